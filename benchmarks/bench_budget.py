@@ -0,0 +1,139 @@
+# -- coding: utf-8 --
+# Anggaran request OSRM (OSRM_RATE): satu klien API bulk yang bising (banyak koneksi /api/route) bersama satu klien
+# API yang sopan (satu koneksi dengan jeda) dan beberapa pengguna halaman peta (POST /), dengan dan tanpa
+# UpstreamBudget. Dilaporkan laju request ke OSRM (harus di bawah batas server publik), latensi per kelas klien,
+# serta berapa respons yang dipangkas (tanpa rute alternatif / hasil lama) atau ditolak (503). OSRM dilayani
+# osrm_stub; jam dibekukan pada jam sibuk agar rute alternatif dibutuhkan.
+#
+#   python benchmarks/bench_budget.py [--rate 20] [--bulk 8] [--interactive 2] [--duration 5] [--latency 20]
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import osrm_stub
+import ujianakhir
+from ujianakhir import Config, OSRMClient, RouteCache, SmartNavigator, TrafficPredictor, UpstreamBudget
+
+RUSH_HOUR = datetime(2024, 5, 6, 8, 0)
+
+
+class CountingSession:
+    def __init__(self, session):
+        self.session = session
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def get(self, *args, **kwargs):
+        with self._lock:
+            self.calls += 1
+        return self.session.get(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+
+def make_app(args, rate):
+    session = CountingSession(osrm_stub.stub_session(latency=args.latency / 1000))
+    navigator = SmartNavigator(route_cache=RouteCache(db_path=''), route_matrix=None, osrm_client=OSRMClient(session=session),
+                               traffic_predictor=TrafficPredictor(clock=lambda: RUSH_HOUR),
+                               upstream_budget=UpstreamBudget(rate=rate, burst=args.burst))
+    return ujianakhir.create_app(navigator=navigator, background=False), session
+
+
+def classify(kind, response):
+    # 'ok', 'dipangkas' (rute utama saja / hasil lama) atau 'ditolak'
+    if kind != 'halaman':
+        if response.status_code == 503:
+            return 'ditolak'
+        return 'dipangkas' if response.get_json().get('degraded') else 'ok'
+    page = response.get_data(as_text=True)
+    if 'Layanan peta sedang sibuk, coba lagi' in page:
+        return 'ditolak'
+    return 'dipangkas' if 'Layanan peta sedang sibuk:' in page else 'ok'
+
+
+def drive(app, args):
+    pairs = [(start, end, transport) for transport in Config.TRANSPORT_PROFILES
+             for start in Config.NODES for end in Config.NODES if start != end]
+    results = {'halaman': [], 'bulk sopan': [], 'bulk bising': []}
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + args.duration
+
+    def worker(kind, index):
+        rng = random.Random(index)
+        client = app.test_client()
+        # Semua koneksi bulk bising berasal dari satu alamat; klien lain masing-masing punya alamat sendiri
+        address = {'bulk bising': '10.0.0.1', 'bulk sopan': '10.0.0.2'}.get(kind, f"10.0.1.{index}")
+        local = []
+        while time.perf_counter() < stop_at:
+            start, end, transport = rng.choice(pairs)
+            started = time.perf_counter()
+            if kind == 'halaman':
+                response = client.post('/', data={'start': start, 'end': end, 'transport': transport},
+                                       environ_base={'REMOTE_ADDR': address})
+            else:
+                response = client.post('/api/route', json={'start': start, 'end': end, 'transport': transport},
+                                       environ_base={'REMOTE_ADDR': address})
+            local.append((time.perf_counter() - started, classify(kind, response)))
+            if kind != 'bulk bising':
+                time.sleep(args.think / 1000)
+        with lock:
+            results[kind].extend(local)
+
+    threads = [threading.Thread(target=worker, args=('bulk bising', i)) for i in range(args.bulk)]
+    threads += [threading.Thread(target=worker, args=('halaman', i)) for i in range(args.interactive)]
+    threads.append(threading.Thread(target=worker, args=('bulk sopan', args.bulk)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def summarize(samples):
+    latencies = sorted(seconds for seconds, _ in samples)
+
+    def pick(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else 0.0
+
+    outcomes = [outcome for _, outcome in samples]
+    return len(samples), pick(0.5), pick(0.95), outcomes.count('dipangkas'), outcomes.count('ditolak')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark anggaran request OSRM")
+    parser.add_argument('--rate', type=float, default=20, help="Batas request OSRM per detik (OSRM_RATE)")
+    parser.add_argument('--burst', type=int, default=Config.OSRM_BURST)
+    parser.add_argument('--bulk', type=int, default=8, help="Koneksi klien API bulk (satu alamat)")
+    parser.add_argument('--interactive', type=int, default=2, help="Pengguna halaman peta")
+    parser.add_argument('--think', type=float, default=200, help="Jeda antar request halaman peta / klien sopan (ms)")
+    parser.add_argument('--duration', type=float, default=5, help="Durasi per konfigurasi (detik)")
+    parser.add_argument('--latency', type=float, default=20, help="Latensi OSRM tiruan (ms)")
+    args = parser.parse_args(argv)
+
+    print(f"Batas OSRM {args.rate:.0f} req/s (burst {args.burst}), {args.bulk} koneksi bulk bising, 1 bulk sopan, "
+          f"{args.interactive} pengguna halaman peta, latensi OSRM {args.latency:.0f} ms")
+    print(f"{'Anggaran':<10}{'OSRM req/s':>11}{'Klien':>13}{'Request':>9}{'p50':>11}{'p95':>11}{'Dipangkas':>11}{'Ditolak':>9}")
+    for label, rate in (('tanpa', 0), ('aktif', args.rate)):
+        app, session = make_app(args, rate)
+        started = time.perf_counter()
+        results = drive(app, args)
+        upstream = f"{session.calls / (time.perf_counter() - started):.1f}"
+        for kind in results:
+            count, p50, p95, degraded, rejected = summarize(results[kind])
+            print(f"{label:<10}{upstream:>11}{kind:>13}{count:>9}{p50:>8.1f} ms{p95:>8.1f} ms{degraded:>11}{rejected:>9}")
+            label = upstream = ''
+        budget = app.extensions['smartcity']['navigator'].upstream.info()
+        if rate:
+            print(f"{'':<10}token: {budget['granted']} diberikan, {budget['queued']} antre, "
+                  f"{budget['shed']} ditolak, {budget['skipped']} alternatif dilewati")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+# -- coding: utf-8 --
+# Prakiraan ETA per jam keberangkatan: satu panggilan forecast_departures (geometri sekali, faktor kemacetan
+# semua slot dalam satu operasi array) vs find_all_routes per slot. OSRM dilayani osrm_stub.
+#
+#   python benchmarks/bench_forecast.py [--window 180] [--slot 15] [--repeat 20]
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import osrm_stub
+from ujianakhir import Config, OSRMClient, RouteCache, SmartNavigator
+
+
+class CountingSession:
+    def __init__(self, session):
+        self.session = session
+        self.calls = 0
+
+    def get(self, *args, **kwargs):
+        self.calls += 1
+        return self.session.get(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+
+def navigator():
+    session = CountingSession(osrm_stub.stub_session())
+    return SmartNavigator(route_cache=RouteCache(db_path=''), route_matrix=None, osrm_client=OSRMClient(session=session)), session
+
+
+def per_slot(nav, pairs, departures):
+    for start, end, transport in pairs:
+        for depart in departures:
+            nav.result_cache.clear()  # tiap slot dihitung seperti request baru pada jam tersebut
+            nav.find_all_routes(start, end, transport, depart)
+
+
+def vectorized(nav, pairs, departures, window, slot):
+    for start, end, transport in pairs:
+        nav.forecast_departures(start, end, transport, departures[0], window, slot)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark prakiraan ETA per jam keberangkatan")
+    parser.add_argument('--window', type=int, default=180, help="Jendela keberangkatan (menit)")
+    parser.add_argument('--slot', type=int, default=15, help="Lebar slot (menit)")
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    start_at = datetime(2024, 5, 6, 6, 0)
+    departures = [start_at + timedelta(minutes=offset) for offset in range(0, args.window - args.window % args.slot, args.slot)]
+    pairs = [(start, end, 'motor') for start in Config.NODES for end in Config.NODES if start != end][:30]
+
+    print(f"{len(pairs)} pasangan x {len(departures)} slot")
+    print(f"{'Mode':<26}{'Cold':>10}{'Warm':>10}{'Req OSRM':>10}")
+    for label, fn in (('find_all_routes per slot', lambda nav: per_slot(nav, pairs, departures)),
+                      ('forecast_departures', lambda nav: vectorized(nav, pairs, departures, args.window, args.slot))):
+        nav, session = navigator()
+        started = time.perf_counter()
+        fn(nav)
+        cold = time.perf_counter() - started
+        calls = session.calls
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            fn(nav)
+        warm = (time.perf_counter() - started) / args.repeat
+        print(f"{label:<26}{cold * 1000:>7.1f} ms{warm * 1000:>7.1f} ms{calls:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+# -- coding: utf-8 --
+# Isokron (/api/isochrone): satu route OSRM per titik sampel vs request table (sources=0) berkelompok, serta biaya
+# isokron saat cache kosong, saat bucket kemacetan berganti (waktu tempuh bebas hambatan dipakai ulang) dan saat
+# hasil sudah di-cache. OSRM dilayani osrm_stub; dengan --graph juga diukur mesin rute lokal (Dijkstra terpotong).
+#
+#   python benchmarks/bench_isochrone.py [--latency 20] [--minutes 5 10 15] [--graph road_graph.npz]
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import osrm_stub
+from ujianakhir import Config, Isochrone, LocalRouter, OSRMClient, RoadGraph, RouteCache, SmartNavigator, TrafficPredictor
+
+RUSH_HOUR = datetime(2024, 5, 6, 8, 0)
+NIGHT = datetime(2024, 5, 6, 3, 0)
+
+
+class CountingSession:
+    def __init__(self, session):
+        self.session = session
+        self.calls = 0
+
+    def get(self, *args, **kwargs):
+        self.calls += 1
+        return self.session.get(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+
+def navigator(latency):
+    session = CountingSession(osrm_stub.stub_session(latency=latency))
+    return SmartNavigator(route_cache=RouteCache(db_path=''), route_matrix=None, osrm_client=OSRMClient(session=session)), session
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - started) * 1000, result
+
+
+def per_point(nav, origin, transport, max_minutes):
+    # Pembanding: titik sampel yang sama, tetapi satu request route per titik (tetap paralel lewat _prefetch_osrm)
+    coords = (Config.NODES[origin]['lat'], Config.NODES[origin]['lng'])
+    radius_km = max_minutes / 60 * Config.TRANSPORT_PROFILES[transport]['base_speed'] * Config.ISOCHRONE_SPEED_MARGIN
+    lat, lng = Isochrone(coords, radius_km, 2 * radius_km / Config.ISOCHRONE_GRID).centers()
+    nav._prefetch_osrm([([coords, point], transport) for point in zip(lat.tolist(), lng.tolist())])
+    return len(lat)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark isokron")
+    parser.add_argument('--latency', type=float, default=20, help="Latensi OSRM tiruan per request (ms)")
+    parser.add_argument('--origin', type=int, default=1)
+    parser.add_argument('--transport', default='motor', choices=list(Config.TRANSPORT_PROFILES))
+    parser.add_argument('--minutes', type=int, nargs='+', default=list(Config.ISOCHRONE_MINUTES))
+    parser.add_argument('--graph', help="Graf jalan (.npz) untuk mengukur backend lokal")
+    args = parser.parse_args(argv)
+
+    nav, session = navigator(args.latency / 1000)
+    baseline_ms, samples = timed(lambda: per_point(nav, args.origin, args.transport, max(args.minutes)))
+    baseline_calls = session.calls
+
+    nav, session = navigator(args.latency / 1000)
+    cold_ms, result = timed(lambda: nav.isochrone(args.origin, args.transport, args.minutes, RUSH_HOUR))
+    cold_calls = session.calls
+    bucket_ms, _ = timed(lambda: nav.isochrone(args.origin, args.transport, args.minutes, NIGHT))
+    cached_ms, _ = timed(lambda: nav.isochrone(args.origin, args.transport, args.minutes, RUSH_HOUR))
+    vertices = sum(len(ring) for feature in result['features'] for polygon in feature['geometry']['coordinates'] for ring in polygon)
+
+    print(f"Asal: {Config.NODES[args.origin]['name']}, moda: {args.transport}, kontur: {args.minutes} menit, "
+          f"{samples} titik sampel, latensi OSRM {args.latency:.0f} ms")
+    print(f"{'Mode':<36}{'Waktu':>12}{'Request OSRM':>15}")
+    print(f"{'Route per titik sampel':<36}{baseline_ms:>9.1f} ms{baseline_calls:>15}")
+    print(f"{'Table sources=0 (cache kosong)':<36}{cold_ms:>9.1f} ms{cold_calls:>15}")
+    print(f"{'Bucket kemacetan berganti':<36}{bucket_ms:>9.2f} ms{session.calls - cold_calls:>15}")
+    print(f"{'Hasil di cache':<36}{cached_ms:>9.3f} ms{0:>15}")
+    print(f"Speedup table vs route per titik: {baseline_ms / cold_ms:.1f}x; {vertices} titik poligon")
+
+    if args.graph:
+        local = SmartNavigator(route_cache=RouteCache(db_path=''), route_matrix=None,
+                               osrm_client=LocalRouter(RoadGraph.load(args.graph), TrafficPredictor()))
+        local.osrm.warm()
+        cold_ms, result = timed(lambda: local.isochrone(args.origin, args.transport, args.minutes, RUSH_HOUR))
+        bucket_ms, _ = timed(lambda: local.isochrone(args.origin, args.transport, args.minutes, NIGHT))
+        cells = np.mean([len(feature['geometry']['coordinates']) for feature in result.get('features', [])] or [0])
+        print(f"Graf lokal ({local.osrm.graph.n_vertices} vertex): cache kosong {cold_ms:.1f} ms, "
+              f"bucket berganti {bucket_ms:.2f} ms, rata-rata {cells:.1f} poligon per kontur")
+
+
+if __name__ == '__main__':
+    main()
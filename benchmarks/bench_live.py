@@ -0,0 +1,80 @@
+# -- coding: utf-8 --
+# Throughput ingest data lalu lintas live: parsing baris CSV, pencocokan node terdekat per batch,
+# dan agregat ring buffer. Memori agregat harus tetap sama berapa pun jumlah sampel.
+#
+#   python benchmarks/bench_live.py [--samples 500000] [--batch 5000]
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from ujianakhir import Config, LiveTraffic, TrafficPredictor, parse_probe_lines
+
+
+def synthetic_samples(n, rng, now):
+    # Sampel tersebar di sekitar lokasi Config.NODES dengan timestamp naik dalam satu jendela
+    nodes = np.array([[node['lat'], node['lng']] for node in Config.NODES.values()])
+    picks = rng.integers(0, len(nodes), n)
+    return np.column_stack([
+        nodes[picks, 0] + rng.normal(0, 0.002, n),
+        nodes[picks, 1] + rng.normal(0, 0.002, n),
+        rng.uniform(3, 60, n),
+        now - Config.LIVE_WINDOW_SECONDS + np.sort(rng.uniform(0, Config.LIVE_WINDOW_SECONDS, n)),
+    ])
+
+
+def ingest_all(live, samples, batch):
+    started = time.perf_counter()
+    for i in range(0, len(samples), batch):
+        live.ingest(samples[i:i + batch])
+    return time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ingest data lalu lintas live")
+    parser.add_argument('--samples', type=int, default=500000)
+    parser.add_argument('--batch', type=int, default=Config.LIVE_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(3)
+    now = time.time()
+    samples = synthetic_samples(args.samples, rng, now)
+    lines = [f"{lat:.6f},{lng:.6f},{speed:.1f},{ts:.0f}" for lat, lng, speed, ts in samples[:args.batch]]
+
+    started = time.perf_counter()
+    parse_probe_lines(lines)
+    parse_s = time.perf_counter() - started
+
+    live = LiveTraffic()
+    ingest_s = ingest_all(live, samples, args.batch)
+
+    # Puncak memori selama ingest sedikit vs banyak sampel: selisihnya hanya buffer batch, bukan riwayat sampel
+    peaks = []
+    for n in (args.batch * 2, args.samples):
+        live = LiveTraffic()
+        tracemalloc.start()
+        ingest_all(live, samples[:n], args.batch)
+        peaks.append(tracemalloc.get_traced_memory()[1] / 1024 / 1024)
+        tracemalloc.stop()
+
+    predictor = TrafficPredictor(live=live)
+    started = time.perf_counter()
+    predictor.snapshot()
+    blend_ms = (time.perf_counter() - started) * 1000
+
+    print(f"{'Tahap':<34}{'Hasil':>20}")
+    print(f"{'Parsing CSV':<34}{len(lines) / parse_s:>14,.0f} baris/s")
+    print(f"{'Ingest (node terdekat + agregat)':<34}{args.samples / ingest_s:>12,.0f} sampel/s")
+    print(f"{'Puncak memori':<34}{peaks[0]:>8.2f} MiB ({args.batch * 2:,} sampel) / {peaks[1]:.2f} MiB ({args.samples:,} sampel)")
+    print(f"{'Snapshot gabungan pertama':<34}{blend_ms:>17.2f} ms")
+    info = live.info()
+    print(f"Sampel cocok / di luar radius / terlambat: {info['matched']:,} / {info['unmatched']:,} / {info['late']:,}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+# -- coding: utf-8 --
+# Generator beban untuk perencanaan kapasitas: campuran request realistis ke `/` dan `/api/route` (asal-tujuan
+# condong ke lokasi populer, tiga moda, jam sibuk vs sepi lewat jam TrafficPredictor yang dibekukan per request)
+# diputar pada beberapa tingkat konkurensi. OSRM dilayani osrm_stub dengan latensi log-normal.
+# Hasilnya kurva saturasi: di konkurensi berapa throughput berhenti naik, dan tahap mana (tunggu OSRM, pencarian
+# node terdekat, render folium, ...) yang menghabiskan waktu per request saat itu.
+#
+#   python benchmarks/bench_load.py [--concurrency 1 2 4 8 16 32] [--duration 5] [--latency 20] [--map folium]
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import osrm_stub
+import ujianakhir
+from ujianakhir import Config, OSRMClient, RouteCache, SmartNavigator, TrafficPredictor
+
+WEEKDAY = datetime(2024, 5, 6)  # Senin
+WEEKEND = datetime(2024, 5, 11)  # Sabtu
+RUSH_HOURS = (7, 8, 16, 17, 18)
+OFF_PEAK_HOURS = (10, 11, 13, 14, 20, 21)
+# Bagian waktu request yang saling lepas; tahap yang bersarang dikurangkan dari tahap induknya (lihat breakdown)
+BUCKETS = ('OSRM', 'Geodesik', 'Kemacetan', 'Rute lain', 'Folium', 'Layer JSON', 'Flask/antrean')
+
+
+class ReplayClock:
+    # Jam TrafficPredictor per thread: test client Flask menjalankan request di thread pemanggil, sehingga tiap
+    # request memakai waktu yang ditetapkan generator tepat sebelum request dikirim
+    def __init__(self, default):
+        self.default = default
+        self._local = threading.local()
+
+    def set(self, at):
+        self._local.at = at
+
+    def __call__(self):
+        return getattr(self._local, 'at', self.default)
+
+
+class LatencyModel:
+    # Latensi OSRM log-normal: median dan sebaran (sigma) dalam skala log; 0 ms = tanpa jeda
+    def __init__(self, median_ms, sigma, seed):
+        self.median = median_ms / 1000
+        self.sigma = sigma
+        self.seed = seed
+        self._local = threading.local()
+
+    def __call__(self, key):
+        if not self.median:
+            return 0.0
+        rng = getattr(self._local, 'rng', None)
+        if rng is None:
+            rng = self._local.rng = random.Random(f"{self.seed}-{threading.get_ident()}")
+        return self.median * math.exp(rng.gauss(0, self.sigma))
+
+
+class RequestMix:
+    def __init__(self, args):
+        # Popularitas lokasi mengikuti Zipf; lokasi kritis (pusat keramaian) di peringkat teratas
+        ranked = sorted(Config.NODES, key=lambda node_id: (not Config.NODES[node_id]['critical'], node_id))
+        self.nodes = ranked
+        self.node_weights = [1 / (rank + 1) ** args.zipf for rank in range(len(ranked))]
+        self.transports = list(Config.TRANSPORT_PROFILES)
+        self.transport_weights = [args.transport_mix.get(transport, 0) for transport in self.transports]
+        self.args = args
+
+    def draw(self, rng):
+        args = self.args
+        start = rng.choices(self.nodes, self.node_weights)[0]
+        end = start
+        while end == start:
+            end = rng.choices(self.nodes, self.node_weights)[0]
+        transport = rng.choices(self.transports, self.transport_weights)[0]
+        day = WEEKEND if rng.random() < args.weekend_ratio else WEEKDAY
+        hour = rng.choice(RUSH_HOURS if rng.random() < args.rush_ratio else OFF_PEAK_HOURS)
+        at = day + timedelta(hours=hour, minutes=rng.randrange(60))
+        roll = rng.random()
+        kind = 'home' if roll < args.home_ratio else 'page' if roll < args.home_ratio + args.page_ratio else 'route'
+        return kind, start, end, transport, at
+
+
+def make_app(args, clock):
+    session = osrm_stub.stub_session(latency=LatencyModel(args.latency, args.jitter, args.seed))
+    navigator = SmartNavigator(route_cache=RouteCache(db_path=''), route_matrix=None, osrm_client=OSRMClient(session=session),
+                               traffic_predictor=TrafficPredictor(clock=clock))
+    app = ujianakhir.create_app(navigator=navigator, background=False)
+    app.test_client().get('/')  # import folium/Jinja dan layer awal tidak dihitung
+    return app
+
+
+def send(client, kind, start, end, transport):
+    if kind == 'home':
+        return client.get('/')
+    if kind == 'page':
+        return client.post('/', data={'start': start, 'end': end, 'transport': transport})
+    return client.post('/api/route', json={'start': start, 'end': end, 'transport': transport})
+
+
+def drive(app, clock, mix, concurrency, duration, seed):
+    # Closed loop: tiap thread langsung mengirim request berikutnya setelah respons diterima
+    samples, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        client = app.test_client()
+        local, failed = [], 0
+        while time.perf_counter() < stop_at:
+            kind, start, end, transport, at = mix.draw(rng)
+            clock.set(at)
+            started = time.perf_counter()
+            response = send(client, kind, start, end, transport)
+            local.append(time.perf_counter() - started)
+            failed += response.status_code != 200
+        with lock:
+            samples.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, errors[0], time.perf_counter() - started
+
+
+def breakdown(totals, latency_total, requests):
+    # ms per request untuk tiap bagian yang saling lepas. OSRM, node terdekat dan kemacetan terjadi di dalam
+    # route_search; sisanya (route_search dikurangi ketiganya) adalah CPU rute lain. Request OSRM paralel
+    # (alternatif, prefetch) bisa membuat jumlah tunggu OSRM melebihi route_search, sehingga dipotong di nol.
+    def total(stage):
+        return totals.get(stage, (0.0, 0))[0]
+
+    search = total('route_search')
+    parts = {'OSRM': total('osrm_request'), 'Geodesik': total('nearest_node'), 'Kemacetan': total('congestion')}
+    parts['Rute lain'] = max(0.0, search - sum(parts.values()))
+    parts['Folium'] = total('map_render')
+    parts['Layer JSON'] = total('map_layer')
+    parts['Flask/antrean'] = max(0.0, latency_total - search - parts['Folium'] - parts['Layer JSON'])
+    return {name: seconds / max(requests, 1) * 1000 for name, seconds in parts.items()}
+
+
+def run_level(args, mix, concurrency):
+    clock = ReplayClock(WEEKDAY + timedelta(hours=8))
+    app = make_app(args, clock)
+    if args.warmup:
+        drive(app, clock, mix, concurrency, args.warmup, seed=1)  # cache rute diisi dulu, tidak dihitung
+    ujianakhir.metrics.reset()
+    samples, errors, wall = drive(app, clock, mix, concurrency, args.duration, seed=2)
+    totals = ujianakhir.metrics.stage_totals()
+    samples.sort()
+
+    def pick(p):
+        return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+
+    return {
+        'concurrency': concurrency,
+        'requests': len(samples),
+        'errors': errors,
+        'throughput': round(len(samples) / wall, 1),
+        'p50_ms': round(pick(0.5), 2),
+        'p95_ms': round(pick(0.95), 2),
+        'stages_ms': {name: round(ms, 3) for name, ms in breakdown(totals, sum(samples), len(samples)).items()},
+    }
+
+
+def knee(results, gain):
+    # Tingkat pertama yang throughput-nya naik kurang dari `gain` dibanding tingkat sebelumnya
+    for previous, current in zip(results, results[1:]):
+        if current['throughput'] < previous['throughput'] * (1 + gain):
+            return previous
+    return None
+
+
+def parse_mix(text):
+    # "motor=0.55,mobil=0.35,jalan_kaki=0.1"
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in Config.TRANSPORT_PROFILES:
+            raise argparse.ArgumentTypeError(f"Moda '{name}' tidak dikenal")
+        mix[name] = float(weight)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generator beban dan kurva saturasi SmartCity Bengkulu")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--duration', type=float, default=5, help="Durasi pengukuran per tingkat (detik)")
+    parser.add_argument('--warmup', type=float, default=1, help="Pemanasan per tingkat, tidak dihitung (detik)")
+    parser.add_argument('--latency', type=float, default=20, help="Median latensi OSRM tiruan (ms)")
+    parser.add_argument('--jitter', type=float, default=0.5, help="Sigma log-normal latensi OSRM")
+    parser.add_argument('--map', choices=['json', 'folium'], default=Config.MAP_RENDERING, help="MAP_RENDERING halaman utama")
+    parser.add_argument('--page-ratio', type=float, default=0.3, help="Porsi POST / (halaman dengan rute)")
+    parser.add_argument('--home-ratio', type=float, default=0.05, help="Porsi GET / (halaman kosong)")
+    parser.add_argument('--rush-ratio', type=float, default=0.5, help="Porsi request pada jam sibuk")
+    parser.add_argument('--weekend-ratio', type=float, default=2 / 7)
+    parser.add_argument('--zipf', type=float, default=1.1, help="Kecondongan popularitas lokasi (0 = seragam)")
+    parser.add_argument('--transport-mix', type=parse_mix, default=parse_mix('motor=0.55,mobil=0.35,jalan_kaki=0.1'))
+    parser.add_argument('--knee', type=float, default=0.1, help="Kenaikan throughput minimum agar dianggap masih naik")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help="Simpan kurva ke file JSON")
+    args = parser.parse_args(argv)
+
+    Config.MAP_RENDERING = args.map
+    mix = RequestMix(args)
+    results = []
+    for concurrency in args.concurrency:
+        results.append(run_level(args, mix, concurrency))
+
+    base = results[0]['throughput'] / results[0]['concurrency']
+    print(f"CPU: {os.cpu_count()}, peta: {args.map}, OSRM median {args.latency:.0f} ms (sigma {args.jitter}), "
+          f"jam sibuk {args.rush_ratio:.0%}, halaman {args.page_ratio + args.home_ratio:.0%}")
+    print(f"{'Konk':>5}{'Req/s':>9}{'Efisiensi':>11}{'p50':>11}{'p95':>11}{'Error':>7}  "
+          + ''.join(f"{name:>14}" for name in BUCKETS) + "  (ms/request)")
+    for r in results:
+        efficiency = r['throughput'] / (base * r['concurrency']) if base else 0.0
+        print(f"{r['concurrency']:>5}{r['throughput']:>9.1f}{efficiency:>10.0%} {r['p50_ms']:>8.1f} ms{r['p95_ms']:>8.1f} ms"
+              f"{r['errors']:>7}  " + ''.join(f"{r['stages_ms'][name]:>14.2f}" for name in BUCKETS))
+
+    saturated = knee(results, args.knee)
+    if saturated is None:
+        print(f"Throughput masih naik hingga konkurensi {results[-1]['concurrency']}")
+    else:
+        # Tahap yang paling bertambah lambat menyerap antrean (CPU/GIL, pool koneksi); porsi terbesar belum tentu sama
+        stages, first = saturated['stages_ms'], results[0]['stages_ms']
+        slowest = max(stages, key=lambda name: stages[name] - first[name])
+        largest = max(stages, key=stages.get)
+        print(f"Throughput berhenti naik setelah konkurensi {saturated['concurrency']} ({saturated['throughput']:.1f} req/s)")
+        print(f"Bottleneck: {slowest} (+{stages[slowest] - first[slowest]:.2f} ms/request sejak konkurensi "
+              f"{results[0]['concurrency']}); porsi terbesar: {largest} ({stages[largest] / sum(stages.values()):.0%})")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'cpu_count': os.cpu_count(), 'args': dict(vars(args)), 'results': results,
+                       'knee': saturated['concurrency'] if saturated else None}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+# -- coding: utf-8 --
+# Latensi p50/p99 halaman "/" dengan render folium penuh vs HTML peta dasar yang di-cache,
+# lalu biaya satu pencarian rute (waktu server dan byte) mode MAP_RENDERING=folium vs json.
+#
+#   python benchmarks/bench_map.py [--requests 200]
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import folium
+from folium.plugins import HeatMap
+
+import osrm_stub
+import ujianakhir
+from ujianakhir import Config, OSRMClient
+
+
+def legacy_create_map(self, start=None, end=None, route_data=None, at=None):
+    # TrafficMap.create_map sebelum cache: seluruh peta dibangun dan dirender ulang tiap request
+    traffic_map = folium.Map(location=[-3.7956, 102.2597], zoom_start=14, tiles='cartodbpositron')
+    snapshot = self.traffic_predictor.snapshot(at)
+    heat_data = []
+    for node_id, node in Config.NODES.items():
+        heat_data.append([node['lat'], node['lng'], 0.7 if snapshot[node_id]['level'] == 'padat' else 0.3])
+    HeatMap(heat_data, radius=15).add_to(traffic_map)
+    for node_id, node in Config.NODES.items():
+        congestion = snapshot[node_id]
+        folium.CircleMarker(
+            location=[node['lat'], node['lng']],
+            radius=6,
+            popup=f"{node['name']} - {congestion['level']} ({congestion['reason']})",
+            color=self.congestion_colors[congestion['level']],
+            fill=True
+        ).add_to(traffic_map)
+    for key, color in (('primary', 'blue'), ('alternative', 'green')):
+        route = (route_data or {}).get(key)
+        if route and route.get('path'):
+            folium.PolyLine(route['path'], color=color, weight=6,
+                            popup=f"Rute {'Alternatif' if route.get('is_alternative') else 'Utama'}: {route['distance']} ({route['time']})").add_to(traffic_map)
+    for node_id, label, color, icon in ((start, 'START', 'green', 'play'), (end, 'END', 'red', 'stop')):
+        if node_id in Config.NODES:
+            node = Config.NODES[node_id]
+            folium.Marker(location=[node['lat'], node['lng']], popup=f"<b>{label}:</b> {node['name']}",
+                          icon=folium.Icon(color=color, icon=icon, prefix='fa')).add_to(traffic_map)
+    return traffic_map._repr_html_()
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+
+    def pick(p):
+        return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+
+    return pick(0.5), pick(0.99)
+
+
+def run(client, n_requests):
+    results = {}
+    for label, method, data in (('GET /', 'get', None), ('POST / (rute)', 'post', {'start': 11, 'end': 15, 'transport': 'motor'})):
+        samples = []
+        for _ in range(n_requests):
+            started = time.perf_counter()
+            response = getattr(client, method)('/', data=data)
+            samples.append(time.perf_counter() - started)
+            assert response.status_code == 200
+        results[label] = percentiles(samples)
+    return results
+
+
+def search_cost(client, mode, n_requests):
+    # Satu pencarian = POST / ditambah (mode json) layer yang diambil browser: layer rute baru (200) dan
+    # revalidasi layer kemacetan (304). Shell ada di cache browser dan tidak diminta lagi.
+    Config.MAP_RENDERING = mode
+    pairs = [(start, end) for start in Config.NODES for end in Config.NODES if start != end]
+    congestion_etag = client.get('/api/map/congestion').headers['ETag']
+    page_samples, samples, sizes = [], [], []
+    for i in range(n_requests):
+        start, end = pairs[i % len(pairs)]
+        started = time.perf_counter()
+        size = len(client.post('/', data={'start': start, 'end': end, 'transport': 'motor'}).data)
+        page_samples.append(time.perf_counter() - started)
+        if mode == 'json':
+            size += len(client.get(f'/api/map/route?start={start}&end={end}&transport=motor').data)
+            response = client.get('/api/map/congestion', headers={'If-None-Match': congestion_etag})
+            assert response.status_code == 304
+        samples.append(time.perf_counter() - started)
+        sizes.append(size)
+    return percentiles(page_samples)[0], percentiles(samples), sum(sizes) / len(sizes)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark render peta")
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    navigator = ujianakhir.SmartNavigator(osrm_client=OSRMClient(session=osrm_stub.stub_session()))
+    client = ujianakhir.create_app(navigator=navigator).test_client()
+    client.post('/', data={'start': 11, 'end': 15, 'transport': 'motor'})  # hangatkan cache rute
+
+    rendering = Config.MAP_RENDERING
+    Config.MAP_RENDERING = 'folium'
+    cached = run(client, args.requests)
+    original = ujianakhir.TrafficMap.create_map
+    ujianakhir.TrafficMap.create_map = legacy_create_map
+    try:
+        legacy = run(client, args.requests)
+    finally:
+        ujianakhir.TrafficMap.create_map = original
+
+    print(f"{'Request':<16}{'Sebelum p50':>13}{'p99':>10}{'Sesudah p50':>14}{'p99':>10}")
+    for label in cached:
+        print(f"{label:<16}{legacy[label][0]:>10.2f} ms{legacy[label][1]:>7.2f} ms{cached[label][0]:>11.2f} ms{cached[label][1]:>7.2f} ms")
+
+    for start in Config.NODES:  # hangatkan cache hasil rute semua pasangan
+        for end in Config.NODES:
+            if start != end:
+                navigator.find_all_routes(start, end, 'motor')
+    try:
+        costs = {mode: search_cost(client, mode, args.requests) for mode in ('folium', 'json')}
+    finally:
+        Config.MAP_RENDERING = rendering
+    print(f"\n{'Per pencarian':<16}{'POST / p50':>12}{'Total p50':>12}{'p99':>10}{'Byte':>10}")
+    for mode, (page_p50, (p50, p99), size) in costs.items():
+        print(f"{mode:<16}{page_p50:>9.2f} ms{p50:>9.2f} ms{p99:>7.2f} ms{size:>10,.0f}")
+
+
+if __name__ == '__main__':
+    main()
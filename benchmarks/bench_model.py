@@ -0,0 +1,85 @@
+# -- coding: utf-8 --
+# Throughput model kemacetan: satu inferensi per baris vs satu inferensi batch.
+# Model XGBoost kecil dilatih dari data sintetis sehingga berjalan offline.
+#
+#   python benchmarks/bench_model.py [--rows 2000] [--save-model xgb_model.json]
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import xgboost
+
+from ujianakhir import Config, TrafficPredictor, XGBoostCongestionModel
+
+
+def synthetic_training_data(n_rows, rng):
+    # Fitur sama dengan XGBoostCongestionModel.FEATURES; label mengikuti aturan jam sibuk + noise
+    length = rng.uniform(0.05, 3.0, n_rows)
+    factor = rng.choice([0.3, 0.4, 0.7, 1.0], n_rows, p=[0.1, 0.2, 0.2, 0.5])
+    hour = rng.integers(0, 24, n_rows)
+    is_weekend = rng.random(n_rows) < 2 / 7
+    rush = ((hour >= 7) & (hour <= 9)) | ((hour >= 16) & (hour <= 19))
+    logit = -2.0 + 3.0 * (1.0 - factor) + 1.2 * rush + 0.6 * is_weekend + 0.3 * length
+    label = rng.random(n_rows) < 1 / (1 + np.exp(-logit))
+    X = np.column_stack([length, factor, hour, is_weekend]).astype(np.float32)
+    return X, label.astype(np.float32)
+
+
+def train_model(path, n_rows=20000, seed=7):
+    X, y = synthetic_training_data(n_rows, np.random.default_rng(seed))
+    dtrain = xgboost.DMatrix(X, label=y, feature_names=list(XGBoostCongestionModel.FEATURES))
+    params = {'objective': 'binary:logistic', 'max_depth': 4, 'eta': 0.3, 'nthread': 1}
+    booster = xgboost.train(params, dtrain, num_boost_round=50)
+    booster.save_model(path)
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark model kemacetan")
+    parser.add_argument('--rows', type=int, default=2000, help="Jumlah baris (langkah rute) yang dinilai")
+    parser.add_argument('--save-model', help="Simpan model sintetis ke path ini (mis. xgb_model.json)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.save_model or os.path.join(tmp, 'xgb_model.json')
+        train_model(path)
+        model = XGBoostCongestionModel(path)
+
+    rng = np.random.default_rng(1)
+    at = datetime(2024, 5, 6, 8, 0)
+    node_ids = rng.choice(list(Config.NODES), args.rows).tolist()
+    lengths_km = np.round(rng.uniform(0.05, 3.0, args.rows), 2)
+
+    model.predict(node_ids[:10], at, lengths_km[:10])  # hangatkan
+    per_call_s, per_call = timed(lambda: [model.predict([node_id], at, [length])[0] for node_id, length in zip(node_ids, lengths_km)])
+    batch_s, batch = timed(lambda: model.predict(node_ids, at, lengths_km))
+    assert per_call == batch, "Hasil per-baris dan batch berbeda"
+
+    print(f"{'Mode':<28}{'Waktu':>12}{'Baris/detik':>16}")
+    print(f"{'Per baris':<28}{per_call_s * 1000:>9.1f} ms{args.rows / per_call_s:>16,.0f}")
+    print(f"{'Batch (1 panggilan)':<28}{batch_s * 1000:>9.1f} ms{args.rows / batch_s:>16,.0f}")
+    print(f"{'Speedup batch':<27}: {per_call_s / batch_s:.1f}x")
+
+    # Cache per bucket waktu di TrafficPredictor
+    predictor = TrafficPredictor(model=model)
+    cold_snapshot_s, _ = timed(lambda: predictor.snapshot(at))
+    warm_snapshot_s, _ = timed(lambda: predictor.snapshot(at + timedelta(minutes=5)))
+    cold_steps_s, _ = timed(lambda: predictor.predict_steps(node_ids, lengths_km, at))
+    warm_steps_s, _ = timed(lambda: predictor.predict_steps(node_ids, lengths_km, at))
+    print(f"{'Snapshot semua node':<27}: {cold_snapshot_s * 1000:.2f} ms (cache bucket {warm_snapshot_s * 1000:.3f} ms)")
+    print(f"{f'{args.rows} langkah rute':<27}: {cold_steps_s * 1000:.2f} ms (cache bucket {warm_steps_s * 1000:.2f} ms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# -- coding: utf-8 --
+# Anggaran waktu cold start: import modul, create_app, dan request pertama,
+# masing-masing diukur di interpreter baru. Exit code 1 jika anggaran terlampaui.
+#
+#   python benchmarks/bench_startup.py [--runs 5] [--import-budget-ms 400] [--first-request-budget-ms 1500]
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dijalankan di proses terpisah; cwd direktori kosong untuk memastikan tidak ada file yang ditulis
+PROBE = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+HEAVY = ('folium', 'geopy', 'requests')
+
+started = time.perf_counter()
+import ujianakhir
+import_ms = (time.perf_counter() - started) * 1000
+heavy_after_import = [name for name in HEAVY if name in sys.modules]
+
+import osrm_stub
+started = time.perf_counter()
+app = ujianakhir.create_app(navigator=ujianakhir.SmartNavigator(
+    route_cache=ujianakhir.RouteCache(db_path=''),
+    osrm_client=ujianakhir.OSRMClient(session=osrm_stub.stub_session())))
+create_ms = (time.perf_counter() - started) * 1000
+client = app.test_client()
+
+started = time.perf_counter()
+assert client.post('/api/route', json={{'start': 11, 'end': 15, 'transport': 'motor'}}).status_code == 200
+api_ms = (time.perf_counter() - started) * 1000
+
+started = time.perf_counter()
+assert client.get('/').status_code == 200
+page_ms = (time.perf_counter() - started) * 1000
+
+print(json.dumps({{'import_ms': import_ms, 'create_app_ms': create_ms, 'first_api_ms': api_ms,
+                  'first_page_ms': page_ms, 'heavy_after_import': heavy_after_import}}))
+"""
+
+
+def probe():
+    with tempfile.TemporaryDirectory() as cwd:
+        env = dict(os.environ, PYTHONWARNINGS='ignore', PYTHONDONTWRITEBYTECODE='1')
+        output = subprocess.run([sys.executable, '-c', PROBE.format(root=ROOT)], cwd=cwd, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        written = os.listdir(cwd)
+    result = json.loads(output.strip().splitlines()[-1])
+    result['written'] = written
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark cold start")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--import-budget-ms', type=float, default=400)
+    parser.add_argument('--first-request-budget-ms', type=float, default=1500)
+    args = parser.parse_args(argv)
+
+    probe()  # hangatkan cache bytecode dan page cache OS
+    runs = [probe() for _ in range(args.runs)]
+    median = {key: statistics.median(run[key] for run in runs) for key in ('import_ms', 'create_app_ms', 'first_api_ms', 'first_page_ms')}
+
+    print(f"{'Tahap':<28}{'Median':>12}")
+    print(f"{'import ujianakhir':<28}{median['import_ms']:>9.1f} ms")
+    print(f"{'create_app()':<28}{median['create_app_ms']:>9.1f} ms")
+    print(f"{'POST /api/route pertama':<28}{median['first_api_ms']:>9.1f} ms")
+    print(f"{'GET / pertama (folium)':<28}{median['first_page_ms']:>9.1f} ms")
+    print(f"Modul berat setelah import : {', '.join(runs[0]['heavy_after_import']) or '-'}")
+    print(f"File ditulis saat startup  : {', '.join(runs[0]['written']) or '-'}")
+
+    first_request_ms = median['create_app_ms'] + max(median['first_api_ms'], median['first_page_ms'])
+    failures = []
+    if median['import_ms'] > args.import_budget_ms:
+        failures.append(f"import {median['import_ms']:.1f} ms > {args.import_budget_ms:.0f} ms")
+    if first_request_ms > args.first_request_budget_ms:
+        failures.append(f"request pertama {first_request_ms:.1f} ms > {args.first_request_budget_ms:.0f} ms")
+    if runs[0]['heavy_after_import']:
+        failures.append(f"modul berat diimpor saat import: {runs[0]['heavy_after_import']}")
+    if runs[0]['written']:
+        failures.append(f"file ditulis saat startup: {runs[0]['written']}")
+    for failure in failures:
+        print(f"GAGAL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+# -- coding: utf-8 --
+# Membandingkan loop per-langkah lama dengan pipeline langkah berbasis array.
+#
+#   python benchmarks/bench_steps.py [--repeat 20]
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from geopy.distance import geodesic
+
+import osrm_stub
+from ujianakhir import Config, OSRMClient, RouteCache, SmartNavigator
+
+
+def geodesic_nearest(coords):
+    # _find_nearest_node sebelum ada indeks spasial
+    return min(Config.NODES, key=lambda node_id: geodesic(coords, (Config.NODES[node_id]['lat'], Config.NODES[node_id]['lng'])).km)
+
+
+def legacy_steps(navigator, route, transport_type, nearest):
+    base_speed = Config.TRANSPORT_PROFILES[transport_type]['base_speed']
+    path = [[coord[1], coord[0]] for coord in route['geometry']['coordinates']]
+    steps = []
+    for leg in route.get('legs', []):
+        for i, step in enumerate(leg.get('steps', [])):
+            maneuver = step.get('maneuver', {})
+            instruction = step.get('name', 'Lanjutkan')
+            if maneuver.get('type') == 'turn':
+                direction = maneuver.get('modifier', '')
+                instruction = f"Belok {'kiri' if 'left' in direction else 'kanan'} di {instruction}"
+            if i < len(leg.get('steps', [])) - 1:
+                next_coords = [leg['steps'][i + 1]['maneuver']['location'][1], leg['steps'][i + 1]['maneuver']['location'][0]]
+                direction = navigator.calculate_bearing([step['maneuver']['location'][1], step['maneuver']['location'][0]], next_coords)
+            else:
+                direction = "Lurus"
+            step_distance = step['distance'] / 1000
+            step_duration = (step_distance / base_speed) * 60 / Config.TRANSPORT_PROFILES[transport_type]['congestion_factor']
+            nearest_node = nearest([step['maneuver']['location'][1], step['maneuver']['location'][0]])
+            congestion = navigator.traffic_predictor.predict_congestion(nearest_node)
+            steps.append({
+                'instruction': f"{instruction} menuju arah {direction}",
+                'distance': f"{step_distance:.1f} km",
+                'time': f"{step_duration:.0f} menit",
+                'condition': f"Kondisi jalan: {congestion['level']} ({congestion['reason']})"
+            })
+    return path, steps
+
+
+def vectorized_steps(navigator, route, transport_type):
+    path = np.asarray(route['geometry']['coordinates'], dtype=np.float64)[:, ::-1].tolist()
+    return path, navigator._process_steps(route, transport_type).to_dicts()
+
+
+def timed(fn, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pemrosesan langkah rute")
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    navigator = SmartNavigator(route_cache=RouteCache(db_path=''), osrm_client=OSRMClient(session=osrm_stub.stub_session()))
+    def node(node_id):
+        return (Config.NODES[node_id]['lat'], Config.NODES[node_id]['lng'])
+
+    scenarios = {
+        'Bandara -> Pulau Baai': [node(11), node(15)],
+        'Bandara -> Pulau Baai (via UNIB)': [node(11), node(5), node(15)],
+        'Tur semua lokasi': [node(node_id) for node_id in Config.NODES],
+    }
+
+    print(f"{'Rute':<34}{'Langkah':>8}{'Loop+geodesic':>16}{'Loop+indeks':>14}{'Vektor':>10}{'Speedup':>10}")
+    for label, coords in scenarios.items():
+        route = navigator._fetch_osrm(coords, 'motor')['routes'][0]
+        n_steps = sum(len(leg['steps']) for leg in route['legs'])
+        geodesic_ms, expected = timed(lambda: legacy_steps(navigator, route, 'motor', geodesic_nearest), max(1, args.repeat // 4))
+        loop_ms, _ = timed(lambda: legacy_steps(navigator, route, 'motor', navigator._find_nearest_node), args.repeat)
+        vector_ms, actual = timed(lambda: vectorized_steps(navigator, route, 'motor'), args.repeat)
+        assert actual == expected, "Hasil pipeline vektor berbeda dengan loop lama"
+        print(f"{label:<34}{n_steps:>8}{geodesic_ms:>13.2f} ms{loop_ms:>11.2f} ms{vector_ms:>7.2f} ms{geodesic_ms / vector_ms:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+# -- coding: utf-8 --
+# Suite benchmark offline: semua request OSRM dilayani osrm_stub (rekaman atau sintetis),
+# jam TrafficPredictor dibekukan agar prediksi kemacetan identik antar run, dan hasil dibandingkan
+# dengan baseline tersimpan. Exit code 1 jika ada skenario yang melambat.
+#
+#   python benchmarks/bench_suite.py --save-baseline          # simpan baseline mesin ini
+#   python benchmarks/bench_suite.py                          # bandingkan dengan baseline
+#   python benchmarks/bench_suite.py --recorded osrm_recording.json.gz --latency 20
+#
+# Rekaman OSRM asli dibuat dengan: python precompute_routes.py --record osrm_recording.json.gz
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import osrm_stub
+import ujianakhir
+from ujianakhir import Config, OSRMClient, RouteCache, SmartNavigator, TrafficMap, TrafficPredictor
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+# Metrik yang dibandingkan dengan baseline: nama -> (lebih besar berarti lebih buruk, pengali toleransi).
+# p95 lebih berisik sehingga diberi toleransi dua kali lipat.
+CHECKED = {'p50_ms': (True, 1), 'p95_ms': (True, 2), 'throughput': (False, 1)}
+
+
+def summarize(samples, wall_seconds):
+    samples = sorted(samples)
+
+    def pick(p):
+        return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 3)
+
+    return {
+        'requests': len(samples),
+        'throughput': round(len(samples) / wall_seconds, 1),
+        'p50_ms': pick(0.5),
+        'p95_ms': pick(0.95),
+        'p99_ms': pick(0.99),
+    }
+
+
+def run_sequential(calls):
+    samples = []
+    started = time.perf_counter()
+    for call in calls:
+        call_started = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - call_started)
+    return samples, time.perf_counter() - started
+
+
+def run_concurrent(make_worker_call, items, concurrency):
+    # Tiap thread punya test client sendiri; item dibagi rata antar thread
+    samples = []
+    lock = threading.Lock()
+
+    def worker(chunk):
+        call = make_worker_call()
+        local = []
+        for item in chunk:
+            call_started = time.perf_counter()
+            call(item)
+            local.append(time.perf_counter() - call_started)
+        with lock:
+            samples.extend(local)
+
+    chunks = [items[i::concurrency] for i in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, chunks))
+    return samples, time.perf_counter() - started
+
+
+def peak_memory_mib(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024 / 1024, 2)
+
+
+class Suite:
+    def __init__(self, args):
+        self.args = args
+        self.recorded = osrm_stub.load_recording(args.recorded) if args.recorded else None
+        self.pairs = [(start, end, transport) for transport in Config.TRANSPORT_PROFILES
+                      for start in Config.NODES for end in Config.NODES if start != end]
+        rng = random.Random(args.seed)
+        self.http_items = [rng.choice(self.pairs) for _ in range(args.requests)]
+        self.at = datetime.fromisoformat(args.at)
+
+    def navigator(self):
+        # Tanpa matriks precompute dan tanpa tier disk: setiap run mulai dari cache kosong yang sama
+        session = osrm_stub.stub_session(recorded=self.recorded, latency=self.args.latency / 1000, strict=self.recorded is not None)
+        # Endpoint Flask mengambil waktu dari jam TrafficPredictor, jadi semua skenario memakai waktu beku yang sama
+        return SmartNavigator(route_cache=RouteCache(db_path=''), route_matrix=None, osrm_client=OSRMClient(session=session),
+                              traffic_predictor=TrafficPredictor(clock=lambda: self.at))
+
+    def find_all_routes(self):
+        navigator = self.navigator()
+        at = self.at
+        calls = [lambda item=item: navigator.find_all_routes(*item, at) for item in self.pairs]
+        cold = run_sequential(calls)
+        warm = run_sequential(calls)
+        return {'find_all_routes (cold)': cold, 'find_all_routes (warm)': warm}
+
+    def api_route(self):
+        app = ujianakhir.create_app(navigator=self.navigator())
+
+        def make_call():
+            client = app.test_client()
+            return lambda item: client.post('/api/route', json=dict(zip(('start', 'end', 'transport'), item)))
+
+        return {'POST /api/route': run_concurrent(make_call, self.http_items, self.args.concurrency)}
+
+    def index(self):
+        app = ujianakhir.create_app(navigator=self.navigator())
+        app.test_client().get('/')  # peta dasar pertama (import + render folium) tidak dihitung
+
+        def make_call():
+            client = app.test_client()
+
+            def call(item):
+                # Selang-seling halaman kosong dan halaman dengan rute
+                if item[0] % 2:
+                    return client.get('/')
+                return client.post('/', data=dict(zip(('start', 'end', 'transport'), item)))
+            return call
+
+        return {'GET|POST /': run_concurrent(make_call, self.http_items, self.args.concurrency)}
+
+    def create_map(self):
+        navigator = self.navigator()
+        map_visualizer = TrafficMap(navigator.traffic_predictor)
+        at = self.at
+        routes = [(start, end, navigator.find_all_routes(start, end, transport, at)) for start, end, transport in self.http_items[:50]]
+        map_visualizer.create_map(at=at)
+        calls = [lambda route=route: map_visualizer.create_map(route[0], route[1], route[2], at) for route in routes]
+        return {'TrafficMap.create_map': run_sequential(calls * max(1, self.args.requests // len(calls)))}
+
+    def run(self):
+        scenarios = [self.find_all_routes, self.api_route, self.index, self.create_map]
+        results = {}
+        for scenario in scenarios:
+            # Median dari beberapa run untuk meredam noise penjadwalan thread
+            runs = {}
+            for _ in range(self.args.runs):
+                for name, (samples, wall) in scenario().items():
+                    runs.setdefault(name, []).append(summarize(samples, wall))
+            # Puncak memori diukur pada run terpisah agar tracemalloc tidak mengganggu latensi
+            peak = peak_memory_mib(scenario)
+            for name, summaries in runs.items():
+                results[name] = {key: statistics.median(summary[key] for summary in summaries) for key in summaries[0]}
+                results[name]['peak_mib'] = peak
+        return results
+
+
+def compare(results, baseline, tolerance):
+    failures = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric, (higher_is_worse, multiplier) in CHECKED.items():
+            before, after = previous[metric], current[metric]
+            if not before:
+                continue
+            ratio = after / before if higher_is_worse else before / after
+            if ratio > 1 + tolerance * multiplier:
+                failures.append(f"{name}: {metric} {before} -> {after} ({(ratio - 1) * 100:+.0f}%)")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Suite benchmark offline SmartCity Bengkulu")
+    parser.add_argument('--recorded', help="Putar ulang rekaman OSRM (JSON / JSON.gz); default OSRM sintetis")
+    parser.add_argument('--latency', type=float, default=0.0, help="Latensi OSRM tiruan per request (ms)")
+    parser.add_argument('--requests', type=int, default=400, help="Jumlah request HTTP per skenario")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--runs', type=int, default=3, help="Jumlah pengulangan tiap skenario (diambil median)")
+    parser.add_argument('--at', default='2024-05-06T08:00', help="Waktu beku untuk prediksi kemacetan (ISO)")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help="Simpan hasil run ini sebagai baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Batas perlambatan relatif sebelum gagal")
+    args = parser.parse_args(argv)
+
+    results = Suite(args).run()
+
+    print(f"{'Skenario':<26}{'Req':>6}{'Req/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'Memori':>11}")
+    for name, r in results.items():
+        print(f"{name:<26}{r['requests']:>6.0f}{r['throughput']:>10.1f}{r['p50_ms']:>7.2f} ms{r['p95_ms']:>7.2f} ms"
+              f"{r['p99_ms']:>7.2f} ms{r['peak_mib']:>7.1f} MiB")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'meta': {'python': platform.python_version(), 'machine': platform.machine(), 'args': vars(args)},
+                       'results': results}, f, indent=2)
+        print(f"Baseline disimpan ke {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"Baseline {args.baseline} belum ada; jalankan dengan --save-baseline terlebih dahulu")
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    failures = compare(results, baseline['results'], args.tolerance)
+    for failure in failures:
+        print(f"LEBIH LAMBAT: {failure}")
+    if not failures:
+        print(f"Tidak ada regresi dibanding baseline (toleransi {args.tolerance:.0%})")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
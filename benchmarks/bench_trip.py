@@ -0,0 +1,43 @@
+# -- coding: utf-8 --
+# Urutan kunjungan rute multi-titik: DP eksak (Held-Karp) vs heuristik (2-opt + Or-opt + double bridge)
+# pada matriks durasi semua lokasi Config.NODES (rute OSRM tiruan dari osrm_stub).
+#
+#   python benchmarks/bench_trip.py [--transport mobil] [--round-trip]
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import osrm_stub
+from ujianakhir import Config, OSRMClient, RouteCache, SmartNavigator, TripPlanner
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - started) * 1000, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark urutan kunjungan multi-titik")
+    parser.add_argument('--transport', default='mobil', choices=list(Config.TRANSPORT_PROFILES))
+    parser.add_argument('--round-trip', action='store_true')
+    args = parser.parse_args(argv)
+
+    navigator = SmartNavigator(route_cache=RouteCache(db_path=''), route_matrix=None,
+                               osrm_client=OSRMClient(session=osrm_stub.stub_session()))
+    durations = navigator._duration_arrays(list(Config.NODES), args.transport)[0]
+
+    print(f"{'Titik':>6}{'Eksak':>12}{'Heuristik':>12}{'Selisih biaya':>16}")
+    for n in range(6, len(Config.NODES) + 1):
+        matrix = durations[:n, :n]
+        exact_ms, (_, exact_cost, _) = timed(lambda: TripPlanner(matrix, args.round_trip, exact_max=n).solve())
+        heuristic_ms, (_, heuristic_cost, _) = timed(lambda: TripPlanner(matrix, args.round_trip, exact_max=0).solve())
+        print(f"{n:>6}{exact_ms:>9.1f} ms{heuristic_ms:>9.1f} ms{(heuristic_cost / exact_cost - 1) * 100:>15.2f}%")
+    print(f"Default: eksak hingga {Config.TRIP_EXACT_MAX_STOPS} titik, batas waktu heuristik {Config.TRIP_TIME_BUDGET * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
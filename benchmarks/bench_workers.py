@@ -0,0 +1,175 @@
+# -- coding: utf-8 --
+# Skalabilitas mode produksi (gunicorn -c gunicorn.conf.py wsgi:app) terhadap jumlah worker.
+# OSRM dilayani osrm_stub sebagai server HTTP terpisah; beban HTTP dibangkitkan beberapa proses klien.
+# Selain throughput dan latensi dilaporkan memori RSS vs PSS semua proses gunicorn (PSS membagi
+# halaman bersama hasil preload/copy-on-write secara adil antar proses).
+#
+#   python benchmarks/bench_workers.py [--workers 1 2 4] [--threads 4] [--duration 10] [--latency 20]
+import argparse
+import json
+import os
+import random
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing import Pool
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import requests
+
+from ujianakhir import Config
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(url, process, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and process.poll() is None:
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def gunicorn_pids(master):
+    pids = [master]
+    with open(f"/proc/{master}/task/{master}/children") as f:
+        pids += [int(pid) for pid in f.read().split()]
+    return pids
+
+
+def memory_mib(pids):
+    # Jumlah RSS dan PSS (kB dari /proc/<pid>/smaps_rollup) semua proses
+    totals = {'Rss': 0, 'Pss': 0}
+    for pid in pids:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                name, _, rest = line.partition(':')
+                if name in totals:
+                    totals[name] += int(rest.split()[0])
+    return totals['Rss'] / 1024, totals['Pss'] / 1024
+
+
+def client(job):
+    # Satu proses klien: beberapa thread, masing-masing dengan koneksi keep-alive sendiri
+    base_url, threads, duration, page_ratio, seed = job
+    pairs = [(start, end, transport) for transport in Config.TRANSPORT_PROFILES
+             for start in Config.NODES for end in Config.NODES if start != end]
+    samples, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        session = requests.Session()
+        local, failed = [], 0
+        while time.monotonic() < stop_at:
+            start, end, transport = rng.choice(pairs)
+            started = time.perf_counter()
+            try:
+                if rng.random() < page_ratio:
+                    response = session.post(f"{base_url}/", data={'start': start, 'end': end, 'transport': transport}, timeout=30)
+                else:
+                    response = session.post(f"{base_url}/api/route", json={'start': start, 'end': end, 'transport': transport}, timeout=30)
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            local.append(time.perf_counter() - started)
+            failed += not ok
+        with lock:
+            samples.extend(local)
+            errors[0] += failed
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return samples, errors[0]
+
+
+def run_load(base_url, args, duration, seed):
+    jobs = [(base_url, args.client_threads, duration, args.page_ratio, seed + i) for i in range(args.clients)]
+    with Pool(args.clients) as pool:
+        results = pool.map(client, jobs)
+    samples = sorted(s for result in results for s in result[0])
+    errors = sum(result[1] for result in results)
+    return samples, errors
+
+
+def bench(workers, args, osrm_url):
+    port = free_port()
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), GUNICORN_THREADS=str(args.threads), BIND=f"127.0.0.1:{port}",
+               OSRM_URL=osrm_url, ROUTE_CACHE_DB='', LOG_LEVEL='warning')
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'], cwd=ROOT, env=env)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        started = time.perf_counter()
+        if not wait_ready(f"{base_url}/readyz", server):
+            raise RuntimeError("gunicorn tidak siap")
+        boot_s = time.perf_counter() - started
+        time.sleep(0.5)  # beri waktu semua worker selesai fork
+        run_load(base_url, args, args.warmup, seed=1)  # cache per worker diisi dulu, tidak dihitung
+        samples, errors = run_load(base_url, args, args.duration, seed=2)
+        rss, pss = memory_mib(gunicorn_pids(server.pid))
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(30)
+
+    def pick(p):
+        return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+
+    return {'workers': workers, 'boot_s': round(boot_s, 2), 'requests': len(samples), 'errors': errors,
+            'throughput': round(len(samples) / args.duration, 1), 'p50_ms': round(pick(0.5), 2),
+            'p95_ms': round(pick(0.95), 2), 'mean_ms': round(statistics.mean(samples) * 1000, 2),
+            'rss_mib': round(rss, 1), 'pss_mib': round(pss, 1)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark skalabilitas worker gunicorn")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, default=4, help="Thread per worker (GUNICORN_THREADS)")
+    parser.add_argument('--duration', type=float, default=10, help="Durasi pengukuran per konfigurasi (detik)")
+    parser.add_argument('--warmup', type=float, default=3, help="Durasi pemanasan sebelum pengukuran (detik)")
+    parser.add_argument('--clients', type=int, default=2, help="Jumlah proses pembangkit beban")
+    parser.add_argument('--client-threads', type=int, default=8, help="Koneksi bersamaan per proses klien")
+    parser.add_argument('--page-ratio', type=float, default=0.2, help="Porsi request halaman peta (POST /)")
+    parser.add_argument('--latency', type=float, default=20, help="Latensi OSRM tiruan (ms)")
+    parser.add_argument('--json', help="Simpan hasil ke file JSON")
+    args = parser.parse_args(argv)
+
+    osrm_port = free_port()
+    osrm = subprocess.Popen([sys.executable, os.path.join(ROOT, 'osrm_stub.py'), '--port', str(osrm_port),
+                             '--latency', str(args.latency)], stdout=subprocess.DEVNULL)
+    try:
+        results = [bench(workers, args, f"http://127.0.0.1:{osrm_port}/route/v1/") for workers in args.workers]
+    finally:
+        osrm.terminate()
+        osrm.wait(10)
+
+    print(f"CPU: {os.cpu_count()}, thread/worker: {args.threads}, koneksi klien: {args.clients * args.client_threads}")
+    print(f"{'Worker':>6}{'Boot':>8}{'Req/s':>9}{'p50':>11}{'p95':>11}{'Error':>7}{'RSS':>11}{'PSS':>11}")
+    for r in results:
+        print(f"{r['workers']:>6}{r['boot_s']:>6.1f} s{r['throughput']:>9.1f}{r['p50_ms']:>8.1f} ms{r['p95_ms']:>8.1f} ms"
+              f"{r['errors']:>7}{r['rss_mib']:>7.1f} MiB{r['pss_mib']:>7.1f} MiB")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'cpu_count': os.cpu_count(), 'args': vars(args), 'results': results}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,46 @@
+# -- coding: utf-8 --
+# Membangun graf jalan ringkas (.npz) untuk mesin rute lokal (ROUTING_BACKEND=local).
+#
+#   python build_road_graph.py bengkulu.osm                 # ekstrak OSM XML (.osm / .osm.gz)
+#   python build_road_graph.py bengkulu.osm --output road_graph.npz
+#
+# Ekstrak area kota bisa diunduh dari Overpass API, mis.
+#   https://overpass-api.de/api/map?bbox=102.20,-3.92,102.36,-3.74
+# File .osm.pbf perlu dikonversi dulu ke XML (mis. `osmium cat bengkulu.osm.pbf -o bengkulu.osm`).
+import argparse
+import os
+import sys
+import time
+
+from ujianakhir import Config, LocalRouter, RoadGraph, TrafficPredictor
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Bangun graf jalan untuk mesin rute lokal")
+    parser.add_argument('osm', help="File OSM XML (.osm atau .osm.gz)")
+    parser.add_argument('--output', default=Config.ROAD_GRAPH_PATH, help="File tujuan (.npz)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    started = time.perf_counter()
+    graph = RoadGraph.from_osm_xml(args.osm)
+    elapsed = time.perf_counter() - started
+    graph.save(args.output)
+
+    # Pastikan semua lokasi Config.NODES bisa di-snap ke jaringan jalan
+    router = LocalRouter(RoadGraph.load(args.output), TrafficPredictor())
+    unreachable = [node['name'] for node in Config.NODES.values()
+                   if router._snap((node['lat'], node['lng']), 'driving') is None]
+
+    print(f"Vertex / edge      : {graph.n_vertices} / {graph.n_edges}")
+    print(f"Waktu build        : {elapsed:.2f} s")
+    print(f"Ukuran file        : {os.path.getsize(args.output) / 1024:.1f} KiB -> {args.output}")
+    print(f"Lokasi di luar graf: {', '.join(unreachable) or '-'}")
+    return 1 if unreachable else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
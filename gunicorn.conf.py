@@ -0,0 +1,42 @@
+# -- coding: utf-8 --
+# Konfigurasi gunicorn SmartCity Bengkulu (lihat README, bagian "Mode Produksi").
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#   WEB_CONCURRENCY=4 GUNICORN_THREADS=8 gunicorn -c gunicorn.conf.py wsgi:app
+import gc
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', f"0.0.0.0:{os.environ.get('PORT', 8080)}")
+
+# Satu proses per core untuk pekerjaan CPU (pemrosesan langkah, peta, mesin rute lokal);
+# thread per worker menutup waktu tunggu I/O ke OSRM.
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Aplikasi dibuat dan dipanaskan sekali di master (wsgi.warm_up), lalu dibagi ke worker lewat copy-on-write
+preload_app = True
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+# Daur ulang worker secara berkala dengan jitter agar tidak semua worker restart bersamaan
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')  # '-' untuk stdout
+errorlog = '-'
+loglevel = os.environ.get('LOG_LEVEL', 'info').lower()
+
+
+def when_ready(server):
+    # Objek hasil warm-up dipindah ke generasi permanen GC: siklus GC di worker tidak lagi menulis
+    # header objek tersebut sehingga halaman memori bersama tidak tersalin
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from wsgi import app
+    import ujianakhir
+    ujianakhir.after_fork(app)
@@ -0,0 +1,217 @@
+# -- coding: utf-8 --
+# Pengganti server OSRM untuk build matriks rute, benchmark, dan uji offline.
+# Dipasang sebagai transport adapter pada requests.Session sehingga kode
+# navigasi berjalan persis seperti saat memanggil router.project-osrm.org.
+# Untuk proses lain (mis. worker gunicorn) stub bisa dijalankan sebagai server HTTP:
+#
+#   python osrm_stub.py --port 5001 --latency 20      # lalu OSRM_URL=http://127.0.0.1:5001/route/v1/
+import argparse
+import gzip
+import json
+import math
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+
+# Kecepatan rata-rata (km/jam) yang dipakai untuk durasi sintetis
+STUB_SPEEDS = {'driving': 30.0, 'walking': 5.0, 'cycling': 15.0}
+STUB_SEGMENT_KM = 0.1
+STUB_STEP_KM = 0.5
+
+
+def request_key(url):
+    # Kunci rekaman tidak bergantung host agar bisa diputar ulang untuk OSM_URL mana pun
+    parts = urlsplit(url)
+    path = parts.path
+    if '/route/v1/' in path:
+        path = path[path.index('/route/v1/'):]
+    elif '/table/v1/' in path:
+        path = path[path.index('/table/v1/'):]
+    return f"{path}?{parts.query}" if parts.query else path
+
+
+def load_recording(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_recording(recorded, path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'wt', encoding='utf-8') as f:
+        json.dump(recorded, f, separators=(',', ':'))
+
+
+def _haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 6371.0088 * 2 * math.asin(math.sqrt(a))
+
+
+def _parse_coords(path):
+    # /route/v1/{profile}/{lng,lat;lng,lat;...}
+    segments = path.strip('/').split('/')
+    profile = segments[2]
+    coords = [tuple(float(v) for v in point.split(',')) for point in segments[3].split(';')]
+    return profile, coords
+
+
+def synthetic_route(profile, coords):
+    # Rute "Manhattan": bergerak utara-selatan lalu timur-barat antar waypoint,
+    # cukup realistis untuk jumlah titik geometri dan langkah OSRM
+    speed = STUB_SPEEDS.get(profile, 30.0)
+    geometry = [list(coords[0])]
+    steps = []
+    total_km = 0.0
+    for (lng1, lat1), (lng2, lat2) in zip(coords, coords[1:]):
+        corner = (lng1, lat2)
+        for (a_lng, a_lat), (b_lng, b_lat), name in (((lng1, lat1), corner, 'Jalan Lintas'), (corner, (lng2, lat2), 'Jalan Raya')):
+            leg_km = _haversine_km(a_lat, a_lng, b_lat, b_lng)
+            n_points = max(1, int(leg_km / STUB_SEGMENT_KM))
+            n_steps = max(1, int(leg_km / STUB_STEP_KM))
+            for i in range(1, n_points + 1):
+                t = i / n_points
+                geometry.append([a_lng + (b_lng - a_lng) * t, a_lat + (b_lat - a_lat) * t])
+            for i in range(n_steps):
+                t = i / n_steps
+                step_km = leg_km / n_steps
+                steps.append({
+                    'name': f"{name} {len(steps) + 1}",
+                    'distance': step_km * 1000,
+                    'duration': step_km / speed * 3600,
+                    'maneuver': {
+                        'type': 'turn' if i == 0 and steps else 'continue',
+                        'modifier': 'left' if len(steps) % 2 else 'right',
+                        'location': [a_lng + (b_lng - a_lng) * t, a_lat + (b_lat - a_lat) * t],
+                    },
+                })
+            total_km += leg_km
+    steps.append({
+        'name': 'Tujuan',
+        'distance': 0.0,
+        'duration': 0.0,
+        'maneuver': {'type': 'arrive', 'location': list(coords[-1])},
+    })
+    return {
+        'code': 'Ok',
+        'routes': [{
+            'distance': total_km * 1000,
+            'duration': total_km / speed * 3600,
+            'geometry': {'type': 'LineString', 'coordinates': geometry},
+            'legs': [{'steps': steps}],
+        }],
+    }
+
+
+def synthetic_table(profile, coords, sources=None):
+    speed = STUB_SPEEDS.get(profile, 30.0)
+    distances = []
+    durations = []
+    for lng1, lat1 in (coords if sources is None else [coords[i] for i in sources]):
+        # Jarak Manhattan, konsisten dengan synthetic_route
+        row = [_haversine_km(lat1, lng1, lat2, lng1) + _haversine_km(lat2, lng1, lat2, lng2) for lng2, lat2 in coords]
+        distances.append([km * 1000 for km in row])
+        durations.append([km / speed * 3600 for km in row])
+    return {'code': 'Ok', 'durations': durations, 'distances': distances}
+
+
+class OSRMStubAdapter(BaseAdapter):
+    def __init__(self, recorded=None, latency=0.0, strict=False):
+        super().__init__()
+        self.recorded = recorded or {}
+        self.latency = latency  # detik, atau callable(key) -> detik
+        self.strict = strict
+        self.calls = 0
+
+    def send(self, request, **kwargs):
+        self.calls += 1
+        key = request_key(request.url)
+        delay = self.latency(key) if callable(self.latency) else self.latency
+        if delay:
+            time.sleep(delay)
+
+        if key in self.recorded:
+            status, body = 200, self.recorded[key]
+        elif self.strict:
+            status, body = 400, {'code': 'NoRoute', 'message': f"Tidak ada rekaman untuk {key}"}
+        else:
+            path, _, query = key.partition('?')
+            profile, coords = _parse_coords(path)
+            if path.startswith('/table/'):
+                sources = parse_qs(query).get('sources')
+                body = synthetic_table(profile, coords, [int(i) for i in sources[0].split(';')] if sources else None)
+            else:
+                body = synthetic_route(profile, coords)
+            status = 200
+
+        response = requests.Response()
+        response.status_code = status
+        response._content = json.dumps(body).encode('utf-8')
+        response.headers['Content-Type'] = 'application/json'
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+class RecordingAdapter(HTTPAdapter):
+    # Meneruskan request ke OSRM asli dan menyimpan respons yang berhasil
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.recorded = {}
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        if response.status_code == 200:
+            self.recorded[request_key(request.url)] = response.json()
+        return response
+
+
+def stub_session(recorded=None, latency=0.0, strict=False):
+    session = requests.Session()
+    adapter = OSRMStubAdapter(recorded=recorded, latency=latency, strict=strict)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def make_server(host='127.0.0.1', port=5001, recorded=None, latency=0.0, strict=False):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    adapter = OSRMStubAdapter(recorded=recorded, latency=latency, strict=strict)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            response = adapter.send(requests.Request('GET', f"http://osrm-stub{self.path}").prepare())
+            self.send_response(response.status_code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(response.content)))
+            self.end_headers()
+            self.wfile.write(response.content)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Server OSRM tiruan")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--latency', type=float, default=0.0, help="Latensi per request (ms)")
+    parser.add_argument('--recorded', help="Putar ulang rekaman OSRM (JSON / JSON.gz)")
+    args = parser.parse_args()
+    recorded = load_recording(args.recorded) if args.recorded else None
+    server = make_server(args.host, args.port, recorded, args.latency / 1000, strict=recorded is not None)
+    print(f"OSRM tiruan di http://{args.host}:{args.port}/route/v1/")
+    server.serve_forever()
@@ -0,0 +1,76 @@
+# -- coding: utf-8 --
+# Membangun ulang matriks rute semua pasangan Config.NODES x TRANSPORT_PROFILES.
+#
+#   python precompute_routes.py                       # OSRM sesuai Config.OSM_URL
+#   python precompute_routes.py --osm-url http://localhost:5000/route/v1/
+#   python precompute_routes.py --recorded osrm_recording.json.gz
+#   python precompute_routes.py --stub                # OSRM sintetis (offline)
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import requests
+
+import osrm_stub
+from ujianakhir import Config, OSRMClient, RouteCache, RouteMatrix, SmartNavigator
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute matriks rute SmartCity Bengkulu")
+    parser.add_argument('--output', default=Config.ROUTE_MATRIX_PATH, help="File tujuan (.json.gz)")
+    parser.add_argument('--osm-url', help="Base URL OSRM lokal, mis. http://localhost:5000/route/v1/")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--recorded', help="Putar ulang respons OSRM hasil rekaman (JSON / JSON.gz)")
+    source.add_argument('--stub', action='store_true', help="Gunakan OSRM sintetis tanpa jaringan")
+    parser.add_argument('--record', help="Simpan respons OSRM asli ke file ini selama build")
+    parser.add_argument('--transport', action='append', choices=list(Config.TRANSPORT_PROFILES), help="Batasi moda (bisa diulang)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.osm_url:
+        Config.OSM_URL = args.osm_url
+
+    session = None
+    recorder = None
+    if args.recorded:
+        session = osrm_stub.stub_session(recorded=osrm_stub.load_recording(args.recorded), strict=True)
+    elif args.stub:
+        session = osrm_stub.stub_session()
+    elif args.record:
+        session = requests.Session()
+        recorder = osrm_stub.RecordingAdapter()
+        session.mount('http://', recorder)
+        session.mount('https://', recorder)
+
+    # Tanpa matriks lama dan tanpa tier disk agar setiap rute benar-benar dibangun ulang
+    navigator = SmartNavigator(route_cache=RouteCache(db_path=''), route_matrix=None, osrm_client=OSRMClient(session=session))
+
+    started = time.perf_counter()
+    matrix = navigator.build_route_matrix(transports=args.transport)
+    elapsed = time.perf_counter() - started
+    matrix.meta['build_seconds'] = round(elapsed, 3)
+    matrix.save(args.output)
+
+    if recorder is not None:
+        osrm_stub.save_recording(recorder.recorded, args.record)
+
+    tracemalloc.start()
+    loaded = RouteMatrix.load(args.output)
+    loaded_bytes, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del loaded
+
+    failed = matrix.meta['failed']
+    print(f"Rute tersimpan     : {len(matrix)} ({len(failed)} gagal)")
+    print(f"Waktu build        : {elapsed:.2f} s")
+    print(f"Ukuran file        : {os.path.getsize(args.output) / 1024:.1f} KiB -> {args.output}")
+    print(f"Memori saat dimuat : {loaded_bytes / 1024 / 1024:.2f} MiB (puncak {peak_bytes / 1024 / 1024:.2f} MiB)")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
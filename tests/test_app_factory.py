@@ -0,0 +1,58 @@
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+import osrm_stub
+from ujianakhir import (OSRMClient, RouteCache, RuleCongestionModel, SmartNavigator, TrafficPredictor, UpstreamBudget,
+                        create_app)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_CHECK = """
+import json, logging, sys, threading
+import ujianakhir
+print(json.dumps({
+    'heavy': sorted(name for name in ('folium', 'geopy', 'requests', 'xgboost') if name in sys.modules),
+    'handlers': len(logging.getLogger().handlers),
+    'threads': threading.active_count(),
+}))
+"""
+
+
+def make_navigator():
+    return SmartNavigator(route_cache=RouteCache(db_path=''), osrm_client=OSRMClient(session=osrm_stub.stub_session()),
+                          traffic_predictor=TrafficPredictor(model=RuleCongestionModel(), clock=lambda: datetime(2024, 5, 6, 2)),
+                          upstream_budget=UpstreamBudget(rate=0))
+
+
+def test_import_has_no_side_effects(tmp_path):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    env.pop('SHARED_CACHE_URL', None)
+    output = subprocess.run([sys.executable, '-c', IMPORT_CHECK], cwd=tmp_path, env=env, capture_output=True, text=True,
+                            check=True, timeout=60).stdout
+    assert json.loads(output) == {'heavy': [], 'handlers': 0, 'threads': 1}
+    # Tidak ada templates/index.html atau file lain yang ditulis di direktori kerja
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_each_app_gets_its_own_services(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    first, second = make_navigator(), make_navigator()
+    apps = [create_app(navigator=first, background=False), create_app(navigator=second, background=False)]
+    assert [app.extensions['smartcity']['navigator'] for app in apps] == [first, second]
+    for app in apps:
+        response = app.test_client().get('/')
+        assert response.status_code == 200 and b'<html' in response.data.lower()
+    # Template dilayani dari memori
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_background_threads_start_only_on_request(monkeypatch):
+    started = []
+    monkeypatch.setattr('ujianakhir.start_background', lambda app: started.append(app))
+    app = create_app(navigator=make_navigator(), background=False)
+    assert started == []
+    create_app(navigator=make_navigator())
+    assert len(started) == 1 and started[0] is not app
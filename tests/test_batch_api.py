@@ -0,0 +1,74 @@
+import json
+from datetime import datetime
+
+import pytest
+
+import osrm_stub
+from ujianakhir import (Config, OSRMClient, RouteCache, RuleCongestionModel, SmartNavigator, TrafficPredictor,
+                        UpstreamBudget, create_app)
+
+
+@pytest.fixture
+def session():
+    return osrm_stub.stub_session()
+
+
+@pytest.fixture
+def client(session):
+    navigator = SmartNavigator(route_cache=RouteCache(db_path=''), osrm_client=OSRMClient(session=session),
+                               traffic_predictor=TrafficPredictor(model=RuleCongestionModel(), clock=lambda: datetime(2024, 5, 6, 2)),
+                               upstream_budget=UpstreamBudget(rate=0))
+    return create_app(navigator=navigator, background=False).test_client()
+
+
+@pytest.mark.parametrize('nodes', ['123', 12, {'1': 2}, []])
+def test_matrix_rejects_nodes_that_are_not_a_list(client, session, nodes):
+    response = client.post('/api/matrix', json={'transport': 'motor', 'nodes': nodes})
+    assert response.status_code == 400
+    assert session.get_adapter('http://').calls == 0
+
+
+def test_matrix_shape_from_one_table_request(client, session):
+    response = client.post('/api/matrix', json={'transport': 'mobil', 'nodes': [1, 2, 3, 5]})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['nodes'] == [1, 2, 3, 5] and data['units'] == {'durations': 'menit', 'distances': 'km'}
+    for matrix in (data['durations'], data['distances']):
+        assert len(matrix) == 4 and all(len(row) == 4 for row in matrix)
+        assert [matrix[i][i] for i in range(4)] == [0, 0, 0, 0]
+        assert all(value > 0 for i, row in enumerate(matrix) for j, value in enumerate(row) if i != j)
+    assert session.get_adapter('http://').calls == 1
+
+
+def test_matrix_defaults_to_every_location(client, session):
+    data = client.post('/api/matrix', json={'transport': 'motor'}).get_json()
+    assert data['nodes'] == list(Config.NODES) and len(data['durations']) == len(Config.NODES)
+    assert session.get_adapter('http://').calls == 1
+
+
+def test_batch_computes_each_route_once_and_reports_invalid_items(client, session):
+    items = [{'start': 1, 'end': 3, 'transport': 'mobil'}, {'start': 1, 'end': 999, 'transport': 'mobil'},
+             {'start': 1, 'end': 3, 'transport': 'mobil'}, 'bukan objek', {'start': 2, 'end': 4, 'transport': 'motor'}]
+    response = client.post('/api/routes/batch', json={'items': items, 'stream': False})
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [entry['index'] for entry in results] == [0, 1, 2, 3, 4]
+    assert 'error' in results[1] and 'error' in results[3]
+    assert results[0]['result'] == results[2]['result'] and 'primary' in results[4]['result']
+    # Dua rute unik pada malam hari (tanpa alternatif): satu request OSRM per rute
+    assert session.get_adapter('http://').calls == 2
+
+
+def test_batch_streams_one_json_line_per_item(client):
+    items = [{'start': 1, 'end': node_id, 'transport': 'mobil'} for node_id in (2, 3, 4)]
+    response = client.post('/api/routes/batch', json={'items': items})
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert sorted(entry['index'] for entry in lines) == [0, 1, 2] and all('result' in entry for entry in lines)
+
+
+def test_batch_limits(client, monkeypatch):
+    assert client.post('/api/routes/batch', json={'items': []}).status_code == 400
+    monkeypatch.setattr(Config, 'BATCH_MAX_ITEMS', 2)
+    items = [{'start': 1, 'end': 2, 'transport': 'mobil'}] * 3
+    assert client.post('/api/routes/batch', json={'items': items}).status_code == 400
@@ -0,0 +1,93 @@
+import importlib.util
+import json
+import os
+import random
+import threading
+from collections import Counter
+from datetime import datetime
+
+import pytest
+
+import osrm_stub
+from ujianakhir import (Config, OSRMClient, RouteCache, RuleCongestionModel, SmartNavigator, TrafficPredictor,
+                        UpstreamBudget, create_app)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='module')
+def bench_load():
+    spec = importlib.util.spec_from_file_location('bench_load', os.path.join(ROOT, 'benchmarks', 'bench_load.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def level(concurrency, throughput):
+    return {'concurrency': concurrency, 'throughput': throughput}
+
+
+def test_knee_is_the_last_level_that_still_scaled(bench_load):
+    results = [level(1, 100), level(2, 190), level(4, 200), level(8, 205)]
+    assert bench_load.knee(results, 0.1) == results[1]
+    assert bench_load.knee(results[:2], 0.1) is None
+
+
+def test_breakdown_parts_are_disjoint(bench_load):
+    totals = {'route_search': (0.8, 4), 'osrm_request': (0.5, 6), 'nearest_node': (0.1, 4), 'congestion': (0.05, 4),
+              'map_render': (0.2, 2), 'map_layer': (0.0, 0)}
+    parts = bench_load.breakdown(totals, 1.2, 4)
+    assert parts['Rute lain'] == pytest.approx(0.15 / 4 * 1000)
+    assert parts['Flask/antrean'] == pytest.approx(0.2 / 4 * 1000)
+    assert sum(parts.values()) == pytest.approx(1.2 / 4 * 1000)
+    # Tunggu OSRM paralel bisa melebihi route_search: CPU rute lain tidak menjadi negatif
+    totals['osrm_request'] = (2.0, 12)
+    assert bench_load.breakdown(totals, 1.2, 4)['Rute lain'] == 0
+
+
+def test_request_mix_is_skewed_and_split_by_hour(bench_load):
+    args = bench_load.argparse.Namespace(zipf=1.1, transport_mix={'motor': 1.0}, weekend_ratio=0.0, rush_ratio=1.0,
+                                         home_ratio=0.0, page_ratio=0.0)
+    mix = bench_load.RequestMix(args)
+    rng = random.Random(1)
+    draws = [mix.draw(rng) for _ in range(2000)]
+    assert all(kind == 'route' and start != end and transport == 'motor' for kind, start, end, transport, _ in draws)
+    assert all(at.weekday() == 0 and at.hour in bench_load.RUSH_HOURS for *_, at in draws)
+    popular, _ = Counter(start for _, start, *_ in draws).most_common(1)[0]
+    assert Config.NODES[popular]['critical']
+
+
+def test_replay_clock_is_per_thread(bench_load):
+    clock = bench_load.ReplayClock(datetime(2024, 5, 6, 8))
+    clock.set(datetime(2024, 5, 6, 2))
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append(clock()))
+    thread.start()
+    thread.join()
+    assert clock() == datetime(2024, 5, 6, 2) and seen == [datetime(2024, 5, 6, 8)]
+
+
+def test_endpoints_read_now_from_the_predictor_clock():
+    now = [datetime(2024, 5, 6, 2)]
+    navigator = SmartNavigator(route_cache=RouteCache(db_path=''), osrm_client=OSRMClient(session=osrm_stub.stub_session()),
+                               traffic_predictor=TrafficPredictor(model=RuleCongestionModel(), clock=lambda: now[0]),
+                               upstream_budget=UpstreamBudget(rate=0))
+    client = create_app(navigator=navigator, background=False).test_client()
+    route = {'start': 1, 'end': 3, 'transport': 'mobil'}
+    night = client.post('/api/route', json=route).get_json()
+    now[0] = datetime(2024, 5, 6, 8)
+    rush = client.post('/api/route', json=route).get_json()
+    assert not night['primary_congested'] and rush['primary_congested']
+
+
+def test_main_writes_saturation_curve(bench_load, tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'MAP_RENDERING', Config.MAP_RENDERING)
+    output = tmp_path / 'curve.json'
+    assert bench_load.main(['--concurrency', '1', '2', '--duration', '0.3', '--warmup', '0', '--latency', '0',
+                            '--map', 'json', '--json', str(output)]) == 0
+    curve = json.loads(output.read_text())
+    assert [result['concurrency'] for result in curve['results']] == [1, 2]
+    for result in curve['results']:
+        assert result['requests'] > 0 and result['errors'] == 0
+        assert set(result['stages_ms']) == set(bench_load.BUCKETS)
+    assert 'knee' in curve
@@ -0,0 +1,69 @@
+import importlib.util
+import json
+import os
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='module')
+def bench_suite():
+    spec = importlib.util.spec_from_file_location('bench_suite', os.path.join(ROOT, 'benchmarks', 'bench_suite.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def small_suite(bench_suite, monkeypatch):
+    # Beberapa pasangan lokasi cukup untuk menguji alur suite; run penuh memakai semua pasangan
+    init = bench_suite.Suite.__init__
+
+    def small_init(self, args):
+        init(self, args)
+        self.pairs = self.pairs[:6]
+
+    monkeypatch.setattr(bench_suite.Suite, '__init__', small_init)
+    return bench_suite
+
+
+def result(p50=10.0, p95=20.0, throughput=100.0):
+    return {'requests': 10, 'throughput': throughput, 'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p95}
+
+
+def test_summarize_percentiles(bench_suite):
+    summary = bench_suite.summarize([i / 1000 for i in range(1, 101)], 2.0)
+    assert summary == {'requests': 100, 'throughput': 50.0, 'p50_ms': 51.0, 'p95_ms': 96.0, 'p99_ms': 100.0}
+
+
+def test_compare_flags_regressions_beyond_tolerance(bench_suite):
+    baseline = {'a': result(), 'b': result(), 'c': result(), 'd': result(p50=0)}
+    current = {
+        'a': result(p50=12.4, p95=29.0, throughput=81.0),  # dalam toleransi (p95 mendapat 2x toleransi)
+        'b': result(p50=12.6),
+        'c': result(p95=31.0, throughput=79.0),
+        'd': result(p50=5.0),  # baseline nol tidak dibandingkan
+        'baru': result(),  # skenario tanpa baseline dilewati
+    }
+    failures = bench_suite.compare(current, baseline, 0.25)
+    assert [failure.split(':')[0] for failure in failures] == ['b', 'c', 'c']
+    assert 'p50_ms 10.0 -> 12.6' in failures[0]
+
+
+def test_main_saves_and_checks_baseline(small_suite, tmp_path, capsys):
+    baseline = str(tmp_path / 'baseline.json')
+    args = ['--requests', '8', '--runs', '1', '--concurrency', '2', '--baseline', baseline]
+    assert small_suite.main(args + ['--save-baseline']) == 0
+    with open(baseline, encoding='utf-8') as f:
+        saved = json.load(f)
+    assert set(saved['results']) == {'find_all_routes (cold)', 'find_all_routes (warm)', 'POST /api/route', 'GET|POST /',
+                                     'TrafficMap.create_map'}
+    assert saved['results']['find_all_routes (cold)']['requests'] == 6
+    # Baseline yang jauh lebih cepat: run berikutnya gagal
+    for entry in saved['results'].values():
+        entry['p50_ms'] /= 100
+    with open(baseline, 'w', encoding='utf-8') as f:
+        json.dump(saved, f)
+    assert small_suite.main(args) == 1
+    assert 'LEBIH LAMBAT: find_all_routes (cold): p50_ms' in capsys.readouterr().out
@@ -0,0 +1,70 @@
+import threading
+import time
+from datetime import datetime
+
+import osrm_stub
+from ujianakhir import OSRMClient, RouteCache, RuleCongestionModel, SmartNavigator, TrafficPredictor, UpstreamBudget
+
+RUSH_HOUR = datetime(2024, 5, 6, 8, 0)  # Simpang Lima (1) dan Pasar Panorama (3) padat: alternatif dibutuhkan
+NIGHT = datetime(2024, 5, 6, 2, 0)
+
+
+class InFlight:
+    # Latency stub yang mencatat jumlah request OSRM yang berjalan bersamaan
+    def __init__(self, seconds=0.05):
+        self.seconds = seconds
+        self.current = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, key):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+        time.sleep(self.seconds)
+        with self._lock:
+            self.current -= 1
+        return 0
+
+
+def make_navigator(clock, latency=0.0):
+    session = osrm_stub.stub_session(latency=latency)
+    navigator = SmartNavigator(route_cache=RouteCache(db_path=''), osrm_client=OSRMClient(session=session),
+                               traffic_predictor=TrafficPredictor(model=RuleCongestionModel(), clock=lambda: clock),
+                               upstream_budget=UpstreamBudget(rate=0))
+    navigator.calls = lambda: session.get_adapter('http://').calls
+    return navigator
+
+
+def test_primary_and_alternative_are_fetched_together():
+    in_flight = InFlight()
+    navigator = make_navigator(RUSH_HOUR, in_flight)
+    result = navigator.find_all_routes_concurrent(1, 3, 'mobil')
+    assert 'alternative' in result and in_flight.peak == 2
+    # Request yang sama dengan versi berurutan, tanpa request ganda
+    sequential = make_navigator(RUSH_HOUR)
+    assert sequential.find_all_routes(1, 3, 'mobil') == result
+    assert navigator.calls() == sequential.calls()
+
+
+def test_alternative_not_prefetched_when_endpoints_are_clear():
+    navigator = make_navigator(NIGHT)
+    result = navigator.find_all_routes_concurrent(1, 3, 'mobil')
+    assert 'alternative' not in result and navigator.calls() == 1
+
+
+def test_motor_customer_route_is_used_when_it_succeeds():
+    navigator = make_navigator(NIGHT)
+    assert 'error' not in navigator.find_all_routes_concurrent(1, 3, 'motor')
+    # Customer berhasil tanpa menunggu: fallback default tidak perlu dikirim
+    assert navigator.calls() == 1
+    # Hasil ada di cache: request berikutnya tidak ke OSRM
+    navigator.find_all_routes_concurrent(1, 3, 'motor')
+    assert navigator.calls() == 1
+
+
+def test_unknown_locations_are_reported_without_fetching():
+    navigator = make_navigator(NIGHT)
+    assert 'error' in navigator.find_all_routes_concurrent(1, 999, 'mobil')
+    assert 'error' in navigator.find_all_routes_concurrent('a', 3, 'mobil')
+    assert navigator.calls() == 0
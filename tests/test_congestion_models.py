@@ -0,0 +1,79 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from ujianakhir import Config, RuleCongestionModel, TrafficPredictor, XGBoostCongestionModel, load_congestion_model
+
+RUSH_HOUR = datetime(2024, 5, 6, 8, 0)
+SATURDAY = datetime(2024, 5, 11, 10, 0)
+
+
+class FakeBooster:
+    # Peluang macet = 1 - congestion_factor, ditambah sedikit untuk langkah panjang; mencatat ukuran tiap batch
+    def __init__(self):
+        self.batches = []
+
+    def inplace_predict(self, X):
+        self.batches.append(len(X))
+        return np.clip(1 - X[:, 1] + 0.01 * X[:, 0], 0, 1).astype(np.float32)
+
+
+@pytest.fixture
+def model():
+    return XGBoostCongestionModel(booster=FakeBooster())
+
+
+def test_features_follow_training_columns(model):
+    X = model.features([1, 15], SATURDAY, np.array([0.5, 2.0]))
+    assert X.dtype == np.float32 and X.shape == (2, 4)
+    assert X[:, 0].tolist() == [0.5, 2.0]
+    assert X[:, 1].tolist() == pytest.approx([RuleCongestionModel.rule(Config.NODES[node_id], SATURDAY)['factor'] for node_id in (1, 15)])
+    assert X[:, 2].tolist() == [10, 10] and X[:, 3].tolist() == [1, 1]
+    # Tanpa panjang: baris mewakili titik jalan dengan panjang bawaan
+    assert (model.features([1], RUSH_HOUR)[:, 0] == np.float32(Config.MODEL_NODE_LENGTH_KM)).all()
+
+
+def test_probabilities_map_to_levels(model, monkeypatch):
+    monkeypatch.setattr(model, 'predict_proba', lambda X: np.array([0.9, 0.5, 0.1], dtype=np.float32))
+    monkeypatch.setattr(Config, 'MODEL_PADAT_THRESHOLD', 0.7)
+    monkeypatch.setattr(Config, 'MODEL_SEDANG_THRESHOLD', 0.4)
+    results = model.predict([1, 2, 3], RUSH_HOUR)
+    assert [result['level'] for result in results] == ['padat', 'sedang', 'lancar']
+    assert [result['factor'] for result in results] == [0.4, 0.7, 1.0]
+    assert results[0]['reason'] == 'Prediksi model (90% macet)'
+    assert model.predict([], RUSH_HOUR) == []
+
+
+def test_snapshot_scores_every_node_in_one_batch(model):
+    predictor = TrafficPredictor(model=model)
+    predictor.snapshot(RUSH_HOUR)
+    predictor.snapshot(RUSH_HOUR.replace(minute=30))
+    assert model.booster.batches == [len(Config.NODES)]
+
+
+def test_route_steps_scored_once_per_bucket(model):
+    predictor = TrafficPredictor(model=model)
+    nodes = [1, 1, 2, 3, 3, 3]
+    lengths = np.array([0.5, 0.5, 1.0, 0.2, 0.2, 0.4])
+    steps = predictor.predict_steps(nodes, lengths, RUSH_HOUR)
+    # Satu batch untuk snapshot, satu untuk 4 pasangan (node, panjang) yang berbeda
+    assert model.booster.batches == [len(Config.NODES), 4]
+    assert steps[0] == steps[1] and steps[3] == steps[4] and len(steps) == 6
+    assert predictor.predict_steps(nodes, lengths, RUSH_HOUR) == steps
+    assert model.booster.batches == [len(Config.NODES), 4]
+    # Bucket baru dinilai ulang
+    predictor.predict_steps(nodes, lengths, SATURDAY)
+    assert model.booster.batches[-1] == 4 and len(model.booster.batches) == 4
+
+
+def test_rule_model_ignores_step_length():
+    predictor = TrafficPredictor(model=RuleCongestionModel())
+    steps = predictor.predict_steps([1, 15], np.array([0.1, 5.0]), RUSH_HOUR)
+    assert steps == [predictor.predict_congestion(1, RUSH_HOUR), predictor.predict_congestion(15, RUSH_HOUR)]
+
+
+def test_loader_falls_back_to_rules(tmp_path):
+    assert isinstance(load_congestion_model('xgboost', str(tmp_path / 'tidak-ada.json')), RuleCongestionModel)
+    assert isinstance(load_congestion_model('jaringan-saraf'), RuleCongestionModel)
+    assert isinstance(load_congestion_model('rules'), RuleCongestionModel)
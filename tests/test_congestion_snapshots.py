@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from ujianakhir import Config, RuleCongestionModel, TrafficPredictor
+
+
+class CountingModel(RuleCongestionModel):
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, node_ids, at, lengths_km=None):
+        self.calls.append(at)
+        return super().predict(node_ids, at, lengths_km)
+
+
+@pytest.fixture
+def model():
+    return CountingModel()
+
+
+def test_one_model_call_per_bucket(model):
+    predictor = TrafficPredictor(bucket_minutes=60, model=model)
+    first = predictor.snapshot(datetime(2024, 5, 6, 8, 0))
+    assert predictor.snapshot(datetime(2024, 5, 6, 8, 59, 59)) is first
+    for node_id in Config.NODES:
+        predictor.predict_congestion(node_id, datetime(2024, 5, 6, 8, 30))
+    assert model.calls == [datetime(2024, 5, 6, 8, 0)]
+    # Awal jam berikutnya adalah bucket baru
+    assert predictor.snapshot(datetime(2024, 5, 6, 9, 0)) is not first
+    assert model.calls[-1] == datetime(2024, 5, 6, 9, 0) and len(model.calls) == 2
+
+
+@pytest.mark.parametrize('at, bucket', [
+    (datetime(2024, 5, 6, 8, 14, 59), datetime(2024, 5, 6, 8, 0)),
+    (datetime(2024, 5, 6, 8, 15), datetime(2024, 5, 6, 8, 15)),
+    (datetime(2024, 5, 6, 23, 59), datetime(2024, 5, 6, 23, 45)),
+])
+def test_bucket_boundaries(model, at, bucket):
+    assert TrafficPredictor(bucket_minutes=15, model=model).snapshot(at).bucket == bucket
+
+
+def test_snapshot_matches_rules_across_a_week(model):
+    predictor = TrafficPredictor(model=model)
+    at = datetime(2024, 5, 6)
+    while at < datetime(2024, 5, 13):
+        snap = predictor.snapshot(at)
+        assert dict(snap.levels) == {node_id: RuleCongestionModel.rule(node, at) for node_id, node in Config.NODES.items()}
+        at += timedelta(minutes=17)
+
+
+def test_snapshot_is_read_only_and_history_is_bounded(model):
+    predictor = TrafficPredictor(model=model)
+    snap = predictor.snapshot(datetime(2024, 5, 6, 8))
+    with pytest.raises(TypeError):
+        snap.levels[1] = {'level': 'lancar', 'factor': 1.0, 'reason': 'Lancar'}
+    for hour in range(TrafficPredictor.SNAPSHOT_HISTORY + 1):
+        predictor.snapshot(datetime(2024, 5, 7) + timedelta(hours=hour))
+    assert len(predictor._snapshots) == TrafficPredictor.SNAPSHOT_HISTORY
+    # Bucket yang sudah dibuang dinilai ulang oleh model
+    calls = len(model.calls)
+    predictor.snapshot(datetime(2024, 5, 6, 8))
+    assert len(model.calls) == calls + 1
+
+
+def test_bucket_starts_cut_the_last_bucket_at_midnight(model):
+    predictor = TrafficPredictor(bucket_minutes=90, model=model)
+    assert predictor.bucket_starts(datetime(2024, 5, 6, 23), datetime(2024, 5, 7, 1)) == [
+        datetime(2024, 5, 6, 22, 30), datetime(2024, 5, 7, 0, 0)]
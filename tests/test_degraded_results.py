@@ -0,0 +1,71 @@
+from datetime import datetime
+
+import pytest
+
+import osrm_stub
+from ujianakhir import (OSRMClient, RouteCache, RuleCongestionModel, SmartNavigator, SQLiteStore, TrafficPredictor,
+                        UpstreamBudget, UpstreamBusy)
+
+RUSH_HOUR = datetime(2024, 5, 6, 8, 0)  # Simpang Lima (1) dan Pasar Panorama (3) padat: alternatif dicari
+
+
+@pytest.fixture
+def navigator(monkeypatch):
+    navigator = SmartNavigator(route_cache=RouteCache(db_path=''), osrm_client=OSRMClient(session=osrm_stub.stub_session()),
+                               traffic_predictor=TrafficPredictor(model=RuleCongestionModel(), clock=lambda: RUSH_HOUR),
+                               upstream_budget=UpstreamBudget(rate=0))
+    navigator.busy = True
+    monkeypatch.setattr(navigator.upstream, 'busy', lambda: navigator.busy)
+    find_alternative = navigator._find_alternative_route
+
+    def alternative(*args):
+        if navigator.busy:
+            raise UpstreamBusy(1)
+        return find_alternative(*args)
+
+    monkeypatch.setattr(navigator, '_find_alternative_route', alternative)
+    computed = []
+    compute = navigator._compute_routes
+    monkeypatch.setattr(navigator, '_compute_routes', lambda *args: computed.append(args) or compute(*args))
+    navigator.computed = computed
+    return navigator
+
+
+def test_degraded_result_reused_while_budget_busy(navigator):
+    first = navigator.find_all_routes(1, 3, 'motor')
+    assert first['degraded'] and 'alternative' not in first
+    assert first['primary_congested'] and not first['has_congestion']
+    # Mis. /api/map/route tepat setelah pencarian di halaman: tidak dihitung (dan tidak meminta OSRM) lagi
+    assert navigator.find_all_routes(1, 3, 'motor') is first
+    assert len(navigator.computed) == 1
+
+
+def test_degraded_result_recomputed_once_budget_frees(navigator):
+    navigator.find_all_routes(1, 3, 'motor')
+    navigator.busy = False
+    full = navigator.find_all_routes(1, 3, 'motor')
+    assert not full.get('degraded') and full['has_congestion'] and 'alternative' in full
+    assert len(navigator.computed) == 2
+    # Hasil lengkap tetap dipakai saat anggaran kembali sibuk
+    navigator.busy = True
+    assert navigator.find_all_routes(1, 3, 'motor') is full
+
+
+def test_has_congestion_requires_an_alternative(navigator, monkeypatch):
+    # Rute utama padat tetapi tidak ada alternatif: has_congestion tetap False, kemacetannya di primary_congested
+    navigator.busy = False
+    monkeypatch.setattr(navigator, '_find_alternative_route', lambda *args: None)
+    result = navigator.find_all_routes(1, 3, 'motor')
+    assert result['has_congestion'] is False and result['primary_congested'] is True
+    assert 'alternative' not in result
+
+
+def test_degraded_result_stays_out_of_shared_tier(navigator, tmp_path):
+    store = SQLiteStore(str(tmp_path / 'shared.db'), namespace='results')
+    navigator.result_cache = RouteCache(db_path='', store=store, namespace='results')
+    assert navigator.find_all_routes(1, 3, 'motor')['degraded']
+    # Worker lain yang anggarannya longgar tidak boleh menerima hasil tanpa alternatif
+    assert store.get('1|3|motor') is None
+    navigator.busy = False
+    full = navigator.find_all_routes(1, 3, 'motor')
+    assert 'alternative' in full and store.get('1|3|motor')[0]['result'] == full
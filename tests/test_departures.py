@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import osrm_stub
+from ujianakhir import (OSRMClient, RouteCache, RuleCongestionModel, SmartNavigator, TrafficPredictor, UpstreamBudget,
+                        create_app)
+
+MONDAY = datetime(2024, 5, 6)  # jam sibuk node kritis 07:00-09:59
+
+
+@pytest.fixture
+def session():
+    return osrm_stub.stub_session()
+
+
+@pytest.fixture
+def navigator(session):
+    return SmartNavigator(route_cache=RouteCache(db_path=''), osrm_client=OSRMClient(session=session),
+                          traffic_predictor=TrafficPredictor(model=RuleCongestionModel(), clock=lambda: MONDAY.replace(hour=5)),
+                          upstream_budget=UpstreamBudget(rate=0))
+
+
+def etas(result):
+    return [departure['eta_minutes'] for departure in result['departures']]
+
+
+def test_slots_cover_the_window_with_one_osrm_request(navigator, session):
+    result = navigator.forecast_departures(1, 3, 'mobil', MONDAY.replace(hour=5, minute=50), 180, 15)
+    departures = result['departures']
+    assert len(departures) == 12 and result['slot_minutes'] == 15
+    for i, departure in enumerate(departures):
+        depart = datetime.fromisoformat(departure['depart'])
+        assert depart == MONDAY.replace(hour=5, minute=50) + timedelta(minutes=15 * i)
+        # arrive dipotong ke menit
+        assert 0 <= departure['eta_minutes'] - (datetime.fromisoformat(departure['arrive']) - depart).total_seconds() / 60 < 1.05
+    assert session.get_adapter('http://').calls == 1
+
+
+def test_etas_rise_into_the_morning_peak(navigator):
+    result = navigator.forecast_departures(1, 3, 'mobil', MONDAY.replace(hour=5, minute=50), 180, 15)
+    times = etas(result)
+    assert times == sorted(times)
+    free_flow = result['free_flow_minutes']
+    assert times[0] == free_flow and times[-1] > free_flow
+    # Berangkat 06:50 tanpa macet, tetapi bagian akhir perjalanan sudah masuk jam sibuk 07:00
+    crossing = result['departures'][4]
+    assert crossing['depart'].endswith('06:50') and free_flow < crossing['eta_minutes'] < times[-1]
+    assert result['best'] == result['departures'][0]
+
+
+def test_best_slot_after_the_peak_ends(navigator):
+    result = navigator.forecast_departures(1, 3, 'mobil', MONDAY.replace(hour=9), 120, 15)
+    times = etas(result)
+    assert times == sorted(times, reverse=True)
+    assert result['best']['eta_minutes'] == result['free_flow_minutes']
+    assert datetime.fromisoformat(result['best']['depart']) >= MONDAY.replace(hour=9, minute=45)
+
+
+@pytest.mark.parametrize('hour', [5, 8, 12])
+def test_first_slot_matches_route_search(navigator, hour):
+    at = MONDAY.replace(hour=hour, minute=10)
+    first = navigator.forecast_departures(1, 3, 'mobil', at, 15, 15)['departures'][0]
+    assert first['time'] == navigator.find_all_routes(1, 3, 'mobil', at)['primary']['time']
+
+
+def test_departures_endpoint_validates_window(navigator):
+    client = create_app(navigator=navigator, background=False).test_client()
+    body = {'start': 1, 'end': 3, 'transport': 'mobil', 'depart_from': '2024-05-06T06:00'}
+    response = client.post('/api/route/departures', json=dict(body, window_minutes=60, slot_minutes=20))
+    assert response.status_code == 200 and len(response.get_json()['departures']) == 3
+    for invalid in ({'depart_from': 'besok pagi'}, {'slot_minutes': 0}, {'window_minutes': 10, 'slot_minutes': 15},
+                    {'window_minutes': 'tiga jam'}, {'window_minutes': 100000, 'slot_minutes': 1}):
+        assert client.post('/api/route/departures', json=dict(body, **invalid)).status_code == 400
@@ -0,0 +1,84 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import osrm_stub
+from ujianakhir import (Config, OSRMClient, RouteCache, RuleCongestionModel, SmartNavigator, TrafficPredictor,
+                        UpstreamBudget)
+
+RUSH_HOUR = datetime(2024, 5, 6, 8, 0)
+
+
+class CountingSession:
+    def __init__(self, session):
+        self.session = session
+        self.calls = 0
+
+    def get(self, *args, **kwargs):
+        self.calls += 1
+        return self.session.get(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+
+@pytest.fixture
+def session():
+    return CountingSession(osrm_stub.stub_session())
+
+
+@pytest.fixture
+def navigator(session):
+    return SmartNavigator(route_cache=RouteCache(db_path=''), osrm_client=OSRMClient(session=session),
+                          traffic_predictor=TrafficPredictor(model=RuleCongestionModel(), clock=lambda: RUSH_HOUR),
+                          upstream_budget=UpstreamBudget(rate=0))
+
+
+def route_eta(navigator, start, end, transport_type, at=RUSH_HOUR):
+    primary = navigator.find_all_routes(start, end, transport_type, at)['primary']
+    return primary['speed_adjusted_duration'] / primary['congestion_factor']
+
+
+def test_matrix_is_one_table_request(navigator, session):
+    result = navigator.duration_matrix(list(Config.NODES), 'motor', RUSH_HOUR)
+    assert session.calls == 1
+    assert len(result['durations']) == len(Config.NODES) and all(len(row) == len(Config.NODES) for row in result['durations'])
+    # Bucket kemacetan lain memakai ulang table yang sama
+    navigator.duration_matrix(list(Config.NODES), 'motor', datetime(2024, 5, 6, 13, 0))
+    assert session.calls == 1
+
+
+@pytest.mark.parametrize('transport_type', ['motor', 'mobil', 'jalan_kaki'])
+def test_matrix_matches_route_eta_once_route_is_cached(navigator, session, transport_type):
+    # Simpang Lima dan Bandara sama-sama padat pada jam sibuk, tetapi sebagian besar rute di antaranya lancar
+    nodes = [1, 11, 5]
+    expected = {(start, end): route_eta(navigator, start, end, transport_type) for start in nodes for end in nodes if start != end}
+    calls = session.calls
+    durations, _ = navigator._duration_arrays(nodes, transport_type, RUSH_HOUR)
+    assert session.calls == calls + 1
+    for (start, end), eta in expected.items():
+        assert durations[nodes.index(start), nodes.index(end)] == pytest.approx(eta)
+
+
+def test_matrix_matches_departure_forecast(navigator):
+    forecast = navigator.forecast_departures(1, 11, 'motor', depart_from=RUSH_HOUR)
+    durations, _ = navigator._duration_arrays([1, 11], 'motor', RUSH_HOUR)
+    assert durations[0, 1] == pytest.approx(forecast['departures'][0]['eta_minutes'], abs=0.05)
+
+
+def test_uncached_pairs_weight_congestion_along_straight_line(navigator):
+    night = datetime(2024, 5, 6, 2, 0)
+    rush, _ = navigator._duration_arrays([1, 11], 'motor', RUSH_HOUR)
+    free, distances = navigator._duration_arrays([1, 11], 'motor', night)
+    # Lebih lambat saat jam sibuk, tetapi jauh dari pembagian seluruh durasi dengan faktor 0.4 node ujung
+    assert free[0, 1] < rush[0, 1] < free[0, 1] / 0.4
+    assert np.all(np.diag(rush) == 0) and distances[0, 1] > 0
+    line = np.linspace([Config.NODES[1]['lat'], Config.NODES[1]['lng']], [Config.NODES[11]['lat'], Config.NODES[11]['lng']], 2000)
+    lookup = navigator._factor_lookup(navigator.traffic_predictor.snapshot(RUSH_HOUR))
+    assert rush[0, 1] == pytest.approx(free[0, 1] / navigator._path_factor(*navigator._zone_lengths(line), lookup), rel=0.02)
+
+
+def test_matrix_reports_error_when_table_fails(navigator, monkeypatch):
+    monkeypatch.setattr(navigator, '_fetch_osrm_table', lambda *args, **kwargs: {'code': 'NoTable'})
+    assert 'error' in navigator.duration_matrix([1, 2], 'mobil', RUSH_HOUR)
@@ -0,0 +1,51 @@
+import numpy as np
+
+from ujianakhir import GeometryCodec
+
+
+def test_polyline_matches_reference_encoding():
+    # Contoh dari dokumentasi format Google encoded polyline
+    path = [[38.5, -120.2], [40.7, -120.95], [43.252, -126.453]]
+    assert GeometryCodec.encode_polyline(path) == '_p~iF~ps|U_ulLnnqC_mqNvxq`@'
+    assert GeometryCodec.decode_polyline('_p~iF~ps|U_ulLnnqC_mqNvxq`@') == path
+
+
+def test_polyline_round_trip_within_precision():
+    rng = np.random.default_rng(0)
+    path = np.column_stack([-3.8 + rng.uniform(-0.05, 0.05, 200), 102.27 + rng.uniform(-0.05, 0.05, 200)]).tolist()
+    for precision in (5, 6):
+        decoded = GeometryCodec.decode_polyline(GeometryCodec.encode_polyline(path, precision), precision)
+        assert np.abs(np.array(decoded) - np.array(path)).max() <= 0.5 / 10 ** precision + 1e-12
+    assert GeometryCodec.encode_polyline([]) == ''
+
+
+def test_delta_encoding_accumulates_to_path():
+    path = [[-3.8, 102.26], [-3.79, 102.27], [-3.795, 102.265]]
+    encoded = GeometryCodec.encode_delta(path)
+    assert encoded['lat'][0] == -380000
+    coords = np.cumsum(np.column_stack([encoded['lat'], encoded['lng']]), axis=0) / 10 ** encoded['precision']
+    assert np.allclose(coords, path)
+    assert GeometryCodec.encode_delta([]) == {'precision': 5, 'lat': [], 'lng': []}
+
+
+def test_simplify_keeps_endpoints_and_respects_tolerance():
+    # Garis lurus dengan satu tonjolan ~110 m di tengah
+    path = [[-3.8, 102.26 + i * 0.001] for i in range(21)]
+    path[10] = [-3.799, 102.27]
+    assert GeometryCodec.simplify(path, 200) == [path[0], path[-1]]
+    simplified = GeometryCodec.simplify(path, 50)
+    assert simplified[0] == path[0] and simplified[-1] == path[-1]
+    assert path[10] in simplified
+    assert len(simplified) < len(path)
+    assert GeometryCodec.simplify(path[:2], 1000) == path[:2]
+
+
+def test_apply_does_not_mutate_cached_result():
+    route = {'path': [[-3.8, 102.26], [-3.79, 102.27]], 'distance': '1.0 km'}
+    data = {'primary': route, 'has_congestion': False}
+    result = GeometryCodec.apply(data, 'polyline')
+    assert 'path' not in result['primary'] and result['primary']['polyline']
+    assert data['primary'] is route and 'path' in route
+    assert GeometryCodec.apply(data) is data
+    assert 'path_delta' in GeometryCodec.apply(data, 'delta')['primary']
+    assert GeometryCodec.apply(data, 'full', zoom=10)['primary']['path'] == route['path']
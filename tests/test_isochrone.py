@@ -0,0 +1,141 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import osrm_stub
+from ujianakhir import (Config, Isochrone, OSRMClient, RouteCache, RuleCongestionModel, SmartNavigator, TrafficPredictor,
+                        UpstreamBudget)
+
+SIMPANG_LIMA = np.array([Config.NODES[1]['lat'], Config.NODES[1]['lng']])
+BANDARA = np.array([Config.NODES[11]['lat'], Config.NODES[11]['lng']])
+PELABUHAN = np.array([Config.NODES[15]['lat'], Config.NODES[15]['lng']])
+
+
+@pytest.fixture
+def grid():
+    return Isochrone((0.0, 0.0), 1.0, 0.2)  # 10 x 10 sel
+
+
+@pytest.fixture
+def navigator():
+    return SmartNavigator(route_cache=RouteCache(db_path=''), osrm_client=OSRMClient(session=osrm_stub.stub_session()),
+                          traffic_predictor=TrafficPredictor(model=RuleCongestionModel(), clock=lambda: datetime(2024, 5, 6, 8)),
+                          upstream_budget=UpstreamBudget(rate=0))
+
+
+def cell_area(grid, cells):
+    return cells * grid.dlat * grid.dlng
+
+
+def assert_closed(polygons):
+    for polygon in polygons:
+        for ring in polygon:
+            assert len(ring) >= 5 and ring[0] == ring[-1]
+            # Tanpa titik berulang selain penutup: ring tidak menyinggung dirinya sendiri
+            assert len({tuple(point) for point in ring}) == len(ring) - 1
+
+
+def test_block_is_single_counter_clockwise_ring(grid):
+    mask = np.zeros((grid.size, grid.size), dtype=bool)
+    mask[2:5, 3:7] = True
+    polygons = grid.polygons(mask)
+    assert_closed(polygons)
+    assert len(polygons) == 1 and len(polygons[0]) == 1 and len(polygons[0][0]) == 5
+    assert Isochrone._area(polygons[0][0]) == pytest.approx(cell_area(grid, 12), rel=1e-2)
+
+
+def test_hole_is_clockwise_inside_its_outer_ring(grid):
+    mask = np.zeros((grid.size, grid.size), dtype=bool)
+    mask[2:8, 2:8] = True
+    mask[4:6, 4:6] = False
+    polygons = grid.polygons(mask)
+    assert_closed(polygons)
+    assert len(polygons) == 1
+    outer, hole = polygons[0]
+    assert Isochrone._area(outer) == pytest.approx(cell_area(grid, 36), rel=1e-2)
+    assert Isochrone._area(hole) == pytest.approx(-cell_area(grid, 4), rel=1e-2)
+
+
+def test_nested_rings_become_separate_polygons(grid):
+    # Cincin luar berlubang, di dalam lubangnya pulau yang juga berlubang: tiap lubang milik ring luar terkecil
+    # yang memuatnya
+    mask = np.ones((grid.size, grid.size), dtype=bool)
+    mask[1:9, 1:9] = False
+    mask[2:8, 2:8] = True
+    mask[4:6, 4:6] = False
+    polygons = sorted(grid.polygons(mask), key=lambda polygon: -Isochrone._area(polygon[0]))
+    assert_closed(polygons)
+    assert [len(polygon) for polygon in polygons] == [2, 2]
+    (outer, outer_hole), (island, island_hole) = polygons
+    assert Isochrone._area(outer) == pytest.approx(cell_area(grid, 100), rel=1e-2)
+    assert Isochrone._area(outer_hole) == pytest.approx(-cell_area(grid, 64), rel=1e-2)
+    assert Isochrone._area(island) == pytest.approx(cell_area(grid, 36), rel=1e-2)
+    assert Isochrone._area(island_hole) == pytest.approx(-cell_area(grid, 4), rel=1e-2)
+
+
+def test_separate_blocks_and_diagonal_contact(grid):
+    mask = np.zeros((grid.size, grid.size), dtype=bool)
+    mask[0, 0] = mask[8, 8] = True
+    assert len(grid.polygons(mask)) == 2
+    # Sel yang hanya bersentuhan di sudut disambung menjadi satu ring yang valid
+    mask[7, 7] = True
+    polygons = grid.polygons(mask)
+    assert_closed(polygons)
+    assert len(polygons) == 2 and sorted(len(polygon) for polygon in polygons) == [1, 1]
+    assert grid.polygons(np.zeros((grid.size, grid.size), dtype=bool)) == []
+
+
+def test_unreachable_cells_are_left_out(grid):
+    lat, lng = grid.centers()
+    minutes = np.arange(len(lat), dtype=np.float64)
+    minutes[:grid.size] = np.nan  # baris bawah tidak terjangkau
+    minutes[grid.size:2 * grid.size] = np.inf
+    lat = np.append(lat, 10.0)  # titik di luar grid diabaikan
+    lng = np.append(lng, 0.0)
+    times = grid.rasterize(lat, lng, np.append(minutes, 0.0))
+    assert np.isinf(times[:2]).all() and np.isfinite(times[2:]).all()
+    polygons = grid.polygons(times <= 1000)
+    assert len(polygons) == 1 and len(polygons[0]) == 1
+    assert Isochrone._area(polygons[0][0]) == pytest.approx(cell_area(grid, 80), rel=1e-2)
+
+
+def as_dict(zones, zone_km):
+    return {zone: km for zone, km in zip(zones.tolist(), zone_km.tolist()) if km}
+
+
+def test_tree_zones_match_route_zone_lengths(navigator):
+    # Dua cabang dari Simpang Lima: ke Bencoolen Mall dan ke Bandara; panjang per zona tiap titik harus sama dengan
+    # rute berupa rantai parents-nya
+    to_mall = np.linspace(SIMPANG_LIMA, [Config.NODES[2]['lat'], Config.NODES[2]['lng']], 12)[1:]
+    to_bandara = np.linspace(SIMPANG_LIMA, BANDARA, 40)[1:]
+    latlng = np.vstack([SIMPANG_LIMA, to_mall, to_bandara])
+    parents = np.concatenate([[0], np.arange(len(to_mall)), [0], np.arange(len(to_mall) + 1, len(latlng) - 1)])
+    rows, zones, zone_km = navigator._tree_zones(latlng, parents)
+    for point in range(1, len(latlng)):
+        path = [point]
+        while path[-1]:
+            path.append(parents[path[-1]])
+        expected = as_dict(*navigator._zone_lengths(latlng[path[::-1]]))
+        assert as_dict(zones[rows == point], zone_km[rows == point]) == pytest.approx(expected)
+    assert not (rows == 0).any()
+
+
+def test_line_zones_follow_straight_line(navigator):
+    rows, zones, zone_km = navigator._line_zones(np.broadcast_to(SIMPANG_LIMA, (3, 2)), np.vstack([SIMPANG_LIMA, BANDARA, PELABUHAN]))
+    assert zone_km[rows == 0].sum() == 0
+    for point, target in ((1, BANDARA), (2, PELABUHAN)):
+        line_zones, line_km = navigator._zone_lengths(np.linspace(SIMPANG_LIMA, target, 2000))
+        assert zone_km[rows == point].sum() == pytest.approx(line_km.sum(), rel=1e-3)
+        lookup = navigator._factor_lookup(navigator.traffic_predictor.snapshot())
+        assert navigator._path_factor(zones[rows == point], zone_km[rows == point], lookup) == pytest.approx(
+            navigator._path_factor(line_zones, line_km, lookup), rel=0.02)
+
+
+def test_congestion_shrinks_area_along_the_path(navigator):
+    def area(at):
+        feature = navigator.isochrone(1, 'motor', [10], at=at)['features'][0]
+        return sum(Isochrone._area(polygon[0]) for polygon in feature['geometry']['coordinates'])
+
+    # Hanya jalur yang melewati zona padat (sekitar Simpang Lima pada jam sibuk) yang melambat
+    assert area(datetime(2024, 5, 6, 8)) < area(datetime(2024, 5, 6, 2))
@@ -0,0 +1,114 @@
+import time
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from ujianakhir import Config, LiveTraffic, RuleCongestionModel, TrafficPredictor
+
+SIMPANG_LIMA = (Config.NODES[1]['lat'], Config.NODES[1]['lng'])
+BANDARA = (Config.NODES[11]['lat'], Config.NODES[11]['lng'])
+LANCAR = {'level': 'lancar', 'factor': 1.0, 'reason': 'Lancar'}
+
+
+@pytest.fixture
+def live():
+    # Jendela 60 detik dalam 6 slot @ 10 detik
+    return LiveTraffic(window_seconds=60, slots=6)
+
+
+@pytest.fixture
+def t0():
+    # Awal slot, cukup jauh di belakang jam sistem agar tidak dianggap sampel dari masa depan
+    return (time.time() // 10) * 10 - 3600
+
+
+def sample(point, speed, timestamp):
+    return [point[0], point[1], speed, timestamp]
+
+
+def test_samples_aggregate_per_node(live, t0):
+    assert live.ingest([sample(SIMPANG_LIMA, 20, t0), sample(SIMPANG_LIMA, 40, t0 + 15), sample(BANDARA, 10, t0 + 5)]) == 3
+    assert live.observations() == {1: (30.0, 2), 11: (10.0, 1)}
+    assert live.version == 1 and live.watermark == t0 + 15
+
+
+def test_slots_expire_when_window_advances(live, t0):
+    live.ingest([sample(SIMPANG_LIMA, 20, t0)])
+    live.ingest([sample(SIMPANG_LIMA, 40, t0 + 30)])
+    # Slot t0 masih dalam jendela 60 detik sampai slot t0 + 60 dibuka
+    live.ingest([sample(BANDARA, 10, t0 + 55)])
+    assert live.observations()[1] == (30.0, 2)
+    live.ingest([sample(BANDARA, 10, t0 + 60)])
+    assert live.observations() == {1: (40.0, 1), 11: (10.0, 2)}
+    # Lompatan lebih dari satu jendela mengosongkan semua slot
+    live.ingest([sample(BANDARA, 50, t0 + 200)])
+    assert live.observations() == {11: (50.0, 1)}
+
+
+def test_buffer_size_is_fixed(live, t0):
+    shape = live._count.shape
+    rng = np.random.default_rng(3)
+    for batch in range(20):
+        timestamps = t0 + batch * 7 + rng.uniform(0, 7, 500)
+        live.ingest(np.column_stack([np.full(500, SIMPANG_LIMA[0]), np.full(500, SIMPANG_LIMA[1]),
+                                     rng.uniform(5, 50, 500), timestamps]))
+    assert live._count.shape == live._speed_sum.shape == shape
+    assert live.observations()[1][1] == int(live._count.sum())
+
+
+def test_late_samples_are_dropped(live, t0):
+    live.ingest([sample(SIMPANG_LIMA, 20, t0 + 100)])
+    # Jendela kini berisi slot t0 + 50 sampai t0 + 100: sampel t0 dan t0 + 45 terlambat
+    assert live.ingest([sample(SIMPANG_LIMA, 30, t0), sample(SIMPANG_LIMA, 30, t0 + 45), sample(SIMPANG_LIMA, 60, t0 + 55)]) == 1
+    assert live.stats['late'] == 2
+    assert live.observations() == {1: (40.0, 2)}
+
+
+def test_invalid_and_unmatched_samples(live, t0):
+    far = (SIMPANG_LIMA[0] + 0.5, SIMPANG_LIMA[1])
+    count = live.ingest([
+        sample(SIMPANG_LIMA, float('nan'), t0),
+        sample(SIMPANG_LIMA, -5, t0),
+        sample(SIMPANG_LIMA, 20, time.time() + 3600),
+        sample(far, 20, t0),
+        sample(SIMPANG_LIMA, 20, t0),
+    ])
+    assert count == 1
+    assert live.stats == {'received': 5, 'matched': 1, 'unmatched': 1, 'late': 0, 'invalid': 3}
+    # Sampel dari masa depan tidak boleh menggeser jendela
+    assert live.watermark == t0
+
+
+def test_applies_only_near_watermark(live, t0):
+    assert not live.applies(datetime.fromtimestamp(t0))
+    live.ingest([sample(SIMPANG_LIMA, 20, t0)])
+    assert live.applies(datetime.fromtimestamp(t0 + 60))
+    assert not live.applies(datetime.fromtimestamp(t0 + 61))
+
+
+@pytest.mark.parametrize('count, factor, level', [
+    (4, 0.9, 'lancar'),
+    (10, 0.75, 'sedang'),
+    (20, 0.5, 'padat'),
+    (200, 0.5, 'padat'),
+])
+def test_live_weight_ramps_with_sample_count(monkeypatch, count, factor, level):
+    # Kecepatan live 12 km/jam = faktor 0.3; bobot live naik linear sampai LIVE_MIN_SAMPLES lalu tetap LIVE_WEIGHT
+    monkeypatch.setattr(Config, 'LIVE_WEIGHT', 0.7)
+    monkeypatch.setattr(Config, 'LIVE_FREE_FLOW_KMH', 40.0)
+    blended = TrafficPredictor._blend(LANCAR, (12.0, count))
+    assert blended['factor'] == pytest.approx(factor)
+    assert blended['level'] == level
+    assert blended['reason'] == 'Lancar + data live'
+
+
+def test_snapshot_blends_live_observations(live, t0):
+    predictor = TrafficPredictor(model=RuleCongestionModel(), live=live)
+    at = datetime.fromtimestamp(t0)
+    base = predictor.snapshot(at)
+    live.ingest([sample(BANDARA, 12, t0)] * Config.LIVE_MIN_SAMPLES)
+    blended = predictor.snapshot(at)
+    assert blended[11]['factor'] < base[11]['factor']
+    assert blended[1] == base[1]
+    assert blended.version != base.version
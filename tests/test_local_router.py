@@ -0,0 +1,147 @@
+import itertools
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from ujianakhir import Config, LocalRouter, RoadGraph, RuleCongestionModel, SpatialIndex, TrafficPredictor
+
+RUSH_HOUR = datetime(2024, 5, 6, 8, 0)  # Senin, node kritis 'padat'
+NIGHT = datetime(2024, 5, 6, 2, 0)
+STEP = 0.002  # ~220 m
+CENTER = Config.NODES[15]  # Pelabuhan Pulau Baai: node kritis tanpa node lain dalam beberapa km
+
+
+def grid_graph(size=7):
+    # Grid size x size dua arah berpusat di node 15; hanya vertex dalam CONGESTION_RADIUS_KM yang ikut macet
+    half = size // 2
+    rows, cols = np.meshgrid(np.arange(size) - half, np.arange(size) - half, indexing='ij')
+    lat = CENTER['lat'] + rows.ravel() * STEP
+    lng = CENTER['lng'] + cols.ravel() * STEP
+    sources, targets = [], []
+    for r in range(size):
+        for c in range(size):
+            v = r * size + c
+            for w in ([v + 1] if c + 1 < size else []) + ([v + size] if r + 1 < size else []):
+                sources += [v, w]
+                targets += [w, v]
+    n = len(sources)
+    return RoadGraph.from_edges(lat, lng, sources, targets, np.full(n, 30.0), np.full(n, 7), np.zeros(n), ['Jalan Uji'])
+
+
+def chain_graph(bypass_offset=0.0002):
+    # Jalan lurus 10 vertex (jauh dari zona macet) dengan satu jalan pintas sejajar di ruas 4-5
+    lat = [CENTER['lat'] + 0.02] * 10 + [CENTER['lat'] + 0.02 + bypass_offset]
+    lng = [CENTER['lng'] + i * STEP for i in range(10)] + [CENTER['lng'] + 4.5 * STEP]
+    pairs = [(i, i + 1) for i in range(9)] + [(4, 10), (10, 5)]
+    sources = [a for a, b in pairs] + [b for a, b in pairs]
+    targets = [b for a, b in pairs] + [a for a, b in pairs]
+    n = len(sources)
+    return RoadGraph.from_edges(lat, lng, sources, targets, np.full(n, 30.0), np.full(n, 7), np.zeros(n), ['Jalan Uji'])
+
+
+def make_router(graph, clock=RUSH_HOUR):
+    return LocalRouter(graph, TrafficPredictor(model=RuleCongestionModel(), clock=lambda: clock))
+
+
+def vertex(graph, index):
+    return (float(graph.lat[index]), float(graph.lng[index]))
+
+
+def segments(route):
+    coords = [tuple(point) for point in route['geometry']['coordinates']]
+    return set(zip(coords, coords[1:]))
+
+
+@pytest.fixture
+def grid():
+    return grid_graph()
+
+
+def test_astar_matches_dijkstra(grid):
+    router = make_router(grid)
+    _, (_, weights, _) = router._congested_weights('driving')
+    max_speed_ms = router._max_speed_ms('driving')
+    for source, target in itertools.permutations(range(0, grid.n_vertices, 4), 2):
+        path = router._astar(weights, source, target, max_speed_ms)
+        assert router._sources[path[0]] == source and router._targets[path[-1]] == target
+        expected = router._dijkstra(weights, source, [target])[target][0]
+        assert sum(weights[edge] for edge in path) == pytest.approx(expected, rel=1e-5)
+
+
+def test_route_weights_follow_requested_time(grid):
+    # Tengah baris tengah berada di zona node 15: pada jam sibuk rute barat -> timur memutar lewat tepi grid
+    router = make_router(grid, clock=NIGHT)
+    west, east, center = vertex(grid, 21), vertex(grid, 27), vertex(grid, 24)
+    night = router.route([west, east], 'driving')[1]['routes'][0]
+    rush = router.route([west, east], 'driving', at=RUSH_HOUR)[1]['routes'][0]
+
+    assert len(night['geometry']['coordinates']) == 7
+    assert [center[1], center[0]] in night['geometry']['coordinates']
+    assert [center[1], center[0]] not in rush['geometry']['coordinates']
+    assert rush['distance'] > night['distance']
+    assert router._congested_weights('driving', NIGHT)[0] != router._congested_weights('driving', RUSH_HOUR)[0]
+
+
+def test_penalty_alternative_differs_from_primary(grid):
+    router = make_router(grid)
+    status, data = router.route([vertex(grid, 21), vertex(grid, 27)], 'driving', alternatives=True)
+    assert status == 200
+    primary, alternative = data['routes']
+    shared = segments(primary) & segments(alternative)
+    assert len(shared) / len(segments(alternative)) <= Config.LOCAL_ALT_MAX_OVERLAP
+    assert router.info()['alternatives'] == 1
+
+
+def test_alternative_rejected_above_max_overlap(monkeypatch):
+    # Satu-satunya alternatif hanya mengganti satu dari sembilan ruas (~89% sama) sehingga ditolak
+    graph = chain_graph()
+    router = make_router(graph)
+    coords = [vertex(graph, 0), vertex(graph, 9)]
+    assert len(router.route(coords, 'driving', alternatives=True)[1]['routes']) == 1
+
+    monkeypatch.setattr(Config, 'LOCAL_ALT_MAX_OVERLAP', 0.95)
+    routes = router.route(coords, 'driving', alternatives=True)[1]['routes']
+    assert len(routes) == 2
+    assert [float(graph.lng[10]), float(graph.lat[10])] in routes[1]['geometry']['coordinates']
+
+
+def test_route_rejects_points_off_graph(grid):
+    router = make_router(grid)
+    far = (CENTER['lat'] + 0.5, CENTER['lng'])
+    status, data = router.route([vertex(grid, 0), far], 'driving')
+    assert status == 400 and data['code'] == 'NoSegment'
+    assert router.info()['failures'] == 1
+
+
+def test_edge_zones_match_nearest_node_within_radius():
+    # Vertex acak di seluruh kota: zona tiap ruas sama dengan node Config terdekat (jarak penuh ke semua node)
+    rng = np.random.default_rng(7)
+    lat = np.array([node['lat'] for node in Config.NODES.values()])
+    lng = np.array([node['lng'] for node in Config.NODES.values()])
+    n = 400
+    graph = RoadGraph.from_edges(rng.uniform(lat.min() - 0.02, lat.max() + 0.02, n), rng.uniform(lng.min() - 0.02, lng.max() + 0.02, n),
+                                 np.arange(n - 1), np.arange(1, n), np.full(n - 1, 30.0), np.full(n - 1, 7), np.zeros(n - 1), [''])
+    router = make_router(graph)
+    index = SpatialIndex(Config.NODES)
+    dists = np.hypot(router._xy[:, None, 0] - index.xy[None, :, 0], router._xy[:, None, 1] - index.xy[None, :, 1])
+    nearest = dists.argmin(axis=1)
+    expected = np.where(dists.min(axis=1) <= Config.CONGESTION_RADIUS_KM, nearest, len(Config.NODES))
+    assert (router._edge_zone == expected[graph.targets]).all()
+    assert (router._edge_zone == len(Config.NODES)).any() and (router._edge_zone < len(Config.NODES)).any()
+
+
+def test_osm_xml_keeps_highways_only(tmp_path):
+    path = tmp_path / 'kota.osm'
+    path.write_text("""<osm>
+      <node id="1" lat="-3.80" lon="102.26"><tag k="amenity" v="cafe"/></node>
+      <node id="2" lat="-3.80" lon="102.27"/>
+      <node id="3" lat="-3.81" lon="102.27"/>
+      <way id="10"><nd ref="1"/><nd ref="2"/><tag k="highway" v="primary"/><tag k="name" v="Jalan Uji"/><tag k="oneway" v="yes"/></way>
+      <way id="11"><nd ref="2"/><nd ref="3"/><tag k="building" v="yes"/></way>
+      <relation id="20"><member type="way" ref="10"/></relation>
+    </osm>""")
+    graph = RoadGraph.from_osm_xml(str(path))
+    assert graph.n_vertices == 2 and graph.n_edges == 2
+    car = (graph.access & RoadGraph.ACCESS_CAR) != 0
+    assert car.sum() == 1 and graph.names[graph.name_ids[0]] == 'Jalan Uji'
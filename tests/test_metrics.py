@@ -0,0 +1,66 @@
+import re
+from datetime import datetime
+
+import pytest
+
+import osrm_stub
+from ujianakhir import (Config, Metrics, OSRMClient, RouteCache, RuleCongestionModel, SmartNavigator, TrafficPredictor,
+                        UpstreamBudget, create_app, metrics)
+
+ROUTE = {'start': 1, 'end': 3, 'transport': 'mobil'}
+
+
+@pytest.fixture
+def client():
+    metrics.reset()
+    navigator = SmartNavigator(route_cache=RouteCache(db_path=''), osrm_client=OSRMClient(session=osrm_stub.stub_session()),
+                               traffic_predictor=TrafficPredictor(model=RuleCongestionModel(), clock=lambda: datetime(2024, 5, 6, 2)),
+                               upstream_budget=UpstreamBudget(rate=0))
+    yield create_app(navigator=navigator, background=False).test_client()
+    metrics.reset()
+
+
+def sample(text, line):
+    match = re.search('^' + re.escape(line) + r' (\S+)$', text, re.MULTILINE)
+    assert match, line
+    return float(match.group(1))
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Metrics(enabled=True)
+    for seconds in (0.0004, 0.003, 0.003, 20.0):
+        registry.observe('smartcity_stage_duration_seconds', seconds, stage='uji')
+    text = registry.render({'smartcity_osrm_requests': 7})
+    prefix = 'smartcity_stage_duration_seconds'
+    assert sample(text, f'{prefix}_bucket{{stage="uji",le="0.0005"}}') == 1
+    assert sample(text, f'{prefix}_bucket{{stage="uji",le="0.0025"}}') == 1
+    assert sample(text, f'{prefix}_bucket{{stage="uji",le="0.005"}}') == 3
+    assert sample(text, f'{prefix}_bucket{{stage="uji",le="10.0"}}') == 3
+    assert sample(text, f'{prefix}_bucket{{stage="uji",le="+Inf"}}') == 4
+    assert sample(text, f'{prefix}_count{{stage="uji"}}') == 4
+    assert sample(text, f'{prefix}_sum{{stage="uji"}}') == pytest.approx(20.0064)
+    assert '# TYPE smartcity_osrm_requests gauge' in text and sample(text, 'smartcity_osrm_requests') == 7
+
+
+def test_disabled_registry_records_nothing():
+    registry = Metrics(enabled=False)
+    assert registry.timed('uji')(lambda value: value * 2)(21) == 42
+    assert registry.stage_totals() == {} and registry.render() == '\n'
+
+
+def test_metrics_endpoint_reports_stages_requests_and_gauges(client):
+    assert client.post('/api/route', json=ROUTE).status_code == 200
+    text = client.get('/metrics').get_data(as_text=True)
+    for stage in ('route_search', 'osrm_request', 'nearest_node', 'congestion', 'process_steps'):
+        assert sample(text, f'smartcity_stage_duration_seconds_count{{stage="{stage}"}}') >= 1
+    assert sample(text, 'smartcity_request_duration_seconds_count{endpoint="smartcity.api_route",method="POST",status="200"}') == 1
+    assert sample(text, 'smartcity_route_cache_misses') >= 1
+
+
+def test_server_timing_header_only_when_enabled(client, monkeypatch):
+    assert 'Server-Timing' not in client.post('/api/route', json=ROUTE).headers
+    monkeypatch.setattr(Config, 'TIMING_HEADER', True)
+    header = client.post('/api/route', json=dict(ROUTE, end=4)).headers['Server-Timing']
+    stages = dict(part.split(';dur=') for part in header.split(', '))
+    assert {'route_search', 'osrm_request', 'total'} <= set(stages)
+    assert float(stages['route_search']) <= float(stages['total'])
@@ -0,0 +1,108 @@
+import threading
+
+import requests
+
+from ujianakhir import OSRMClient
+
+
+class FakeResponse:
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+class FakeSession:
+    # Mengembalikan status dari daftar secara berurutan (status terakhir diulang)
+    def __init__(self, statuses, gate=None):
+        self.statuses = list(statuses)
+        self.calls = 0
+        self.gate = gate
+
+    def get(self, url, timeout=None):
+        self.calls += 1
+        if self.gate is not None:
+            self.gate.wait(5)
+        status = self.statuses[min(self.calls, len(self.statuses)) - 1]
+        if status is None:
+            raise requests.ConnectionError("connection refused")
+        return FakeResponse(status, {'code': 'Ok' if status == 200 else 'Error', 'message': f"HTTP {status}"})
+
+    def close(self):
+        pass
+
+
+def client(statuses, **kwargs):
+    options = dict(max_retries=2, backoff=0, failure_threshold=2, reset_timeout=60)
+    options.update(kwargs)
+    return OSRMClient(base_url='http://osrm.test/route/v1/', session=FakeSession(statuses), **options)
+
+
+def test_retries_transient_errors_until_success():
+    osrm = client([503, None, 200])
+    status, data = osrm.get_json('http://osrm.test/x')
+    assert (status, data['code']) == (200, 'Ok')
+    info = osrm.info()
+    assert (info['requests'], info['retries'], info['failures'], info['state']) == (3, 2, 0, 'closed')
+
+
+def test_client_errors_are_not_retried_or_counted_as_failures():
+    osrm = client([400])
+    assert osrm.get_json('http://osrm.test/x')[0] == 400
+    assert osrm.session.calls == 1
+    assert osrm.info()['failures'] == 0
+
+
+def test_failure_counted_once_per_call_regardless_of_retries():
+    osrm = client([503])
+    assert osrm.get_json('http://osrm.test/x')[0] == 503
+    assert osrm.session.calls == 3
+    info = osrm.info()
+    assert (info['failures'], info['state']) == (1, 'closed')
+
+    osrm.get_json('http://osrm.test/x')
+    assert osrm.info()['state'] == 'open'
+
+
+def test_open_breaker_short_circuits_without_calling_server():
+    osrm = client([503], max_retries=0, failure_threshold=1)
+    osrm.get_json('http://osrm.test/x')
+    calls = osrm.session.calls
+    status, data = osrm.get_json('http://osrm.test/x')
+    assert (status, data['code']) == (503, 'Unavailable')
+    assert osrm.session.calls == calls
+    assert osrm.info()['short_circuited'] == 1
+
+
+def test_half_open_admits_a_single_probe():
+    osrm = client([503, 200], max_retries=0, failure_threshold=1, reset_timeout=0)
+    osrm.get_json('http://osrm.test/x')
+    assert osrm.info()['state'] == 'open'
+
+    gate = threading.Event()
+    osrm.session.gate = gate
+    results = []
+    probe = threading.Thread(target=lambda: results.append(osrm.get_json('http://osrm.test/x')))
+    probe.start()
+    while osrm.session.calls < 2:
+        pass
+    # Selama percobaan berjalan, request lain ditolak tanpa menyentuh server
+    assert osrm.get_json('http://osrm.test/x')[0] == 503
+    assert osrm.info()['state'] == 'half_open'
+    gate.set()
+    probe.join()
+
+    assert results[0][0] == 200
+    info = osrm.info()
+    assert (info['state'], info['short_circuited'], osrm.session.calls) == ('closed', 1, 2)
+
+
+def test_failed_probe_reopens_without_retrying():
+    osrm = client([503], failure_threshold=1, reset_timeout=0)
+    osrm.get_json('http://osrm.test/x')
+    calls = osrm.session.calls
+    osrm.get_json('http://osrm.test/x')
+    assert osrm.session.calls == calls + 1
+    assert osrm.info()['state'] == 'open'
@@ -0,0 +1,119 @@
+import threading
+from datetime import datetime
+
+import pytest
+
+from ujianakhir import (Config, OSRMClient, RouteCache, RuleCongestionModel, SmartNavigator, TrafficPredictor,
+                        UpstreamBudget)
+
+START = (Config.NODES[1]['lat'], Config.NODES[1]['lng'])
+END = (Config.NODES[2]['lat'], Config.NODES[2]['lng'])
+OK = {'code': 'Ok', 'routes': []}
+
+
+@pytest.fixture(autouse=True)
+def short_hedge(monkeypatch):
+    monkeypatch.setattr(Config, 'OSRM_HEDGE_DELAY', 0.05)
+
+
+class FakeOSRM:
+    # slow=True: access=customer baru selesai setelah request tanpa access dimulai (paling lama 1 detik)
+    cacheable = OSRMClient.cacheable
+    supports_alternatives = OSRMClient.supports_alternatives
+    supports_reach = OSRMClient.supports_reach
+    rate_limited = False
+
+    def __init__(self, customer_ok, slow=False):
+        self.customer_ok = customer_ok
+        self.slow = slow
+        self.default_started = threading.Event()
+        self.calls = []
+        self.overlapped = None
+
+    def route(self, coords, profile, access=None):
+        self.calls.append(access)
+        if access == 'customer':
+            self.overlapped = self.default_started.wait(1) if self.slow else self.default_started.is_set()
+            return (200, dict(OK, access='customer')) if self.customer_ok else (400, {'code': 'NoRoute', 'message': 'x'})
+        self.default_started.set()
+        return 200, dict(OK, access=None)
+
+    def after_fork(self):
+        pass
+
+
+def make_navigator(osrm, budget=None):
+    return SmartNavigator(route_cache=RouteCache(db_path=''), osrm_client=osrm,
+                          traffic_predictor=TrafficPredictor(model=RuleCongestionModel(), clock=lambda: datetime(2024, 5, 6, 8)),
+                          upstream_budget=budget or UpstreamBudget(rate=0))
+
+
+def test_fast_customer_success_sends_one_request():
+    osrm = FakeOSRM(customer_ok=True)
+    navigator = make_navigator(osrm)
+    assert navigator._fetch_osrm([START, END], 'motor')['access'] == 'customer'
+    navigator.executor.shutdown(wait=True)
+    assert osrm.calls == ['customer']
+    assert navigator.route_cache.get(navigator._osrm_key([START, END], 'motor'))['access'] == 'customer'
+
+
+def test_slow_customer_is_hedged_with_fallback():
+    osrm = FakeOSRM(customer_ok=False, slow=True)
+    navigator = make_navigator(osrm)
+    data = navigator._fetch_osrm([START, END], 'motor')
+    assert data['access'] is None
+    assert osrm.overlapped is True
+    assert navigator.fallback_stats == {'hedged': 1, 'after_failure': 0}
+    # Hasil fallback juga tersedia untuk kunci tanpa access (dipakai moda mobil)
+    assert navigator.route_cache.get(RouteCache.make_key([START, END], 'driving')) == data
+
+
+def test_fast_customer_failure_falls_back_after_it():
+    osrm = FakeOSRM(customer_ok=False)
+    navigator = make_navigator(osrm)
+    assert navigator._fetch_osrm([START, END], 'motor')['access'] is None
+    assert osrm.calls == ['customer', None]
+    assert osrm.overlapped is False
+    assert navigator.fallback_stats == {'hedged': 0, 'after_failure': 1}
+
+
+def test_hedge_delay_follows_customer_latency(monkeypatch):
+    navigator = make_navigator(FakeOSRM(customer_ok=True))
+    assert navigator._hedge_delay() == Config.OSRM_HEDGE_DELAY
+    navigator._customer_history.extend([(True, 0.3), (False, 5.0), (True, 0.1), (True, 0.2)])
+    assert navigator._hedge_delay() == 0.2
+    # Anggaran antre: fallback hanya setelah customer gagal
+    monkeypatch.setattr(navigator.upstream, 'busy', lambda: True)
+    assert navigator._hedge_delay() is None
+
+
+def test_reliable_customer_is_not_hedged(monkeypatch):
+    monkeypatch.setattr(Config, 'OSRM_HEDGE_WINDOW', 3)
+    osrm = FakeOSRM(customer_ok=True, slow=True)
+    navigator = make_navigator(osrm)
+    navigator._customer_history.extend([(True, 0.01)] * 3)
+    assert navigator._hedge_delay() is None
+    assert navigator._fetch_osrm([START, END], 'motor')['access'] == 'customer'
+    assert osrm.calls == ['customer'] and osrm.overlapped is False
+
+
+def test_fallback_runs_inline_when_pool_is_busy():
+    # Semua thread pool sedang dipakai (mis. prefetch): fallback yang belum berjalan diambil alih pemanggil
+    osrm = FakeOSRM(customer_ok=False, slow=True)
+    navigator = make_navigator(osrm)
+    release = threading.Event()
+    blockers = [navigator.executor.submit(release.wait, 5) for _ in range(Config.OSRM_WORKERS)]
+    try:
+        assert navigator._fetch_osrm([START, END], 'motor')['access'] is None
+        assert osrm.overlapped is False
+        assert osrm.calls == ['customer', None]
+    finally:
+        release.set()
+        for blocker in blockers:
+            blocker.result()
+
+
+def test_mobil_sends_single_request():
+    osrm = FakeOSRM(customer_ok=True)
+    make_navigator(osrm)._fetch_osrm([START, END], 'mobil')
+    assert osrm.calls == [None]
@@ -0,0 +1,85 @@
+import importlib.util
+import os
+import sys
+import types
+from datetime import datetime
+
+import pytest
+
+import osrm_stub
+import ujianakhir
+from ujianakhir import (OSRMClient, RouteCache, RuleCongestionModel, SmartNavigator, TrafficPredictor, UpstreamBudget,
+                        create_app)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def session():
+    return osrm_stub.stub_session()
+
+
+@pytest.fixture
+def navigator(session, tmp_path):
+    return SmartNavigator(route_cache=RouteCache(db_path=str(tmp_path / 'routes.db')), osrm_client=OSRMClient(session=session),
+                          traffic_predictor=TrafficPredictor(model=RuleCongestionModel(), clock=lambda: datetime(2024, 5, 6, 8)),
+                          upstream_budget=UpstreamBudget(rate=0))
+
+
+@pytest.fixture
+def gunicorn_conf():
+    spec = importlib.util.spec_from_file_location('gunicorn_conf', os.path.join(ROOT, 'gunicorn.conf.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_healthz_is_always_live(navigator):
+    response = create_app(navigator=navigator, background=False, preload=True).test_client().get('/healthz')
+    assert response.status_code == 200 and response.get_json() == {'status': 'ok', 'pid': os.getpid()}
+
+
+def test_readyz_waits_for_warm_up_without_calling_osrm(navigator, session):
+    app = create_app(navigator=navigator, background=False, preload=True)
+    client = app.test_client()
+    response = client.get('/readyz')
+    assert response.status_code == 503 and response.get_json()['checks']['warmed'] is False
+    ujianakhir.warm_up(app)
+    response = client.get('/readyz')
+    assert response.status_code == 200 and response.get_json()['ready'] is True
+    assert session.get_adapter('http://').calls == 0
+    # Tanpa preload (server development) aplikasi langsung siap
+    assert create_app(navigator=navigator, background=False).test_client().get('/readyz').status_code == 200
+
+
+def test_readyz_fails_while_osrm_breaker_is_open(navigator):
+    app = create_app(navigator=navigator, background=False)
+    navigator.osrm._record(False, True)
+    response = app.test_client().get('/readyz')
+    assert response.status_code == 503 and response.get_json()['checks']['routing'] is False
+
+
+def test_after_fork_replaces_inherited_resources(navigator, monkeypatch):
+    app = create_app(navigator=navigator, background=False)
+    started = []
+    monkeypatch.setattr(ujianakhir, 'start_background', started.append)
+    executor, connection = navigator.executor, navigator.route_cache._store._db
+    ujianakhir.after_fork(app)
+    assert navigator.executor is not executor and navigator.route_cache._store._db is not connection
+    assert started == [app]
+    # Pool lama tidak dipakai lagi; pool baru melayani request seperti biasa
+    assert 'error' not in navigator.find_all_routes_concurrent(1, 3, 'mobil')
+
+
+def test_gunicorn_config_preloads_and_hooks_workers(gunicorn_conf, monkeypatch):
+    assert gunicorn_conf.preload_app is True and gunicorn_conf.worker_class == 'gthread'
+    frozen = []
+    monkeypatch.setattr(gunicorn_conf.gc, 'freeze', lambda: frozen.append(True))
+    gunicorn_conf.when_ready(None)
+    assert frozen == [True]
+    app = object()
+    forked = []
+    monkeypatch.setitem(sys.modules, 'wsgi', types.SimpleNamespace(app=app))
+    monkeypatch.setattr(ujianakhir, 'after_fork', forked.append)
+    gunicorn_conf.post_fork(None, None)
+    assert forked == [app]
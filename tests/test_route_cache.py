@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from ujianakhir import RouteCache
+
+
+@pytest.fixture
+def clock(clock, monkeypatch):
+    # RouteCache memakai time.time() langsung
+    monkeypatch.setattr(time, 'time', clock)
+    return clock
+
+
+def test_make_key_rounds_coordinates_and_includes_access():
+    key = RouteCache.make_key([(-3.8, 102.26), (-3.79123456789, 102.3)], 'driving', 'customer')
+    assert key == 'driving|customer|-3.800000,102.260000;-3.791235,102.300000'
+    assert RouteCache.make_key([(-3.8, 102.26)], 'driving').startswith('driving|-|')
+
+
+def test_lru_evicts_least_recently_used():
+    cache = RouteCache(max_size=2, db_path='')
+    cache.set('a', {'n': 1})
+    cache.set('b', {'n': 2})
+    assert cache.get('a') == {'n': 1}  # a menjadi yang terbaru
+    cache.set('c', {'n': 3})
+    assert cache.get('b') is None
+    assert cache.get('a') == {'n': 1}
+    assert cache.get('c') == {'n': 3}
+    assert cache.info()['evictions'] == 1
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = RouteCache(max_size=10, ttl=60, db_path='')
+    cache.set('a', {'n': 1})
+    clock.now += 60
+    assert cache.get('a') == {'n': 1}
+    assert 'a' in cache
+    clock.now += 1
+    assert 'a' not in cache
+    assert cache.get('a') is None
+    info = cache.info()
+    assert info['expired'] == 1
+    assert info['misses'] == 1
+
+
+def test_sqlite_tier_survives_new_instance(tmp_path):
+    path = str(tmp_path / 'routes.db')
+    RouteCache(max_size=10, db_path=path).set('a', {'code': 'Ok'})
+
+    cache = RouteCache(max_size=10, db_path=path)
+    assert 'a' in cache
+    assert cache.get('a') == {'code': 'Ok'}
+    assert cache.info()['disk_hits'] == 1
+    assert cache.get('a') == {'code': 'Ok'}
+    assert cache.info()['hits'] == 1
+
+
+def test_sqlite_tier_drops_expired_rows(tmp_path, clock):
+    path = str(tmp_path / 'routes.db')
+    RouteCache(max_size=10, ttl=60, db_path=path).set('a', {'code': 'Ok'})
+    clock.now += 61
+    cache = RouteCache(max_size=10, ttl=60, db_path=path)
+    assert cache.get('a') is None
+
+
+def test_warm_loads_recent_rows_into_memory(tmp_path):
+    path = str(tmp_path / 'routes.db')
+    writer = RouteCache(max_size=10, db_path=path)
+    for key in 'abc':
+        writer.set(key, {'key': key})
+
+    cache = RouteCache(max_size=2, db_path=path)
+    assert cache.warm() == 2
+    assert cache.info()['size'] == 2
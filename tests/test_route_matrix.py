@@ -0,0 +1,56 @@
+from datetime import datetime
+
+import pytest
+
+import osrm_stub
+import precompute_routes
+from ujianakhir import (Config, OSRMClient, RouteCache, RouteMatrix, RuleCongestionModel, SmartNavigator, TrafficPredictor,
+                        UpstreamBudget)
+
+
+@pytest.fixture(scope='module')
+def matrix_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('matrix') / 'route_matrix.json.gz')
+    assert precompute_routes.main(['--stub', '--transport', 'mobil', '--output', path]) == 0
+    return path
+
+
+def make_navigator(matrix, session, clock):
+    return SmartNavigator(route_cache=RouteCache(db_path=''), route_matrix=matrix, osrm_client=OSRMClient(session=session),
+                          traffic_predictor=TrafficPredictor(model=RuleCongestionModel(), clock=lambda: clock),
+                          upstream_budget=UpstreamBudget(rate=0))
+
+
+def test_cli_builds_primary_and_alternative_for_every_pair(matrix_path):
+    matrix = RouteMatrix.load(matrix_path)
+    pairs = len(Config.NODES) * (len(Config.NODES) - 1)
+    assert len(matrix) == 2 * pairs
+    assert matrix.meta['failed'] == [] and matrix.meta['build_seconds'] >= 0
+    route = next(iter(matrix.routes.values()))['routes'][0]
+    # Hanya field yang dipakai navigator yang disimpan
+    assert set(route) == {'distance', 'duration', 'geometry', 'legs'}
+    assert set(route['legs'][0]['steps'][0]) == {'name', 'distance', 'duration', 'maneuver'}
+
+
+@pytest.mark.parametrize('clock', [datetime(2024, 5, 6, 2), datetime(2024, 5, 6, 8)])
+def test_precomputed_routes_need_no_upstream_request(matrix_path, clock):
+    session = osrm_stub.stub_session()
+    with_matrix = make_navigator(RouteMatrix.load(matrix_path), session, clock)
+    result = with_matrix.find_all_routes(1, 3, 'mobil')
+    assert 'error' not in result and ('alternative' in result) == (clock.hour == 8)
+    assert session.get_adapter('http://').calls == 0
+    # Hasilnya sama dengan menghitung langsung dari OSRM (geometri dibulatkan 6 desimal), termasuk koreksi
+    # kemacetan per request
+    direct = make_navigator(None, osrm_stub.stub_session(), clock).find_all_routes(1, 3, 'mobil')
+    assert direct.keys() == result.keys() and direct['has_congestion'] == result['has_congestion']
+    for kind in ('primary', 'alternative'):
+        if kind in direct:
+            assert (direct[kind]['distance'], direct[kind]['time']) == (result[kind]['distance'], result[kind]['time'])
+            assert len(direct[kind]['path']) == len(result[kind]['path'])
+
+
+def test_missing_or_corrupt_matrix_is_ignored(tmp_path):
+    assert RouteMatrix.load_if_exists(str(tmp_path / 'tidak-ada.json.gz')) is None
+    corrupt = tmp_path / 'rusak.json.gz'
+    corrupt.write_bytes(b'bukan gzip')
+    assert RouteMatrix.load_if_exists(str(corrupt)) is None
@@ -0,0 +1,73 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import osrm_stub
+from ujianakhir import (Config, OSRMClient, RouteCache, RouteSteps, RuleCongestionModel, SmartNavigator, TrafficPredictor,
+                        UpstreamBudget)
+
+RUSH_HOUR = datetime(2024, 5, 6, 8, 0)
+
+
+@pytest.fixture
+def navigator():
+    return SmartNavigator(route_cache=RouteCache(db_path=''), osrm_client=OSRMClient(session=osrm_stub.stub_session()),
+                          traffic_predictor=TrafficPredictor(model=RuleCongestionModel(), clock=lambda: RUSH_HOUR),
+                          upstream_budget=UpstreamBudget(rate=0))
+
+
+def node(node_id):
+    return (Config.NODES[node_id]['lat'], Config.NODES[node_id]['lng'])
+
+
+def per_step(navigator, route, transport_type):
+    # Loop per langkah sebelum pipeline array: satu bearing, node terdekat dan prediksi per langkah
+    transport = Config.TRANSPORT_PROFILES[transport_type]
+    steps = []
+    for leg in route.get('legs', []):
+        leg_steps = leg.get('steps', [])
+        for i, step in enumerate(leg_steps):
+            maneuver = step.get('maneuver', {})
+            location = [maneuver['location'][1], maneuver['location'][0]]
+            instruction = step.get('name', 'Lanjutkan')
+            if maneuver.get('type') == 'turn':
+                instruction = f"Belok {'kiri' if 'left' in maneuver.get('modifier', '') else 'kanan'} di {instruction}"
+            if i < len(leg_steps) - 1:
+                following = leg_steps[i + 1]['maneuver']['location']
+                direction = navigator.calculate_bearing(location, [following[1], following[0]])
+            else:
+                direction = "Lurus"
+            distance = step['distance'] / 1000
+            duration = distance / transport['base_speed'] * 60 / transport['congestion_factor']
+            congestion = navigator.traffic_predictor.predict_congestion(navigator._find_nearest_node(location), RUSH_HOUR)
+            steps.append({
+                'instruction': f"{instruction} menuju arah {direction}",
+                'distance': f"{distance:.1f} km",
+                'time': f"{duration:.0f} menit",
+                'condition': f"Kondisi jalan: {congestion['level']} ({congestion['reason']})"
+            })
+    return steps
+
+
+@pytest.mark.parametrize('transport_type', list(Config.TRANSPORT_PROFILES))
+@pytest.mark.parametrize('waypoints', [(11, 15), (1, 3), (11, 5, 15), (2, 1, 8, 12)])
+def test_pipeline_matches_per_step_loop(navigator, transport_type, waypoints):
+    profile = Config.TRANSPORT_PROFILES[transport_type]['profile']
+    route = osrm_stub.synthetic_route(profile, [(lng, lat) for lat, lng in map(node, waypoints)])['routes'][0]
+    steps = navigator._process_steps(route, transport_type, RUSH_HOUR)
+    assert len(steps) == sum(len(leg['steps']) for leg in route['legs'])
+    assert steps.to_dicts() == per_step(navigator, route, transport_type)
+
+
+def test_route_without_steps(navigator):
+    steps = navigator._process_steps({'legs': [{'steps': []}]}, 'mobil', RUSH_HOUR)
+    assert len(steps) == 0 and steps.to_dicts() == []
+
+
+def test_bearing_directions_match_scalar_bearing(navigator):
+    rng = np.random.default_rng(3)
+    start = rng.uniform([-3.9, 102.2], [-3.7, 102.4], (200, 2))
+    end = rng.uniform([-3.9, 102.2], [-3.7, 102.4], (200, 2))
+    expected = [navigator.calculate_bearing(a, b) for a, b in zip(start, end)]
+    assert RouteSteps.bearing_directions(start, end).tolist() == expected
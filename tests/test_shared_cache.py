@@ -0,0 +1,223 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from ujianakhir import Config, RedisStore, RouteCache, SingleFlight, SQLiteStore, TrafficMap, TrafficPredictor
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    return str(tmp_path / 'shared.db')
+
+
+@pytest.fixture(autouse=True)
+def fast_poll(monkeypatch):
+    monkeypatch.setattr(Config, 'CACHE_LEASE_POLL', 0.005)
+
+
+def run_threads(n, target):
+    results = [None] * n
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, target())) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return 'hasil'
+
+    threads = [threading.Thread(target=flight.do, args=('k', compute)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    while flight.coalesced < 7:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert calls == [1] and flight.coalesced == 7
+    # Setelah selesai, kunci yang sama dihitung ulang
+    assert flight.do('k', lambda: 'baru') == 'baru'
+
+
+def test_single_flight_shares_errors_with_waiters():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def fail():
+        started.set()
+        release.wait(5)
+        raise RuntimeError('gagal')
+
+    errors = []
+
+    def call():
+        try:
+            flight.do('k', fail)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=call)
+    follower.start()
+    while flight.coalesced < 1:
+        time.sleep(0.001)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    assert errors == ['gagal', 'gagal']
+
+
+def test_sqlite_lease_acquire_release_and_expiry(store_path):
+    store = SQLiteStore(store_path)
+    other = SQLiteStore(store_path)  # proses lain membuka file yang sama
+    assert store.acquire('k', 30)
+    assert not other.acquire('k', 30)
+    store.release('k')
+    assert other.acquire('k', 30)
+    # Lease milik proses yang mati kedaluwarsa lalu boleh diambil alih
+    assert store.acquire('mati', 0.01)
+    time.sleep(0.02)
+    assert other.acquire('mati', 30)
+    # Lease per namespace
+    assert SQLiteStore(store_path, namespace='results').acquire('k', 30)
+
+
+class FakeRedis:
+    # Cukup perintah redis-py yang dipakai RedisStore; down=True meniru server yang tidak bisa dihubungi
+    def __init__(self):
+        self.data = {}
+        self.down = False
+        self.calls = []
+
+    def _command(self, name):
+        self.calls.append(name)
+        if self.down:
+            raise ConnectionError('redis mati')
+
+    def get(self, key):
+        self._command('get')
+        return self.data.get(key)
+
+    def set(self, key, value, nx=False, px=None):
+        self._command('set')
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def delete(self, *keys):
+        self._command('delete')
+        for key in keys:
+            self.data.pop(key, None)
+
+    def ping(self):
+        self._command('ping')
+        return True
+
+
+def test_redis_contains_honours_since():
+    store = RedisStore(client=FakeRedis())
+    store.set('k', {'code': 'Ok'}, 100.0, 60)
+    assert store.contains('k', 99.0) and store.contains('k', 100.0)
+    assert not store.contains('k', 101.0)
+    assert not store.contains('lain', 0)
+
+
+def test_redis_contended_lease_does_not_ping():
+    client = FakeRedis()
+    store, other = RedisStore(client=client), RedisStore(client=client)
+    assert store.acquire('k', 30)
+    assert not other.acquire('k', 30)
+    assert 'ping' not in client.calls
+    store.release('k')
+    assert other.acquire('k', 30)
+    # Redis tidak tersedia: worker menghitung sendiri daripada menunggu lease
+    client.down = True
+    assert store.acquire('k', 30)
+    assert store.get('k') is None and not store.contains('k', 0)
+
+
+def test_sqlite_reopen_closes_inherited_connection(store_path):
+    store = SQLiteStore(store_path)
+    store.set('k', {'code': 'Ok'}, time.time(), 60)
+    inherited = store._db
+    store.reopen()
+    with pytest.raises(sqlite3.ProgrammingError):
+        inherited.execute("SELECT 1")
+    assert store.get('k')[0] == {'code': 'Ok'}
+
+
+def test_get_or_compute_computes_once_per_process():
+    cache = RouteCache(db_path='')
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return {'code': 'Ok'}
+
+    results = run_threads(8, lambda: cache.get_or_compute('k', compute))
+    assert calls == [1]
+    assert results == [{'code': 'Ok'}] * 8
+    assert cache.info()['coalesced'] == 7
+
+
+def test_get_or_compute_waits_for_lease_holder(store_path):
+    # Dua "worker" dengan tier bersama yang sama: yang tidak memegang lease memakai hasil worker pemegang lease
+    holder = RouteCache(db_path='', store=SQLiteStore(store_path))
+    waiter = RouteCache(db_path='', store=SQLiteStore(store_path))
+    assert holder._store.acquire('k', Config.CACHE_LEASE_SECONDS)
+
+    def finish():
+        time.sleep(0.05)
+        holder.set('k', {'code': 'Ok', 'dari': 'holder'})
+        holder._store.release('k')
+
+    threading.Thread(target=finish).start()
+    result = waiter.get_or_compute('k', lambda: pytest.fail("lease dipegang worker lain"))
+    assert result == {'code': 'Ok', 'dari': 'holder'}
+    assert waiter.info()['lease_waits'] == 1
+
+
+def test_get_or_compute_takes_over_expired_lease(store_path):
+    waiter = RouteCache(db_path='', store=SQLiteStore(store_path))
+    assert SQLiteStore(store_path).acquire('k', 0.05)  # pemegang lease mati tanpa melepasnya
+    assert waiter.get_or_compute('k', lambda: {'code': 'Ok'}) == {'code': 'Ok'}
+    assert waiter._store.get('k')[0] == {'code': 'Ok'}
+    # Lease dilepas setelah menghitung
+    assert SQLiteStore(store_path).acquire('k', 30)
+
+
+def test_get_or_compute_respects_should_store(store_path):
+    cache = RouteCache(db_path='', store=SQLiteStore(store_path))
+    assert cache.get_or_compute('k', lambda: {'code': 'NoRoute'}, should_store=lambda data: data['code'] == 'Ok') == {'code': 'NoRoute'}
+    assert cache.get('k') is None and cache._store.get('k') is None
+
+
+def test_traffic_map_reopens_shared_tier_after_fork():
+    class RecordingStore:
+        reopened = 0
+
+        def purge(self, older_than):
+            pass
+
+        def reopen(self):
+            self.reopened += 1
+
+    store = RecordingStore()
+    TrafficMap(TrafficPredictor(), store=store).after_fork()
+    assert store.reopened == 1
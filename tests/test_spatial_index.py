@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from ujianakhir import Config, SpatialIndex
+
+
+@pytest.fixture(scope='module')
+def dense():
+    # 2000 titik acak ~20 x 20 km di sekitar Bengkulu dengan sel grid kecil
+    rng = np.random.default_rng(7)
+    lat = -3.8 + rng.uniform(-0.1, 0.1, 2000)
+    lng = 102.27 + rng.uniform(-0.1, 0.1, 2000)
+    return SpatialIndex.from_arrays(np.arange(2000) + 100, lat, lng, cell_km=0.25)
+
+
+def queries(n, spread, seed=1):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([-3.8 + rng.uniform(-spread, spread, n), 102.27 + rng.uniform(-spread, spread, n)])
+
+
+def brute_nearest_within(index, coords, radius_km):
+    points = index._project(coords[:, 0], coords[:, 1])
+    dists = np.hypot(points[:, None, 0] - index.xy[None, :, 0], points[:, None, 1] - index.xy[None, :, 1])
+    nearest = dists.argmin(axis=1)
+    return np.where(dists[np.arange(len(points)), nearest] <= radius_km, index.node_ids[nearest], -1)
+
+
+@pytest.mark.parametrize('radius_km', [0.1, 0.5, 2.0])
+def test_nearest_within_matches_brute_force(dense, radius_km):
+    coords = queries(3000, 0.15)
+    result = dense.nearest_within(coords, radius_km)
+    assert np.array_equal(result, brute_nearest_within(dense, coords, radius_km))
+    assert (result == -1).any()
+
+
+def test_nearest_within_does_not_build_all_pairs(dense, monkeypatch):
+    # Jumlah pasangan titik x node yang dihitung jauh lebih kecil dari semua pasangan
+    pairs = []
+    ring_pairs = dense._ring_pairs
+
+    def counting(cells, ring):
+        result = ring_pairs(cells, ring)
+        pairs.append(len(result[0]))
+        return result
+
+    monkeypatch.setattr(dense, '_ring_pairs', counting)
+    coords = queries(3000, 0.1)
+    dense.nearest_within(coords, 0.5)
+    assert sum(pairs) < len(coords) * len(dense.node_ids) / 20
+
+
+def test_nearest_batch_matches_single_lookup(dense):
+    coords = queries(300, 0.15, seed=3)
+    assert dense.nearest_batch(coords) == [dense.nearest(tuple(point)) for point in coords]
+
+
+def test_nearest_batch_far_outside_grid(dense):
+    coords = np.array([[-5.0, 100.0], [0.0, 110.0]])
+    assert dense.nearest_batch(coords) == [dense.nearest(tuple(point)) for point in coords]
+
+
+def test_city_nodes():
+    index = SpatialIndex(Config.NODES)
+    for node_id, node in Config.NODES.items():
+        assert index.nearest((node['lat'], node['lng'])) == node_id
+    coords = [(node['lat'] + 0.0005, node['lng']) for node in Config.NODES.values()]
+    assert index.nearest_batch(coords) == list(Config.NODES)
+    assert index.nearest_within(np.array(coords), 0.1).tolist() == list(Config.NODES)
+    assert index.nearest_batch([]) == []
+    assert len(index.nearest_within(np.zeros((0, 2)), 0.5)) == 0
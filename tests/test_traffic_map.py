@@ -0,0 +1,57 @@
+import html
+from datetime import datetime
+
+import pytest
+
+from ujianakhir import Config, RuleCongestionModel, TrafficMap, TrafficPredictor
+
+NIGHT = datetime(2024, 5, 6, 2, 0)
+RUSH_HOUR = datetime(2024, 5, 6, 8, 0)
+
+ROUTE = {
+    'primary': {'distance': '3.2 km', 'time': '9 menit', 'path': [[-3.79, 102.26], [-3.80, 102.27]]},
+    'alternative': {'distance': '3.9 km', 'time': '11 menit', 'path': [[-3.79, 102.26], [-3.81, 102.27]], 'is_alternative': True},
+}
+
+
+@pytest.fixture
+def traffic_map(monkeypatch):
+    traffic_map = TrafficMap(TrafficPredictor(model=RuleCongestionModel(), clock=lambda: NIGHT), store=None)
+    traffic_map.builds = []
+    build = traffic_map._build_base_map
+    monkeypatch.setattr(traffic_map, '_build_base_map', lambda snapshot: traffic_map.builds.append(snapshot.bucket) or build(snapshot))
+    return traffic_map
+
+
+def srcdoc(page):
+    assert page.startswith(TrafficMap.IFRAME_PREFIX) and page.endswith(TrafficMap.IFRAME_SUFFIX)
+    return html.unescape(page[len(TrafficMap.IFRAME_PREFIX):-len(TrafficMap.IFRAME_SUFFIX)])
+
+
+def test_base_map_rendered_once_per_congestion_state(traffic_map):
+    first = traffic_map.create_map()
+    # Jam lain dengan kondisi semua node yang sama memakai peta dasar yang sudah dirender
+    assert traffic_map.create_map(at=datetime(2024, 5, 6, 3, 0)) == first
+    assert traffic_map.builds == [NIGHT]
+    rush = traffic_map.create_map(at=RUSH_HOUR)
+    assert rush != first and traffic_map.builds == [NIGHT, RUSH_HOUR]
+    assert traffic_map._base_cache.info()['hits'] == 1
+
+
+def test_route_overlay_is_added_to_the_cached_base(traffic_map):
+    empty = srcdoc(traffic_map.create_map())
+    document = srcdoc(traffic_map.create_map(start=1, end=3, route_data=ROUTE))
+    assert len(traffic_map.builds) == 1
+    # Dokumen dasar tetap utuh; hanya panggilan Leaflet yang disisipkan sebelum </script> terakhir
+    split_at = empty.rindex('</script>')
+    assert document.startswith(empty[:split_at]) and document.endswith(empty[split_at:])
+    overlay = document[split_at:len(document) - len(empty) + split_at]
+    assert overlay.count('L.polyline(') == 2 and overlay.count('L.marker(') == 2
+    assert 'Rute Alternatif: 3.9 km (11 menit)' in overlay
+    assert Config.NODES[1]['name'] in overlay and Config.NODES[3]['name'] in overlay
+
+
+def test_overlay_text_cannot_close_the_script(traffic_map):
+    route = {'primary': dict(ROUTE['primary'], distance='</script><b>x</b>')}
+    document = srcdoc(traffic_map.create_map(route_data=route))
+    assert document.count('</script>') == srcdoc(traffic_map.create_map()).count('</script>')
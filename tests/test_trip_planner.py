@@ -0,0 +1,141 @@
+import itertools
+import time
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import osrm_stub
+from ujianakhir import (OSRMClient, RouteCache, RuleCongestionModel, SmartNavigator, TrafficPredictor, TripPlanner,
+                        UpstreamBudget)
+
+
+def random_matrix(n, seed):
+    # Durasi asimetris 1-60 menit
+    rng = np.random.default_rng(seed)
+    durations = rng.uniform(1, 60, (n, n))
+    np.fill_diagonal(durations, 0)
+    return durations
+
+
+def brute_force(durations, round_trip):
+    planner = TripPlanner(durations, round_trip)
+    return min(planner.cost([0] + list(rest)) for rest in itertools.permutations(range(1, len(durations))))
+
+
+def assert_valid_order(order, n):
+    assert order[0] == 0 and sorted(order) == list(range(n))
+
+
+@pytest.mark.parametrize('round_trip', [False, True])
+@pytest.mark.parametrize('n', [3, 4, 6, 8])
+def test_held_karp_matches_brute_force(n, round_trip):
+    for seed in range(5):
+        durations = random_matrix(n, seed)
+        planner = TripPlanner(durations, round_trip, exact_max=n)
+        order, cost, solver = planner.solve()
+        assert solver == 'exact'
+        assert_valid_order(order, n)
+        assert cost == pytest.approx(brute_force(durations, round_trip))
+        assert cost == pytest.approx(planner.cost(order))
+
+
+@pytest.mark.parametrize('round_trip', [False, True])
+@pytest.mark.parametrize('n', [5, 7, 9])
+def test_heuristic_matches_exact_on_small_matrices(n, round_trip):
+    for seed in range(5):
+        durations = random_matrix(n, seed)
+        exact = TripPlanner(durations, round_trip, exact_max=n).solve()
+        order, cost, solver = TripPlanner(durations, round_trip, exact_max=0, time_budget=1.0).solve()
+        assert solver == 'heuristic'
+        assert_valid_order(order, n)
+        assert cost == pytest.approx(exact[1])
+
+
+def test_double_bridge_improves_on_single_local_search():
+    improved = 0
+    for seed in range(20):
+        planner = TripPlanner(random_matrix(12, seed), round_trip=True, time_budget=1.0)
+        single = planner.cost(planner.local_search(planner.nearest_neighbour(), time.perf_counter() + 1.0))
+        iterated = planner.cost(planner.iterated_local_search())
+        assert iterated <= single + 1e-9
+        improved += iterated < single - 1e-9
+    assert improved > 0
+
+
+def test_local_search_reaches_local_optimum():
+    planner = TripPlanner(random_matrix(8, 3))
+    order = planner.local_search(list(range(8)), time.perf_counter() + 1.0)
+    assert_valid_order(order, 8)
+    assert all(planner.cost(neighbour) >= planner.cost(order) - 1e-9 for neighbour in planner._neighbours(order))
+
+
+@pytest.mark.parametrize('n', [3, 6])
+def test_neighbours_keep_start_fixed(n):
+    neighbours = list(TripPlanner(random_matrix(n, 0))._neighbours(list(range(n))))
+    assert neighbours
+    for neighbour in neighbours:
+        assert_valid_order(neighbour, n)
+
+
+@pytest.mark.parametrize('exact_max', [10, 0])
+def test_unreachable_pairs_are_avoided(exact_max):
+    # 0 -> 2 dan 1 -> 3 tidak terjangkau: urutan yang dipilih tidak boleh memakai pasangan itu
+    durations = random_matrix(5, 1)
+    durations[0, 2] = durations[1, 3] = np.nan
+    order, cost, _ = TripPlanner(durations, exact_max=exact_max).solve()
+    assert cost < TripPlanner.UNREACHABLE
+    assert all(not np.isnan(durations[a, b]) for a, b in zip(order, order[1:]))
+
+
+def test_no_order_when_nothing_reachable():
+    durations = np.full((4, 4), np.nan)
+    np.fill_diagonal(durations, 0)
+    assert TripPlanner(durations).solve()[0] is None
+
+
+def test_plan_trip_matrix_matches_stitched_route():
+    navigator = SmartNavigator(route_cache=RouteCache(db_path=''), osrm_client=OSRMClient(session=osrm_stub.stub_session()),
+                               traffic_predictor=TrafficPredictor(model=RuleCongestionModel(), clock=lambda: datetime(2024, 5, 6, 8)),
+                               upstream_budget=UpstreamBudget(rate=0))
+    first = navigator.plan_trip([1, 5, 9, 11, 15], 'motor')
+    # Rute tiap leg kini ada di cache: matriks memakai geometri dan durasinya, sehingga sama dengan rute sambungan
+    result = navigator.plan_trip([1, 5, 9, 11, 15], 'motor')
+    primary = result['primary']
+    assert result['order'] == first['order']
+    assert result['matrix_minutes'] == pytest.approx(primary['speed_adjusted_duration'] / primary['congestion_factor'], abs=0.05)
+    assert result['primary_congested'] is True  # Simpang Lima dan Megamall padat pada jam sibuk
+
+    night = navigator.plan_trip([5, 7, 14], 'motor', at=datetime(2024, 5, 6, 2))
+    assert night['primary_congested'] is False
+
+
+@pytest.fixture
+def client():
+    from ujianakhir import create_app
+    session = osrm_stub.stub_session()
+    navigator = SmartNavigator(route_cache=RouteCache(db_path=''), osrm_client=OSRMClient(session=session),
+                               traffic_predictor=TrafficPredictor(model=RuleCongestionModel(), clock=lambda: datetime(2024, 5, 6, 8)),
+                               upstream_budget=UpstreamBudget(rate=0))
+    client = create_app(navigator=navigator, background=False).test_client()
+    client.adapter = session.get_adapter('http://')
+    client.navigator = navigator
+    return client
+
+
+def test_trip_matrix_is_one_table_request(client):
+    response = client.post('/api/trip', json={'nodes': [1, 5, 9, 11, 15], 'transport': 'mobil'})
+    assert response.status_code == 200
+    # Satu table untuk urutan, lalu satu route per leg (mobil tanpa fallback access)
+    assert client.adapter.calls == 1 + 4
+
+
+def test_trip_status_codes(client, monkeypatch):
+    assert client.post('/api/trip', json={'nodes': [1], 'transport': 'mobil'}).status_code == 400
+    assert client.post('/api/trip', json={'nodes': [1, 99], 'transport': 'mobil'}).status_code == 400
+    unreachable = {'code': 'Ok', 'durations': [[0, None], [None, 0]], 'distances': [[0, None], [None, 0]]}
+    monkeypatch.setattr(client.navigator, '_fetch_osrm_table', lambda *args, **kwargs: unreachable)
+    response = client.post('/api/trip', json={'nodes': [1, 2], 'transport': 'mobil'})
+    assert response.status_code == 422 and response.get_json() == {'error': 'Tidak ada urutan kunjungan yang bisa dilalui'}
+    monkeypatch.setattr(client.navigator, '_fetch_osrm_table', lambda *args, **kwargs: {'code': 'Error', 'message': 'x'})
+    assert client.post('/api/trip', json={'nodes': [1, 2], 'transport': 'mobil'}).status_code == 502
@@ -0,0 +1,134 @@
+import threading
+import time
+
+import pytest
+
+from ujianakhir import UpstreamBudget
+
+
+TICK = 0.125  # satu token pada rate bawaan make_budget; pecahan biner, tanpa galat pembulatan
+
+
+def make_budget(clock, rate=8, **kwargs):
+    # Request yang antre bangun paling lambat tiap 1 / rate detik (jam asli) untuk membaca jam palsu
+    kwargs.setdefault('max_wait', {'interactive': None, 'bulk': None, 'background': None})
+    return UpstreamBudget(rate=rate, clock=clock, **kwargs)
+
+
+def wait_until(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline, "kondisi tidak tercapai"
+        time.sleep(0.001)
+
+
+def queue(budget, results, client, priority):
+    # acquire() yang menunggu token di thread lain; hasilnya dicatat berurutan saat selesai
+    waiting = budget.info()['waiting']
+    thread = threading.Thread(target=lambda: results.append((client, priority, budget.acquire(client, priority))), daemon=True)
+    thread.start()
+    wait_until(lambda: budget.info()['waiting'] == waiting + 1)
+    return thread
+
+
+def test_disabled_budget_always_grants():
+    budget = UpstreamBudget(rate=0)
+    assert all(budget.acquire('c', 'bulk') for _ in range(100))
+    assert not budget.busy() and budget.retry_after() == 1
+    assert budget.info()['granted'] == 0
+
+
+def test_burst_then_refill(clock):
+    budget = make_budget(clock, burst=3, max_wait={'bulk': 0})
+    assert all(budget.acquire('c', 'bulk') for _ in range(3))
+    assert budget.busy()
+    assert not budget.acquire('c', 'bulk')
+    assert budget.retry_after() == 1
+    clock.now += TICK
+    assert not budget.busy()
+    assert budget.acquire('c', 'bulk')
+    # Bucket tidak terisi melebihi burst
+    clock.now += 60
+    assert budget.info()['tokens'] == 3
+    assert budget.info()['granted'] == 4 and budget.info()['shed'] == 1
+
+
+def test_queue_is_served_by_priority_then_usage_then_arrival(clock):
+    budget = make_budget(clock, burst=1)
+    assert budget.acquire('bising', 'bulk')
+    results = []
+    threads = [queue(budget, results, client, priority) for client, priority in
+               [('a', 'background'), ('bising', 'bulk'), ('sopan', 'bulk'), ('b', 'background'), ('peta', 'interactive')]]
+    assert budget.busy()
+    for served in range(1, len(threads) + 1):
+        clock.now += TICK
+        wait_until(lambda: len(results) == served)
+    assert [client for client, _, _ in results] == ['peta', 'sopan', 'bising', 'a', 'b']
+    assert all(granted for _, _, granted in results)
+    for thread in threads:
+        thread.join(5)
+    assert budget.info()['queued'] == 5 and budget.info()['waiting'] == 0
+
+
+@pytest.mark.parametrize('priority', ['interactive', 'bulk', 'background'])
+def test_queue_limits_apply_to_every_priority(clock, priority):
+    budget = make_budget(clock, burst=1, queue_size=3, client_queue=2)
+    assert budget.acquire('x', priority)
+    results = []
+    threads = [queue(budget, results, 'bising', priority), queue(budget, results, 'bising', priority)]
+    # Klien yang sama sudah memenuhi client_queue; klien lain masih boleh antre sampai queue_size
+    assert not budget.acquire('bising', priority)
+    threads.append(queue(budget, results, 'lain', priority))
+    assert not budget.acquire('baru', priority)
+    assert budget.info()['shed'] == 2 and budget.info()['waiting'] == 3
+    assert budget.retry_after() == 1  # (3 antre + 1) / 8 token per detik
+    for served in range(1, len(threads) + 1):
+        clock.now += TICK
+        wait_until(lambda: len(results) == served)
+    for thread in threads:
+        thread.join(5)
+    assert all(granted for _, _, granted in results)
+
+
+def test_waiting_request_is_shed_after_max_wait(clock):
+    budget = make_budget(clock, rate=1, burst=1, max_wait={'bulk': 0.5})
+    assert budget.acquire('c', 'bulk')
+    results = []
+    thread = queue(budget, results, 'c', 'bulk')
+    # Batas tunggu lewat sebelum token berikutnya terisi
+    clock.now += 0.6
+    thread.join(5)
+    assert results == [('c', 'bulk', False)]
+    assert budget.info()['shed'] == 1
+
+
+def test_optional_request_never_queues_behind_others(clock):
+    budget = make_budget(clock, burst=1)
+    assert budget.acquire('c', 'interactive', optional=True)
+    results = []
+    thread = queue(budget, results, 'c', 'interactive')
+    assert not budget.acquire('d', 'interactive', optional=True)
+    assert not budget.acquire('d', 'background', optional=True)
+    assert budget.info()['skipped'] == 2 and budget.info()['shed'] == 0
+    clock.now += TICK
+    thread.join(5)
+    assert results == [('c', 'interactive', True)]
+
+
+def test_optional_request_counts_against_queue_limits(clock):
+    budget = make_budget(clock, burst=1, queue_size=2, client_queue=1)
+    assert budget.acquire('x', 'bulk')
+    results = []
+    # Antrean hanya berisi request background, jadi request interaktif opsional boleh menunggu, tetapi tetap
+    # dibatasi client_queue dan queue_size
+    threads = [queue(budget, results, 'bising', 'background')]
+    assert not budget.acquire('bising', 'interactive', optional=True)
+    threads.append(queue(budget, results, 'lain', 'background'))
+    assert not budget.acquire('baru', 'interactive', optional=True)
+    assert budget.info()['skipped'] == 2 and budget.info()['shed'] == 0 and budget.info()['waiting'] == 2
+    for served in range(1, len(threads) + 1):
+        clock.now += TICK
+        wait_until(lambda: len(results) == served)
+    for thread in threads:
+        thread.join(5)
+    assert all(granted for _, _, granted in results)
@@ -1,677 +1,4501 @@
-# -- coding: utf-8 --
-import os
-from datetime import datetime
-import requests
-from flask import Flask, render_template, request, jsonify
-import folium
-from folium.plugins import HeatMap
-from geopy.distance import geodesic
-import logging
-import math
-
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
-logger = logging.getLogger(__name__)
-
-app = Flask(__name__)
-
-# ===================== KONFIGURASI JALAN BENGKULU =====================
-class Config:
-    NODES = {
-        1: {"name": "Simpang Lima (Jl. Soekarno Hatta)", "lat": -3.797347, "lng": 102.265986, "critical": True, "weekend_congestion": True},
-        2: {"name": "Bencoolen Mall", "lat": -3.8115102, "lng": 102.2672974, "critical": False, "weekend_congestion": False},
-        3: {"name": "Pasar Panorama", "lat": -3.8158167, "lng": 102.2981593, "critical": True, "weekend_congestion": True},
-        4: {"name": "Benteng Marlborough", "lat": -3.7878833, "lng": 102.2508915, "critical": False, "weekend_congestion": False},
-        5: {"name": "Gerbang Depan UNIB", "lat": -3.7599491, "lng": 102.266921, "critical": False, "weekend_congestion": False},
-        6: {"name": "Kantor Gubernur", "lat": -3.8209187, "lng": 102.2839724, "critical": True, "weekend_congestion": False},
-        7: {"name": "Gerbang Belakang UNIB", "lat": -3.759583, "lng": 102.275278, "critical": False, "weekend_congestion": False},
-        8: {"name": "Masjid Raya Baitul Izzah", "lat": -3.8208245, "lng": 102.287404, "critical": True, "weekend_congestion": True},
-        9: {"name": "Megamall Bengkulu", "lat": -3.7933378, "lng": 102.2664841, "critical": True, "weekend_congestion": True},
-        10: {"name": "Sport Center", "lat": -3.807732, "lng": 102.2633519, "critical": False, "weekend_congestion": True},
-        11: {"name": "Bandara Fatmawati", "lat": -3.860507633240813, "lng": 102.33936230986484, "critical": True, "weekend_congestion": False},
-        12: {"name": "Masjid Jamik", "lat": -3.7925189, "lng": 102.2620151, "critical": True, "weekend_congestion": True},
-        13: {"name": "Stadion Semarak", "lat": -3.7940007, "lng": 102.2721235, "critical": False, "weekend_congestion": True},
-        14: {"name": "Kampus IAIN", "lat": -3.7800, "lng": 102.2900, "critical": False, "weekend_congestion": False},
-        15: {"name": "Pelabuhan Pulau Baai", "lat": -3.9073448, "lng": 102.2984753, "critical": True, "weekend_congestion": False}
-    }
-
-    OSM_URL = "https://router.project-osrm.org/route/v1/"
-
-    TRANSPORT_PROFILES = {
-        'motor': {'base_speed': 40, 'congestion_factor': 0.7, 'icon': 'motorcycle', 'profile': 'driving', 'prefer_narrow': True},
-        'mobil': {'base_speed': 50, 'congestion_factor': 0.5, 'icon': 'car', 'profile': 'driving', 'prefer_narrow': False},
-        'jalan_kaki': {'base_speed': 5, 'congestion_factor': 1.0, 'icon': 'walking', 'profile': 'walking', 'prefer_narrow': True}
-    }
-
-# ===================== SISTEM PREDIKSI KEMACETAN =====================
-class TrafficPredictor:
-    def __init__(self):
-        self.congestion_data = self._init_congestion_data()
-
-    def _init_congestion_data(self):
-        return {node_id: {'level': 'lancar', 'updated': datetime.now()} for node_id in Config.NODES}
-
-    def predict_congestion(self, node_id):
-        node = Config.NODES[node_id]
-        now = datetime.now()
-        is_weekend = now.weekday() >= 5
-
-        if is_weekend and node['weekend_congestion']:
-            return {'level': 'padat', 'factor': 0.3, 'reason': 'Macet akhir pekan'}
-        
-        hour = now.hour
-        if node['critical']:
-            if 7 <= hour <= 9 or 16 <= hour <= 19:
-                return {'level': 'padat', 'factor': 0.4, 'reason': 'Jam sibuk'}
-            elif 12 <= hour <= 14:
-                return {'level': 'sedang', 'factor': 0.7, 'reason': 'Jam makan siang'}
-        
-        return {'level': 'lancar', 'factor': 1.0, 'reason': 'Lancar'}
-
-# ===================== SISTEM NAVIGASI =====================
-class SmartNavigator:
-    def __init__(self):
-        self.traffic_predictor = TrafficPredictor()
-
-    def calculate_bearing(self, start_coords, end_coords):
-        lat1, lon1 = math.radians(start_coords[0]), math.radians(start_coords[1])
-        lat2, lon2 = math.radians(end_coords[0]), math.radians(end_coords[1])
-        delta_lon = lon2 - lon1
-        y = math.sin(delta_lon) * math.cos(lat2)
-        x = math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * math.cos(lat2) * math.cos(delta_lon)
-        bearing = math.degrees(math.atan2(y, x))
-        bearing = (bearing + 360) % 360
-        directions = ['Utara', 'Timur Laut', 'Timur', 'Tenggara', 'Selatan', 'Barat Daya', 'Barat', 'Barat Laut']
-        return directions[int((bearing + 22.5) / 45) % 8]
-
-    def get_route_from_api(self, start_coords, end_coords, transport_type):
-        if transport_type not in Config.TRANSPORT_PROFILES:
-            logger.error(f"Invalid transport type: {transport_type}")
-            return None
-            
-        profile = Config.TRANSPORT_PROFILES[transport_type]['profile']
-        base_speed = Config.TRANSPORT_PROFILES[transport_type]['base_speed']
-        prefer_narrow = Config.TRANSPORT_PROFILES[transport_type].get('prefer_narrow', False)
-        
-        url = f"{Config.OSM_URL}{profile}/{start_coords[1]},{start_coords[0]};{end_coords[1]},{end_coords[0]}?overview=full&geometries=geojson&steps=true"
-        if prefer_narrow and transport_type == 'motor':
-            url_with_narrow = url + "&access=customer"
-            try:
-                response = requests.get(url_with_narrow)
-                data = response.json()
-                if response.status_code != 200 or data.get('code') != 'Ok':
-                    logger.warning(f"Failed with access=customer, falling back to default: {data.get('message', 'Unknown error')}")
-                    response = requests.get(url)
-                    data = response.json()
-            except Exception as e:
-                logger.error(f"Error with access=customer, falling back: {e}")
-                response = requests.get(url)
-                data = response.json()
-        else:
-            response = requests.get(url)
-            data = response.json()
-            
-        if response.status_code == 200 and data.get('code') == 'Ok':
-            route = data['routes'][0]
-            distance = route['distance'] / 1000
-            duration = route['duration'] / 60
-            geometry = route['geometry']['coordinates']
-            
-            path = [[coord[1], coord[0]] for coord in geometry]
-            
-            steps = []
-            if 'legs' in route:
-                for leg in route.get('legs', []):
-                    for i, step in enumerate(leg.get('steps', [])):
-                        maneuver = step.get('maneuver', {})
-                        instruction = step.get('name', 'Lanjutkan')
-                        if maneuver.get('type') == 'turn':
-                            direction = maneuver.get('modifier', '')
-                            instruction = f"Belok {'kiri' if 'left' in direction else 'kanan'} di {instruction}"
-                        # Hitung arah berdasarkan koordinat langkah
-                        if i < len(leg.get('steps', [])) - 1:
-                            next_coords = [leg['steps'][i + 1]['maneuver']['location'][1], leg['steps'][i + 1]['maneuver']['location'][0]]
-                            direction = self.calculate_bearing([step['maneuver']['location'][1], step['maneuver']['location'][0]], next_coords)
-                        else:
-                            direction = "Lurus"
-                        # Hitung waktu per langkah
-                        step_distance = step['distance'] / 1000
-                        step_duration = (step_distance / base_speed) * 60 / Config.TRANSPORT_PROFILES[transport_type]['congestion_factor']
-                        nearest_node = self._find_nearest_node([step['maneuver']['location'][1], step['maneuver']['location'][0]])
-                        congestion = self.traffic_predictor.predict_congestion(nearest_node)
-                        road_condition = f"Kondisi jalan: {congestion['level']} ({congestion['reason']})"
-                        steps.append({
-                            'instruction': f"{instruction} menuju arah {direction}",
-                            'distance': f"{step_distance:.1f} km",
-                            'time': f"{step_duration:.0f} menit",
-                            'condition': road_condition
-                        })
-            
-            if not steps:
-                nearest_start_node = self._find_nearest_node(start_coords)
-                nearest_end_node = self._find_nearest_node(end_coords)
-                total_duration = (distance / base_speed) * 60
-                steps = [{
-                    'instruction': f"Bergerak dari {Config.NODES[nearest_start_node]['name']} ke {Config.NODES[nearest_end_node]['name']}",
-                    'distance': f"{distance:.1f} km",
-                    'time': f"{total_duration:.0f} menit",
-                    'condition': "Kondisi jalan: Tidak tersedia"
-                }]
-            
-            if profile == 'driving':
-                speed_adjustment = 50 / base_speed
-                adjusted_duration = duration * speed_adjustment
-            else:
-                adjusted_duration = duration
-                fallback_duration = (distance / base_speed) * 60
-                adjusted_duration = max(adjusted_duration, fallback_duration)
-            
-            return {
-                'distance': f"{distance:.1f} km",
-                'time': f"{adjusted_duration:.0f} menit",
-                'path': path,
-                'steps': steps,
-                'raw_duration': duration,
-                'raw_distance': distance,
-                'speed_adjusted_duration': adjusted_duration
-            }
-        logger.error(f"OSRM API error: {data.get('message', 'Unknown error')}")
-        return None
-
-    def find_all_routes(self, start, end, transport_type):
-        try:
-            start = int(start)
-            end = int(end)
-        except (ValueError, TypeError):
-            logger.error(f"Invalid start/end IDs: start={start}, end={end}")
-            return {"error": "ID lokasi tidak valid"}
-
-        if start not in Config.NODES or end not in Config.NODES:
-            logger.error(f"Invalid nodes: start={start}, end={end}")
-            return {"error": "Lokasi tidak valid"}
-        
-        if transport_type not in Config.TRANSPORT_PROFILES:
-            logger.error(f"Invalid transport type: {transport_type}")
-            return {"error": f"Moda transportasi '{transport_type}' tidak valid"}
-        
-        start_coords = (Config.NODES[start]['lat'], Config.NODES[start]['lng'])
-        end_coords = (Config.NODES[end]['lat'], Config.NODES[end]['lng'])
-        
-        primary_route = self.get_route_from_api(start_coords, end_coords, transport_type)
-        
-        if not primary_route:
-            logger.error("Failed to get primary route from OSRM")
-            return {"error": "Gagal mendapatkan rute dari layanan peta"}
-        
-        nearest_start_node = self._find_nearest_node(start_coords)
-        nearest_end_node = self._find_nearest_node(end_coords)
-        
-        congestion_start = self.traffic_predictor.predict_congestion(nearest_start_node)
-        congestion_end = self.traffic_predictor.predict_congestion(nearest_end_node)
-        
-        congestion_factor = min(congestion_start['factor'], congestion_end['factor'])
-        final_duration = primary_route['speed_adjusted_duration'] / congestion_factor
-        primary_route['time'] = f"{final_duration:.0f} menit"
-        
-        primary_route.update({
-            'transport': transport_type,
-            'transport_icon': Config.TRANSPORT_PROFILES[transport_type]['icon'],
-            'steps': primary_route['steps'],
-            'congestion_levels': {
-                Config.NODES[nearest_start_node]['name']: congestion_start,
-                Config.NODES[nearest_end_node]['name']: congestion_end
-            },
-            'is_alternative': False
-        })
-        
-        if congestion_start['level'] == 'padat' or congestion_end['level'] == 'padat':
-            alternative_route = self._find_alternative_route(start_coords, end_coords, transport_type)
-            
-            if alternative_route:
-                logger.debug(f"Alternative route found: distance={alternative_route['distance']}, time={alternative_route['time']}")
-                return {
-                    'primary': primary_route,
-                    'alternative': alternative_route,
-                    'has_congestion': True
-                }
-        
-        return {
-            'primary': primary_route,
-            'has_congestion': False
-        }
-
-    def _find_alternative_route(self, start_coords, end_coords, transport_type):
-        if transport_type not in Config.TRANSPORT_PROFILES:
-            logger.error(f"Invalid transport type for alternative route: {transport_type}")
-            return None
-            
-        profile = Config.TRANSPORT_PROFILES[transport_type]['profile']
-        base_speed = Config.TRANSPORT_PROFILES[transport_type]['base_speed']
-        prefer_narrow = Config.TRANSPORT_PROFILES[transport_type].get('prefer_narrow', False)
-        
-        mid_point = [
-            (start_coords[0] + end_coords[0]) / 2 + 0.005,
-            (start_coords[1] + end_coords[1]) / 2 + 0.005
-        ]
-        
-        url = f"{Config.OSM_URL}{profile}/{start_coords[1]},{start_coords[0]};{mid_point[1]},{mid_point[0]};{end_coords[1]},{end_coords[0]}?overview=full&geometries=geojson&steps=true"
-        if prefer_narrow and transport_type == 'motor':
-            url_with_narrow = url + "&access=customer"
-            try:
-                response = requests.get(url_with_narrow)
-                data = response.json()
-                if response.status_code != 200 or data.get('code') != 'Ok':
-                    logger.warning(f"Failed with access=customer, falling back to default: {data.get('message', 'Unknown error')}")
-                    response = requests.get(url)
-                    data = response.json()
-            except Exception as e:
-                logger.error(f"Error with access=customer, falling back: {e}")
-                response = requests.get(url)
-                data = response.json()
-        else:
-            response = requests.get(url)
-            data = response.json()
-            
-        if response.status_code == 200 and data.get('code') == 'Ok':
-            route = data['routes'][0]
-            distance = route['distance'] / 1000
-            duration = route['duration'] / 60
-            geometry = route['geometry']['coordinates']
-            
-            path = [[coord[1], coord[0]] for coord in geometry]
-            
-            steps = []
-            if 'legs' in route:
-                for leg in route.get('legs', []):
-                    for i, step in enumerate(leg.get('steps', [])):
-                        maneuver = step.get('maneuver', {})
-                        instruction = step.get('name', 'Lanjutkan')
-                        if maneuver.get('type') == 'turn':
-                            direction = maneuver.get('modifier', '')
-                            instruction = f"Belok {'kiri' if 'left' in direction else 'kanan'} di {instruction}"
-                        # Hitung arah berdasarkan koordinat langkah
-                        if i < len(leg.get('steps', [])) - 1:
-                            next_coords = [leg['steps'][i + 1]['maneuver']['location'][1], leg['steps'][i + 1]['maneuver']['location'][0]]
-                            direction = self.calculate_bearing([step['maneuver']['location'][1], step['maneuver']['location'][0]], next_coords)
-                        else:
-                            direction = "Lurus"
-                        # Hitung waktu per langkah
-                        step_distance = step['distance'] / 1000
-                        step_duration = (step_distance / base_speed) * 60 / Config.TRANSPORT_PROFILES[transport_type]['congestion_factor']
-                        nearest_node = self._find_nearest_node([step['maneuver']['location'][1], step['maneuver']['location'][0]])
-                        congestion = self.traffic_predictor.predict_congestion(nearest_node)
-                        road_condition = f"Kondisi jalan: {congestion['level']} ({congestion['reason']})"
-                        steps.append({
-                            'instruction': f"{instruction} menuju arah {direction}",
-                            'distance': f"{step_distance:.1f} km",
-                            'time': f"{step_duration:.0f} menit",
-                            'condition': road_condition
-                        })
-            
-            nearest_start_node = self._find_nearest_node(start_coords)
-            nearest_end_node = self._find_nearest_node(end_coords)
-            
-            if not steps:
-                steps = [{
-                    'instruction': f"Bergerak dari {Config.NODES[nearest_start_node]['name']} ke {Config.NODES[nearest_end_node]['name']}",
-                    'distance': f"{distance:.1f} km",
-                    'time': f"{duration:.0f} menit",
-                    'condition': "Kondisi jalan: Tidak tersedia"
-                }]
-            
-            if profile == 'driving':
-                speed_adjustment = 50 / base_speed
-                adjusted_duration = duration * speed_adjustment
-            else:
-                adjusted_duration = duration
-                fallback_duration = (distance / base_speed) * 60
-                adjusted_duration = max(adjusted_duration, fallback_duration)
-            
-            congestion_start = self.traffic_predictor.predict_congestion(nearest_start_node)
-            congestion_end = self.traffic_predictor.predict_congestion(nearest_end_node)
-            congestion_factor = min(congestion_start['factor'], congestion_end['factor'])
-            final_duration = adjusted_duration / congestion_factor
-            
-            return {
-                'distance': f"{distance:.1f} km",
-                'time': f"{final_duration:.0f} menit",
-                'path': path,
-                'transport': transport_type,
-                'transport_icon': Config.TRANSPORT_PROFILES[transport_type]['icon'],
-                'steps': steps,
-                'congestion_levels': {
-                    Config.NODES[nearest_start_node]['name']: congestion_start,
-                    Config.NODES[nearest_end_node]['name']: congestion_end
-                },
-                'is_alternative': True,
-                'avoided_congestion': [Config.NODES[nearest_start_node]['name']] if congestion_start['level'] == 'padat' else []
-            }
-        logger.error(f"OSRM API error for alternative route: {data.get('message', 'Unknown error')}")
-        return None
-
-    def _find_nearest_node(self, coords):
-        min_dist = float('inf')
-        nearest_node = 1
-        
-        for node_id, node in Config.NODES.items():
-            dist = geodesic(coords, (node['lat'], node['lng'])).km
-            if dist < min_dist:
-                min_dist = dist
-                nearest_node = node_id
-                
-        return nearest_node
-
-# ===================== VISUALISASI PETA =====================
-class TrafficMap:
-    def __init__(self, traffic_predictor):
-        self.congestion_colors = {'padat': 'red', 'sedang': 'orange', 'lancar': 'green'}
-        self.traffic_predictor = traffic_predictor
-
-    def create_map(self, start=None, end=None, route_data=None):
-        map_center = [-3.7956, 102.2597]
-        traffic_map = folium.Map(location=map_center, zoom_start=14, tiles='cartodbpositron')
-        
-        heat_data = []
-        for node_id, node in Config.NODES.items():
-            congestion = self.traffic_predictor.predict_congestion(node_id)
-            heat_level = 0.7 if congestion['level'] == 'padat' else 0.3
-            heat_data.append([node['lat'], node['lng'], heat_level])
-        
-        HeatMap(heat_data, radius=15).add_to(traffic_map)
-        
-        for node_id, node in Config.NODES.items():
-            congestion = self.traffic_predictor.predict_congestion(node_id)
-            folium.CircleMarker(
-                location=[node['lat'], node['lng']],
-                radius=6,
-                popup=f"{node['name']} - {congestion['level']} ({congestion['reason']})",
-                color=self.congestion_colors[congestion['level']],
-                fill=True
-            ).add_to(traffic_map)
-        
-        if route_data and 'primary' in route_data:
-            self._draw_route(traffic_map, route_data['primary'], 'blue')
-            
-            if 'alternative' in route_data:
-                self._draw_route(traffic_map, route_data['alternative'], 'green')
-        
-        if start in Config.NODES:
-            start_node = Config.NODES[start]
-            folium.Marker(
-                location=[start_node['lat'], start_node['lng']],
-                popup=f"<b>START:</b> {start_node['name']}",
-                icon=folium.Icon(color='green', icon='play', prefix='fa')
-            ).add_to(traffic_map)
-        
-        if end in Config.NODES:
-            end_node = Config.NODES[end]
-            folium.Marker(
-                location=[end_node['lat'], end_node['lng']],
-                popup=f"<b>END:</b> {end_node['name']}",
-                icon=folium.Icon(color='red', icon='stop', prefix='fa')
-            ).add_to(traffic_map)
-        
-        return traffic_map._repr_html_()  # Corrected to _repr_html_()
-
-    def _draw_route(self, map_obj, route, color):
-        if 'path' in route and route['path']:
-            folium.PolyLine(
-                route['path'],
-                color=color,
-                weight=6,
-                popup=f"Rute {'Alternatif' if route.get('is_alternative') else 'Utama'}: {route['distance']} ({route['time']})"
-            ).add_to(map_obj)
-
-# ===================== FLASK ROUTES =====================
-navigator = SmartNavigator()
-map_visualizer = TrafficMap(navigator.traffic_predictor)
-
-@app.route('/', methods=['GET', 'POST'])
-def index():
-    start = request.form.get('start', type=int)
-    end = request.form.get('end', type=int)
-    transport = request.form.get('transport', 'mobil')
-    
-    route_data = None
-    error_message = None
-    
-    if start is not None and end is not None and transport in Config.TRANSPORT_PROFILES:
-        if start in Config.NODES and end in Config.NODES:
-            route_data = navigator.find_all_routes(start, end, transport)
-            if 'error' in route_data:
-                error_message = route_data['error']
-                route_data = None
-        else:
-            error_message = "Lokasi awal atau tujuan tidak valid"
-    
-    map_html = map_visualizer.create_map(start, end, route_data)
-    
-    return render_template(
-        'index.html',
-        map_html=map_html,
-        nodes=Config.NODES,
-        route_data=route_data,
-        selected_start=start,
-        selected_end=end,
-        selected_transport=transport,
-        congestion_colors=map_visualizer.congestion_colors,
-        error_message=error_message
-    )
-
-@app.route('/api/route', methods=['POST'])
-def api_route():
-    data = request.get_json()
-    start = data.get('start') if data else None
-    end = data.get('end') if data else None
-    transport = data.get('transport', 'mobil') if data else 'mobil'
-    
-    if not start or not end:
-        return jsonify({"error": "Parameter start dan end diperlukan"}), 400
-    
-    try:
-        start = int(start)
-        end = int(end)
-    except (ValueError, TypeError):
-        return jsonify({"error": "ID lokasi tidak valid"}), 400
-    
-    if transport not in Config.TRANSPORT_PROFILES:
-        return jsonify({"error": f"Moda transportasi '{transport}' tidak valid"}), 400
-    
-    route_data = navigator.find_all_routes(start, end, transport)
-    return jsonify(route_data)
-
-if not os.path.exists('templates'):
-    os.makedirs('templates')
-
-HTML_TEMPLATE = """
-<!DOCTYPE html>
-<html lang="id">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Smart Traffic Bengkulu</title>
-    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css">
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css" rel="stylesheet">
-    <style>
-        .route-option {
-            border: 1px solid #ddd;
-            border-radius: 8px;
-            padding: 15px;
-            margin-bottom: 15px;
-            cursor: pointer;
-            transition: all 0.3s;
-        }
-        .route-option:hover {
-            background-color: #f8f9fa;
-            border-color: #007bff;
-        }
-        .badge-padat { background-color: #dc3545; }
-        .badge-sedang { background-color: #ffc107; }
-        .badge-lancar { background-color: #28a745; }
-        .transport-icon { font-size: 1.5em; margin-right: 10px; }
-        .step-item { margin-left: 20px; }
-        .step-details { font-size: 0.9em; color: #666; }
-    </style>
-</head>
-<body>
-    <div class="container-fluid">
-        <div class="row bg-primary text-white p-4">
-            <div class="col">
-                <h1><i class="fas fa-traffic-light"></i> Smart Traffic Bengkulu</h1>
-                <p class="mb-0">Sistem navigasi cerdas berbasis peta digital</p>
-            </div>
-        </div>
-        
-        <div class="row mt-4">
-            <div class="col-md-4">
-                <div class="card">
-                    <div class="card-header bg-primary text-white">
-                        <h5 class="mb-0"><i class="fas fa-search-location"></i> Cari Rute</h5>
-                    </div>
-                    <div class="card-body">
-                        <form method="POST">
-                            <div class="mb-3">
-                                <label for="start" class="form-label">Lokasi Awal</label>
-                                <select class="form-select" id="start" name="start" required>
-                                    <option value="">Pilih lokasi awal</option>
-                                    {% for id, node in nodes.items() %}
-                                    <option value="{{ id }}" {% if selected_start == id %}selected{% endif %}>{{ node.name }}</option>
-                                    {% endfor %}
-                                </select>
-                            </div>
-                            <div class="mb-3">
-                                <label for="end" class="form-label">Lokasi Tujuan</label>
-                                <select class="form-select" id="end" name="end" required>
-                                    <option value="">Pilih lokasi tujuan</option>
-                                    {% for id, node in nodes.items() %}
-                                    <option value="{{ id }}" {% if selected_end == id %}selected{% endif %}>{{ node.name }}</option>
-                                    {% endfor %}
-                                </select>
-                            </div>
-                            <div class="mb-3">
-                                <label for="transport" class="form-label">Moda Transportasi</label>
-                                <select class="form-select" id="transport" name="transport">
-                                    <option value="motor" {% if selected_transport == 'motor' %}selected{% endif %}>Motor</option>
-                                    <option value="mobil" {% if selected_transport == 'mobil' %}selected{% endif %}>Mobil</option>
-                                    <option value="jalan_kaki" {% if selected_transport == 'jalan_kaki' %}selected{% endif %}>Jalan Kaki</option>
-                                </select>
-                            </div>
-                            <button type="submit" class="btn btn-primary w-100">
-                                <i class="fas fa-route"></i> Cari Rute
-                            </button>
-                        </form>
-                    </div>
-                </div>
-                
-                <div class="card mt-3">
-                    <div class="card-header bg-primary text-white">
-                        <h5 class="mb-0"><i class="fas fa-info-circle"></i> Legenda</h5>
-                    </div>
-                    <div class="card-body">
-                        <div class="d-flex align-items-center mb-2">
-                            <div style="width: 20px; height: 20px; background-color: red; margin-right: 10px;"></div>
-                            <span>Padat</span>
-                        </div>
-                        <div class="d-flex align-items-center mb-2">
-                            <div style="width: 20px; height: 20px; background-color: orange; margin-right: 10px;"></div>
-                            <span>Sedang</span>
-                        </div>
-                        <div class="d-flex align-items-center">
-                            <div style="width: 20px; height: 20px; background-color: green; margin-right: 10px;"></div>
-                            <span>Lancar</span>
-                        </div>
-                    </div>
-                </div>
-            </div>
-            
-            <div class="col-md-8">
-                <div class="card h-100">
-                    <div class="card-header bg-primary text-white">
-                        <h5 class="mb-0"><i class="fas fa-map-marked-alt"></i> Peta</h5>
-                    </div>
-                    <div class="card-body p-0">
-                        {{ map_html|safe }}
-                    </div>
-                </div>
-            </div>
-        </div>
-
-        {% if error_message %}
-        <div class="container mt-4">
-            <div class="alert alert-danger">
-                <i class="fas fa-exclamation-circle"></i> {{ error_message }}
-            </div>
-        </div>
-        {% endif %}
-
-        {% if route_data %}
-        <div class="container mt-4">
-            {% if route_data.has_congestion %}
-            <div class="alert alert-warning">
-                <i class="fas fa-exclamation-triangle"></i> 
-                Terdeteksi kemacetan pada rute utama. Berikut alternatifnya:
-            </div>
-            {% endif %}
-            
-            <div class="row">
-                <div class="col-md-6">
-                    <div class="route-option">
-                        <h5><i class="fas fa-route"></i> Rute Utama <i class="fas fa-{{ route_data.primary.transport_icon }} transport-icon"></i></h5>
-                        <div class="d-flex justify-content-between">
-                            <span>{{ route_data.primary.distance }}</span>
-                            <span>{{ route_data.primary.time }}</span>
-                        </div>
-                        {% for step in route_data.primary.steps %}
-                        <div class="step-item mb-2">
-                            <strong>{{ step.instruction }}</strong>
-                            <div class="step-details">
-                                <p>Jarak: {{ step.distance }}</p>
-                                <p>Waktu: {{ step.time }}</p>
-                                <p>{{ step.condition }}</p>
-                            </div>
-                        </div>
-                        {% endfor %}
-                    </div>
-                </div>
-                
-                {% if route_data.has_congestion and route_data.alternative %}
-                <div class="col-md-6">
-                    <div class="route-option">
-                        <h5><i class="fas fa-random"></i> Rute Alternatif <i class="fas fa-{{ route_data.alternative.transport_icon }} transport-icon"></i></h5>
-                        <div class="d-flex justify-content-between">
-                            <span>{{ route_data.alternative.distance }}</span>
-                            <span>{{ route_data.alternative.time }}</span>
-                        </div>
-                        {% if route_data.alternative.avoided_congestion %}
-                        <div class="text-muted mb-1">
-                            <small><i class="fas fa-check-circle"></i> Menghindari {{ route_data.alternative.avoided_congestion|length }} titik macet</small>
-                        </div>
-                        {% endif %}
-                        {% for step in route_data.alternative.steps %}
-                        <div class="step-item mb-2">
-                            <strong>{{ step.instruction }}</strong>
-                            <div class="step-details">
-                                <p>Jarak: {{ step.distance }}</p>
-                                <p>Waktu: {{ step.time }}</p>
-                                <p>{{ step.condition }}</p>
-                            </div>
-                        </div>
-                        {% endfor %}
-                    </div>
-                </div>
-                {% endif %}
-            </div>
-        </div>
-        {% endif %}
-    </div>
-    
-    <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.bundle.min.js"></script>
-</body>
-</html>
-"""
-
-with open('templates/index.html', 'w', encoding='utf-8') as f:
-    f.write(HTML_TEMPLATE)
-
-if __name__ == "__main__":
-    app.run(host='0.0.0.0', port=8080, debug=True)
\ No newline at end of file
+# -- coding: utf-8 --
+import os
+import bisect
+import contextvars
+import functools
+import gzip
+import hashlib
+import heapq
+import html
+import json
+import sqlite3
+import threading
+import time
+import random
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from types import MappingProxyType
+from flask import Blueprint, Flask, Response, current_app, g, render_template, request, jsonify, stream_with_context, url_for
+from jinja2 import DictLoader
+from werkzeug.local import LocalProxy
+import logging
+import math
+import numpy as np
+
+# folium, geopy dan requests diimpor saat pertama dipakai agar import modul (dan boot worker) tetap cepat.
+# Konfigurasi logging diserahkan ke proses yang menjalankan aplikasi.
+logger = logging.getLogger(__name__)
+
+# ===================== KONFIGURASI JALAN BENGKULU =====================
+class Config:
+    NODES = {
+        1: {"name": "Simpang Lima (Jl. Soekarno Hatta)", "lat": -3.797347, "lng": 102.265986, "critical": True, "weekend_congestion": True},
+        2: {"name": "Bencoolen Mall", "lat": -3.8115102, "lng": 102.2672974, "critical": False, "weekend_congestion": False},
+        3: {"name": "Pasar Panorama", "lat": -3.8158167, "lng": 102.2981593, "critical": True, "weekend_congestion": True},
+        4: {"name": "Benteng Marlborough", "lat": -3.7878833, "lng": 102.2508915, "critical": False, "weekend_congestion": False},
+        5: {"name": "Gerbang Depan UNIB", "lat": -3.7599491, "lng": 102.266921, "critical": False, "weekend_congestion": False},
+        6: {"name": "Kantor Gubernur", "lat": -3.8209187, "lng": 102.2839724, "critical": True, "weekend_congestion": False},
+        7: {"name": "Gerbang Belakang UNIB", "lat": -3.759583, "lng": 102.275278, "critical": False, "weekend_congestion": False},
+        8: {"name": "Masjid Raya Baitul Izzah", "lat": -3.8208245, "lng": 102.287404, "critical": True, "weekend_congestion": True},
+        9: {"name": "Megamall Bengkulu", "lat": -3.7933378, "lng": 102.2664841, "critical": True, "weekend_congestion": True},
+        10: {"name": "Sport Center", "lat": -3.807732, "lng": 102.2633519, "critical": False, "weekend_congestion": True},
+        11: {"name": "Bandara Fatmawati", "lat": -3.860507633240813, "lng": 102.33936230986484, "critical": True, "weekend_congestion": False},
+        12: {"name": "Masjid Jamik", "lat": -3.7925189, "lng": 102.2620151, "critical": True, "weekend_congestion": True},
+        13: {"name": "Stadion Semarak", "lat": -3.7940007, "lng": 102.2721235, "critical": False, "weekend_congestion": True},
+        14: {"name": "Kampus IAIN", "lat": -3.7800, "lng": 102.2900, "critical": False, "weekend_congestion": False},
+        15: {"name": "Pelabuhan Pulau Baai", "lat": -3.9073448, "lng": 102.2984753, "critical": True, "weekend_congestion": False}
+    }
+
+    OSM_URL = os.environ.get('OSRM_URL', "https://router.project-osrm.org/route/v1/")
+
+    TRANSPORT_PROFILES = {
+        'motor': {'base_speed': 40, 'congestion_factor': 0.7, 'icon': 'motorcycle', 'profile': 'driving', 'prefer_narrow': True},
+        'mobil': {'base_speed': 50, 'congestion_factor': 0.5, 'icon': 'car', 'profile': 'driving', 'prefer_narrow': False},
+        'jalan_kaki': {'base_speed': 5, 'congestion_factor': 1.0, 'icon': 'walking', 'profile': 'walking', 'prefer_narrow': True}
+    }
+
+    # Prediksi rule-based hanya bergantung pada jam dan hari, jadi snapshot per jam sudah tepat
+    CONGESTION_BUCKET_MINUTES = int(os.environ.get('CONGESTION_BUCKET_MINUTES', 60))
+    # Jangkauan kondisi sebuah node ke ruas jalan di sekitarnya (bobot ETA per segmen dan mesin rute lokal)
+    CONGESTION_RADIUS_KM = float(os.environ.get('CONGESTION_RADIUS_KM', 0.5))
+
+    # Jumlah HTML peta dasar (per kondisi kemacetan) yang disimpan; 0 = tanpa cache
+    MAP_CACHE_SIZE = int(os.environ.get('MAP_CACHE_SIZE', 8))
+    # Peta halaman utama: 'json' (shell Leaflet statis, layer diambil dari /api/map/*) atau 'folium' (HTML peta lengkap)
+    MAP_RENDERING = os.environ.get('MAP_RENDERING', 'folium')
+    MAP_SHELL_MAX_AGE = 7 * 24 * 3600  # detik; URL shell memuat hash isinya sehingga aman di-cache lama
+    MAP_LAYER_MAX_AGE = int(os.environ.get('MAP_LAYER_MAX_AGE', 30))  # detik sebelum browser merevalidasi layer
+
+    # Cache hasil OSRM: tier memori (LRU) + tier disk opsional (SQLite)
+    ROUTE_CACHE_SIZE = int(os.environ.get('ROUTE_CACHE_SIZE', 1024))
+    ROUTE_CACHE_TTL = int(os.environ.get('ROUTE_CACHE_TTL', 24 * 3600))  # detik
+    ROUTE_CACHE_DB = os.environ.get('ROUTE_CACHE_DB')  # None = tanpa tier disk
+    # Tier cache bersama antar worker untuk cache OSRM, hasil rute, dan peta dasar:
+    # 'redis://host:6379/0' atau 'sqlite:////dev/shm/smartcity-cache.db' (satu host). Menggantikan ROUTE_CACHE_DB.
+    SHARED_CACHE_URL = os.environ.get('SHARED_CACHE_URL')
+    CACHE_LEASE_SECONDS = 30.0  # batas waktu satu proses memegang hak menghitung sebuah kunci
+    CACHE_LEASE_POLL = 0.02  # selang pengecekan hasil saat menunggu proses lain
+    # Hasil find_all_routes per (start, end, moda); tetap dipakai lintas jam selama kemacetan di sepanjang rute sama
+    RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', 2048))
+
+    # Klien OSRM: pool koneksi, timeout (connect, read), retry dan circuit breaker
+    OSRM_POOL_SIZE = int(os.environ.get('OSRM_POOL_SIZE', 20))
+    OSRM_TIMEOUT = (float(os.environ.get('OSRM_CONNECT_TIMEOUT', 3.05)), float(os.environ.get('OSRM_READ_TIMEOUT', 10)))
+    OSRM_RETRIES = int(os.environ.get('OSRM_RETRIES', 2))
+    OSRM_BACKOFF = float(os.environ.get('OSRM_BACKOFF', 0.25))  # detik, dikali 2 tiap percobaan
+    OSRM_BREAKER_THRESHOLD = int(os.environ.get('OSRM_BREAKER_THRESHOLD', 5))
+    OSRM_BREAKER_RESET = float(os.environ.get('OSRM_BREAKER_RESET', 30))  # detik
+    OSRM_WORKERS = int(os.environ.get('OSRM_WORKERS', 8))  # thread untuk request OSRM paralel
+    # Fallback tanpa access untuk motor hanya dikirim jika access=customer belum selesai setelah jeda ini (detik;
+    # setelah ada riwayat dipakai median latensi customer) atau setelah customer gagal. Jika OSRM_HEDGE_WINDOW hasil
+    # customer terakhir semuanya berhasil, fallback tidak di-hedge sama sekali.
+    OSRM_HEDGE_DELAY = float(os.environ.get('OSRM_HEDGE_DELAY', 0.25))
+    OSRM_HEDGE_WINDOW = int(os.environ.get('OSRM_HEDGE_WINDOW', 50))
+
+    # Anggaran request ke server OSRM (token bucket per proses; 0 = tanpa batas). Dengan gunicorn, isi
+    # OSRM_RATE = batas server OSRM / WEB_CONCURRENCY. Request yang kehabisan token menunggu di antrean terbatas.
+    OSRM_RATE = float(os.environ.get('OSRM_RATE', 0))  # request per detik
+    OSRM_BURST = int(os.environ.get('OSRM_BURST', 10))
+    OSRM_QUEUE_SIZE = int(os.environ.get('OSRM_QUEUE_SIZE', 32))  # request yang boleh menunggu token sekaligus
+    OSRM_CLIENT_QUEUE = int(os.environ.get('OSRM_CLIENT_QUEUE', 4))  # ... dari satu klien
+    OSRM_MAX_WAIT = {'interactive': 2.0, 'bulk': 0.5, 'background': None}  # detik; None = tunggu sampai dapat token (antrean tetap dibatasi)
+    OSRM_FAIR_WINDOW = 10.0  # detik; pemakaian anggaran per klien meluruh dengan skala waktu ini
+    CLIENT_ID_HEADER = os.environ.get('CLIENT_ID_HEADER')  # mis. X-Forwarded-For di belakang proxy tepercaya
+    INTERACTIVE_ENDPOINTS = ('smartcity.index', 'smartcity.api_map_route', 'smartcity.api_isochrone')
+
+    # Batas ukuran request batch / matriks
+    BATCH_MAX_ITEMS = int(os.environ.get('BATCH_MAX_ITEMS', 500))
+    MATRIX_MAX_NODES = int(os.environ.get('MATRIX_MAX_NODES', 100))
+
+    # Prakiraan ETA per jam keberangkatan (/api/route/departures): jendela dan lebar slot default (menit)
+    FORECAST_WINDOW_MINUTES = int(os.environ.get('FORECAST_WINDOW_MINUTES', 180))
+    FORECAST_SLOT_MINUTES = int(os.environ.get('FORECAST_SLOT_MINUTES', 15))
+    FORECAST_MAX_SLOTS = int(os.environ.get('FORECAST_MAX_SLOTS', 96))
+    FORECAST_PASSES = 2  # 1 = semua segmen dinilai pada jam berangkat; 2 = pada perkiraan jam segmen dilalui
+
+    # Rute multi-titik (/api/trip): DP eksak hingga TRIP_EXACT_MAX_STOPS titik, selebihnya heuristik dengan batas waktu
+    TRIP_EXACT_MAX_STOPS = int(os.environ.get('TRIP_EXACT_MAX_STOPS', 12))
+    TRIP_TIME_BUDGET = float(os.environ.get('TRIP_TIME_BUDGET', 0.2))  # detik
+
+    # Isokron (/api/isochrone): area yang terjangkau dalam N menit dari sebuah lokasi, sebagai poligon GeoJSON
+    ISOCHRONE_MINUTES = (5, 10, 15)  # kontur default
+    ISOCHRONE_MAX_MINUTES = int(os.environ.get('ISOCHRONE_MAX_MINUTES', 60))
+    ISOCHRONE_MAX_CONTOURS = 4
+    ISOCHRONE_GRID = int(os.environ.get('ISOCHRONE_GRID', 32))  # titik sampel per sisi (backend OSRM, via table)
+    ISOCHRONE_TABLE_BATCH = 100  # koordinat per request table; batas default server OSRM publik
+    ISOCHRONE_CELL_KM = float(os.environ.get('ISOCHRONE_CELL_KM', 0.2))  # resolusi raster graf lokal
+    ISOCHRONE_SPEED_MARGIN = 1.5  # radius sampel = menit x base_speed x margin (jalan utama lebih cepat dari base_speed)
+    ISOCHRONE_CACHE_SIZE = int(os.environ.get('ISOCHRONE_CACHE_SIZE', 256))
+    ISOCHRONE_REACH_CACHE_SIZE = 64  # waktu tempuh bebas hambatan per asal; untuk graf lokal bisa berisi puluhan ribu vertex
+
+    # Indeks spasial titik jalan: ukuran sel grid (km) dan toleransi cek ulang geodesik
+    NODE_INDEX_CELL_KM = float(os.environ.get('NODE_INDEX_CELL_KM', 1.0))
+    NODE_INDEX_TOLERANCE = 0.01  # relatif terhadap jarak proyeksi terdekat
+    NODE_INDEX_CHUNK = 1_000_000  # pasangan titik x node maksimum per potongan saat grid tidak membantu
+
+    # Matriks rute hasil precompute (lihat precompute_routes.py)
+    ROUTE_MATRIX_PATH = os.environ.get('ROUTE_MATRIX_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'route_matrix.json.gz'))
+
+    # Backend prediksi kemacetan: 'rules' atau 'xgboost' (butuh paket xgboost dan file model)
+    CONGESTION_MODEL = os.environ.get('CONGESTION_MODEL', 'rules')
+    CONGESTION_MODEL_PATH = os.environ.get('CONGESTION_MODEL_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'xgb_model.json'))
+    MODEL_PADAT_THRESHOLD = float(os.environ.get('MODEL_PADAT_THRESHOLD', 0.6))  # probabilitas macet
+    MODEL_SEDANG_THRESHOLD = float(os.environ.get('MODEL_SEDANG_THRESHOLD', 0.3))
+    MODEL_NODE_LENGTH_KM = 0.5  # fitur length untuk titik jalan (bukan langkah rute)
+
+    # Mesin rute: 'osrm' (HTTP) atau 'local' (graf jalan ROAD_GRAPH_PATH, dibangun dengan build_road_graph.py)
+    ROUTING_BACKEND = os.environ.get('ROUTING_BACKEND', 'osrm')
+    ROAD_GRAPH_PATH = os.environ.get('ROAD_GRAPH_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'road_graph.npz'))
+    LOCAL_SNAP_MAX_KM = 1.0  # titik lebih jauh dari ini ke jalan terdekat dianggap di luar graf
+    LOCAL_ALTERNATIVES = int(os.environ.get('LOCAL_ALTERNATIVES', 1))
+    LOCAL_ALT_PENALTY = 1.5  # pengali bobot ruas yang sudah dipakai rute sebelumnya
+    LOCAL_ALT_CONGESTION_PENALTY = 2.0  # pengali tambahan ruas di zona 'padat' saat mencari alternatif
+    LOCAL_ALT_MAX_OVERLAP = 0.8  # alternatif ditolak jika > 80% panjangnya sama dengan rute sebelumnya
+
+    # Instrumentasi: histogram latensi per tahap (/metrics) dan header Server-Timing per request
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+    TIMING_HEADER = os.environ.get('TIMING_HEADER', '0') == '1'
+
+    # Data lalu lintas live dari probe kecepatan (lihat LiveTraffic); sumber: 'file:path', 'tail:path' atau 'udp:host:port'
+    LIVE_TRAFFIC = os.environ.get('LIVE_TRAFFIC', '0') == '1' or bool(os.environ.get('LIVE_TRAFFIC_SOURCE'))
+    LIVE_TRAFFIC_SOURCE = os.environ.get('LIVE_TRAFFIC_SOURCE')
+    LIVE_WINDOW_SECONDS = int(os.environ.get('LIVE_WINDOW_SECONDS', 300))  # jendela geser agregat
+    LIVE_SLOTS = 30  # resolusi ring buffer: jendela dibagi 30 slot
+    LIVE_BATCH_SIZE = int(os.environ.get('LIVE_BATCH_SIZE', 5000))  # sampel maksimum per batch ingest
+    LIVE_FLUSH_SECONDS = 0.5  # batch yang belum penuh tetap diproses setelah selang ini
+    LIVE_FREE_FLOW_KMH = float(os.environ.get('LIVE_FREE_FLOW_KMH', 40))  # kecepatan yang dianggap lancar
+    LIVE_MIN_SAMPLES = 20  # jumlah sampel agar data live mendapat bobot penuh
+    LIVE_WEIGHT = float(os.environ.get('LIVE_WEIGHT', 0.7))  # bobot maksimum data live terhadap prediksi dasar
+    LIVE_PADAT_FACTOR = 0.55  # faktor gabungan di bawah ini = padat
+    LIVE_SEDANG_FACTOR = 0.85
+
+# ===================== METRIK & TRACING =====================
+# Durasi per tahap untuk request yang sedang berjalan (hanya jika header Server-Timing aktif)
+_request_timings = contextvars.ContextVar('request_timings', default=None)
+
+class Metrics:
+    # Histogram gaya Prometheus; nama metrik + label -> [jumlah per bucket, total detik, jumlah observasi]
+    BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    HELP = {
+        'smartcity_stage_duration_seconds': 'Durasi tiap tahap pemrosesan',
+        'smartcity_request_duration_seconds': 'Durasi request HTTP',
+    }
+
+    def __init__(self, enabled=None):
+        self.enabled = Config.METRICS_ENABLED if enabled is None else enabled
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        index = bisect.bisect_left(self.BUCKETS, seconds)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * (len(self.BUCKETS) + 1), 0.0, 0]
+            histogram[0][index] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+
+    def record_stage(self, stage, seconds):
+        self.observe('smartcity_stage_duration_seconds', seconds, stage=stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + seconds
+
+    def timed(self, stage):
+        # Dekorator span; saat metrik dimatikan hanya menambah satu pengecekan boolean per panggilan
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.record_stage(stage, time.perf_counter() - started)
+            return wrapper
+        return decorator
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def stage_totals(self):
+        # {tahap: (total detik, jumlah panggilan)} sejak reset terakhir
+        with self._lock:
+            return {dict(labels)['stage']: (h[1], h[2]) for (name, labels), h in self._histograms.items()
+                    if name == 'smartcity_stage_duration_seconds'}
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{key}="{value}"' for key, value in pairs) + '}'
+
+    def render(self, gauges=None):
+        # Format teks Prometheus (text/plain; version=0.0.4)
+        with self._lock:
+            snapshot = sorted((key, (list(h[0]), h[1], h[2])) for key, h in self._histograms.items())
+        lines = []
+        current = None
+        for (name, labels), (counts, total, count) in snapshot:
+            if name != current:
+                current = name
+                lines.append(f"# HELP {name} {self.HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(self.BUCKETS + ('+Inf',), counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{self._labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{self._labels(labels)} {total}")
+            lines.append(f"{name}_count{self._labels(labels)} {count}")
+        for name, value in sorted((gauges or {}).items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics()
+
+# ===================== SISTEM PREDIKSI KEMACETAN =====================
+class CongestionModel:
+    # Antarmuka backend prediksi: satu panggilan predict menilai banyak baris sekaligus.
+    # lengths_km diisi untuk langkah rute; None berarti baris mewakili titik jalan.
+    name = None
+    uses_length = False
+
+    def predict(self, node_ids, at, lengths_km=None):
+        raise NotImplementedError
+
+class RuleCongestionModel(CongestionModel):
+    name = 'rules'
+
+    @staticmethod
+    def rule(node, at):
+        is_weekend = at.weekday() >= 5
+
+        if is_weekend and node['weekend_congestion']:
+            return {'level': 'padat', 'factor': 0.3, 'reason': 'Macet akhir pekan'}
+        
+        hour = at.hour
+        if node['critical']:
+            if 7 <= hour <= 9 or 16 <= hour <= 19:
+                return {'level': 'padat', 'factor': 0.4, 'reason': 'Jam sibuk'}
+            elif 12 <= hour <= 14:
+                return {'level': 'sedang', 'factor': 0.7, 'reason': 'Jam makan siang'}
+        
+        return {'level': 'lancar', 'factor': 1.0, 'reason': 'Lancar'}
+
+    def predict(self, node_ids, at, lengths_km=None):
+        return [self.rule(Config.NODES[node_id], at) for node_id in node_ids]
+
+class XGBoostCongestionModel(CongestionModel):
+    # Klasifikasi biner macet/tidak dengan fitur yang sama seperti saat training (lihat README)
+    name = 'xgboost'
+    uses_length = True
+    FEATURES = ('length', 'congestion_factor', 'hour', 'is_weekend')
+    LEVEL_FACTORS = {'padat': 0.4, 'sedang': 0.7, 'lancar': 1.0}
+
+    def __init__(self, path=None, booster=None):
+        if booster is None:
+            import xgboost
+            booster = xgboost.Booster()
+            booster.load_model(path or Config.CONGESTION_MODEL_PATH)
+        self.booster = booster
+        # congestion_factor dasar per node dari aturan, dihitung sekali per (jam, akhir pekan)
+        self._rule_factors = {}
+
+    def _node_factors(self, node_ids, at):
+        key = (at.hour, at.weekday() >= 5)
+        factors = self._rule_factors.get(key)
+        if factors is None:
+            factors = {node_id: RuleCongestionModel.rule(node, at)['factor'] for node_id, node in Config.NODES.items()}
+            self._rule_factors[key] = factors
+        return np.array([factors[node_id] for node_id in node_ids], dtype=np.float32)
+
+    def features(self, node_ids, at, lengths_km=None):
+        n = len(node_ids)
+        X = np.empty((n, len(self.FEATURES)), dtype=np.float32)
+        X[:, 0] = Config.MODEL_NODE_LENGTH_KM if lengths_km is None else lengths_km
+        X[:, 1] = self._node_factors(node_ids, at)
+        X[:, 2] = at.hour
+        X[:, 3] = at.weekday() >= 5
+        return X
+
+    def predict_proba(self, X):
+        return self.booster.inplace_predict(X)
+
+    def predict(self, node_ids, at, lengths_km=None):
+        if not len(node_ids):
+            return []
+        proba = self.predict_proba(self.features(node_ids, at, lengths_km))
+        levels = np.where(proba >= Config.MODEL_PADAT_THRESHOLD, 'padat',
+                          np.where(proba >= Config.MODEL_SEDANG_THRESHOLD, 'sedang', 'lancar'))
+        return [
+            {'level': level, 'factor': self.LEVEL_FACTORS[level], 'reason': f"Prediksi model ({p:.0%} macet)"}
+            for level, p in zip(levels.tolist(), proba.tolist())
+        ]
+
+def load_congestion_model(name=None, path=None):
+    name = name or Config.CONGESTION_MODEL
+    if name == 'xgboost':
+        path = path or Config.CONGESTION_MODEL_PATH
+        try:
+            model = XGBoostCongestionModel(path)
+            logger.info("Congestion model loaded from %s", path)
+            return model
+        except Exception as e:
+            logger.warning("Failed to load congestion model %s, falling back to rules: %s", path, e)
+    elif name != 'rules':
+        logger.warning("Unknown congestion model '%s', falling back to rules", name)
+    return RuleCongestionModel()
+
+class CongestionSnapshot:
+    # Tabel kemacetan semua node untuk satu bucket waktu; tidak diubah setelah dibuat
+    def __init__(self, bucket, taken_at, levels, version=None):
+        self.bucket = bucket
+        self.taken_at = taken_at
+        # Identitas isi snapshot: bucket waktu, ditambah versi data live jika snapshot memuat data live
+        self.version = bucket if version is None else version
+        self.levels = MappingProxyType(levels)
+        self.signature = tuple((node_id, levels[node_id]['level']) for node_id in sorted(levels))
+
+    def __getitem__(self, node_id):
+        return self.levels[node_id]
+
+class TrafficPredictor:
+    SNAPSHOT_HISTORY = 32
+
+    def __init__(self, bucket_minutes=None, model=None, live=None, clock=None):
+        # clock: sumber waktu "sekarang" untuk prediksi tanpa parameter at; bisa diganti jam beku untuk benchmark/replay
+        self.clock = clock or datetime.now
+        self.bucket_minutes = bucket_minutes or Config.CONGESTION_BUCKET_MINUTES
+        self.model = model or load_congestion_model()
+        self.live = live
+        self.congestion_data = self._init_congestion_data()
+        self._snapshots = OrderedDict()
+        self._step_scores = {}  # bucket -> {(node_id, panjang langkah): hasil model}
+        self._live_snapshots = {}  # (bucket, versi data live) -> snapshot gabungan
+        self._lock = threading.Lock()
+
+    def _init_congestion_data(self):
+        return {node_id: {'level': 'lancar', 'updated': self.now()} for node_id in Config.NODES}
+
+    def now(self):
+        return self.clock()
+
+    def _bucket(self, at):
+        minutes = at.hour * 60 + at.minute
+        start = minutes - minutes % self.bucket_minutes
+        return at.replace(hour=start // 60, minute=start % 60, second=0, microsecond=0)
+
+    def snapshot(self, at=None):
+        at = at or self.now()
+        snap = self._base_snapshot(at)
+        observations = self._live_observations(at)
+        if not observations:
+            return snap
+
+        key = (snap.bucket, self.live.version)
+        live_snap = self._live_snapshots.get(key)
+        if live_snap is None:
+            levels = dict(snap.levels)
+            for node_id, observation in observations.items():
+                levels[node_id] = self._blend(levels[node_id], observation)
+            live_snap = CongestionSnapshot(snap.bucket, at, levels, version=key)
+            updated = datetime.fromtimestamp(self.live.watermark)
+            with self._lock:
+                # Hanya snapshot untuk versi data live terbaru yang disimpan
+                if any(cached_key[1] != key[1] for cached_key in self._live_snapshots):
+                    self._live_snapshots.clear()
+                live_snap = self._live_snapshots.setdefault(key, live_snap)
+                for node_id in observations:
+                    if self.congestion_data[node_id]['level'] != live_snap[node_id]['level']:
+                        self.congestion_data[node_id] = {'level': live_snap[node_id]['level'], 'updated': updated}
+        return live_snap
+
+    def _live_observations(self, at):
+        if self.live is None or not self.live.applies(at):
+            return None
+        return self.live.observations()
+
+    @staticmethod
+    def _blend(congestion, observation):
+        # Faktor prediksi dasar digabung dengan rasio kecepatan live terhadap kecepatan lancar; bobot data live
+        # naik seiring jumlah sampel. Faktor dibulatkan ke 0.05 agar hasil rute tidak berubah oleh noise kecil.
+        speed_kmh, count = observation
+        weight = Config.LIVE_WEIGHT * min(1.0, count / Config.LIVE_MIN_SAMPLES)
+        live_factor = min(1.0, max(0.3, speed_kmh / Config.LIVE_FREE_FLOW_KMH))
+        factor = round(((1 - weight) * congestion['factor'] + weight * live_factor) * 20) / 20
+        if factor < Config.LIVE_PADAT_FACTOR:
+            level = 'padat'
+        elif factor < Config.LIVE_SEDANG_FACTOR:
+            level = 'sedang'
+        else:
+            level = 'lancar'
+        return {'level': level, 'factor': factor, 'reason': f"{congestion['reason']} + data live"}
+
+    def _base_snapshot(self, at):
+        bucket = self._bucket(at)
+        with self._lock:
+            snap = self._snapshots.get(bucket)
+            if snap is not None:
+                self._snapshots.move_to_end(bucket)
+                return snap
+
+        # Semua node dinilai dalam satu panggilan model
+        node_ids = list(Config.NODES)
+        levels = dict(zip(node_ids, self.model.predict(node_ids, bucket)))
+        snap = CongestionSnapshot(bucket, at, levels)
+        with self._lock:
+            snap = self._snapshots.setdefault(bucket, snap)
+            while len(self._snapshots) > self.SNAPSHOT_HISTORY:
+                evicted, _ = self._snapshots.popitem(last=False)
+                self._step_scores.pop(evicted, None)
+            latest = max(self._snapshots)
+        if bucket == latest:
+            for node_id, congestion in snap.levels.items():
+                self.congestion_data[node_id] = {'level': congestion['level'], 'updated': snap.taken_at}
+        return snap
+
+    def bucket_starts(self, start, end):
+        # Awal semua bucket waktu yang beririsan dengan [start, end]; bucket terakhir tiap hari bisa lebih pendek
+        buckets = [self._bucket(start)]
+        while True:
+            last = buckets[-1]
+            midnight = datetime.combine(last.date() + timedelta(days=1), datetime.min.time(), tzinfo=last.tzinfo)
+            following = self._bucket(min(last + timedelta(minutes=self.bucket_minutes), midnight))
+            if following > end:
+                return buckets
+            buckets.append(following)
+
+    def forecast_factors(self, node_ids, start, end):
+        # Faktor kemacetan node_ids di tiap bucket antara start dan end: (awal bucket, array (bucket, node)).
+        # Bucket pertama dinilai pada waktu start agar data live ikut dipakai selama masih berlaku.
+        buckets = self.bucket_starts(start, end)
+        factors = np.empty((len(buckets), len(node_ids)))
+        for i, bucket in enumerate(buckets):
+            snap = self.snapshot(max(bucket, start))
+            factors[i] = [snap[node_id]['factor'] for node_id in node_ids]
+        return buckets, factors
+
+    @metrics.timed('congestion')
+    def predict_congestion(self, node_id, at=None):
+        return self.snapshot(at)[node_id]
+
+    @metrics.timed('congestion')
+    def predict_all(self, at=None):
+        return dict(self.snapshot(at).levels)
+
+    @metrics.timed('congestion')
+    def predict_steps(self, node_ids, lengths_km, at=None):
+        # Kondisi tiap langkah rute; model tanpa fitur panjang cukup memakai snapshot node terdekat
+        snap = self.snapshot(at)
+        if not self.model.uses_length:
+            return [snap[node_id] for node_id in node_ids]
+
+        keys = list(zip(node_ids, np.round(lengths_km, 2).tolist()))
+        with self._lock:
+            scores = self._step_scores.setdefault(snap.bucket, {})
+            missing = [key for key in dict.fromkeys(keys) if key not in scores]
+        if missing:
+            # Langkah yang belum pernah dinilai pada bucket ini diproses dalam satu panggilan model
+            results = self.model.predict([key[0] for key in missing], snap.bucket, [key[1] for key in missing])
+            with self._lock:
+                scores.update(zip(missing, results))
+        observations = self._live_observations(at or self.now())
+        if observations:
+            return [self._blend(scores[key], observations[key[0]]) if key[0] in observations else scores[key] for key in keys]
+        return [scores[key] for key in keys]
+
+# ===================== INDEKS SPASIAL =====================
+class SpatialIndex:
+    EARTH_RADIUS_KM = 6371.0088
+    MAX_RING = 4  # ring grid terjauh untuk query batch k-terdekat
+
+    def __init__(self, nodes, cell_km=None):
+        self._build(list(nodes), [node['lat'] for node in nodes.values()], [node['lng'] for node in nodes.values()], cell_km)
+
+    @classmethod
+    def from_arrays(cls, node_ids, lat, lng, cell_km=None):
+        # Untuk titik dalam jumlah besar (mis. vertex graf jalan) tanpa membangun dict per titik
+        index = cls.__new__(cls)
+        index._build(node_ids, lat, lng, cell_km)
+        return index
+
+    def _build(self, node_ids, lat, lng, cell_km):
+        self.cell_km = cell_km or Config.NODE_INDEX_CELL_KM
+        self.node_ids = np.asarray(node_ids, dtype=np.int64)
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lng = np.asarray(lng, dtype=np.float64)
+        # Proyeksi equirectangular (km) di sekitar lintang rata-rata; cukup akurat untuk skala kota
+        self._cos_ref = math.cos(math.radians(float(self.lat.mean())))
+        self.xy = self._project(self.lat, self.lng)
+
+        self._grid = {}
+        cells = np.floor(self.xy / self.cell_km).astype(np.int64)
+        for idx, (cx, cy) in enumerate(cells):
+            self._grid.setdefault((int(cx), int(cy)), []).append(idx)
+        self._min_cell = cells.min(axis=0)
+        self._max_cell = cells.max(axis=0)
+        # Versi array dari grid untuk query batch: indeks node diurutkan per kunci sel
+        self._grid_shape = self._max_cell - self._min_cell + 1
+        keys = (cells[:, 0] - self._min_cell[0]) * self._grid_shape[1] + (cells[:, 1] - self._min_cell[1])
+        self._cell_order = np.argsort(keys, kind='stable')
+        self._cell_keys = keys[self._cell_order]
+
+    def _project(self, lat, lng):
+        x = np.radians(lng) * self._cos_ref * self.EARTH_RADIUS_KM
+        y = np.radians(lat) * self.EARTH_RADIUS_KM
+        return np.stack([x, y], axis=-1)
+
+    def _refine(self, coords, candidates, projected):
+        # Cek ulang geodesik hanya untuk kandidat yang hampir sama dekat dengan yang terbaik
+        best = projected.min()
+        limit = best * (1 + Config.NODE_INDEX_TOLERANCE) + 0.01
+        close = [idx for idx, dist in zip(candidates, projected) if dist <= limit]
+        if len(close) == 1:
+            return int(self.node_ids[close[0]])
+        from geopy.distance import geodesic
+        return int(self.node_ids[min(close, key=lambda idx: geodesic(coords, (self.lat[idx], self.lng[idx])).km)])
+
+    @staticmethod
+    def _ring_cells(ring):
+        if ring == 0:
+            return [(0, 0)]
+        cells = [(dx, dy) for dx in range(-ring, ring + 1) for dy in (-ring, ring)]
+        cells += [(dx, dy) for dy in range(-ring + 1, ring) for dx in (-ring, ring)]
+        return cells
+
+    def nearest(self, coords):
+        point = self._project(np.float64(coords[0]), np.float64(coords[1]))
+        cx, cy = np.floor(point / self.cell_km).astype(np.int64)
+        max_ring = int(max(abs(cx - self._min_cell[0]), abs(cx - self._max_cell[0]),
+                           abs(cy - self._min_cell[1]), abs(cy - self._max_cell[1])))
+        candidates = []
+        best = float('inf')
+        for ring in range(max_ring + 1):
+            # Sel pada ring ini berjarak minimal (ring - 1) * cell_km dari titik query
+            if candidates and (ring - 1) * self.cell_km > best * (1 + Config.NODE_INDEX_TOLERANCE) + 0.01:
+                break
+            if (2 * ring + 1) ** 2 > 4 * len(self.node_ids) + 9:
+                # Titik jauh di luar grid: memindai semua node lebih murah daripada memindai sel kosong
+                candidates = list(range(len(self.node_ids)))
+                break
+            for dx, dy in self._ring_cells(ring):
+                for idx in self._grid.get((int(cx) + dx, int(cy) + dy), ()):
+                    candidates.append(idx)
+                    best = min(best, float(np.hypot(*(self.xy[idx] - point))))
+        projected = np.hypot(*(self.xy[candidates] - point).T)
+        return self._refine(coords, candidates, projected)
+
+    def _ring_pairs(self, cells, ring):
+        # (indeks titik, indeks node) untuk semua node di sel-sel pada ring ini di sekitar sel tiap titik
+        point_parts, node_parts = [], []
+        for dx, dy in self._ring_cells(ring):
+            cx = cells[:, 0] + dx - self._min_cell[0]
+            cy = cells[:, 1] + dy - self._min_cell[1]
+            inside = np.nonzero((cx >= 0) & (cx < self._grid_shape[0]) & (cy >= 0) & (cy < self._grid_shape[1]))[0]
+            if not len(inside):
+                continue
+            keys = cx[inside] * self._grid_shape[1] + cy[inside]
+            start = np.searchsorted(self._cell_keys, keys, 'left')
+            count = np.searchsorted(self._cell_keys, keys, 'right') - start
+            occupied = count > 0
+            inside, start, count = inside[occupied], start[occupied], count[occupied]
+            if not len(inside):
+                continue
+            point_parts.append(np.repeat(inside, count))
+            within = np.arange(int(count.sum())) - np.repeat(np.cumsum(count) - count, count)
+            node_parts.append(self._cell_order[np.repeat(start, count) + within])
+        if not point_parts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.concatenate(point_parts), np.concatenate(node_parts)
+
+    def _cells_of(self, coords):
+        points = self._project(coords[:, 0], coords[:, 1])
+        return points, np.floor(points / self.cell_km).astype(np.int64)
+
+    def nearest_within(self, coords, radius_km):
+        # Node terdekat (jarak proyeksi) untuk tiap titik, -1 jika tidak ada node dalam radius. Hanya node di sel
+        # grid sekitar titik yang dihitung jaraknya, jadi memori sebanding jumlah titik x node di dekatnya.
+        if len(coords) == 0:
+            return np.zeros(0, dtype=np.int64)
+        points, cells = self._cells_of(np.asarray(coords, dtype=np.float64))
+        best = np.full(len(points), np.inf)
+        nearest = np.full(len(points), -1, dtype=np.int64)
+        for ring in range(int(math.ceil(radius_km / self.cell_km)) + 1):
+            pts, nodes = self._ring_pairs(cells, ring)
+            if not len(pts):
+                continue
+            dists = np.hypot(*(points[pts] - self.xy[nodes]).T)
+            order = np.lexsort((nodes, dists, pts))
+            first = order[np.unique(pts[order], return_index=True)[1]]
+            closer = dists[first] < best[pts[first]]
+            best[pts[first[closer]]] = dists[first[closer]]
+            nearest[pts[first[closer]]] = nodes[first[closer]]
+        return np.where(best <= radius_km, self.node_ids[np.maximum(nearest, 0)], -1)
+
+    def _nearest_candidates(self, points, cells, k):
+        # k node terdekat (jarak proyeksi, terurut) untuk tiap titik. Ring grid diperluas per titik sampai kandidat
+        # ke-k lebih dekat dari sel mana pun di ring berikutnya. Titik yang belum selesai setelah MAX_RING ring
+        # (mis. jauh di luar grid) dihitung ke semua node per potongan agar memori tetap terbatas.
+        n_nodes = len(self.node_ids)
+        gap = np.maximum(np.maximum(self._min_cell - cells, cells - self._max_cell).max(axis=1), 0)
+        open_points = np.nonzero(gap <= self.MAX_RING)[0]
+        found = [(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0))]
+        ring = 0
+        while len(open_points) and ring <= self.MAX_RING:
+            pts, nodes = self._ring_pairs(cells[open_points], ring)
+            pts = open_points[pts]
+            found.append((pts, nodes, np.hypot(*(points[pts] - self.xy[nodes]).T)))
+            all_pts, _, all_dists = (np.concatenate(part) for part in zip(*found))
+            order = np.lexsort((all_dists, all_pts))
+            sorted_pts, sorted_dists = all_pts[order], all_dists[order]
+            start = np.searchsorted(sorted_pts, open_points, 'left')
+            count = np.searchsorted(sorted_pts, open_points, 'right') - start
+            kth = np.full(len(open_points), np.inf)
+            enough = count >= k
+            kth[enough] = sorted_dists[start[enough] + k - 1]
+            open_points = open_points[kth > ring * self.cell_km]
+            ring += 1
+
+        open_points = np.union1d(open_points, np.nonzero(gap > self.MAX_RING)[0])
+        if len(open_points):
+            all_pts, all_nodes, all_dists = (np.concatenate(part) for part in zip(*found))
+            keep = ~np.isin(all_pts, open_points)
+            found = [(all_pts[keep], all_nodes[keep], all_dists[keep])]
+            chunk = max(1, Config.NODE_INDEX_CHUNK // n_nodes)
+            for offset in range(0, len(open_points), chunk):
+                pts = open_points[offset:offset + chunk]
+                dists = np.hypot(points[pts, None, 0] - self.xy[None, :, 0], points[pts, None, 1] - self.xy[None, :, 1])
+                nodes = np.argpartition(dists, k - 1, axis=1)[:, :k] if k < n_nodes else np.tile(np.arange(n_nodes), (len(pts), 1))
+                found.append((np.repeat(pts, k), nodes.ravel(), np.take_along_axis(dists, nodes, axis=1).ravel()))
+
+        all_pts, all_nodes, all_dists = (np.concatenate(part) for part in zip(*found))
+        order = np.lexsort((all_nodes, all_dists, all_pts))
+        start = np.searchsorted(all_pts[order], np.arange(len(points)), 'left')
+        picked = order[start[:, None] + np.arange(k)]
+        return all_nodes[picked], all_dists[picked]
+
+    def nearest_batch(self, coords_list, k=4):
+        if len(coords_list) == 0:
+            return []
+        coords = np.asarray(coords_list, dtype=np.float64)
+        points, cells = self._cells_of(coords)
+        k = min(k, len(self.node_ids))
+        candidates, candidate_dists = self._nearest_candidates(points, cells, k)
+
+        result = self.node_ids[candidates[:, 0]].tolist()
+        if k > 1:
+            ambiguous = candidate_dists[:, 1] <= candidate_dists[:, 0] * (1 + Config.NODE_INDEX_TOLERANCE) + 0.01
+            for row in np.nonzero(ambiguous)[0]:
+                result[row] = self._refine(tuple(coords[row]), candidates[row].tolist(), candidate_dists[row])
+        return result
+
+# ===================== DATA LALU LINTAS LIVE =====================
+class LiveTraffic:
+    # Agregat kecepatan probe per node dalam jendela geser. Ring buffer berukuran tetap (node x slot waktu)
+    # sehingga memori tidak bertambah berapa pun laju sampel; jumlah per jendela diperbarui inkremental.
+    def __init__(self, nodes=None, window_seconds=None, slots=None, radius_km=None):
+        nodes = nodes or Config.NODES
+        self.window_seconds = window_seconds or Config.LIVE_WINDOW_SECONDS
+        self.slots = slots or Config.LIVE_SLOTS
+        self.slot_seconds = self.window_seconds / self.slots
+        self.radius_km = radius_km or Config.CONGESTION_RADIUS_KM
+        self.index = SpatialIndex(nodes)
+        self.node_ids = self.index.node_ids
+        self._order = np.argsort(self.node_ids)
+
+        n = len(self.node_ids)
+        self._speed_sum = np.zeros((n, self.slots))
+        self._count = np.zeros((n, self.slots), dtype=np.int64)
+        self._window_speed = np.zeros(n)
+        self._window_count = np.zeros(n, dtype=np.int64)
+        self._current_slot = None
+        self.watermark = None  # timestamp sampel terbaru (detik epoch)
+        self.version = 0  # naik setiap ada sampel yang masuk agregat
+        self.stats = {'received': 0, 'matched': 0, 'unmatched': 0, 'late': 0, 'invalid': 0}
+        self._lock = threading.Lock()
+
+    def _rows(self, node_ids):
+        return self._order[np.searchsorted(self.node_ids[self._order], node_ids)]
+
+    def _advance(self, slot):
+        # Geser jendela ke slot terbaru: kolom yang keluar dikurangkan dari jumlah jendela lalu dikosongkan
+        if self._current_slot is not None and slot - self._current_slot < self.slots:
+            expired = [s % self.slots for s in range(self._current_slot + 1, slot + 1)]
+            self._window_speed -= self._speed_sum[:, expired].sum(axis=1)
+            self._window_count -= self._count[:, expired].sum(axis=1)
+            self._speed_sum[:, expired] = 0
+            self._count[:, expired] = 0
+            self._window_speed[self._window_count == 0] = 0
+        else:
+            self._speed_sum[:] = 0
+            self._count[:] = 0
+            self._window_speed[:] = 0
+            self._window_count[:] = 0
+        self._current_slot = slot
+
+    def ingest(self, samples):
+        # samples: array (n, 4) berisi lat, lng, kecepatan km/jam, timestamp epoch
+        samples = np.asarray(samples, dtype=np.float64).reshape(-1, 4)
+        # Timestamp jauh di depan jam sistem akan menggeser jendela dan menghapus semua agregat
+        valid = np.isfinite(samples).all(axis=1) & (samples[:, 2] >= 0) & (samples[:, 3] <= time.time() + self.window_seconds)
+        invalid = int(len(samples) - valid.sum())
+        samples = samples[valid]
+
+        # Pencarian node terdekat untuk seluruh batch dilakukan di luar lock
+        node_ids = self.index.nearest_within(samples[:, :2], self.radius_km)
+        matched = node_ids >= 0
+        slots = np.floor(samples[:, 3] / self.slot_seconds).astype(np.int64)
+
+        with self._lock:
+            self.stats['received'] += len(samples) + invalid
+            self.stats['invalid'] += invalid
+            self.stats['unmatched'] += int((~matched).sum())
+            if not len(samples):
+                return 0
+            newest = int(slots.max())
+            if self._current_slot is None or newest > self._current_slot:
+                self._advance(newest)
+            self.watermark = max(self.watermark or 0.0, float(samples[:, 3].max()))
+            # Sampel yang sudah keluar dari jendela dibuang
+            in_window = matched & (slots > self._current_slot - self.slots)
+            self.stats['late'] += int((matched & ~in_window).sum())
+            if not in_window.any():
+                return 0
+
+            rows = self._rows(node_ids[in_window])
+            columns = slots[in_window] % self.slots
+            speeds = samples[in_window, 2]
+            np.add.at(self._speed_sum, (rows, columns), speeds)
+            np.add.at(self._count, (rows, columns), 1)
+            np.add.at(self._window_speed, rows, speeds)
+            np.add.at(self._window_count, rows, 1)
+            self.stats['matched'] += len(rows)
+            self.version += 1
+            return len(rows)
+
+    def applies(self, at):
+        # Data live hanya menggambarkan kondisi di sekitar timestamp sampel terbaru
+        watermark = self.watermark
+        return watermark is not None and abs(at.timestamp() - watermark) <= self.window_seconds
+
+    def observations(self):
+        # {node_id: (rata-rata kecepatan km/jam, jumlah sampel)} untuk node yang punya sampel dalam jendela
+        with self._lock:
+            rows = np.nonzero(self._window_count)[0]
+            speeds = (self._window_speed[rows] / self._window_count[rows]).tolist()
+            counts = self._window_count[rows].tolist()
+        return {int(self.node_ids[row]): (speed, count) for row, speed, count in zip(rows, speeds, counts)}
+
+    def info(self):
+        with self._lock:
+            info = dict(self.stats, version=self.version, window_seconds=self.window_seconds, slots=self.slots)
+            watermark = self.watermark
+        info['watermark'] = datetime.fromtimestamp(watermark).isoformat() if watermark is not None else None
+        return info
+
+def parse_probe_lines(lines):
+    # Baris CSV "lat,lng,kecepatan_kmh,timestamp"; baris rusak dibuang (tercatat sebagai invalid)
+    lines = [line for line in lines if line.strip()]
+    try:
+        return np.array([line.split(',') for line in lines], dtype=np.float64).reshape(-1, 4)
+    except ValueError:
+        rows = []
+        for line in lines:
+            try:
+                lat, lng, speed, timestamp = (float(part) for part in line.split(','))
+            except ValueError:
+                lat = lng = speed = timestamp = float('nan')
+            rows.append((lat, lng, speed, timestamp))
+        return np.array(rows, dtype=np.float64).reshape(-1, 4)
+
+def probe_file_source(path, batch_size=None, follow=False):
+    # Sumber dari file (.csv atau .csv.gz); follow=True membaca terus baris baru seperti `tail -f`
+    def source(stop):
+        batch = []
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            while not stop.is_set():
+                line = f.readline()
+                if line:
+                    batch.append(line)
+                    if len(batch) >= (batch_size or Config.LIVE_BATCH_SIZE):
+                        yield batch
+                        batch = []
+                    continue
+                if batch:
+                    yield batch
+                    batch = []
+                if not follow:
+                    return
+                stop.wait(Config.LIVE_FLUSH_SECONDS)
+    return source
+
+def probe_udp_source(host, port, batch_size=None):
+    # Sumber datagram UDP; satu datagram boleh berisi beberapa baris CSV
+    def source(stop):
+        import socket
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind((host, port))
+        sock.settimeout(Config.LIVE_FLUSH_SECONDS)
+        batch = []
+        flush_at = time.monotonic() + Config.LIVE_FLUSH_SECONDS
+        try:
+            while not stop.is_set():
+                try:
+                    batch.extend(sock.recv(65535).decode('utf-8', 'replace').splitlines())
+                except socket.timeout:
+                    pass
+                if batch and (len(batch) >= (batch_size or Config.LIVE_BATCH_SIZE) or time.monotonic() >= flush_at):
+                    yield batch
+                    batch = []
+                    flush_at = time.monotonic() + Config.LIVE_FLUSH_SECONDS
+        finally:
+            sock.close()
+    return source
+
+def probe_queue_source(q, batch_size=None):
+    # Sumber dari queue.Queue berisi baris CSV (pengganti message broker); None menghentikan sumber
+    def source(stop):
+        import queue
+        while not stop.is_set():
+            try:
+                batch = [q.get(timeout=Config.LIVE_FLUSH_SECONDS)]
+            except queue.Empty:
+                continue
+            # Ambil yang sudah antre tanpa menunggu, hingga batas batch
+            while len(batch) < (batch_size or Config.LIVE_BATCH_SIZE):
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+            ended = None in batch
+            batch = [line for line in batch if line is not None]
+            if batch:
+                yield batch
+            if ended:
+                return
+    return source
+
+def open_probe_source(spec):
+    # 'file:/path/probes.csv', 'tail:/path/probes.csv' atau 'udp:0.0.0.0:9999'
+    kind, _, target = spec.partition(':')
+    if kind in ('file', 'tail'):
+        return probe_file_source(target, follow=kind == 'tail')
+    if kind == 'udp':
+        host, _, port = target.rpartition(':')
+        return probe_udp_source(host or '0.0.0.0', int(port))
+    raise ValueError(f"Unknown probe source '{spec}'")
+
+class ProbeIngestor:
+    # Thread latar: membaca batch baris dari sumber probe lalu memasukkannya ke LiveTraffic
+    def __init__(self, live, source):
+        self.live = live
+        self.source = source
+        self.batches = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='probe-ingest', daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            for lines in self.source(self._stop):
+                self.live.ingest(parse_probe_lines(lines))
+                self.batches += 1
+        except Exception as e:
+            logger.error("Probe ingestion stopped: %s", e)
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+# ===================== CACHE RUTE =====================
+class SingleFlight:
+    # Penggabungan request identik dalam satu proses: satu thread menghitung, thread lain dengan kunci sama menunggu hasilnya
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {'done': threading.Event(), 'result': None, 'error': None}
+            else:
+                self.coalesced += 1
+        if not leader:
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result']
+        try:
+            call['result'] = fn()
+            return call['result']
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call['done'].set()
+
+class SQLiteStore:
+    # Tier cache bersama di satu host: file SQLite yang dibuka semua worker (letakkan di /dev/shm agar tetap di memori).
+    # Satu tabel per namespace; tabel locks menyimpan lease single-flight antar proses.
+    backend = 'sqlite'
+
+    def __init__(self, path, namespace='routes'):
+        self.path = path
+        self.table = namespace
+        self._lock = threading.Lock()
+        self._connect()
+        with self._lock:
+            self._db.execute(f"CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, data TEXT NOT NULL, stored_at REAL NOT NULL)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS locks (key TEXT PRIMARY KEY, expires_at REAL NOT NULL)")
+            self._db.commit()
+
+    def _connect(self):
+        # WAL: pembaca di worker lain tidak terblokir oleh penulis
+        self._db = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+
+    def reopen(self):
+        # Koneksi warisan proses induk ditutup eksplisit; WAL dan lock file tetap dipegang koneksi induk sendiri
+        with self._lock:
+            inherited = self._db
+            self._connect()
+            try:
+                inherited.close()
+            except sqlite3.Error as e:
+                logger.warning("Closing inherited SQLite connection failed: %s", e)
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute(f"SELECT data, stored_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def contains(self, key, since):
+        with self._lock:
+            return self._db.execute(f"SELECT 1 FROM {self.table} WHERE key = ? AND stored_at >= ?", (key, since)).fetchone() is not None
+
+    def set(self, key, data, stored_at, ttl):
+        with self._lock:
+            self._db.execute(f"INSERT OR REPLACE INTO {self.table} (key, data, stored_at) VALUES (?, ?, ?)", (key, json.dumps(data), stored_at))
+            self._db.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._db.commit()
+
+    def purge(self, older_than):
+        with self._lock:
+            self._db.execute(f"DELETE FROM {self.table} WHERE stored_at < ?", (older_than,))
+            self._db.commit()
+
+    def recent(self, since, limit):
+        with self._lock:
+            rows = self._db.execute(f"SELECT key, data, stored_at FROM {self.table} WHERE stored_at >= ? ORDER BY stored_at DESC LIMIT ?",
+                                    (since, limit)).fetchall()
+        return [(key, json.loads(data), stored_at) for key, data, stored_at in rows]
+
+    def clear(self):
+        with self._lock:
+            self._db.execute(f"DELETE FROM {self.table}")
+            self._db.commit()
+
+    def acquire(self, key, ttl):
+        # Lease yang kedaluwarsa (pemegangnya mati) boleh diambil alih
+        now = time.time()
+        lock_key = f"{self.table}|{key}"
+        with self._lock:
+            self._db.execute("DELETE FROM locks WHERE key = ? AND expires_at < ?", (lock_key, now))
+            acquired = self._db.execute("INSERT OR IGNORE INTO locks (key, expires_at) VALUES (?, ?)", (lock_key, now + ttl)).rowcount == 1
+            self._db.commit()
+        return acquired
+
+    def release(self, key):
+        with self._lock:
+            self._db.execute("DELETE FROM locks WHERE key = ?", (f"{self.table}|{key}",))
+            self._db.commit()
+
+class RedisStore:
+    # Tier cache bersama lewat server Redis (butuh paket redis). Entri kedaluwarsa sendiri lewat TTL Redis.
+    # Kesalahan koneksi dicatat dan diperlakukan sebagai cache miss agar request tetap dilayani.
+    backend = 'redis'
+
+    def __init__(self, url=None, namespace='routes', client=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = f"smartcity:{namespace}:"
+        self._tokens = {}
+
+    def _call(self, default, method, *args, **kwargs):
+        try:
+            return getattr(self.client, method)(*args, **kwargs)
+        except Exception as e:
+            logger.warning("Shared cache %s failed: %s", method, e)
+            return default
+
+    def reopen(self):
+        # redis-py membuat koneksi baru sendiri jika mendeteksi PID berubah
+        pass
+
+    def get(self, key):
+        raw = self._call(None, 'get', self.prefix + key)
+        if raw is None:
+            return None
+        stored_at, data = json.loads(raw)
+        return data, stored_at
+
+    def contains(self, key, since):
+        # Waktu tulis disimpan bersama nilai; entri yang lebih tua dari since dianggap tidak ada
+        entry = self.get(key)
+        return entry is not None and entry[1] >= since
+
+    def set(self, key, data, stored_at, ttl):
+        self._call(None, 'set', self.prefix + key, json.dumps([stored_at, data]), px=max(1, int(ttl * 1000)))
+
+    def delete(self, key):
+        self._call(None, 'delete', self.prefix + key)
+
+    def purge(self, older_than):
+        pass
+
+    def recent(self, since, limit):
+        # Tier Redis sudah dibagi semua worker; tidak perlu disalin ke memori saat warm-up
+        return []
+
+    def clear(self):
+        keys = list(self._call([], 'scan_iter', match=self.prefix + '*', count=500))
+        if keys:
+            self._call(None, 'delete', *keys)
+
+    def acquire(self, key, ttl):
+        token = f"{os.getpid()}-{threading.get_ident()}-{random.random()}"
+        try:
+            # SET NX yang kalah mengembalikan None; hanya exception yang berarti Redis tidak tersedia
+            acquired = self.client.set(self.prefix + 'lock:' + key, token, nx=True, px=max(1, int(ttl * 1000)))
+        except Exception as e:
+            logger.warning("Shared cache lease failed: %s", e)
+            return True  # Redis tidak tersedia: hitung sendiri daripada menunggu
+        if acquired:
+            self._tokens[(key, threading.get_ident())] = token
+        return bool(acquired)
+
+    def release(self, key):
+        token = self._tokens.pop((key, threading.get_ident()), None)
+        # Hapus hanya lease milik sendiri (lease yang sudah kedaluwarsa bisa dipegang proses lain)
+        if token is not None and self._call(None, 'get', self.prefix + 'lock:' + key) in (token, token.encode()):
+            self._call(None, 'delete', self.prefix + 'lock:' + key)
+
+def open_cache_store(namespace, url=None):
+    # 'redis://host:6379/0' atau 'sqlite:////dev/shm/smartcity-cache.db'; None jika tier bersama tidak dikonfigurasi
+    url = url or Config.SHARED_CACHE_URL
+    if not url:
+        return None
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisStore(url, namespace)
+    if url.startswith('sqlite://'):
+        return SQLiteStore(url[len('sqlite://'):], namespace)
+    raise ValueError(f"Unknown shared cache URL '{url}'")
+
+class RouteCache:
+    def __init__(self, max_size=None, ttl=None, db_path=None, store=None, namespace='routes'):
+        # Tier memori (LRU per proses) + tier bersama opsional: store eksplisit, SHARED_CACHE_URL, atau file
+        # SQLite db_path / ROUTE_CACHE_DB. db_path='' berarti hanya memori kecuali store diberikan.
+        self.max_size = max_size if max_size is not None else Config.ROUTE_CACHE_SIZE
+        self.ttl = ttl if ttl is not None else Config.ROUTE_CACHE_TTL
+        self.db_path = db_path if db_path is not None else Config.ROUTE_CACHE_DB
+        if store is None and db_path is None:
+            store = open_cache_store(namespace)
+        if store is None and self.db_path:
+            store = SQLiteStore(self.db_path, namespace)
+        self._store = store
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self.stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0, 'lease_waits': 0}
+        if self._store is not None:
+            self._store.purge(time.time() - self.ttl)
+
+    @staticmethod
+    def make_key(coords, profile, access=None):
+        points = ';'.join(f"{lat:.6f},{lng:.6f}" for lat, lng in coords)
+        return f"{profile}|{access or '-'}|{points}"
+
+    def get(self, key):
+        data = self._lookup(key)
+        if data is None:
+            with self._lock:
+                self.stats['misses'] += 1
+        return data
+
+    def _lookup(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, data = entry
+                if now - stored_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return data
+                del self._entries[key]
+                self.stats['expired'] += 1
+
+        if self._store is None:
+            return None
+        row = self._store.get(key)
+        if row is None:
+            return None
+        data, stored_at = row
+        if now - stored_at > self.ttl:
+            self._store.delete(key)
+            with self._lock:
+                self.stats['expired'] += 1
+            return None
+        with self._lock:
+            self._store_memory(key, data, stored_at)
+            self.stats['disk_hits'] += 1
+        return data
+
+    def set(self, key, data, shared=True):
+        # shared=False: hanya tier memori proses ini (mis. hasil yang valid hanya selama kondisi proses ini)
+        now = time.time()
+        with self._lock:
+            self._store_memory(key, data, now)
+        if shared and self._store is not None:
+            self._store.set(key, data, now, self.ttl)
+
+    def get_or_compute(self, key, compute, should_store=None):
+        # Single-flight: dalam satu proses hanya satu thread yang menjalankan compute untuk sebuah kunci; antar
+        # proses (tier bersama) pemegang lease yang menghitung, proses lain menunggu hasilnya muncul di tier bersama.
+        data = self.get(key)
+        if data is not None:
+            return data
+        return self._flight.do(key, lambda: self._compute_once(key, compute, should_store or (lambda value: True)))
+
+    def _compute_once(self, key, compute, should_store):
+        data = self._lookup(key)
+        if data is not None:
+            return data
+        leased = self._store is not None and self._acquire_lease(key)
+        try:
+            if self._store is not None:
+                # Proses lain bisa saja selesai tepat sebelum lease didapat (atau saat lease ditunggu)
+                data = self._lookup(key)
+                if data is not None:
+                    return data
+            data = compute()
+            if should_store(data):
+                self.set(key, data)
+            return data
+        finally:
+            if leased:
+                self._store.release(key)
+
+    def _acquire_lease(self, key):
+        # True jika lease didapat; False jika hasil proses lain sudah tersedia atau lease pemegangnya kedaluwarsa
+        deadline = time.monotonic() + Config.CACHE_LEASE_SECONDS
+        waited = False
+        while not self._store.acquire(key, Config.CACHE_LEASE_SECONDS):
+            if not waited:
+                waited = True
+                with self._lock:
+                    self.stats['lease_waits'] += 1
+            if self._store.contains(key, time.time() - self.ttl) or time.monotonic() >= deadline:
+                return False
+            time.sleep(Config.CACHE_LEASE_POLL)
+        return True
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] <= self.ttl:
+                return True
+        return self._store is not None and self._store.contains(key, time.time() - self.ttl)
+
+    def _store_memory(self, key, data, stored_at):
+        self._entries[key] = (stored_at, data)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def warm(self, limit=None):
+        # Isi tier memori dengan entri terbaru dari tier bersama (mis. sebelum fork worker gunicorn)
+        if self._store is None:
+            return 0
+        rows = self._store.recent(time.time() - self.ttl, min(limit or self.max_size, self.max_size))
+        with self._lock:
+            for key, data, stored_at in reversed(rows):
+                self._store_memory(key, data, stored_at)
+        return len(rows)
+
+    def reopen(self):
+        # Koneksi tier bersama tidak boleh dipakai bersama setelah fork; tiap proses membuka koneksinya sendiri
+        if self._store is not None:
+            self._store.reopen()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self._store is not None:
+            self._store.clear()
+
+    def info(self):
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['disk_hits'] + self.stats['misses']
+            hit_rate = (self.stats['hits'] + self.stats['disk_hits']) / lookups if lookups else 0.0
+            return dict(self.stats, size=len(self._entries), max_size=self.max_size, ttl=self.ttl, coalesced=self._flight.coalesced,
+                        persistent=self._store is not None, store=self._store.backend if self._store is not None else None,
+                        hit_rate=round(hit_rate, 4))
+
+# ===================== KLIEN OSRM =====================
+class OSRMClient:
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+    cacheable = True  # respons OSRM tidak bergantung kondisi lalu lintas, aman disimpan di RouteCache
+    supports_alternatives = False  # alternatif dibentuk SmartNavigator lewat titik bantu
+    supports_reach = False  # isokron disampling lewat table()
+    rate_limited = True  # tiap request memakai token UpstreamBudget
+
+    def __init__(self, base_url=None, session=None, timeout=None, max_retries=None, backoff=None,
+                 failure_threshold=None, reset_timeout=None, pool_size=None):
+        self.base_url = base_url
+        self.timeout = timeout or Config.OSRM_TIMEOUT
+        self.max_retries = max_retries if max_retries is not None else Config.OSRM_RETRIES
+        self.backoff = backoff if backoff is not None else Config.OSRM_BACKOFF
+        self.failure_threshold = failure_threshold or Config.OSRM_BREAKER_THRESHOLD
+        self.reset_timeout = reset_timeout if reset_timeout is not None else Config.OSRM_BREAKER_RESET
+        if session is None:
+            # Keep-alive: satu pool koneksi dipakai ulang oleh semua request
+            import requests
+            from requests.adapters import HTTPAdapter
+            pool_size = pool_size or Config.OSRM_POOL_SIZE
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.session = session
+
+        self._lock = threading.Lock()
+        self._state = 'closed'
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._latencies = deque(maxlen=1000)
+        self.stats = {'requests': 0, 'failures': 0, 'retries': 0, 'short_circuited': 0}
+
+    def route_url(self, coords, profile, access=None):
+        points = ';'.join(f"{lng},{lat}" for lat, lng in coords)
+        url = f"{self.base_url or Config.OSM_URL}{profile}/{points}?overview=full&geometries=geojson&steps=true"
+        if access:
+            url += f"&access={access}"
+        return url
+
+    def route(self, coords, profile, access=None):
+        return self.get_json(self.route_url(coords, profile, access))
+
+    def warm(self):
+        # Tidak ada state yang perlu disiapkan; koneksi ke OSRM baru dibuka di masing-masing worker
+        pass
+
+    def after_fork(self):
+        # Buang koneksi keep-alive yang mungkin diwarisi dari proses induk
+        self.session.close()
+
+    def table(self, coords, profile, sources=None):
+        points = ';'.join(f"{lng},{lat}" for lat, lng in coords)
+        base = (self.base_url or Config.OSM_URL).replace('/route/v1/', '/table/v1/')
+        url = f"{base}{profile}/{points}?annotations=duration,distance"
+        if sources is not None:
+            url += '&sources=' + ';'.join(str(i) for i in sources)
+        return self.get_json(url)
+
+    @metrics.timed('osrm_request')
+    def get_json(self, url):
+        import requests
+        probe = self._admit()
+        if probe is None:
+            logger.warning("OSRM circuit open, skipping request: %s", url)
+            return 503, {'code': 'Unavailable', 'message': 'Layanan peta sedang tidak tersedia'}
+
+        # Breaker menghitung satu keberhasilan/kegagalan per panggilan, berapa pun jumlah retry-nya.
+        # Request percobaan saat half-open tidak di-retry.
+        ok = False
+        last_error = None
+        try:
+            for attempt in range(1 if probe else self.max_retries + 1):
+                if attempt:
+                    if not self._is_closed():
+                        break
+                    time.sleep(self.backoff * (2 ** (attempt - 1)) * (1 + random.random() / 2))
+                started = time.perf_counter()
+                try:
+                    response = self.session.get(url, timeout=self.timeout)
+                    data = response.json()
+                except (requests.RequestException, ValueError) as e:
+                    last_error = str(e)
+                    self._observe(time.perf_counter() - started, attempt)
+                    logger.warning("OSRM request failed (attempt %d): %s", attempt + 1, e)
+                    continue
+                self._observe(time.perf_counter() - started, attempt)
+                if response.status_code in self.RETRY_STATUS:
+                    last_error = data.get('message', f"HTTP {response.status_code}")
+                    continue
+                # 4xx / NoRoute adalah jawaban valid dari server, bukan kegagalan layanan
+                ok = True
+                return response.status_code, data
+        finally:
+            self._record(ok, probe)
+
+        return 503, {'code': 'Unavailable', 'message': f"Layanan peta tidak merespons: {last_error}"}
+
+    def _admit(self):
+        # False = request biasa, True = satu-satunya request percobaan saat half-open, None = ditolak breaker
+        with self._lock:
+            if self._state == 'closed':
+                return False
+            if self._state == 'open' and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = 'half_open'
+                return True
+            self.stats['short_circuited'] += 1
+            return None
+
+    def _is_closed(self):
+        with self._lock:
+            return self._state == 'closed'
+
+    def _observe(self, elapsed, attempt):
+        with self._lock:
+            self.stats['requests'] += 1
+            if attempt:
+                self.stats['retries'] += 1
+            self._latencies.append(elapsed)
+
+    def _record(self, ok, probe):
+        with self._lock:
+            if ok:
+                self._consecutive_failures = 0
+                self._state = 'closed'
+                return
+            self.stats['failures'] += 1
+            self._consecutive_failures += 1
+            if probe or self._consecutive_failures >= self.failure_threshold:
+                if self._state != 'open':
+                    logger.error("OSRM circuit opened after %d consecutive failures", self._consecutive_failures)
+                self._state = 'open'
+                self._opened_at = time.monotonic()
+
+    def info(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            def percentile(p):
+                return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2) if latencies else None
+            return dict(self.stats, state=self._state, latency_ms={
+                'avg': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else None,
+                'p50': percentile(0.5),
+                'p95': percentile(0.95),
+                'p99': percentile(0.99),
+                'max': round(latencies[-1] * 1000, 2) if latencies else None
+            })
+
+# ===================== ANGGARAN REQUEST OSRM =====================
+# (klien, prioritas) request HTTP yang sedang berjalan; di luar request (warm-up, precompute) = background
+_upstream_client = contextvars.ContextVar('upstream_client', default=None)
+
+class UpstreamBusy(Exception):
+    # Token anggaran OSRM tidak didapat dalam batas waktu tunggu prioritasnya
+    def __init__(self, retry_after):
+        super().__init__(f"Anggaran request OSRM habis, coba lagi dalam {retry_after} detik")
+        self.retry_after = retry_after
+
+class UpstreamBudget:
+    # Token bucket untuk request ke server OSRM. Saat token habis, request menunggu di antrean terbatas dan
+    # dilayani berdasarkan prioritas (interactive > bulk > background), lalu klien dengan pemakaian terkecil
+    # belakangan ini, lalu urutan datang. Request yang tidak kebagian token dalam batas tunggunya ditolak.
+    PRIORITIES = ('interactive', 'bulk', 'background')
+
+    def __init__(self, rate=None, burst=None, queue_size=None, client_queue=None, max_wait=None, clock=time.monotonic):
+        self.rate = Config.OSRM_RATE if rate is None else rate
+        self.burst = max(1, burst or Config.OSRM_BURST)
+        self.queue_size = queue_size or Config.OSRM_QUEUE_SIZE
+        self.client_queue = client_queue or Config.OSRM_CLIENT_QUEUE
+        self.max_wait = dict(Config.OSRM_MAX_WAIT, **(max_wait or {}))
+        self.clock = clock
+        self.tokens = float(self.burst)
+        self._updated = clock()
+        self._usage = {}  # klien -> (pemakaian meluruh, waktu update)
+        self._waiting = []  # tiket (prioritas, nomor urut, klien)
+        self._sequence = 0
+        self._cond = threading.Condition()
+        self.stats = {'granted': 0, 'queued': 0, 'shed': 0, 'skipped': 0}
+
+    @property
+    def enabled(self):
+        return self.rate > 0
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _usage_of(self, client, now):
+        used, at = self._usage.get(client, (0.0, now))
+        return used * math.exp((at - now) / Config.OSRM_FAIR_WINDOW)
+
+    def _take(self, client, now):
+        self.tokens -= 1
+        self.stats['granted'] += 1
+        self._usage[client] = (self._usage_of(client, now) + 1, now)
+        if len(self._usage) > 1024:
+            self._usage = {other: entry for other, entry in self._usage.items() if self._usage_of(other, now) >= 0.01}
+
+    def _next(self, now):
+        return min(self._waiting, key=lambda ticket: (ticket[0], self._usage_of(ticket[2], now), ticket[1]))
+
+    def acquire(self, client='-', priority='background', optional=False):
+        # True jika boleh mengirim satu request ke OSRM
+        if not self.enabled:
+            return True
+        rank = self.PRIORITIES.index(priority)
+        with self._cond:
+            now = self.clock()
+            self._refill(now)
+            if not self._waiting and self.tokens >= 1:
+                self._take(client, now)
+                return True
+            if optional:
+                # Request opsional (rute alternatif) tidak pernah antre di belakang request yang sama atau lebih
+                # penting; paling lama menunggu token berikutnya (plus sedikit kelonggaran untuk ketelitian timer)
+                if any(ticket[0] <= rank for ticket in self._waiting):
+                    self.stats['skipped'] += 1
+                    return False
+                wait = max(0.0, 1 - self.tokens) / self.rate + 0.005
+            else:
+                wait = self.max_wait[priority]
+                if wait == 0:
+                    self.stats['shed'] += 1
+                    return False
+            # Batas antrean berlaku untuk semua request yang menunggu, termasuk opsional dan background
+            if len(self._waiting) >= self.queue_size or sum(ticket[2] == client for ticket in self._waiting) >= self.client_queue:
+                self.stats['skipped' if optional else 'shed'] += 1
+                return False
+            self._sequence += 1
+            ticket = (rank, self._sequence, client)
+            self._waiting.append(ticket)
+            self.stats['queued'] += 1
+            deadline = None if wait is None else now + wait
+            try:
+                while True:
+                    if self.tokens >= 1 and self._next(now) == ticket:
+                        self._take(client, now)
+                        return True
+                    if deadline is not None and now >= deadline:
+                        self.stats['skipped' if optional else 'shed'] += 1
+                        return False
+                    # Bangun saat token berikutnya terisi; request lain yang selesai menunggu juga membangunkan antrean
+                    timeout = max((1 - self.tokens) / self.rate, 0.001)
+                    self._cond.wait(timeout if deadline is None else min(timeout, deadline - now))
+                    now = self.clock()
+                    self._refill(now)
+            finally:
+                self._waiting.remove(ticket)
+                self._cond.notify_all()
+
+    def after_fork(self):
+        # Tiap worker memulai dengan bucket penuh dan antrean kosong
+        self._cond = threading.Condition()
+        self._waiting = []
+        self.tokens = float(self.burst)
+        self._updated = self.clock()
+
+    def busy(self):
+        # True jika request baru harus antre (prefetch opsional dilewati)
+        if not self.enabled:
+            return False
+        with self._cond:
+            self._refill(self.clock())
+            return bool(self._waiting) or self.tokens < 1
+
+    def retry_after(self):
+        # Perkiraan detik sampai antrean saat ini terlayani (header Retry-After)
+        if not self.enabled:
+            return 1
+        with self._cond:
+            self._refill(self.clock())
+            return max(1, math.ceil((len(self._waiting) + 1 - self.tokens) / self.rate))
+
+    def info(self):
+        with self._cond:
+            if self.enabled:
+                self._refill(self.clock())
+            return dict(self.stats, rate=self.rate, burst=self.burst, tokens=round(self.tokens, 2), waiting=len(self._waiting))
+
+# ===================== MATRIKS RUTE (PRECOMPUTE) =====================
+class RouteMatrix:
+    def __init__(self, routes=None, meta=None):
+        self.routes = routes or {}
+        self.meta = meta or {}
+
+    @staticmethod
+    def compact(data):
+        # Simpan hanya field yang dipakai SmartNavigator agar file tetap kecil
+        route = data['routes'][0]
+        legs = []
+        for leg in route.get('legs', []):
+            steps = []
+            for step in leg.get('steps', []):
+                maneuver = step.get('maneuver', {})
+                compact_maneuver = {'type': maneuver.get('type'), 'location': [round(v, 6) for v in maneuver['location']]}
+                if 'modifier' in maneuver:
+                    compact_maneuver['modifier'] = maneuver['modifier']
+                steps.append({
+                    'name': step.get('name', ''),
+                    'distance': round(step['distance'], 1),
+                    'duration': round(step.get('duration', 0.0), 1),
+                    'maneuver': compact_maneuver
+                })
+            legs.append({'steps': steps})
+        return {
+            'code': 'Ok',
+            'routes': [{
+                'distance': route['distance'],
+                'duration': route['duration'],
+                'geometry': {'coordinates': [[round(lng, 6), round(lat, 6)] for lng, lat in route['geometry']['coordinates']]},
+                'legs': legs
+            }]
+        }
+
+    def get(self, key):
+        return self.routes.get(key)
+
+    def add(self, key, data):
+        self.routes[key] = self.compact(data)
+
+    def __len__(self):
+        return len(self.routes)
+
+    def save(self, path):
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            json.dump({'meta': self.meta, 'routes': self.routes}, f, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            payload = json.load(f)
+        return cls(payload['routes'], payload.get('meta'))
+
+    @classmethod
+    def load_if_exists(cls, path):
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            matrix = cls.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.error("Failed to load route matrix %s: %s", path, e)
+            return None
+        logger.info("Loaded route matrix with %d routes from %s", len(matrix), path)
+        return matrix
+
+# ===================== MESIN RUTE LOKAL =====================
+class RoadGraph:
+    # Graf jalan berarah format CSR: edge keluar dari vertex v berada di indptr[v]:indptr[v + 1]
+    ACCESS_CAR, ACCESS_FOOT, ACCESS_BIKE = 1, 2, 4
+    # Kecepatan bebas hambatan (km/jam) kendaraan per kelas jalan OSM
+    HIGHWAY_SPEEDS = {
+        'motorway': 80, 'motorway_link': 50, 'trunk': 60, 'trunk_link': 40, 'primary': 50, 'primary_link': 35,
+        'secondary': 40, 'secondary_link': 30, 'tertiary': 35, 'tertiary_link': 25, 'unclassified': 30,
+        'residential': 25, 'living_street': 10, 'service': 15, 'track': 10, 'road': 25,
+    }
+    FOOT_ONLY = {'footway', 'pedestrian', 'path', 'steps', 'cycleway', 'bridleway'}
+    NO_FOOT = {'motorway', 'motorway_link', 'trunk', 'trunk_link'}
+
+    def __init__(self, lat, lng, indptr, sources, targets, lengths_m, speeds_kmh, access, name_ids, names):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lng = np.asarray(lng, dtype=np.float64)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.sources = np.asarray(sources, dtype=np.int32)
+        self.targets = np.asarray(targets, dtype=np.int32)
+        self.lengths_m = np.asarray(lengths_m, dtype=np.float32)
+        self.speeds_kmh = np.asarray(speeds_kmh, dtype=np.float32)
+        self.access = np.asarray(access, dtype=np.uint8)
+        self.name_ids = np.asarray(name_ids, dtype=np.int32)
+        self.names = list(names)
+
+    @property
+    def n_vertices(self):
+        return len(self.lat)
+
+    @property
+    def n_edges(self):
+        return len(self.targets)
+
+    @classmethod
+    def from_edges(cls, lat, lng, sources, targets, speeds_kmh, access, name_ids, names):
+        # Edge diurutkan per vertex asal lalu dikompres menjadi CSR; panjang dihitung sekaligus (haversine)
+        sources = np.asarray(sources, dtype=np.int64)
+        order = np.argsort(sources, kind='stable')
+        sources = sources[order]
+        targets = np.asarray(targets, dtype=np.int64)[order]
+        indptr = np.zeros(len(lat) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(lat)), out=indptr[1:])
+        lat_r, lng_r = np.radians(lat), np.radians(lng)
+        a = (np.sin((lat_r[targets] - lat_r[sources]) / 2) ** 2
+             + np.cos(lat_r[sources]) * np.cos(lat_r[targets]) * np.sin((lng_r[targets] - lng_r[sources]) / 2) ** 2)
+        lengths_m = 2 * SpatialIndex.EARTH_RADIUS_KM * 1000 * np.arcsin(np.sqrt(a))
+        return cls(lat, lng, indptr, sources, targets, lengths_m, np.asarray(speeds_kmh)[order],
+                   np.asarray(access)[order], np.asarray(name_ids)[order], names)
+
+    @classmethod
+    def from_osm_xml(cls, path):
+        # Ekstrak OSM XML (.osm / .osm.gz); hanya way ber-tag highway yang dipakai
+        import xml.etree.ElementTree as ElementTree
+
+        coords = {}
+        ways = []
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rb') as f:
+            for _, elem in ElementTree.iterparse(f, events=('end',)):
+                if elem.tag == 'node':
+                    coords[elem.get('id')] = (float(elem.get('lat')), float(elem.get('lon')))
+                    elem.clear()
+                elif elem.tag == 'way':
+                    tags = {tag.get('k'): tag.get('v') for tag in elem.iter('tag')}
+                    highway = tags.get('highway')
+                    if highway in cls.HIGHWAY_SPEEDS or highway in cls.FOOT_ONLY:
+                        ways.append(([nd.get('ref') for nd in elem.iter('nd')], highway, tags))
+                    elem.clear()
+                elif elem.tag == 'relation':
+                    elem.clear()
+
+        vertex_of = {}
+        names = ['']
+        name_of = {'': 0}
+        sources, targets, speeds, access, name_ids = [], [], [], [], []
+        for refs, highway, tags in ways:
+            refs = [ref for ref in refs if ref in coords]
+            if len(refs) < 2:
+                continue
+            speed = cls.HIGHWAY_SPEEDS.get(highway, 5)
+            maxspeed = tags.get('maxspeed', '').split(' ')[0]
+            if maxspeed.isdigit():
+                speed = min(speed, int(maxspeed))
+            car = highway in cls.HIGHWAY_SPEEDS and tags.get('motor_vehicle', tags.get('access')) not in ('no', 'private')
+            foot = highway not in cls.NO_FOOT and tags.get('foot', tags.get('access')) not in ('no', 'private')
+            bike = highway not in cls.NO_FOOT and highway not in ('footway', 'steps', 'pedestrian')
+            oneway = tags.get('oneway', '')
+            if oneway == '-1':
+                refs = refs[::-1]
+            oneway = oneway in ('yes', '1', 'true', '-1') or tags.get('junction') == 'roundabout' or highway == 'motorway'
+            forward = cls.ACCESS_CAR * car | cls.ACCESS_FOOT * foot | cls.ACCESS_BIKE * bike
+            # Jalan satu arah tetap bisa dilalui pejalan kaki ke dua arah
+            backward = forward & ~cls.ACCESS_CAR if oneway else forward
+            name = tags.get('name', '')
+            if name not in name_of:
+                name_of[name] = len(names)
+                names.append(name)
+            vertices = [vertex_of.setdefault(ref, len(vertex_of)) for ref in refs]
+            for a, b in zip(vertices, vertices[1:]):
+                for u, v, flags in ((a, b, forward), (b, a, backward)):
+                    if flags:
+                        sources.append(u)
+                        targets.append(v)
+                        speeds.append(speed)
+                        access.append(flags)
+                        name_ids.append(name_of[name])
+
+        lat = np.empty(len(vertex_of))
+        lng = np.empty(len(vertex_of))
+        for ref, vertex in vertex_of.items():
+            lat[vertex], lng[vertex] = coords[ref]
+        return cls.from_edges(lat, lng, sources, targets, speeds, access, name_ids, names)
+
+    def save(self, path):
+        np.savez_compressed(path, lat=self.lat, lng=self.lng, indptr=self.indptr, sources=self.sources,
+                            targets=self.targets, lengths_m=self.lengths_m, speeds_kmh=self.speeds_kmh,
+                            access=self.access, name_ids=self.name_ids, names=np.array(self.names, dtype=str))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['lat'], data['lng'], data['indptr'], data['sources'], data['targets'], data['lengths_m'],
+                       data['speeds_kmh'], data['access'], data['name_ids'], data['names'].tolist())
+
+class LocalRouter:
+    # Pengganti OSRMClient di dalam proses: route()/table() mengembalikan (status, data) berbentuk respons OSRM.
+    # Bobot ruas dibagi faktor kemacetan TrafficPredictor sehingga hasilnya tidak boleh masuk RouteCache.
+    cacheable = False
+    supports_alternatives = True
+    supports_reach = True
+    rate_limited = False
+    PROFILES = {
+        'driving': (RoadGraph.ACCESS_CAR, None),
+        'walking': (RoadGraph.ACCESS_FOOT, 5.0),
+        'cycling': (RoadGraph.ACCESS_BIKE, 15.0),
+    }
+
+    def __init__(self, graph, traffic_predictor, cache_size=256):
+        self.graph = graph
+        self.traffic_predictor = traffic_predictor
+        self.cache_size = cache_size
+        # Struktur yang disentuh di loop A* disimpan sebagai list Python (indeks list jauh lebih cepat dari array NumPy)
+        self._indptr = graph.indptr.tolist()
+        self._targets = graph.targets.tolist()
+        self._sources = graph.sources.tolist()
+        self._lengths = graph.lengths_m.tolist()
+        index = SpatialIndex(Config.NODES)
+        self._xy = index._project(graph.lat, graph.lng)
+        self._x = self._xy[:, 0].tolist()
+        self._y = self._xy[:, 1].tolist()
+
+        # Zona kemacetan tiap ruas: node Config terdekat (dari ujung ruas) dalam radius CONGESTION_RADIUS_KM.
+        # Ruas di luar semua radius memakai indeks terakhir (faktor 1.0).
+        self._zone_nodes = list(Config.NODES)
+        # Lewat grid SpatialIndex: hanya node di sel sekitar tiap vertex yang dihitung jaraknya (bukan matriks V x N)
+        nearest = index.nearest_within(np.column_stack([graph.lat, graph.lng]), Config.CONGESTION_RADIUS_KM)
+        order = np.argsort(index.node_ids)
+        found = nearest >= 0
+        vertex_zone = np.full(len(nearest), len(self._zone_nodes), dtype=np.int64)
+        vertex_zone[found] = order[np.searchsorted(index.node_ids[order], nearest[found])]
+        self._edge_zone = vertex_zone[graph.targets]
+
+        self._base = {}
+        self._snap_index = {}
+        self._weights = OrderedDict()
+        self._paths = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'failures': 0, 'alternatives': 0, 'path_cache_hits': 0}
+
+    def _base_seconds(self, profile):
+        # Waktu tempuh bebas hambatan per ruas; inf untuk ruas yang tidak boleh dilalui profil ini
+        base = self._base.get(profile)
+        if base is None:
+            flag, speed = self.PROFILES[profile]
+            speeds = self.graph.speeds_kmh if speed is None else np.full(self.graph.n_edges, speed, dtype=np.float32)
+            base = self.graph.lengths_m.astype(np.float64) / speeds * 3.6
+            base[(self.graph.access & flag) == 0] = np.inf
+            self._base[profile] = base
+        return base
+
+    def _max_speed_ms(self, profile):
+        flag, speed = self.PROFILES[profile]
+        if speed is not None:
+            return speed / 3.6
+        allowed = (self.graph.access & flag) != 0
+        return float(self.graph.speeds_kmh[allowed].max()) / 3.6 if allowed.any() else 1.0
+
+    def _congested_weights(self, profile, at=None):
+        # Bobot A* untuk bucket kemacetan waktu `at` (default sekarang); dihitung ulang hanya jika faktor node berubah
+        snapshot = self.traffic_predictor.snapshot(at)
+        factors = np.array([snapshot[node_id]['factor'] for node_id in self._zone_nodes] + [1.0])  # + zona "tanpa node"
+        key = (profile, tuple(factors.tolist()))
+        with self._lock:
+            cached = self._weights.get(key)
+            if cached is not None:
+                self._weights.move_to_end(key)
+                return key, cached
+        weights = self._base_seconds(profile) / factors[self._edge_zone]
+        padat = np.array([snapshot[node_id]['level'] == 'padat' for node_id in self._zone_nodes] + [False])
+        cached = (weights, weights.tolist(), padat[self._edge_zone])
+        with self._lock:
+            self._weights[key] = cached
+            while len(self._weights) > 8:
+                self._weights.popitem(last=False)
+        return key, cached
+
+    def _snap(self, coords, profile):
+        index = self._snap_index.get(profile)
+        if index is None:
+            flag, _ = self.PROFILES[profile]
+            usable = np.zeros(self.graph.n_vertices, dtype=bool)
+            usable[self.graph.sources[(self.graph.access & flag) != 0]] = True
+            vertices = np.nonzero(usable)[0]
+            index = SpatialIndex.from_arrays(vertices, self.graph.lat[vertices], self.graph.lng[vertices], cell_km=0.25)
+            self._snap_index[profile] = index
+        vertex = index.nearest(coords)
+        # Kedua titik diproyeksikan dengan indeks snap yang sama (self._xy memakai lintang acuan Config.NODES)
+        snapped = index._project(self.graph.lat[vertex], self.graph.lng[vertex])
+        distance_km = float(np.hypot(*(snapped - index._project(np.float64(coords[0]), np.float64(coords[1])))))
+        return vertex if distance_km <= Config.LOCAL_SNAP_MAX_KM else None
+
+    def _astar(self, weights, source, target, max_speed_ms):
+        # A* dengan heuristik jarak lurus / kecepatan maksimum (admissible karena faktor kemacetan <= 1)
+        if source == target:
+            return []
+        indptr, targets, xs, ys = self._indptr, self._targets, self._x, self._y
+        tx, ty = xs[target], ys[target]
+        scale = 1000 / max_speed_ms
+        best = {source: 0.0}
+        prev_edge = {}
+        heap = [(math.hypot(xs[source] - tx, ys[source] - ty) * scale, 0.0, source)]
+        inf = float('inf')
+        while heap:
+            _, cost, vertex = heapq.heappop(heap)
+            if vertex == target:
+                path = []
+                while vertex != source:
+                    edge = prev_edge[vertex]
+                    path.append(edge)
+                    vertex = self._sources[edge]
+                return path[::-1]
+            if cost > best[vertex]:
+                continue
+            for edge in range(indptr[vertex], indptr[vertex + 1]):
+                new_cost = cost + weights[edge]
+                nxt = targets[edge]
+                if new_cost < best.get(nxt, inf):
+                    best[nxt] = new_cost
+                    prev_edge[nxt] = edge
+                    heapq.heappush(heap, (new_cost + math.hypot(xs[nxt] - tx, ys[nxt] - ty) * scale, new_cost, nxt))
+        return None
+
+    def _dijkstra(self, weights, source, wanted):
+        # Satu-ke-banyak untuk table(); berhenti setelah semua target terjangkau. Return {vertex: (detik, meter)}
+        indptr, targets, lengths = self._indptr, self._targets, self._lengths
+        best = {source: 0.0}
+        meters = {source: 0.0}
+        remaining = set(wanted) - {source}
+        heap = [(0.0, source)]
+        inf = float('inf')
+        while heap and remaining:
+            cost, vertex = heapq.heappop(heap)
+            if cost > best[vertex]:
+                continue
+            remaining.discard(vertex)
+            for edge in range(indptr[vertex], indptr[vertex + 1]):
+                new_cost = cost + weights[edge]
+                nxt = targets[edge]
+                if new_cost < best.get(nxt, inf):
+                    best[nxt] = new_cost
+                    meters[nxt] = meters[vertex] + lengths[edge]
+                    heapq.heappush(heap, (new_cost, nxt))
+        return {vertex: (best[vertex], meters[vertex]) for vertex in wanted if vertex in best}
+
+    def _reachable(self, weights, source, max_cost):
+        # Dijkstra terpotong untuk reach(): semua vertex dengan biaya <= max_cost.
+        # Return ({vertex: detik}, {vertex: meter}, {vertex: vertex sebelumnya di jalur terpendek})
+        indptr, targets, lengths = self._indptr, self._targets, self._lengths
+        best = {source: 0.0}
+        meters = {source: 0.0}
+        parent = {source: source}
+        heap = [(0.0, source)]
+        inf = float('inf')
+        while heap:
+            cost, vertex = heapq.heappop(heap)
+            if cost > best[vertex]:
+                continue
+            for edge in range(indptr[vertex], indptr[vertex + 1]):
+                new_cost = cost + weights[edge]
+                nxt = targets[edge]
+                if new_cost <= max_cost and new_cost < best.get(nxt, inf):
+                    best[nxt] = new_cost
+                    meters[nxt] = meters[vertex] + lengths[edge]
+                    parent[nxt] = vertex
+                    heapq.heappush(heap, (new_cost, nxt))
+        return best, meters, parent
+
+    def _legs(self, vertices, weights_key, weights, profile):
+        max_speed_ms = self._max_speed_ms(profile)
+        legs = []
+        for source, target in zip(vertices, vertices[1:]):
+            key = (weights_key, source, target)
+            with self._lock:
+                path = self._paths.get(key)
+                if path is not None:
+                    self._paths.move_to_end(key)
+                    self.stats['path_cache_hits'] += 1
+            if path is None:
+                path = self._astar(weights, source, target, max_speed_ms)
+                if path is None:
+                    return None
+                with self._lock:
+                    self._paths[key] = path
+                    while len(self._paths) > self.cache_size:
+                        self._paths.popitem(last=False)
+            legs.append(path)
+        return legs
+
+    def _alternative_legs(self, primary, vertices, weights_array, padat, profile):
+        # Metode penalti: ruas rute sebelumnya dan ruas di zona padat diperberat, lalu A* diulang
+        lengths = self.graph.lengths_m
+        max_speed_ms = self._max_speed_ms(profile)
+        penalized = weights_array * np.where(padat, Config.LOCAL_ALT_CONGESTION_PENALTY, 1.0)
+        used = np.zeros(0, dtype=np.int64)
+        latest = primary
+        alternatives = []
+        for _ in range(Config.LOCAL_ALTERNATIVES):
+            new_edges = np.array([edge for path in latest for edge in path], dtype=np.int64)
+            penalized[new_edges] *= Config.LOCAL_ALT_PENALTY
+            used = np.union1d(used, new_edges)
+            penalized_list = penalized.tolist()
+            candidate = []
+            for source, target in zip(vertices, vertices[1:]):
+                path = self._astar(penalized_list, source, target, max_speed_ms)
+                if path is None:
+                    return alternatives
+                candidate.append(path)
+            edges = np.array([edge for path in candidate for edge in path], dtype=np.int64)
+            total = float(lengths[edges].sum())
+            shared = float(lengths[np.intersect1d(edges, used)].sum())
+            # Alternatif yang hampir sama dengan rute sebelumnya tidak berguna
+            if not total or shared / total > Config.LOCAL_ALT_MAX_OVERLAP:
+                break
+            alternatives.append(candidate)
+            latest = candidate
+        return alternatives
+
+    @staticmethod
+    def _modifier(turn):
+        if abs(turn) < 30:
+            return 'straight'
+        side = 'right' if turn > 0 else 'left'
+        return side if abs(turn) < 120 else f"sharp {side}"
+
+    def _route_json(self, legs, profile):
+        graph = self.graph
+        base = self._base_seconds(profile)
+        lat, lng = graph.lat, graph.lng
+        all_edges = [edge for path in legs for edge in path]
+        vertices = [int(graph.sources[all_edges[0]])] + graph.targets[all_edges].tolist() if all_edges else []
+        geometry = [[float(lng[v]), float(lat[v])] for v in vertices]
+        bearings = np.degrees(np.arctan2(
+            (lng[graph.targets[all_edges]] - lng[graph.sources[all_edges]]) * math.cos(math.radians(float(lat.mean()))),
+            lat[graph.targets[all_edges]] - lat[graph.sources[all_edges]])) if all_edges else np.zeros(0)
+
+        route_legs = []
+        position = 0
+        for leg_index, path in enumerate(legs):
+            steps = []
+            for i, edge in enumerate(path):
+                name = graph.names[graph.name_ids[edge]]
+                if steps and name == steps[-1]['name']:
+                    steps[-1]['distance'] += float(graph.lengths_m[edge])
+                    steps[-1]['duration'] += float(base[edge])
+                    continue
+                source = graph.sources[edge]
+                maneuver = {'type': 'depart', 'location': [float(lng[source]), float(lat[source])]}
+                if steps:
+                    turn = (bearings[position + i] - bearings[position + i - 1] + 180) % 360 - 180
+                    modifier = self._modifier(turn)
+                    maneuver.update(type='continue' if modifier == 'straight' else 'turn', modifier=modifier)
+                steps.append({'name': name or 'Jalan tanpa nama', 'distance': float(graph.lengths_m[edge]),
+                              'duration': float(base[edge]), 'maneuver': maneuver})
+            end_vertex = graph.targets[path[-1]] if path else None
+            if end_vertex is not None:
+                steps.append({'name': steps[-1]['name'], 'distance': 0.0, 'duration': 0.0,
+                              'maneuver': {'type': 'arrive', 'location': [float(lng[end_vertex]), float(lat[end_vertex])]}})
+            position += len(path)
+            route_legs.append({
+                'steps': steps,
+                'distance': float(graph.lengths_m[path].sum()) if path else 0.0,
+                'duration': float(base[path].sum()) if path else 0.0,
+            })
+        return {
+            'distance': sum(leg['distance'] for leg in route_legs),
+            'duration': sum(leg['duration'] for leg in route_legs),
+            'geometry': {'type': 'LineString', 'coordinates': geometry},
+            'legs': route_legs,
+        }
+
+    @metrics.timed('local_route')
+    def route(self, coords, profile, access=None, alternatives=False, at=None):
+        # access diabaikan: graf lokal sudah memuat jalan kecil (service, living_street)
+        with self._lock:
+            self.stats['requests'] += 1
+        if profile not in self.PROFILES:
+            return 400, {'code': 'InvalidValue', 'message': f"Profil '{profile}' tidak didukung"}
+        vertices = [self._snap(point, profile) for point in coords]
+        if any(vertex is None for vertex in vertices):
+            with self._lock:
+                self.stats['failures'] += 1
+            return 400, {'code': 'NoSegment', 'message': 'Titik berada di luar jaringan jalan'}
+
+        weights_key, (weights_array, weights, padat) = self._congested_weights(profile, at)
+        primary = self._legs(vertices, weights_key, weights, profile)
+        if primary is None:
+            with self._lock:
+                self.stats['failures'] += 1
+            return 400, {'code': 'NoRoute', 'message': 'Tidak ada rute di antara titik tersebut'}
+
+        routes = [self._route_json(primary, profile)]
+        if alternatives:
+            for legs in self._alternative_legs(primary, vertices, weights_array, padat, profile):
+                routes.append(self._route_json(legs, profile))
+            with self._lock:
+                self.stats['alternatives'] += len(routes) - 1
+        return 200, {'code': 'Ok', 'routes': routes}
+
+    def table(self, coords, profile, sources=None):
+        # Durasi bebas hambatan seperti OSRM table; koreksi kemacetan dilakukan SmartNavigator.duration_matrix
+        if profile not in self.PROFILES:
+            return 400, {'code': 'InvalidValue', 'message': f"Profil '{profile}' tidak didukung"}
+        vertices = [self._snap(point, profile) for point in coords]
+        weights = self._base_seconds(profile).tolist()
+        wanted = [vertex for vertex in vertices if vertex is not None]
+        durations, distances = [], []
+        for source in (vertices if sources is None else [vertices[i] for i in sources]):
+            reached = self._dijkstra(weights, source, wanted) if source is not None else {}
+            durations.append([reached[target][0] if target in reached else None for target in vertices])
+            distances.append([reached[target][1] if target in reached else None for target in vertices])
+        return 200, {'code': 'Ok', 'durations': durations, 'distances': distances}
+
+    @metrics.timed('local_reach')
+    def reach(self, coords, profile, max_seconds):
+        # Semua vertex yang terjangkau dari coords dalam max_seconds bebas hambatan (satuan sama dengan table) lewat
+        # satu Dijkstra terpotong. Hanya dipanggil di dalam proses, jadi hasilnya langsung berupa array NumPy.
+        if profile not in self.PROFILES:
+            return 400, {'code': 'InvalidValue', 'message': f"Profil '{profile}' tidak didukung"}
+        source = self._snap(coords, profile)
+        if source is None:
+            return 400, {'code': 'NoSegment', 'message': 'Titik berada di luar jaringan jalan'}
+        best, meters, parent = self._reachable(self._base_seconds(profile).tolist(), source, max_seconds)
+        vertices = np.fromiter(best, dtype=np.int64, count=len(best))
+        position = dict(zip(best, range(len(best))))
+        return 200, {
+            'code': 'Ok',
+            'lat': self.graph.lat[vertices].astype(np.float64),
+            'lng': self.graph.lng[vertices].astype(np.float64),
+            'durations': np.fromiter(best.values(), dtype=np.float64, count=len(best)),
+            'distances': np.fromiter(meters.values(), dtype=np.float64, count=len(meters)),
+            # Indeks (dalam array ini) vertex sebelumnya di jalur terpendek; titik asal menunjuk dirinya sendiri
+            'parents': np.fromiter((position[parent[vertex]] for vertex in best), dtype=np.int64, count=len(best)),
+        }
+
+    def warm(self):
+        # Indeks snap dan bobot ruas dibangun sebelum fork agar dipakai bersama semua worker (copy-on-write)
+        for profile in self.PROFILES:
+            self._snap((Config.NODES[1]['lat'], Config.NODES[1]['lng']), profile)
+            self._congested_weights(profile)
+
+    def after_fork(self):
+        pass
+
+    def info(self):
+        with self._lock:
+            return dict(self.stats, backend='local', vertices=self.graph.n_vertices, edges=self.graph.n_edges,
+                        cached_paths=len(self._paths))
+
+# ===================== PEMROSESAN LANGKAH RUTE =====================
+class RouteSteps:
+    DIRECTIONS = np.array(['Utara', 'Timur Laut', 'Timur', 'Tenggara', 'Selatan', 'Barat Daya', 'Barat', 'Barat Laut'])
+
+    def __init__(self, names, maneuver_types, modifiers, directions, distances_km, durations_min, nodes, congestion):
+        self.names = names
+        self.maneuver_types = maneuver_types
+        self.modifiers = modifiers
+        self.directions = directions
+        self.distances_km = distances_km
+        self.durations_min = durations_min
+        self.nodes = nodes
+        self.congestion = congestion  # per langkah, hasil TrafficPredictor.predict_steps
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def bearing_directions(cls, start, end):
+        # Versi vektor dari SmartNavigator.calculate_bearing; start/end berupa array (n, 2) lat, lng
+        lat1, lon1 = np.radians(start[:, 0]), np.radians(start[:, 1])
+        lat2, lon2 = np.radians(end[:, 0]), np.radians(end[:, 1])
+        delta_lon = lon2 - lon1
+        y = np.sin(delta_lon) * np.cos(lat2)
+        x = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(delta_lon)
+        bearing = (np.degrees(np.arctan2(y, x)) + 360) % 360
+        return cls.DIRECTIONS[((bearing + 22.5) / 45).astype(np.int64) % 8]
+
+    def to_dicts(self):
+        # String hanya dibentuk di sini, saat hasil rute diserialisasi
+        steps = []
+        for i in range(len(self.names)):
+            instruction = self.names[i]
+            if self.maneuver_types[i] == 'turn':
+                instruction = f"Belok {'kiri' if 'left' in self.modifiers[i] else 'kanan'} di {instruction}"
+            congestion = self.congestion[i]
+            steps.append({
+                'instruction': f"{instruction} menuju arah {self.directions[i]}",
+                'distance': f"{self.distances_km[i]:.1f} km",
+                'time': f"{self.durations_min[i]:.0f} menit",
+                'condition': f"Kondisi jalan: {congestion['level']} ({congestion['reason']})"
+            })
+        return steps
+
+# ===================== SISTEM NAVIGASI =====================
+class SmartNavigator:
+    def __init__(self, route_cache=None, route_matrix=None, osrm_client=None, traffic_predictor=None, upstream_budget=None):
+        self.traffic_predictor = traffic_predictor or TrafficPredictor()
+        self.route_cache = route_cache or RouteCache()
+        self.route_matrix = route_matrix
+        self.osrm = osrm_client or OSRMClient()
+        self.upstream = upstream_budget or UpstreamBudget()
+        self.executor = ThreadPoolExecutor(max_workers=Config.OSRM_WORKERS, thread_name_prefix='osrm')
+        self.node_index = SpatialIndex(Config.NODES)
+        # (berhasil, detik) request access=customer terakhir, untuk jeda hedge fallback
+        self._customer_history = deque(maxlen=Config.OSRM_HEDGE_WINDOW)
+        self.fallback_stats = {'hedged': 0, 'after_failure': 0}
+        self.result_cache = RouteCache(max_size=Config.RESULT_CACHE_SIZE, db_path='', store=open_cache_store('results'), namespace='results')
+        self.result_stats = {'revalidated': 0, 'invalidated': 0}
+        self._flight = SingleFlight()
+        # Waktu tempuh bebas hambatan ke titik sampel per (asal, moda, batas menit) dan hasil isokron per kondisi kemacetan
+        self.reach_cache = RouteCache(max_size=Config.ISOCHRONE_REACH_CACHE_SIZE, db_path='', namespace='reach')
+        self.isochrone_cache = RouteCache(max_size=Config.ISOCHRONE_CACHE_SIZE, db_path='', namespace='isochrones')
+        # Durasi, jarak dan panjang per zona kemacetan rute tiap pasangan lokasi yang sudah di-cache, dan garis lurus
+        # antar lokasi per zona (bahan matriks durasi)
+        self.path_cache = RouteCache(db_path='', namespace='paths')
+        self._lines = None
+
+    def after_fork(self):
+        # Thread pool, koneksi SQLite dan pool HTTP dari proses induk tidak bisa dipakai di proses anak
+        self.executor = ThreadPoolExecutor(max_workers=Config.OSRM_WORKERS, thread_name_prefix='osrm')
+        self.route_cache.reopen()
+        self.result_cache.reopen()
+        self.osrm.after_fork()
+        self.upstream.after_fork()
+
+    def calculate_bearing(self, start_coords, end_coords):
+        lat1, lon1 = math.radians(start_coords[0]), math.radians(start_coords[1])
+        lat2, lon2 = math.radians(end_coords[0]), math.radians(end_coords[1])
+        delta_lon = lon2 - lon1
+        y = math.sin(delta_lon) * math.cos(lat2)
+        x = math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * math.cos(lat2) * math.cos(delta_lon)
+        bearing = math.degrees(math.atan2(y, x))
+        bearing = (bearing + 360) % 360
+        directions = ['Utara', 'Timur Laut', 'Timur', 'Tenggara', 'Selatan', 'Barat Daya', 'Barat', 'Barat Laut']
+        return directions[int((bearing + 22.5) / 45) % 8]
+
+    def _use_narrow(self, transport_type):
+        return Config.TRANSPORT_PROFILES[transport_type].get('prefer_narrow', False) and transport_type == 'motor'
+
+    def _osrm_key(self, coords, transport_type):
+        profile = Config.TRANSPORT_PROFILES[transport_type]['profile']
+        return RouteCache.make_key(coords, profile, 'customer' if self._use_narrow(transport_type) else None)
+
+    def _fetch_osrm(self, coords, transport_type, alternatives=False, optional=False, at=None):
+        profile = Config.TRANSPORT_PROFILES[transport_type]['profile']
+        use_narrow = self._use_narrow(transport_type)
+
+        if not self.osrm.cacheable:
+            # Mesin lokal: bobot mengikuti kemacetan pada waktu `at` dan path sudah di-cache oleh mesin itu sendiri
+            options = {'alternatives': True} if alternatives else {}
+            return self.osrm.route(coords, profile, at=at, **options)[1]
+
+        key = self._osrm_key(coords, transport_type)
+        if self.route_matrix is not None:
+            precomputed = self.route_matrix.get(key)
+            if precomputed is not None:
+                return precomputed
+
+        # Request identik yang bersamaan (antar thread, dan antar worker jika tier cache bersama aktif) hanya
+        # menghasilkan satu request OSRM
+        return self.route_cache.get_or_compute(key, lambda: self._request_osrm(coords, profile, use_narrow, optional),
+                                               should_store=lambda data: data.get('code') == 'Ok')
+
+    def _acquire_upstream(self, optional=False):
+        # Satu token anggaran per request ke server OSRM; mesin rute lokal tidak dibatasi
+        if not self.osrm.rate_limited:
+            return
+        client, priority = _upstream_client.get() or ('-', 'background')
+        if not self.upstream.acquire(client, priority, optional):
+            raise UpstreamBusy(self.upstream.retry_after())
+
+    def _request_osrm(self, coords, profile, use_narrow, optional=False):
+        fallback = None
+        if use_narrow:
+            # Hedge: fallback tanpa access baru dikirim jika access=customer belum selesai setelah jeda, sehingga
+            # customer yang lambat lalu gagal tidak menambah satu round trip penuh, sedangkan customer yang cepat
+            # berhasil hanya memakai satu request (dan satu token anggaran)
+            delay = self._hedge_delay()
+            finished = threading.Event()
+            if delay is not None:
+                fallback = self.executor.submit(contextvars.copy_context().run, self._hedged_default, coords, profile, optional, finished, delay)
+            started = time.monotonic()
+            try:
+                self._acquire_upstream(optional)
+                status, data = self.osrm.route(coords, profile, access='customer')
+            finally:
+                finished.set()
+            ok = status == 200 and data.get('code') == 'Ok'
+            self._customer_history.append((ok, time.monotonic() - started))
+            if ok:
+                return data
+            logger.warning("Failed with access=customer, falling back to default: %s", data.get('message', 'Unknown error'))
+            # Fallback yang belum mendapat thread, atau belum dikirim saat customer gagal, dijalankan di sini
+            if fallback is not None and not fallback.cancel():
+                hedged = fallback.result()
+                if hedged is not None:
+                    return hedged
+            self.fallback_stats['after_failure'] += 1
+        return self._request_default(coords, profile, optional, use_narrow)
+
+    def _hedge_delay(self):
+        # Detik sebelum fallback di-hedge; None = fallback hanya dikirim setelah customer gagal. Tidak di-hedge saat
+        # anggaran OSRM sudah antre, atau jika satu jendela penuh hasil customer terakhir semuanya berhasil.
+        history = list(self._customer_history)
+        if self.upstream.busy() or (len(history) == self._customer_history.maxlen and all(ok for ok, _ in history)):
+            return None
+        latencies = sorted(seconds for ok, seconds in history if ok)
+        return latencies[len(latencies) // 2] if latencies else Config.OSRM_HEDGE_DELAY
+
+    def _hedged_default(self, coords, profile, optional, finished, delay):
+        if finished.wait(delay):
+            return None
+        self.fallback_stats['hedged'] += 1
+        return self._request_default(coords, profile, optional, True)
+
+    def _request_default(self, coords, profile, optional, store):
+        self._acquire_upstream(optional)
+        status, data = self.osrm.route(coords, profile)
+        if status == 200 and data.get('code') == 'Ok' and store:
+            # Hasil fallback juga disimpan di kunci tanpa access; kunci access=customer diisi get_or_compute
+            # agar tidak mengulang request yang pasti gagal
+            self.route_cache.set(RouteCache.make_key(coords, profile), data)
+        return data
+
+    @metrics.timed('process_steps')
+    def _process_steps(self, route, transport_type, at=None):
+        transport = Config.TRANSPORT_PROFILES[transport_type]
+        legs = [leg.get('steps', []) for leg in route.get('legs', [])]
+        steps = [step for leg in legs for step in leg]
+        if not steps:
+            return RouteSteps([], [], [], [], np.zeros(0), np.zeros(0), [], [])
+
+        locations = np.array([step['maneuver']['location'] for step in steps], dtype=np.float64)[:, ::-1]
+        distances_km = np.array([step['distance'] for step in steps], dtype=np.float64) / 1000
+        durations_min = distances_km / transport['base_speed'] * 60 / transport['congestion_factor']
+
+        # Arah dihitung ke langkah berikutnya dalam leg yang sama; langkah terakhir tiap leg "Lurus"
+        directions = RouteSteps.bearing_directions(locations, np.roll(locations, -1, axis=0))
+        is_last = np.zeros(len(steps), dtype=bool)
+        is_last[np.cumsum([len(leg) for leg in legs if leg]) - 1] = True
+        directions = np.where(is_last, 'Lurus', directions)
+
+        nodes = self._find_nearest_nodes(locations)
+        congestion = self.traffic_predictor.predict_steps(nodes, distances_km, at)
+        return RouteSteps(
+            [step.get('name', 'Lanjutkan') for step in steps],
+            [step.get('maneuver', {}).get('type') for step in steps],
+            [step.get('maneuver', {}).get('modifier', '') for step in steps],
+            directions.tolist(),
+            distances_km,
+            durations_min,
+            nodes,
+            congestion
+        )
+
+    def _prefetch_osrm(self, route_requests):
+        # Ambil semua request OSRM (coords, transport) yang belum tersedia secara bersamaan. Tiap kunci melewati
+        # _fetch_osrm sehingga tetap digabung dengan request identik lain yang sedang berjalan.
+        # Prefetch hanya mempercepat; saat anggaran OSRM sudah antre, request diambil berurutan oleh pemanggil
+        if not self.osrm.cacheable or self.upstream.busy():
+            return
+        futures = []
+        seen = set()
+        for coords, transport_type in route_requests:
+            key = self._osrm_key(coords, transport_type)
+            if key in seen or (self.route_matrix is not None and self.route_matrix.get(key) is not None) or key in self.route_cache:
+                continue
+            seen.add(key)
+            # Thread pool ikut membawa identitas klien request agar anggarannya tercatat atas klien itu
+            futures.append(self.executor.submit(contextvars.copy_context().run, self._fetch_osrm, coords, transport_type))
+        for future in futures:
+            try:
+                future.result()
+            except UpstreamBusy:
+                pass
+
+    def _fetch_osrm_table(self, coords, transport_type, sources=None):
+        profile = Config.TRANSPORT_PROFILES[transport_type]['profile']
+        key = RouteCache.make_key(coords, f"table/{profile}" + (f"/sources={','.join(map(str, sources))}" if sources is not None else ''))
+        cached = self.route_cache.get(key)
+        if cached is not None:
+            return cached
+        self._acquire_upstream()
+        status, data = self.osrm.table(coords, profile, sources)
+        if status == 200 and data.get('code') == 'Ok':
+            self.route_cache.set(key, data)
+        return data
+
+    def _adjusted_durations(self, durations, distances, transport_type):
+        # Versi array dari penyesuaian kecepatan di get_route_from_api (menit, km)
+        base_speed = Config.TRANSPORT_PROFILES[transport_type]['base_speed']
+        if Config.TRANSPORT_PROFILES[transport_type]['profile'] == 'driving':
+            return durations * (50 / base_speed)
+        return np.maximum(durations, distances / base_speed * 60)
+
+    def get_route_from_api(self, start_coords, end_coords, transport_type, at=None):
+        if transport_type not in Config.TRANSPORT_PROFILES:
+            logger.error("Invalid transport type: %s", transport_type)
+            return None
+            
+        profile = Config.TRANSPORT_PROFILES[transport_type]['profile']
+        base_speed = Config.TRANSPORT_PROFILES[transport_type]['base_speed']
+        
+        data = self._fetch_osrm([start_coords, end_coords], transport_type, at=at)
+            
+        if data.get('code') == 'Ok':
+            route = data['routes'][0]
+            distance = route['distance'] / 1000
+            duration = route['duration'] / 60
+            geometry = route['geometry']['coordinates']
+            
+            latlng = np.asarray(geometry, dtype=np.float64)[:, ::-1] if geometry else np.zeros((0, 2))
+            path = latlng.tolist()
+            
+            route_steps = self._process_steps(route, transport_type, at)
+            steps = route_steps.to_dicts()
+            congestion_factor, along_route = self._route_congestion(latlng, at)
+            
+            if not steps:
+                nearest_start_node = self._find_nearest_node(start_coords)
+                nearest_end_node = self._find_nearest_node(end_coords)
+                total_duration = (distance / base_speed) * 60
+                steps = [{
+                    'instruction': f"Bergerak dari {Config.NODES[nearest_start_node]['name']} ke {Config.NODES[nearest_end_node]['name']}",
+                    'distance': f"{distance:.1f} km",
+                    'time': f"{total_duration:.0f} menit",
+                    'condition': "Kondisi jalan: Tidak tersedia"
+                }]
+            
+            if profile == 'driving':
+                speed_adjustment = 50 / base_speed
+                adjusted_duration = duration * speed_adjustment
+            else:
+                adjusted_duration = duration
+                fallback_duration = (distance / base_speed) * 60
+                adjusted_duration = max(adjusted_duration, fallback_duration)
+            
+            return {
+                'distance': f"{distance:.1f} km",
+                'time': f"{adjusted_duration:.0f} menit",
+                'path': path,
+                'steps': steps,
+                'raw_duration': duration,
+                'raw_distance': distance,
+                'speed_adjusted_duration': adjusted_duration,
+                'congestion_factor': congestion_factor,
+                'congestion_along_route': {Config.NODES[node_id]['name']: congestion for node_id, congestion in along_route.items()},
+                '_depends_on': set(route_steps.nodes) | set(along_route)
+            }
+        logger.error("OSRM API error: %s", data.get('message', 'Unknown error'))
+        return None
+
+    @metrics.timed('route_search')
+    def find_all_routes(self, start, end, transport_type, at=None):
+        # Satu timestamp untuk seluruh request agar semua prediksi konsisten
+        at = at or self.traffic_predictor.now()
+        try:
+            start = int(start)
+            end = int(end)
+        except (ValueError, TypeError):
+            logger.error("Invalid start/end IDs: start=%s, end=%s", start, end)
+            return {"error": "ID lokasi tidak valid"}
+
+        if start not in Config.NODES or end not in Config.NODES:
+            logger.error("Invalid nodes: start=%s, end=%s", start, end)
+            return {"error": "Lokasi tidak valid"}
+        
+        if transport_type not in Config.TRANSPORT_PROFILES:
+            logger.error("Invalid transport type: %s", transport_type)
+            return {"error": f"Moda transportasi '{transport_type}' tidak valid"}
+        
+        key = f"{start}|{end}|{transport_type}"
+        snapshot = self.traffic_predictor.snapshot(at)
+        cached = self._cached_routes(key, snapshot)
+        if cached is not None:
+            return cached
+        
+        # Single-flight: saat kondisi berubah, hanya satu thread yang menghitung ulang rute yang sama
+        try:
+            return self._flight.do((key, str(snapshot.version)), lambda: self._recompute_routes(key, snapshot, start, end, transport_type, at))
+        except UpstreamBusy as busy:
+            # Anggaran OSRM habis untuk rute utama: hasil terakhir (kondisi kemacetan sebelumnya) lebih baik
+            # daripada menolak request
+            entry = self.result_cache.get(key)
+            if entry is not None:
+                return dict(entry['result'], degraded=True)
+            return self._busy_error(busy)
+
+    def _busy_error(self, busy):
+        logger.debug("OSRM budget exhausted: %s", busy)
+        return {"error": "Layanan peta sedang sibuk, coba lagi sebentar lagi", "retry_after": busy.retry_after}
+
+    def _recompute_routes(self, key, snapshot, start, end, transport_type, at):
+        cached = self._cached_routes(key, snapshot, record=False)
+        if cached is not None:
+            return cached
+        result, depends_on = self._compute_routes(start, end, transport_type, at)
+        if 'error' not in result:
+            nodes = self._dependencies(depends_on)
+            # Hasil tanpa alternatif hanya berlaku selama anggaran OSRM proses ini sibuk, jadi tidak dibagi ke
+            # worker lain lewat tier bersama
+            self.result_cache.set(key, {
+                'result': result,
+                'version': str(snapshot.version),
+                'nodes': nodes,
+                'fingerprint': self._fingerprint(nodes, snapshot)
+            }, shared=not result.get('degraded'))
+        return result
+
+    def _dependencies(self, depends_on):
+        # Mesin lokal memilih jalur berdasarkan bobot seluruh zona, jadi hasilnya bergantung pada semua node
+        if not self.osrm.cacheable:
+            return list(Config.NODES)
+        return sorted(depends_on)
+
+    def _fingerprint(self, nodes, snapshot):
+        # None: hasil bergantung langsung pada bucket waktu (model menilai langkah dengan fitur jam)
+        if self.traffic_predictor.model.uses_length:
+            return None
+        return [[node_id, snapshot[node_id]['level'], snapshot[node_id]['factor'], snapshot[node_id]['reason']] for node_id in nodes]
+
+    def _cached_routes(self, key, snapshot, record=True):
+        # record=False untuk pengecekan ulang di dalam lock agar statistik tidak terhitung dua kali
+        entry = self.result_cache.get(key)
+        if entry is None:
+            return None
+        # Hasil tanpa alternatif (anggaran OSRM habis) dipakai ulang hanya selama anggaran masih sibuk, mis. oleh
+        # /api/map/route tepat setelah pencarian di halaman; setelah itu dihitung lengkap
+        if entry['result'].get('degraded') and not self.upstream.busy():
+            return None
+        if entry['version'] == str(snapshot.version):
+            return entry['result']
+        # Bucket baru atau data live baru: hasil lama tetap benar jika kondisi semua node yang dilalui rute tidak berubah
+        if entry['fingerprint'] is not None and entry['fingerprint'] == self._fingerprint(entry['nodes'], snapshot):
+            entry['version'] = str(snapshot.version)
+            if record:
+                self.result_stats['revalidated'] += 1
+            return entry['result']
+        if record:
+            self.result_stats['invalidated'] += 1
+        return None
+
+    def _route_congestion(self, latlng, at):
+        # Faktor kemacetan efektif sepanjang rute: waktu tiap segmen dibagi faktor node terdekat dalam
+        # CONGESTION_RADIUS_KM (segmen di luar semua radius dianggap lancar). Return (faktor, {node_id: kondisi}).
+        if len(latlng) < 2:
+            return 1.0, {}
+        snapshot = self.traffic_predictor.snapshot(at)
+        zones, zone_km = self._zone_lengths(latlng)
+        along_route = {int(node_id): snapshot[int(node_id)] for node_id in zones[zones >= 0]}
+        return self._path_factor(zones, zone_km, self._factor_lookup(snapshot)), along_route
+
+    def _zone_lengths(self, latlng):
+        # Panjang rute (km) per zona kemacetan: (node zona, km); node -1 = segmen di luar semua radius
+        segment_km, zones = self._route_segments(latlng)
+        zones, inverse = np.unique(zones, return_inverse=True)
+        return zones, np.bincount(inverse, weights=segment_km, minlength=len(zones))
+
+    def _factor_lookup(self, snapshot):
+        # Faktor kemacetan per ID node; elemen terakhir (indeks -1) = di luar semua zona
+        lookup = np.ones(int(self.node_index.node_ids.max()) + 2)
+        lookup[self.node_index.node_ids] = [snapshot[node_id]['factor'] for node_id in self.node_index.node_ids.tolist()]
+        return lookup
+
+    @staticmethod
+    def _path_factor(zones, zone_km, lookup):
+        weighted = float((zone_km / lookup[zones]).sum())
+        return float(zone_km.sum()) / weighted if weighted else 1.0
+
+    def _route_segments(self, latlng):
+        # Panjang tiap segmen geometri (km) dan node zona kemacetannya (-1 = di luar semua radius)
+        return self._segments(latlng[:-1], latlng[1:])
+
+    def _segments(self, start, end):
+        # Segmen start[i] -> end[i] (array [lat, lng]): panjang (km) dan zona titik tengahnya
+        lat0, lng0, lat1, lng1 = np.radians(start[:, 0]), np.radians(start[:, 1]), np.radians(end[:, 0]), np.radians(end[:, 1])
+        a = np.sin((lat1 - lat0) / 2) ** 2 + np.cos(lat0) * np.cos(lat1) * np.sin((lng1 - lng0) / 2) ** 2
+        segment_km = 2 * SpatialIndex.EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+        return segment_km, self.node_index.nearest_within((start + end) / 2, Config.CONGESTION_RADIUS_KM)
+
+    @metrics.timed('departure_forecast')
+    def forecast_departures(self, start, end, transport_type, depart_from=None, window_minutes=None, slot_minutes=None):
+        # ETA rute utama untuk setiap slot keberangkatan dalam jendela waktu. Geometri diambil sekali (cache /
+        # matriks precompute); hanya faktor kemacetan yang dinilai ulang, untuk semua slot sekaligus.
+        depart_from = (depart_from or self.traffic_predictor.now()).replace(second=0, microsecond=0)
+        window_minutes = window_minutes or Config.FORECAST_WINDOW_MINUTES
+        slot_minutes = slot_minutes or Config.FORECAST_SLOT_MINUTES
+        if start not in Config.NODES or end not in Config.NODES:
+            return {"error": "Lokasi tidak valid"}
+        if transport_type not in Config.TRANSPORT_PROFILES:
+            return {"error": f"Moda transportasi '{transport_type}' tidak valid"}
+
+        start_coords = (Config.NODES[start]['lat'], Config.NODES[start]['lng'])
+        end_coords = (Config.NODES[end]['lat'], Config.NODES[end]['lng'])
+        try:
+            data = self._fetch_osrm([start_coords, end_coords], transport_type, at=depart_from)
+        except UpstreamBusy as busy:
+            return self._busy_error(busy)
+        if data.get('code') != 'Ok':
+            logger.error("OSRM API error: %s", data.get('message', 'Unknown error'))
+            return {"error": "Gagal mendapatkan rute dari layanan peta"}
+        route = data['routes'][0]
+        distance = route['distance'] / 1000
+        free_flow = float(self._adjusted_durations(np.array([route['duration'] / 60]), np.array([distance]), transport_type)[0])
+
+        geometry = route['geometry']['coordinates']
+        latlng = np.asarray(geometry, dtype=np.float64)[:, ::-1] if geometry else np.zeros((0, 2))
+        segment_km, zones = self._route_segments(latlng) if len(latlng) >= 2 else (np.zeros(0), np.zeros(0, dtype=np.int64))
+        if segment_km.sum() > 0:
+            segment_free = free_flow * segment_km / segment_km.sum()  # menit per segmen saat lancar
+        else:
+            segment_free, zones = np.array([free_flow]), np.array([-1])
+
+        # Tabel faktor (bucket, node di sepanjang rute); kolom terakhir = segmen di luar semua zona (lancar)
+        offsets = np.arange(max(1, window_minutes // slot_minutes)) * float(slot_minutes)
+        nodes_along = np.unique(zones[zones >= 0])
+        columns = np.where(zones >= 0, np.searchsorted(nodes_along, zones), len(nodes_along))
+        # Perjalanan slot terakhir bisa berlanjut ke bucket berikutnya: tabel diperpanjang sebesar durasi lancar
+        # dibagi faktor terburuk di jendela keberangkatan (snapshot per bucket sudah di-cache TrafficPredictor)
+        _, factors = self.traffic_predictor.forecast_factors(nodes_along.tolist(), depart_from, depart_from + timedelta(minutes=offsets[-1]))
+        slowest = factors.min() if factors.size else 1.0
+        buckets, factors = self.traffic_predictor.forecast_factors(nodes_along.tolist(), depart_from,
+                                                                   depart_from + timedelta(minutes=offsets[-1] + free_flow / slowest))
+        factors = np.column_stack([factors, np.ones(len(buckets))])
+        bucket_offsets = np.array([(bucket - depart_from).total_seconds() / 60 for bucket in buckets])
+
+        # Waktu tiap segmen (slot, segmen): pass pertama memakai kondisi saat berangkat, pass berikutnya
+        # kondisi pada menit segmen itu dicapai
+        elapsed = np.zeros((len(offsets), len(segment_free)))
+        for _ in range(Config.FORECAST_PASSES):
+            rows = np.searchsorted(bucket_offsets, offsets[:, None] + elapsed, side='right') - 1
+            times = segment_free / factors[rows, columns]
+            elapsed = np.cumsum(times, axis=1) - times
+        etas = times.sum(axis=1)
+
+        departures = []
+        for offset, eta in zip(offsets.tolist(), etas.tolist()):
+            depart = depart_from + timedelta(minutes=offset)
+            departures.append({
+                'depart': depart.isoformat(timespec='minutes'),
+                'arrive': (depart + timedelta(minutes=eta)).isoformat(timespec='minutes'),
+                'eta_minutes': round(eta, 1),
+                'time': f"{eta:.0f} menit",
+                'congestion_factor': round(free_flow / eta, 3) if eta else 1.0
+            })
+        return {
+            'start': start,
+            'end': end,
+            'transport': transport_type,
+            'distance': f"{distance:.1f} km",
+            'free_flow_minutes': round(free_flow, 1),
+            'slot_minutes': slot_minutes,
+            'departures': departures,
+            'best': departures[int(np.argmin(etas))]
+        }
+
+    def _compute_routes(self, start, end, transport_type, at):
+        start_coords = (Config.NODES[start]['lat'], Config.NODES[start]['lng'])
+        end_coords = (Config.NODES[end]['lat'], Config.NODES[end]['lng'])
+        
+        primary_route = self.get_route_from_api(start_coords, end_coords, transport_type, at)
+        
+        if not primary_route:
+            logger.error("Failed to get primary route from OSRM")
+            return {"error": "Gagal mendapatkan rute dari layanan peta"}, set()
+        
+        nearest_start_node = self._find_nearest_node(start_coords)
+        nearest_end_node = self._find_nearest_node(end_coords)
+        
+        congestion_start = self.traffic_predictor.predict_congestion(nearest_start_node, at)
+        congestion_end = self.traffic_predictor.predict_congestion(nearest_end_node, at)
+        
+        final_duration = primary_route['speed_adjusted_duration'] / primary_route['congestion_factor']
+        primary_route['time'] = f"{final_duration:.0f} menit"
+        depends_on = primary_route.pop('_depends_on') | {nearest_start_node, nearest_end_node}
+        
+        primary_route.update({
+            'transport': transport_type,
+            'transport_icon': Config.TRANSPORT_PROFILES[transport_type]['icon'],
+            'steps': primary_route['steps'],
+            'congestion_levels': {
+                Config.NODES[nearest_start_node]['name']: congestion_start,
+                Config.NODES[nearest_end_node]['name']: congestion_end
+            },
+            'is_alternative': False
+        })
+        
+        # Alternatif dicari jika titik awal/akhir atau ruas mana pun di sepanjang rute utama padat
+        congested = (congestion_start['level'] == 'padat' or congestion_end['level'] == 'padat'
+                     or self._has_congestion(primary_route))
+        if congested:
+            try:
+                alternative_route = self._find_alternative_route(start_coords, end_coords, transport_type, at)
+            except UpstreamBusy:
+                # Alternatif dilewati saat anggaran OSRM habis; hasil ini dihitung lengkap begitu anggaran longgar
+                return {
+                    'primary': primary_route,
+                    'has_congestion': False,
+                    'primary_congested': True,
+                    'degraded': True
+                }, depends_on
+            
+            if alternative_route:
+                depends_on |= alternative_route.pop('_depends_on')
+                logger.debug("Alternative route found: distance=%s, time=%s", alternative_route['distance'], alternative_route['time'])
+                return {
+                    'primary': primary_route,
+                    'alternative': alternative_route,
+                    'has_congestion': True,
+                    'primary_congested': True
+                }, depends_on
+        
+        # has_congestion: ada alternatif yang menghindari kemacetan; primary_congested: rute utama melewati zona padat
+        return {
+            'primary': primary_route,
+            'has_congestion': False,
+            'primary_congested': congested
+        }, depends_on
+
+    @staticmethod
+    def _has_congestion(route):
+        return any(congestion['level'] == 'padat' for congestion in route['congestion_along_route'].values())
+
+    def _route_requests(self, start, end, transport_type, at):
+        # Request OSRM yang akan dibutuhkan find_all_routes untuk pasangan lokasi ini
+        start_coords = (Config.NODES[start]['lat'], Config.NODES[start]['lng'])
+        end_coords = (Config.NODES[end]['lat'], Config.NODES[end]['lng'])
+        route_requests = [([start_coords, end_coords], transport_type)]
+        # Rute alternatif diminta lebih awal jika titik awal/akhir padat; kemacetan di tengah rute baru
+        # diketahui setelah geometri rute utama tersedia, sehingga alternatifnya diambil belakangan
+        congestion_start = self.traffic_predictor.predict_congestion(self._find_nearest_node(start_coords), at)
+        congestion_end = self.traffic_predictor.predict_congestion(self._find_nearest_node(end_coords), at)
+        if congestion_start['level'] == 'padat' or congestion_end['level'] == 'padat':
+            route_requests.append((self._alternative_waypoints(start_coords, end_coords), transport_type))
+        return route_requests
+
+    def find_all_routes_concurrent(self, start, end, transport_type, at=None):
+        at = at or self.traffic_predictor.now()
+        try:
+            start, end = int(start), int(end)
+        except (ValueError, TypeError):
+            # Biarkan find_all_routes yang menyusun pesan error
+            return self.find_all_routes(start, end, transport_type, at)
+
+        if start in Config.NODES and end in Config.NODES and transport_type in Config.TRANSPORT_PROFILES:
+            self._prefetch_osrm(self._route_requests(start, end, transport_type, at))
+
+        return self.find_all_routes(start, end, transport_type, at)
+
+    def find_routes_batch(self, items, at=None):
+        # items: daftar (start, end, transport) yang sudah divalidasi; hasil di-yield per item unik
+        at = at or self.traffic_predictor.now()
+        unique = list(dict.fromkeys(items))
+        chunk_size = max(1, Config.OSRM_WORKERS)
+        for offset in range(0, len(unique), chunk_size):
+            chunk = unique[offset:offset + chunk_size]
+            # Lokasi tak dikenal tidak di-prefetch; find_all_routes yang melaporkan error-nya
+            valid = [item for item in chunk if item[0] in Config.NODES and item[1] in Config.NODES]
+            self._prefetch_osrm([req for item in valid for req in self._route_requests(*item, at)])
+            for item in chunk:
+                yield item, self.find_all_routes(*item, at)
+
+    def duration_matrix(self, node_ids, transport_type, at=None):
+        try:
+            arrays = self._duration_arrays(node_ids, transport_type, at)
+        except UpstreamBusy as busy:
+            return self._busy_error(busy)
+        if arrays is None:
+            return {"error": "Gagal mendapatkan matriks dari layanan peta"}
+        final, distances = arrays
+
+        def to_list(matrix):
+            return [[None if np.isnan(value) else round(float(value), 1) for value in row] for row in matrix]
+
+        return {
+            'nodes': list(node_ids),
+            'transport': transport_type,
+            'durations': to_list(final),
+            'distances': to_list(distances),
+            'units': {'durations': 'menit', 'distances': 'km'}
+        }
+
+    def _duration_arrays(self, node_ids, transport_type, at=None):
+        # (durasi menit setelah koreksi moda dan kemacetan, jarak km) sebagai array; NaN = tidak terjangkau.
+        # Satu request OSRM table untuk semua pasangan. Kemacetan memakai faktor tertimbang panjang seperti rute
+        # (_path_factor): sepanjang geometri rute utama jika rute pasangan itu sudah ada di cache / matriks
+        # precompute (durasinya juga dari rute, sehingga sama dengan ETA /api/route), selain itu sepanjang garis
+        # lurus antar lokasi seperti titik sampel table isokron.
+        coords = [(Config.NODES[node_id]['lat'], Config.NODES[node_id]['lng']) for node_id in node_ids]
+        data = self._fetch_osrm_table(coords, transport_type)
+        if data.get('code') != 'Ok':
+            logger.error("OSRM table error: %s", data.get('message', 'Unknown error'))
+            return None
+
+        def to_array(rows, scale):
+            return np.array([[np.nan if value is None else value for value in row] for row in rows], dtype=np.float64) / scale
+
+        distances = to_array(data.get('distances') or [[None] * len(coords)] * len(coords), 1000)
+        durations = self._adjusted_durations(to_array(data['durations'], 60), distances, transport_type)
+
+        lookup = self._factor_lookup(self.traffic_predictor.snapshot(at))
+        rows, zones, zone_km = self._node_lines()
+        size = len(self.node_index.node_ids)
+        total = np.bincount(rows, weights=zone_km, minlength=size * size).reshape(size, size)
+        weighted = np.bincount(rows, weights=zone_km / lookup[zones], minlength=size * size).reshape(size, size)
+        factors = np.ones((size, size))
+        np.divide(total, weighted, out=factors, where=weighted > 0)
+        position = {node_id: i for i, node_id in enumerate(self.node_index.node_ids.tolist())}
+        index = [position[node_id] for node_id in node_ids]
+        durations = durations / factors[np.ix_(index, index)]
+
+        for i in range(len(coords)):
+            for j in range(len(coords)):
+                profile = self._cached_path_profile(coords[i], coords[j], transport_type) if i != j else None
+                if profile is not None:
+                    adjusted, distances[i, j], route_zones, route_km = profile
+                    durations[i, j] = adjusted / self._path_factor(route_zones, route_km, lookup)
+        return durations, distances
+
+    def _node_lines(self):
+        # Garis lurus antar semua lokasi per zona kemacetan: COO (asal * jumlah lokasi + tujuan, node zona, km), indeks
+        # menurut node_index.node_ids. Hanya bergantung posisi lokasi, jadi dihitung sekali.
+        if self._lines is None:
+            latlng = np.column_stack([self.node_index.lat, self.node_index.lng])
+            size = len(latlng)
+            self._lines = self._line_zones(np.repeat(latlng, size, axis=0), np.tile(latlng, (size, 1)))
+        return self._lines
+
+    def _cached_path_profile(self, start_coords, end_coords, transport_type):
+        # (durasi menit terkoreksi moda, jarak km, node zona, km per zona) rute utama yang sudah ada di cache OSRM /
+        # matriks precompute; None jika belum ada (tidak pernah meminta OSRM)
+        if not self.osrm.cacheable:
+            return None
+        key = self._osrm_key([start_coords, end_coords], transport_type)
+        profile = self.path_cache.get(key)
+        if profile is not None:
+            return profile
+        data = self.route_matrix.get(key) if self.route_matrix is not None else None
+        data = data or self.route_cache.get(key)
+        if not data or data.get('code') != 'Ok':
+            return None
+        route = data['routes'][0]
+        distance = route['distance'] / 1000
+        adjusted = float(self._adjusted_durations(np.array([route['duration'] / 60]), np.array([distance]), transport_type)[0])
+        geometry = route['geometry']['coordinates']
+        if len(geometry) < 2:
+            profile = (adjusted, distance, np.array([-1]), np.zeros(1))
+        else:
+            profile = (adjusted, distance) + self._zone_lengths(np.asarray(geometry, dtype=np.float64)[:, ::-1])
+        self.path_cache.set(key, profile)
+        return profile
+
+    @metrics.timed('trip_plan')
+    def plan_trip(self, node_ids, transport_type, round_trip=False, at=None):
+        # Urutan kunjungan node_ids (node pertama = titik berangkat) dengan durasi tercepat; rute tiap pasangan
+        # berurutan diambil seperti find_all_routes (cache/matriks precompute) lalu disambung menjadi satu rute
+        at = at or self.traffic_predictor.now()
+        node_ids = list(dict.fromkeys(node_ids))
+        if len(node_ids) < 2 or any(node_id not in Config.NODES for node_id in node_ids):
+            return {"error": "Minimal dua lokasi valid diperlukan"}
+        if transport_type not in Config.TRANSPORT_PROFILES:
+            return {"error": f"Moda transportasi '{transport_type}' tidak valid"}
+
+        # Matriks yang sama dengan /api/matrix: satu request table, kemacetan sepanjang rute yang sudah di-cache atau
+        # sepanjang garis lurus antar lokasi
+        try:
+            arrays = self._duration_arrays(node_ids, transport_type, at)
+        except UpstreamBusy as busy:
+            return self._busy_error(busy)
+        if arrays is None:
+            return {"error": "Gagal mendapatkan matriks dari layanan peta"}
+        durations = arrays[0]
+
+        order, estimate, solver = TripPlanner(durations, round_trip).solve()
+        if order is None:
+            return {"error": "Tidak ada urutan kunjungan yang bisa dilalui", "infeasible": True}
+        stops = [node_ids[i] for i in order] + ([node_ids[0]] if round_trip else [])
+        coords = {node_id: (Config.NODES[node_id]['lat'], Config.NODES[node_id]['lng']) for node_id in stops}
+        hops = list(zip(stops, stops[1:]))
+
+        self._prefetch_osrm([([coords[a], coords[b]], transport_type) for a, b in hops])
+        legs = []
+        for a, b in hops:
+            try:
+                leg = self.get_route_from_api(coords[a], coords[b], transport_type, at)
+            except UpstreamBusy as busy:
+                return self._busy_error(busy)
+            if not leg:
+                return {"error": "Gagal mendapatkan rute dari layanan peta"}
+            legs.append(leg)
+
+        route = self._stitch_legs(legs, transport_type)
+        route['congestion_levels'] = {Config.NODES[node_id]['name']: self.traffic_predictor.predict_congestion(node_id, at) for node_id in stops}
+        return {
+            'primary': route,
+            'has_congestion': False,
+            'primary_congested': self._has_congestion(route),
+            'order': stops,
+            'round_trip': round_trip,
+            'solver': solver,
+            'legs': [{
+                'from': Config.NODES[a]['name'],
+                'to': Config.NODES[b]['name'],
+                'distance': leg['distance'],
+                'time': f"{leg['speed_adjusted_duration'] / leg['congestion_factor']:.0f} menit"
+            } for (a, b), leg in zip(hops, legs)],
+            'matrix_minutes': round(estimate, 1)
+        }
+
+    def _stitch_legs(self, legs, transport_type):
+        # Format sama dengan rute utama find_all_routes; titik pertama tiap leg berikutnya = titik akhir leg sebelumnya
+        adjusted = sum(leg['speed_adjusted_duration'] for leg in legs)
+        final = sum(leg['speed_adjusted_duration'] / leg['congestion_factor'] for leg in legs)
+        distance = sum(leg['raw_distance'] for leg in legs)
+        along_route = {}
+        for leg in legs:
+            along_route.update(leg['congestion_along_route'])
+        return {
+            'distance': f"{distance:.1f} km",
+            'time': f"{final:.0f} menit",
+            'path': legs[0]['path'] + [point for leg in legs[1:] for point in leg['path'][1:]],
+            'steps': [step for leg in legs for step in leg['steps']],
+            'raw_duration': sum(leg['raw_duration'] for leg in legs),
+            'raw_distance': distance,
+            'speed_adjusted_duration': adjusted,
+            'congestion_factor': adjusted / final if final else 1.0,
+            'congestion_along_route': along_route,
+            'transport': transport_type,
+            'transport_icon': Config.TRANSPORT_PROFILES[transport_type]['icon'],
+            'is_alternative': False
+        }
+
+    @metrics.timed('isochrone')
+    def isochrone(self, origin, transport_type, minutes=None, at=None):
+        # Poligon area yang terjangkau dari node origin dalam tiap batas menit (GeoJSON FeatureCollection, kontur
+        # terbesar lebih dulu). Hasil disimpan per (asal, moda, faktor kemacetan, menit): jam lain dengan kondisi
+        # yang sama langsung memakai hasil yang ada.
+        if origin not in Config.NODES:
+            return {"error": "Lokasi asal tidak valid"}
+        if transport_type not in Config.TRANSPORT_PROFILES:
+            return {"error": f"Moda transportasi '{transport_type}' tidak valid"}
+        minutes = sorted(set(minutes or Config.ISOCHRONE_MINUTES))
+        snapshot = self.traffic_predictor.snapshot(at)
+        factors = np.array([snapshot[node_id]['factor'] for node_id in self.node_index.node_ids.tolist()])
+        key = f"{origin}|{transport_type}|{','.join(map(str, minutes))}|{','.join(f'{factor:.3f}' for factor in factors)}"
+        try:
+            return self.isochrone_cache.get_or_compute(key, lambda: self._compute_isochrone(origin, transport_type, minutes, factors),
+                                                       should_store=lambda result: 'error' not in result)
+        except UpstreamBusy as busy:
+            return self._busy_error(busy)
+
+    def _compute_isochrone(self, origin, transport_type, minutes, factors):
+        samples = self.reach_cache.get_or_compute(f"{origin}|{transport_type}|{minutes[-1]}",
+                                                  lambda: self._reach_samples(origin, transport_type, minutes[-1]),
+                                                  should_store=lambda result: 'error' not in result)
+        if 'error' in samples:
+            return samples
+
+        # Koreksi kemacetan seperti duration_matrix (_path_factor): panjang jalur ke tiap titik dibagi jumlah
+        # km / faktor zona yang dilaluinya (1.0 di luar zona)
+        lookup = np.ones(int(self.node_index.node_ids.max()) + 2)
+        lookup[self.node_index.node_ids] = factors
+        rows, zones, zone_km = samples['zones']
+        size = len(samples['minutes'])
+        weighted = np.bincount(rows, weights=zone_km / lookup[zones], minlength=size)
+        path_factor = np.ones(size)
+        np.divide(np.bincount(rows, weights=zone_km, minlength=size), weighted, out=path_factor, where=weighted > 0)
+        congested = samples['minutes'] / path_factor
+
+        grid = Isochrone((Config.NODES[origin]['lat'], Config.NODES[origin]['lng']), samples['radius_km'], samples['cell_km'])
+        times = grid.rasterize(samples['lat'], samples['lng'], congested, spread=samples['spread'])
+        return {
+            'type': 'FeatureCollection',
+            'features': [{
+                'type': 'Feature',
+                'properties': {'minutes': limit},
+                'geometry': {'type': 'MultiPolygon', 'coordinates': grid.polygons(times <= limit)},
+            } for limit in reversed(minutes)],
+            'origin': origin,
+            'name': Config.NODES[origin]['name'],
+            'transport': transport_type,
+            'cell_km': round(samples['cell_km'], 3),
+        }
+
+    def _reach_samples(self, origin, transport_type, max_minutes):
+        # Waktu tempuh bebas hambatan (menit, sudah dikoreksi moda) dari origin ke titik sampel: semua vertex graf
+        # lokal dalam satu Dijkstra terpotong, atau grid titik lewat request table OSRM (sources=0) yang dikirim
+        # paralel. Tidak bergantung kondisi kemacetan, jadi dipakai ulang lintas bucket.
+        coords = (Config.NODES[origin]['lat'], Config.NODES[origin]['lng'])
+        profile = Config.TRANSPORT_PROFILES[transport_type]['profile']
+        base_speed = Config.TRANSPORT_PROFILES[transport_type]['base_speed']
+
+        if self.osrm.supports_reach:
+            # Batas detik mentah: kebalikan dari _adjusted_durations (moda jalan kaki tidak pernah lebih cepat dari mentah)
+            max_seconds = max_minutes * 60 * (base_speed / 50 if profile == 'driving' else 1)
+            status, data = self.osrm.reach(coords, profile, max_seconds)
+            if status != 200:
+                logger.error("Reach error: %s", data.get('message', 'Unknown error'))
+                return {"error": "Gagal menghitung area jangkauan"}
+            lat, lng = data['lat'], data['lng']
+            minutes = self._adjusted_durations(data['durations'] / 60, data['distances'] / 1000, transport_type)
+            cell_km = Config.ISOCHRONE_CELL_KM
+            offsets = self.node_index._project(lat, lng) - self.node_index._project(np.float64(coords[0]), np.float64(coords[1]))
+            radius_km = float(np.abs(offsets).max()) + cell_km if len(offsets) else cell_km
+            # Vertex hanya ada di sepanjang jalan: sel tetangga ikut diisi agar area tidak berlubang di antara jalan
+            return {'lat': lat, 'lng': lng, 'minutes': minutes, 'radius_km': radius_km, 'cell_km': cell_km, 'spread': 1,
+                    'zones': self._tree_zones(np.column_stack([lat, lng]), data['parents'])}
+
+        radius_km = max_minutes / 60 * base_speed * Config.ISOCHRONE_SPEED_MARGIN
+        grid = Isochrone(coords, radius_km, 2 * radius_km / Config.ISOCHRONE_GRID)
+        lat, lng = grid.centers()
+        points = list(zip(lat.tolist(), lng.tolist()))
+        batch = Config.ISOCHRONE_TABLE_BATCH - 1
+        futures = [self.executor.submit(contextvars.copy_context().run, self._fetch_osrm_table, [coords] + points[i:i + batch], transport_type, [0])
+                   for i in range(0, len(points), batch)]
+        durations, distances, snapped = [], [], []
+        for future in futures:
+            data = future.result()
+            if data.get('code') != 'Ok':
+                logger.error("OSRM table error: %s", data.get('message', 'Unknown error'))
+                return {"error": "Gagal mendapatkan matriks dari layanan peta"}
+            size = len(data['durations'][0]) - 1
+            durations += data['durations'][0][1:]
+            distances += (data.get('distances') or [[None] * (size + 1)])[0][1:]
+            snapped += [destination.get('distance', 0.0) for destination in data.get('destinations', [{}] * (size + 1))[1:]]
+
+        def to_array(values, scale):
+            return np.array([np.nan if value is None else value for value in values], dtype=np.float64) / scale
+
+        minutes = self._adjusted_durations(to_array(durations, 60), to_array(distances, 1000), transport_type)
+        # OSRM men-snap titik sampel ke jalan terdekat; sel tanpa jalan (mis. laut) tidak boleh ikut terjangkau
+        minutes[to_array(snapped, 1000) > grid.cell_km / 2] = np.nan
+        lat, lng = np.append(lat, coords[0]), np.append(lng, coords[1])
+        return {'lat': lat, 'lng': lng, 'minutes': np.append(minutes, 0.0), 'radius_km': radius_km, 'cell_km': grid.cell_km,
+                'spread': 0, 'zones': self._line_zones(np.broadcast_to(coords, (len(lat), 2)), np.column_stack([lat, lng]))}
+
+    def _tree_zones(self, latlng, parents):
+        # Panjang jalur (km) dari asal ke tiap titik per zona kemacetan; jalurnya rantai parents (pohon jalur terpendek).
+        # Tiap ruas parent -> titik dinilai seperti segmen geometri rute, lalu dijumlahkan ke atas pohon dengan pointer
+        # jumping (log2 kedalaman iterasi). Return COO (indeks titik, node zona, km); node -1 = di luar semua zona.
+        node_ids = self.node_index.node_ids
+        column = np.full(int(node_ids.max()) + 2, len(node_ids))
+        column[node_ids] = np.arange(len(node_ids))
+        segment_km, zones = self._segments(latlng[parents], latlng)
+        km = np.zeros((len(parents), len(node_ids) + 1))
+        km[np.arange(len(parents)), column[zones]] = segment_km
+        ancestor = parents
+        while (parents[ancestor] != ancestor).any():
+            km += km[ancestor]
+            ancestor = ancestor[ancestor]
+        rows, columns = np.nonzero(km)
+        return rows, np.append(node_ids, -1)[columns], km[rows, columns]
+
+    def _line_zones(self, start, end):
+        # Seperti _tree_zones untuk pasangan tanpa geometri rute (titik sampel table isokron, sel matriks durasi):
+        # jalurnya garis lurus start[i] -> end[i], dipotong tiap setengah CONGESTION_RADIUS_KM
+        offsets = self.node_index._project(end[:, 0], end[:, 1]) - self.node_index._project(start[:, 0], start[:, 1])
+        pieces = np.maximum(np.ceil(np.hypot(offsets[:, 0], offsets[:, 1]) / (Config.CONGESTION_RADIUS_KM / 2)), 1).astype(np.int64)
+        rows = np.repeat(np.arange(len(end)), pieces)
+        step = (np.arange(len(rows)) - np.repeat(np.cumsum(pieces) - pieces, pieces))[:, None]
+        origin, direction = start[rows], (end - start)[rows]
+        segment_km, zones = self._segments(origin + direction * step / pieces[rows, None],
+                                           origin + direction * (step + 1) / pieces[rows, None])
+        span = int(self.node_index.node_ids.max()) + 2
+        keys, inverse = np.unique(rows * span + zones + 1, return_inverse=True)
+        return keys // span, keys % span - 1, np.bincount(inverse, weights=segment_km, minlength=len(keys))
+
+    def _find_alternative_route(self, start_coords, end_coords, transport_type, at=None):
+        if transport_type not in Config.TRANSPORT_PROFILES:
+            logger.error("Invalid transport type for alternative route: %s", transport_type)
+            return None
+            
+        profile = Config.TRANSPORT_PROFILES[transport_type]['profile']
+        base_speed = Config.TRANSPORT_PROFILES[transport_type]['base_speed']
+        
+        data = self._fetch_alternative(start_coords, end_coords, transport_type, at)
+            
+        if data.get('code') == 'Ok':
+            route = data['routes'][0]
+            distance = route['distance'] / 1000
+            duration = route['duration'] / 60
+            geometry = route['geometry']['coordinates']
+            
+            latlng = np.asarray(geometry, dtype=np.float64)[:, ::-1] if geometry else np.zeros((0, 2))
+            path = latlng.tolist()
+            
+            route_steps = self._process_steps(route, transport_type, at)
+            steps = route_steps.to_dicts()
+            congestion_factor, along_route = self._route_congestion(latlng, at)
+            
+            nearest_start_node = self._find_nearest_node(start_coords)
+            nearest_end_node = self._find_nearest_node(end_coords)
+            
+            if not steps:
+                steps = [{
+                    'instruction': f"Bergerak dari {Config.NODES[nearest_start_node]['name']} ke {Config.NODES[nearest_end_node]['name']}",
+                    'distance': f"{distance:.1f} km",
+                    'time': f"{duration:.0f} menit",
+                    'condition': "Kondisi jalan: Tidak tersedia"
+                }]
+            
+            if profile == 'driving':
+                speed_adjustment = 50 / base_speed
+                adjusted_duration = duration * speed_adjustment
+            else:
+                adjusted_duration = duration
+                fallback_duration = (distance / base_speed) * 60
+                adjusted_duration = max(adjusted_duration, fallback_duration)
+            
+            congestion_start = self.traffic_predictor.predict_congestion(nearest_start_node, at)
+            congestion_end = self.traffic_predictor.predict_congestion(nearest_end_node, at)
+            final_duration = adjusted_duration / congestion_factor
+            
+            return {
+                'distance': f"{distance:.1f} km",
+                'time': f"{final_duration:.0f} menit",
+                'path': path,
+                'transport': transport_type,
+                'transport_icon': Config.TRANSPORT_PROFILES[transport_type]['icon'],
+                'steps': steps,
+                'congestion_levels': {
+                    Config.NODES[nearest_start_node]['name']: congestion_start,
+                    Config.NODES[nearest_end_node]['name']: congestion_end
+                },
+                'congestion_along_route': {Config.NODES[node_id]['name']: congestion for node_id, congestion in along_route.items()},
+                'is_alternative': True,
+                'avoided_congestion': [Config.NODES[nearest_start_node]['name']] if congestion_start['level'] == 'padat' else [],
+                '_depends_on': set(route_steps.nodes) | set(along_route) | {nearest_start_node, nearest_end_node}
+            }
+        logger.error("OSRM API error for alternative route: %s", data.get('message', 'Unknown error'))
+        return None
+
+    def _fetch_alternative(self, start_coords, end_coords, transport_type, at=None):
+        if not self.osrm.supports_alternatives:
+            return self._fetch_osrm(self._alternative_waypoints(start_coords, end_coords), transport_type, optional=True, at=at)
+        # Mesin yang mendukung alternatif sungguhan: routes[0] adalah rute utama, sisanya alternatif
+        data = self._fetch_osrm([start_coords, end_coords], transport_type, alternatives=True, at=at)
+        if data.get('code') == 'Ok':
+            if len(data['routes']) < 2:
+                return {'code': 'NoRoute', 'message': 'Tidak ada rute alternatif yang cukup berbeda'}
+            return dict(data, routes=data['routes'][1:])
+        return data
+
+    def _alternative_waypoints(self, start_coords, end_coords):
+        mid_point = [
+            (start_coords[0] + end_coords[0]) / 2 + 0.005,
+            (start_coords[1] + end_coords[1]) / 2 + 0.005
+        ]
+        return [start_coords, mid_point, end_coords]
+
+    def build_route_matrix(self, transports=None, progress=None):
+        matrix = RouteMatrix(meta={'built_at': datetime.now().isoformat(), 'osm_url': Config.OSM_URL})
+        transports = transports or list(Config.TRANSPORT_PROFILES)
+        failed = []
+        for transport_type in transports:
+            for start, start_node in Config.NODES.items():
+                for end, end_node in Config.NODES.items():
+                    if start == end:
+                        continue
+                    start_coords = (start_node['lat'], start_node['lng'])
+                    end_coords = (end_node['lat'], end_node['lng'])
+                    # Rute utama dan rute alternatif (via titik tengah) sama-sama statis
+                    for coords in ([start_coords, end_coords], self._alternative_waypoints(start_coords, end_coords)):
+                        while True:
+                            try:
+                                data = self._fetch_osrm(coords, transport_type)
+                                break
+                            except UpstreamBusy as busy:
+                                # Antrean anggaran penuh: precompute mengalah lalu mencoba lagi
+                                time.sleep(busy.retry_after)
+                        if data.get('code') == 'Ok':
+                            matrix.add(self._osrm_key(coords, transport_type), data)
+                        else:
+                            failed.append((start, end, transport_type))
+                    if progress:
+                        progress(start, end, transport_type)
+        matrix.meta['failed'] = failed
+        return matrix
+
+    @metrics.timed('nearest_node')
+    def _find_nearest_node(self, coords):
+        return self.node_index.nearest(coords)
+
+    @metrics.timed('nearest_node')
+    def _find_nearest_nodes(self, coords_list):
+        return self.node_index.nearest_batch(coords_list)
+
+# ===================== RUTE MULTI-TITIK =====================
+class TripPlanner:
+    # Urutan kunjungan pada matriks durasi asimetris (menit); titik 0 selalu titik berangkat.
+    # round_trip=True: kembali ke titik 0 di akhir. Pasangan tak terjangkau (NaN) diberi biaya UNREACHABLE.
+    UNREACHABLE = 1e9
+    STALL_ROUNDS = 20
+
+    def __init__(self, durations, round_trip=False, exact_max=None, time_budget=None):
+        self.durations = np.where(np.isnan(durations), self.UNREACHABLE, durations)
+        self.round_trip = round_trip
+        self.exact_max = exact_max if exact_max is not None else Config.TRIP_EXACT_MAX_STOPS
+        self.time_budget = time_budget if time_budget is not None else Config.TRIP_TIME_BUDGET
+
+    def cost(self, order):
+        tour = order + [order[0]] if self.round_trip else order
+        return float(self.durations[tour[:-1], tour[1:]].sum())
+
+    def solve(self):
+        # Return (urutan index, total menit, 'exact' | 'heuristic'); urutan None jika tidak ada yang terjangkau
+        n = len(self.durations)
+        if n <= 2:
+            order, solver = list(range(n)), 'exact'
+        elif n <= self.exact_max:
+            order, solver = self.held_karp(), 'exact'
+        else:
+            order, solver = self.iterated_local_search(), 'heuristic'
+        cost = self.cost(order)
+        return (order if cost < self.UNREACHABLE else None), cost, solver
+
+    def held_karp(self):
+        # DP atas subset titik 1..n-1: best[mask, j] = durasi minimum dari titik 0 melewati mask dan berakhir di j.
+        # Perluasan ke semua titik berikutnya dihitung sebagai satu operasi array per mask.
+        d = self.durations
+        m = len(d) - 1
+        inner = d[1:, 1:]
+        best = np.full((1 << m, m), np.inf)
+        parent = np.full((1 << m, m), -1, dtype=np.int64)
+        best[1 << np.arange(m), np.arange(m)] = d[0, 1:]
+        bits = 1 << np.arange(m)
+        for mask in range(1, 1 << m):
+            row = best[mask]
+            if not np.isfinite(row).any():
+                continue
+            candidates = row[:, None] + inner
+            via = candidates.argmin(axis=0)
+            value = candidates[via, np.arange(m)]
+            targets = np.flatnonzero((mask & bits) == 0)
+            masks = mask | bits[targets]
+            better = value[targets] < best[masks, targets]
+            best[masks[better], targets[better]] = value[targets][better]
+            parent[masks[better], targets[better]] = via[targets][better]
+
+        full = (1 << m) - 1
+        totals = best[full] + (d[1:, 0] if self.round_trip else 0)
+        last = int(totals.argmin())
+        order, mask = [], full
+        while last >= 0:
+            order.append(last + 1)
+            last, mask = int(parent[mask, last]), mask & ~(1 << last)
+        return [0] + order[::-1]
+
+    def nearest_neighbour(self):
+        order = [0]
+        remaining = set(range(1, len(self.durations)))
+        while remaining:
+            following = min(remaining, key=lambda j: self.durations[order[-1], j])
+            order.append(following)
+            remaining.remove(following)
+        return order
+
+    def iterated_local_search(self):
+        # Local search dari nearest neighbour, lalu urutan terbaik diacak sebagian (double bridge) dan di-local
+        # search ulang hingga STALL_ROUNDS kali berturut-turut tanpa perbaikan atau TRIP_TIME_BUDGET habis.
+        # Seed tetap agar hasil deterministik.
+        deadline = time.perf_counter() + self.time_budget
+        rng = random.Random(0)
+        best = self.local_search(self.nearest_neighbour(), deadline)
+        best_cost = self.cost(best)
+        n = len(best)
+        stalled = 0
+        while n >= 5 and stalled < self.STALL_ROUNDS and time.perf_counter() < deadline:
+            a, b, c = sorted(rng.sample(range(1, n), 3))
+            candidate = self.local_search(best[:a] + best[c:] + best[b:c] + best[a:b], deadline)
+            cost = self.cost(candidate)
+            if cost < best_cost - 1e-9:
+                best, best_cost, stalled = candidate, cost, 0
+            else:
+                stalled += 1
+        return best
+
+    def local_search(self, order, deadline):
+        # 2-opt (membalik potongan) dan Or-opt (memindah potongan 1-3 titik): semua tetangga dinilai dalam satu
+        # operasi array, ambil yang terbaik, ulangi hingga tidak ada perbaikan atau batas waktu habis.
+        # Matriks asimetris, jadi biaya tiap kandidat dihitung penuh (bukan selisih tepi).
+        best = self.cost(order)
+        while time.perf_counter() < deadline:
+            candidates = np.array(list(self._neighbours(order)))
+            if not len(candidates):
+                break
+            tours = np.hstack([candidates, candidates[:, :1]]) if self.round_trip else candidates
+            costs = self.durations[tours[:, :-1], tours[:, 1:]].sum(axis=1)
+            i = int(costs.argmin())
+            if costs[i] >= best - 1e-9:
+                break
+            order, best = candidates[i].tolist(), float(costs[i])
+        return order
+
+    def _neighbours(self, order):
+        n = len(order)
+        for i in range(1, n - 1):
+            for j in range(i + 1, n):
+                yield order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+        for length in (1, 2, 3):
+            for i in range(1, n - length + 1):
+                segment, rest = order[i:i + length], order[:i] + order[i + length:]
+                for k in range(1, len(rest) + 1):
+                    if k != i:
+                        yield rest[:k] + segment + rest[k:]
+
+# ===================== ISOKRON =====================
+class Isochrone:
+    # Raster waktu tempuh bersel persegi (cell_km) di sekitar titik asal dan konturnya sebagai poligon GeoJSON.
+    # Tepi poligon mengikuti batas sel, sehingga ring selalu valid (tidak memotong diri sendiri) tanpa library geometri.
+    KM_PER_DEG_LAT = 110.574
+    KM_PER_DEG_LNG = 111.320  # di khatulistiwa, dikali cos(lintang)
+
+    def __init__(self, center, radius_km, cell_km):
+        self.cell_km = cell_km
+        self.size = max(1, int(math.ceil(2 * radius_km / cell_km)))
+        self.dlat = cell_km / self.KM_PER_DEG_LAT
+        self.dlng = cell_km / (self.KM_PER_DEG_LNG * math.cos(math.radians(center[0])))
+        self.lat0 = center[0] - self.size / 2 * self.dlat
+        self.lng0 = center[1] - self.size / 2 * self.dlng
+
+    def centers(self):
+        # Titik tengah semua sel (baris = lintang, kolom = bujur), urut per baris
+        rows, cols = np.divmod(np.arange(self.size * self.size), self.size)
+        return self.lat0 + (rows + 0.5) * self.dlat, self.lng0 + (cols + 0.5) * self.dlng
+
+    def rasterize(self, lat, lng, minutes, spread=0):
+        # Waktu minimum per sel (inf = tidak terjangkau); spread memperlebar tiap sel ke tetangganya (3x3) sebanyak itu
+        rows = np.floor((np.asarray(lat) - self.lat0) / self.dlat).astype(np.int64)
+        cols = np.floor((np.asarray(lng) - self.lng0) / self.dlng).astype(np.int64)
+        inside = (rows >= 0) & (rows < self.size) & (cols >= 0) & (cols < self.size) & np.isfinite(minutes)
+        times = np.full((self.size, self.size), np.inf)
+        np.minimum.at(times, (rows[inside], cols[inside]), np.asarray(minutes)[inside])
+        for _ in range(spread):
+            padded = np.pad(times, 1, constant_values=np.inf)
+            times = np.min([padded[1 + dr:1 + dr + self.size, 1 + dc:1 + dc + self.size]
+                            for dr in (-1, 0, 1) for dc in (-1, 0, 1)], axis=0)
+        return times
+
+    def polygons(self, mask):
+        # Koordinat MultiPolygon GeoJSON untuk sel bernilai True: ring luar berlawanan arah jarum jam, lubang searah
+        outers, holes = [], []
+        for ring in self._rings(self._close_diagonals(mask)):
+            (outers if self._area(ring) > 0 else holes).append(ring)
+        polygons = [[ring] for ring in outers]
+        areas = [self._area(ring) for ring in outers]
+        for hole in holes:
+            # Titik tengah sisi pertama lubang pasti berada di dalam ring luar pemiliknya (bukan di tepinya)
+            (x0, y0), (x1, y1) = hole[0], hole[1]
+            point = ((x0 + x1) / 2, (y0 + y1) / 2)
+            owners = [i for i, ring in enumerate(outers) if self._contains(ring, point)]
+            if owners:
+                polygons[min(owners, key=areas.__getitem__)].append(hole)
+        return [[[[round(self.lng0 + x * self.dlng, 5), round(self.lat0 + y * self.dlat, 5)] for x, y in ring]
+                 for ring in polygon] for polygon in polygons]
+
+    @staticmethod
+    def _close_diagonals(mask):
+        # Dua sel yang hanya bersentuhan di sudut membuat ring menyinggung dirinya sendiri (poligon tidak valid);
+        # salah satu sel kosong di sudut itu diisi sampai tidak ada lagi pola diagonal
+        mask = np.array(mask, dtype=bool)
+        while True:
+            low_left, low_right, up_left, up_right = mask[:-1, :-1], mask[:-1, 1:], mask[1:, :-1], mask[1:, 1:]
+            rising = low_left & up_right & ~low_right & ~up_left
+            falling = low_right & up_left & ~low_left & ~up_right
+            rows, cols = np.nonzero(rising | falling)
+            if not len(rows):
+                return mask
+            mask[rows, cols + rising[rows, cols]] = True
+
+    @staticmethod
+    def _rings(mask):
+        # Sisi sel terisi yang berbatasan dengan sel kosong, berarah berlawanan jarum jam terhadap selnya, disambung
+        # menjadi ring tertutup (titik sudut grid (kolom, baris)). Tanpa pola diagonal tiap sudut punya tepat satu sisi keluar.
+        padded = np.pad(mask, 1)
+        core = padded[1:-1, 1:-1]
+        sides = (
+            (padded[:-2, 1:-1], (0, 0), (1, 0)),  # bawah
+            (padded[1:-1, 2:], (1, 0), (1, 1)),  # kanan
+            (padded[2:, 1:-1], (1, 1), (0, 1)),  # atas
+            (padded[1:-1, :-2], (0, 1), (0, 0)),  # kiri
+        )
+        following = {}
+        for neighbour, (ax, ay), (bx, by) in sides:
+            rows, cols = np.nonzero(core & ~neighbour)
+            for row, col in zip(rows.tolist(), cols.tolist()):
+                following[(col + ax, row + ay)] = (col + bx, row + by)
+
+        rings = []
+        while following:
+            first, point = following.popitem()
+            ring = [first]
+            while point != first:
+                ring.append(point)
+                point = following.pop(point)
+            # Titik di tengah sisi lurus dibuang; ring ditutup dengan titik pertamanya
+            corners = [point for i, point in enumerate(ring)
+                       if (point[0] - ring[i - 1][0], point[1] - ring[i - 1][1])
+                       != (ring[(i + 1) % len(ring)][0] - point[0], ring[(i + 1) % len(ring)][1] - point[1])]
+            rings.append(corners + corners[:1])
+        return rings
+
+    @staticmethod
+    def _area(ring):
+        # Luas bertanda (shoelace); positif untuk ring berlawanan arah jarum jam
+        return sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(ring, ring[1:])) / 2
+
+    @staticmethod
+    def _contains(ring, point):
+        # Ray casting; titik tidak pernah tepat di tepi ring (lihat polygons)
+        x, y = point
+        inside = False
+        for (x0, y0), (x1, y1) in zip(ring, ring[1:]):
+            if (y0 > y) != (y1 > y) and x < x0 + (y - y0) * (x1 - x0) / (y1 - y0):
+                inside = not inside
+        return inside
+
+# ===================== KOMPRESI GEOMETRI =====================
+class GeometryCodec:
+    FORMATS = ('full', 'polyline', 'delta')
+    EARTH_RADIUS_M = 6371008.8
+
+    @staticmethod
+    def encode_polyline(path, precision=5):
+        # Google encoded polyline; path berisi pasangan [lat, lng]
+        if not path:
+            return ''
+        coords = np.round(np.asarray(path, dtype=np.float64) * 10 ** precision).astype(np.int64)
+        deltas = np.diff(coords, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+        chunks = []
+        for value in deltas.tolist():
+            value = ~(value << 1) if value < 0 else value << 1
+            while value >= 0x20:
+                chunks.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            chunks.append(chr(value + 63))
+        return ''.join(chunks)
+
+    @staticmethod
+    def decode_polyline(encoded, precision=5):
+        values = []
+        value = shift = 0
+        for char in encoded:
+            byte = ord(char) - 63
+            value |= (byte & 0x1f) << shift
+            shift += 5
+            if byte < 0x20:
+                values.append(~(value >> 1) if value & 1 else value >> 1)
+                value = shift = 0
+        coords = np.cumsum(np.asarray(values, dtype=np.int64).reshape(-1, 2), axis=0)
+        return (coords / 10 ** precision).tolist()
+
+    @staticmethod
+    def encode_delta(path, precision=5):
+        # Koordinat integer: nilai pertama absolut, sisanya selisih terhadap titik sebelumnya
+        if not path:
+            return {'precision': precision, 'lat': [], 'lng': []}
+        coords = np.round(np.asarray(path, dtype=np.float64) * 10 ** precision).astype(np.int64)
+        deltas = np.diff(coords, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+        return {'precision': precision, 'lat': deltas[:, 0].tolist(), 'lng': deltas[:, 1].tolist()}
+
+    @classmethod
+    def tolerance_for_zoom(cls, zoom, lat):
+        # Ukuran satu piksel (meter) pada tile 256 px di zoom tersebut
+        return 2 * math.pi * cls.EARTH_RADIUS_M * math.cos(math.radians(lat)) / (256 * 2 ** zoom)
+
+    @classmethod
+    def simplify(cls, path, tolerance_m):
+        # Douglas-Peucker pada koordinat terproyeksi (meter), iteratif agar aman untuk rute panjang
+        if len(path) < 3 or tolerance_m <= 0:
+            return path
+        points = np.asarray(path, dtype=np.float64)
+        cos_ref = math.cos(math.radians(float(points[:, 0].mean())))
+        xy = np.column_stack([np.radians(points[:, 1]) * cos_ref, np.radians(points[:, 0])]) * cls.EARTH_RADIUS_M
+        keep = np.zeros(len(points), dtype=bool)
+        keep[[0, -1]] = True
+        stack = [(0, len(points) - 1)]
+        while stack:
+            first, last = stack.pop()
+            if last - first < 2:
+                continue
+            segment = xy[last] - xy[first]
+            offsets = xy[first + 1:last] - xy[first]
+            length = math.hypot(*segment)
+            if length == 0:
+                distances = np.hypot(offsets[:, 0], offsets[:, 1])
+            else:
+                distances = np.abs(segment[0] * offsets[:, 1] - segment[1] * offsets[:, 0]) / length
+            farthest = int(np.argmax(distances))
+            if distances[farthest] > tolerance_m:
+                split = first + 1 + farthest
+                keep[split] = True
+                stack.append((first, split))
+                stack.append((split, last))
+        return points[keep].tolist()
+
+    @classmethod
+    def apply(cls, route_data, fmt='full', zoom=None):
+        # Menghasilkan salinan route_data; hasil asli (yang mungkin di-cache) tidak diubah
+        if fmt == 'full' and zoom is None:
+            return route_data
+        result = dict(route_data)
+        for key in ('primary', 'alternative'):
+            route = route_data.get(key)
+            if not route or 'path' not in route:
+                continue
+            route = dict(route)
+            path = route.pop('path')
+            if zoom is not None and path:
+                path = cls.simplify(path, cls.tolerance_for_zoom(zoom, path[0][0]))
+            if fmt == 'polyline':
+                route['polyline'] = cls.encode_polyline(path)
+            elif fmt == 'delta':
+                route['path_delta'] = cls.encode_delta(path)
+            else:
+                route['path'] = path
+            result[key] = route
+        return result
+
+# ===================== VISUALISASI PETA =====================
+class TrafficMap:
+    # Pembungkus iframe yang sama dengan branca Figure._repr_html_ (width 100%, ratio 60%)
+    IFRAME_PREFIX = (
+        '<div style="width:100%;">'
+        '<div style="position:relative;width:100%;height:0;padding-bottom:60%;">'
+        '<span style="color:#565656">Make this Notebook Trusted to load map: File -> Trust Notebook</span>'
+        '<iframe srcdoc="'
+    )
+    IFRAME_SUFFIX = (
+        '" style="position:absolute;width:100%;height:100%;left:0;top:0;'
+        'border:none !important;" '
+        "allowfullscreen webkitallowfullscreen mozallowfullscreen>"
+        "</iframe>"
+        "</div></div>"
+    )
+
+    def __init__(self, traffic_predictor, cache_size=None, store=None):
+        self.congestion_colors = {'padat': 'red', 'sedang': 'orange', 'lancar': 'green'}
+        self.isochrone_colors = ['green', 'yellowgreen', 'orange', 'red']  # kontur terdekat -> terjauh
+        self.traffic_predictor = traffic_predictor
+        self.cache_size = cache_size if cache_size is not None else Config.MAP_CACHE_SIZE
+        # Peta dasar per kondisi kemacetan; dengan tier bersama, worker lain memakai peta yang sudah dirender
+        self._base_cache = RouteCache(max_size=self.cache_size, db_path='', store=store or open_cache_store('maps'), namespace='maps')
+        # Layer kemacetan JSON (body + ETag) per versi snapshot, hanya di memori
+        self._layer_cache = RouteCache(max_size=max(self.cache_size, 1), db_path='', namespace='layers')
+
+    def after_fork(self):
+        # Peta dasar bisa sudah ditulis ke tier bersama saat warm_up di proses master
+        self._base_cache.reopen()
+
+    @staticmethod
+    def _heat_data(snapshot):
+        return [[node['lat'], node['lng'], 0.7 if snapshot[node_id]['level'] == 'padat' else 0.3]
+                for node_id, node in Config.NODES.items()]
+
+    @metrics.timed('map_base_build')
+    def _build_base_map(self, snapshot):
+        import folium
+        from folium.plugins import HeatMap
+
+        map_center = [-3.7956, 102.2597]
+        traffic_map = folium.Map(location=map_center, zoom_start=14, tiles='cartodbpositron')
+        
+        HeatMap(self._heat_data(snapshot), radius=15).add_to(traffic_map)
+        
+        for node_id, node in Config.NODES.items():
+            congestion = snapshot[node_id]
+            folium.CircleMarker(
+                location=[node['lat'], node['lng']],
+                radius=6,
+                popup=f"{node['name']} - {congestion['level']} ({congestion['reason']})",
+                color=self.congestion_colors[congestion['level']],
+                fill=True
+            ).add_to(traffic_map)
+        
+        # Dokumen dipecah di </script> terakhir sehingga layer rute bisa disisipkan tanpa render ulang folium
+        document = traffic_map.get_root().render()
+        split_at = document.rindex('</script>')
+        return {
+            'map_name': traffic_map.get_name(),
+            'head': html.escape(document[:split_at]),
+            'tail': html.escape(document[split_at:])
+        }
+
+    def _base_map(self, snapshot):
+        key = ';'.join(f"{node_id}:{level}" for node_id, level in snapshot.signature)
+        return self._base_cache.get_or_compute(key, lambda: self._build_base_map(snapshot))
+
+    @metrics.timed('map_render')
+    def create_map(self, start=None, end=None, route_data=None, at=None, isochrone=None):
+        base = self._base_map(self.traffic_predictor.snapshot(at))
+        map_name = base['map_name']
+        overlay = []
+        
+        if isochrone and 'features' in isochrone:
+            overlay.append(self._draw_isochrone(map_name, isochrone))
+        
+        if route_data and 'primary' in route_data:
+            overlay.append(self._draw_route(map_name, route_data['primary'], 'blue'))
+            
+            if 'alternative' in route_data:
+                overlay.append(self._draw_route(map_name, route_data['alternative'], 'green'))
+        
+        if start in Config.NODES:
+            start_node = Config.NODES[start]
+            overlay.append(self._draw_marker(map_name, start_node, f"<b>START:</b> {start_node['name']}", 'green', 'play'))
+        
+        if end in Config.NODES:
+            end_node = Config.NODES[end]
+            overlay.append(self._draw_marker(map_name, end_node, f"<b>END:</b> {end_node['name']}", 'red', 'stop'))
+        
+        return self.IFRAME_PREFIX + base['head'] + html.escape(''.join(overlay)) + base['tail'] + self.IFRAME_SUFFIX
+
+    @staticmethod
+    def _encode_layer(payload):
+        # Body JSON ringkas dan ETag dari isinya: isi yang sama (mis. jam berbeda dengan kondisi sama) -> ETag sama
+        body = json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        return {'body': body, 'etag': hashlib.blake2b(body, digest_size=12).hexdigest()}
+
+    def congestion_layer(self, at=None):
+        # Marker dan titik heatmap kemacetan untuk mode MAP_RENDERING=json
+        snapshot = self.traffic_predictor.snapshot(at)
+        return self._layer_cache.get_or_compute(str(snapshot.version), lambda: self._encode_layer({
+            'markers': [
+                {'id': node_id, 'name': node['name'], 'lat': node['lat'], 'lng': node['lng'], 'level': snapshot[node_id]['level'],
+                 'reason': snapshot[node_id]['reason'], 'color': self.congestion_colors[snapshot[node_id]['level']]}
+                for node_id, node in Config.NODES.items()
+            ],
+            'heatmap': self._heat_data(snapshot),
+        }))
+
+    @metrics.timed('map_layer')
+    def route_layer(self, start=None, end=None, route_data=None, zoom=None):
+        # Polyline rute (encoded polyline) dan marker START/END; pengganti overlay create_map
+        routes = []
+        if route_data and 'primary' in route_data:
+            compact = GeometryCodec.apply(route_data, 'polyline', zoom)
+            for key, color in (('primary', 'blue'), ('alternative', 'green')):
+                route = compact.get(key)
+                if route and route.get('polyline'):
+                    routes.append({'kind': key, 'color': color, 'polyline': route['polyline'], 'popup': self._route_popup(route)})
+        markers = []
+        for node_id, label, color, icon in ((start, 'START', 'green', 'play'), (end, 'END', 'red', 'stop')):
+            if node_id in Config.NODES:
+                node = Config.NODES[node_id]
+                markers.append({'label': label, 'name': node['name'], 'lat': node['lat'], 'lng': node['lng'], 'color': color, 'icon': icon})
+        return self._encode_layer({'routes': routes, 'markers': markers})
+
+    @metrics.timed('map_layer')
+    def isochrone_layer(self, isochrone):
+        # GeoJSON isokron dengan warna dan label per kontur, siap untuk L.geoJSON
+        return self._encode_layer(self._styled_isochrone(isochrone))
+
+    def _styled_isochrone(self, isochrone):
+        features = isochrone['features']
+        colors = self.isochrone_colors[:len(features)][::-1]  # fitur urut dari kontur terjauh
+        return dict(isochrone, features=[
+            dict(feature, properties=dict(feature['properties'], color=color,
+                                          label=f"{feature['properties']['minutes']} menit dari {isochrone['name']}"))
+            for feature, color in zip(features, colors)
+        ])
+
+    @staticmethod
+    def _route_popup(route):
+        return f"Rute {'Alternatif' if route.get('is_alternative') else 'Utama'}: {route['distance']} ({route['time']})"
+
+    @staticmethod
+    def _js(value):
+        # JSON aman untuk disisipkan di dalam <script>
+        return json.dumps(value).replace('</', '<\\/')
+
+    def _draw_route(self, map_name, route, color):
+        if 'path' in route and route['path']:
+            popup = self._route_popup(route)
+            return (
+                f"L.polyline({self._js(route['path'])}, {self._js({'color': color, 'weight': 6})})"
+                f".bindPopup({self._js(popup)}).addTo({map_name});\n"
+            )
+        return ''
+
+    def _draw_isochrone(self, map_name, isochrone):
+        return (
+            f"L.geoJSON({self._js(self._styled_isochrone(isochrone))}, {{style: function (feature) {{"
+            f" return {{color: feature.properties.color, weight: 1, fillOpacity: 0.25}}; }}}})"
+            f".bindPopup(function (shape) {{ return shape.feature.properties.label; }}).addTo({map_name});\n"
+        )
+
+    def _draw_marker(self, map_name, node, popup, color, icon):
+        icon_options = {'icon': icon, 'iconColor': 'white', 'markerColor': color, 'prefix': 'fa', 'extraClasses': 'fa-rotate-0'}
+        return (
+            f"L.marker({self._js([node['lat'], node['lng']])}, {{icon: L.AwesomeMarkers.icon({self._js(icon_options)})}})"
+            f".bindPopup({self._js(popup)}).addTo({map_name});\n"
+        )
+
+    def info(self):
+        return self._base_cache.info()
+
+# ===================== FLASK ROUTES =====================
+bp = Blueprint('smartcity', __name__)
+
+# Layanan milik aplikasi yang sedang aktif (lihat create_app)
+navigator = LocalProxy(lambda: current_app.extensions['smartcity']['navigator'])
+map_visualizer = LocalProxy(lambda: current_app.extensions['smartcity']['map_visualizer'])
+
+@bp.before_request
+def _start_timing():
+    if metrics.enabled:
+        g.request_started = time.perf_counter()
+        if Config.TIMING_HEADER:
+            g.timings_token = _request_timings.set({})
+
+@bp.before_request
+def _identify_client():
+    # Klien dan prioritas untuk anggaran request OSRM: halaman peta interaktif lebih dulu daripada API bulk
+    client = request.headers.get(Config.CLIENT_ID_HEADER, '') if Config.CLIENT_ID_HEADER else ''
+    client = client.split(',')[0].strip() or request.remote_addr or '-'
+    priority = 'interactive' if request.endpoint in Config.INTERACTIVE_ENDPOINTS else 'bulk'
+    g.upstream_token = _upstream_client.set((client, priority))
+
+@bp.teardown_request
+def _forget_client(exc):
+    token = g.pop('upstream_token', None)
+    if token is not None:
+        _upstream_client.reset(token)
+
+@bp.after_request
+def _finish_timing(response):
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    metrics.observe('smartcity_request_duration_seconds', elapsed,
+                    endpoint=request.endpoint, method=request.method, status=response.status_code)
+    token = g.pop('timings_token', None)
+    if token is not None:
+        timings = _request_timings.get()
+        _request_timings.reset(token)
+        # Untuk respons streaming, total hanya mencakup waktu hingga header dikirim
+        parts = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings.items()]
+        parts.append(f"total;dur={elapsed * 1000:.2f}")
+        response.headers['Server-Timing'] = ', '.join(parts)
+    return response
+
+@bp.route('/', methods=['GET', 'POST'])
+def index():
+    start = request.form.get('start', type=int)
+    end = request.form.get('end', type=int)
+    transport = request.form.get('transport', 'mobil')
+    
+    route_data = None
+    error_message = None
+    at = navigator.traffic_predictor.now()
+    
+    # Overlay isokron opsional, mis. /?isochrone=1&minutes=10,20&transport=motor
+    isochrone_origin = request.args.get('isochrone', type=int)
+    isochrone_transport = request.args.get('transport', transport)
+    isochrone_minutes, minutes_error = _parse_isochrone_minutes(request.args.get('minutes'))
+    if isochrone_origin is not None and (isochrone_origin not in Config.NODES or isochrone_transport not in Config.TRANSPORT_PROFILES or minutes_error):
+        error_message = minutes_error or "Lokasi atau moda isokron tidak valid"
+        isochrone_origin = None
+    
+    if start is not None and end is not None and transport in Config.TRANSPORT_PROFILES:
+        if start in Config.NODES and end in Config.NODES:
+            route_data = navigator.find_all_routes(start, end, transport, at)
+            if 'error' in route_data:
+                error_message = route_data['error']
+                route_data = None
+        else:
+            error_message = "Lokasi awal atau tujuan tidak valid"
+    
+    map_html = map_layers = None
+    if Config.MAP_RENDERING == 'folium':
+        isochrone = navigator.isochrone(isochrone_origin, isochrone_transport, isochrone_minutes, at) if isochrone_origin is not None else None
+        if isochrone and 'error' in isochrone:
+            error_message = isochrone['error']
+            isochrone = None
+        map_html = map_visualizer.create_map(start, end, route_data, at, isochrone)
+    else:
+        # Halaman hanya memuat shell peta; kemacetan dan rute diambil browser dari endpoint JSON yang bisa di-cache
+        map_layers = {
+            'shell': url_for('smartcity.map_shell', v=MAP_SHELL_ETAG),
+            'congestion': url_for('smartcity.api_map_congestion'),
+            'route': url_for('smartcity.api_map_route', start=start, end=end, transport=transport) if route_data else None,
+            'isochrone': url_for('smartcity.api_isochrone', origin=isochrone_origin, transport=isochrone_transport,
+                                 minutes=','.join(map(str, isochrone_minutes)) if isochrone_minutes else None)
+            if isochrone_origin is not None else None,
+        }
+    
+    return render_template(
+        'index.html',
+        map_html=map_html,
+        map_layers=map_layers,
+        nodes=Config.NODES,
+        route_data=route_data,
+        selected_start=start,
+        selected_end=end,
+        selected_transport=transport,
+        congestion_colors=map_visualizer.congestion_colors,
+        error_message=error_message
+    )
+
+def _validate_route_params(data):
+    start = data.get('start') if data else None
+    end = data.get('end') if data else None
+    transport = data.get('transport', 'mobil') if data else 'mobil'
+    
+    if not start or not end:
+        return None, "Parameter start dan end diperlukan"
+    
+    try:
+        start = int(start)
+        end = int(end)
+    except (ValueError, TypeError):
+        return None, "ID lokasi tidak valid"
+    
+    if transport not in Config.TRANSPORT_PROFILES:
+        return None, f"Moda transportasi '{transport}' tidak valid"
+    
+    return (start, end, transport), None
+
+def _parse_route_request():
+    params, error = _validate_route_params(request.get_json())
+    if error:
+        return None, (jsonify({"error": error}), 400)
+    return params, None
+
+def _upstream_error(result):
+    # Anggaran request OSRM habis -> 503 + Retry-After; kegagalan lain dari layanan peta -> 502
+    response = jsonify(result)
+    response.status_code = 503 if 'retry_after' in result else 502
+    if 'retry_after' in result:
+        response.headers['Retry-After'] = str(result['retry_after'])
+    return response
+
+def _parse_geometry_options():
+    data = request.get_json() or {}
+    fmt = data.get('geometry', 'full')
+    zoom = data.get('zoom')
+    
+    if fmt not in GeometryCodec.FORMATS:
+        return None, (jsonify({"error": f"Format geometri '{fmt}' tidak valid"}), 400)
+    
+    if zoom is not None:
+        try:
+            zoom = int(zoom)
+        except (ValueError, TypeError):
+            return None, (jsonify({"error": "Parameter zoom tidak valid"}), 400)
+        if not 0 <= zoom <= 22:
+            return None, (jsonify({"error": "Parameter zoom harus antara 0 dan 22"}), 400)
+    
+    return (fmt, zoom), None
+
+@bp.route('/api/route', methods=['POST'])
+def api_route():
+    params, error = _parse_route_request()
+    if error:
+        return error
+    
+    geometry, error = _parse_geometry_options()
+    if error:
+        return error
+    
+    route_data = navigator.find_all_routes(*params)
+    if 'retry_after' in route_data:
+        return _upstream_error(route_data)
+    if 'error' not in route_data:
+        route_data = GeometryCodec.apply(route_data, *geometry)
+    return jsonify(route_data)
+
+@bp.route('/api/route/async', methods=['POST'])
+def api_route_async():
+    params, error = _parse_route_request()
+    if error:
+        return error
+    
+    geometry, error = _parse_geometry_options()
+    if error:
+        return error
+    
+    route_data = navigator.find_all_routes_concurrent(*params)
+    if 'retry_after' in route_data:
+        return _upstream_error(route_data)
+    if 'error' not in route_data:
+        route_data = GeometryCodec.apply(route_data, *geometry)
+    return jsonify(route_data)
+
+@bp.route('/api/route/departures', methods=['POST'])
+def api_route_departures():
+    params, error = _parse_route_request()
+    if error:
+        return error
+    start, end, transport = params
+    if start not in Config.NODES or end not in Config.NODES:
+        return jsonify({"error": "Lokasi tidak valid"}), 400
+    
+    data = request.get_json()
+    depart_from = data.get('depart_from')
+    if depart_from is not None:
+        try:
+            depart_from = datetime.fromisoformat(depart_from)
+        except (ValueError, TypeError):
+            return jsonify({"error": "Parameter depart_from harus berupa waktu ISO 8601"}), 400
+        if depart_from.tzinfo is not None:
+            depart_from = depart_from.astimezone().replace(tzinfo=None)
+    
+    try:
+        window_minutes = int(data.get('window_minutes', Config.FORECAST_WINDOW_MINUTES))
+        slot_minutes = int(data.get('slot_minutes', Config.FORECAST_SLOT_MINUTES))
+    except (ValueError, TypeError):
+        return jsonify({"error": "Parameter window_minutes dan slot_minutes harus berupa bilangan bulat"}), 400
+    if slot_minutes < 1 or window_minutes < slot_minutes:
+        return jsonify({"error": "slot_minutes minimal 1 dan tidak boleh melebihi window_minutes"}), 400
+    if window_minutes // slot_minutes > Config.FORECAST_MAX_SLOTS:
+        return jsonify({"error": f"Maksimal {Config.FORECAST_MAX_SLOTS} slot keberangkatan"}), 400
+    
+    result = navigator.forecast_departures(start, end, transport, depart_from, window_minutes, slot_minutes)
+    if 'error' in result:
+        return _upstream_error(result)
+    return jsonify(result)
+
+@bp.route('/api/routes/batch', methods=['POST'])
+def api_routes_batch():
+    data = request.get_json() or {}
+    items = data.get('items')
+    
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Parameter items diperlukan"}), 400
+    if len(items) > Config.BATCH_MAX_ITEMS:
+        return jsonify({"error": f"Maksimal {Config.BATCH_MAX_ITEMS} item per batch"}), 400
+    
+    geometry, error = _parse_geometry_options()
+    if error:
+        return error
+    
+    # Item yang sama cukup dihitung sekali; error validasi dilaporkan per item
+    indexes = {}
+    invalid = []
+    for index, item in enumerate(items):
+        params, item_error = _validate_route_params(item if isinstance(item, dict) else None)
+        if item_error:
+            invalid.append({'index': index, 'error': item_error})
+        else:
+            indexes.setdefault(params, []).append(index)
+    
+    at = navigator.traffic_predictor.now()
+    
+    def generate():
+        yield from invalid
+        for (start, end, transport), route_data in navigator.find_routes_batch(list(indexes), at):
+            entry = {'start': start, 'end': end, 'transport': transport}
+            if 'error' in route_data:
+                entry['error'] = route_data['error']
+            else:
+                entry['result'] = GeometryCodec.apply(route_data, *geometry)
+            for index in indexes[(start, end, transport)]:
+                yield dict(entry, index=index)
+    
+    if data.get('stream', True):
+        lines = (json.dumps(entry) + '\n' for entry in generate())
+        return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+    return jsonify({'results': sorted(generate(), key=lambda entry: entry['index'])})
+
+@bp.route('/api/matrix', methods=['POST'])
+def api_matrix():
+    data = request.get_json() or {}
+    transport = data.get('transport', 'mobil')
+    node_ids = data.get('nodes', list(Config.NODES))
+    
+    if transport not in Config.TRANSPORT_PROFILES:
+        return jsonify({"error": f"Moda transportasi '{transport}' tidak valid"}), 400
+    # String juga iterable: "123" tidak boleh menjadi lokasi 1, 2, 3
+    if not isinstance(node_ids, list) or not node_ids:
+        return jsonify({"error": "Parameter nodes harus berupa daftar lokasi"}), 400
+    try:
+        node_ids = [int(node_id) for node_id in node_ids]
+    except (ValueError, TypeError):
+        return jsonify({"error": "ID lokasi tidak valid"}), 400
+    if any(node_id not in Config.NODES for node_id in node_ids):
+        return jsonify({"error": "Lokasi tidak valid"}), 400
+    if len(node_ids) > Config.MATRIX_MAX_NODES:
+        return jsonify({"error": f"Maksimal {Config.MATRIX_MAX_NODES} lokasi per matriks"}), 400
+    
+    result = navigator.duration_matrix(node_ids, transport)
+    if 'error' in result:
+        return _upstream_error(result)
+    return jsonify(result)
+
+def _layer_response(layer):
+    # Setelah MAP_LAYER_MAX_AGE browser merevalidasi dengan If-None-Match dan mendapat 304 tanpa body selama isinya sama
+    response = Response(layer['body'], mimetype='application/json')
+    response.set_etag(layer['etag'])
+    response.cache_control.max_age = Config.MAP_LAYER_MAX_AGE
+    return response.make_conditional(request)
+
+@bp.route('/api/map/congestion', methods=['GET'])
+def api_map_congestion():
+    return _layer_response(map_visualizer.congestion_layer())
+
+@bp.route('/api/map/route', methods=['GET'])
+def api_map_route():
+    params, error = _validate_route_params(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+    start, end, transport = params
+    if start not in Config.NODES or end not in Config.NODES:
+        return jsonify({"error": "Lokasi awal atau tujuan tidak valid"}), 400
+    
+    zoom = request.args.get('zoom')
+    if zoom is not None:
+        try:
+            zoom = int(zoom)
+        except ValueError:
+            return jsonify({"error": "Parameter zoom tidak valid"}), 400
+        if not 0 <= zoom <= 22:
+            return jsonify({"error": "Parameter zoom harus antara 0 dan 22"}), 400
+    
+    route_data = navigator.find_all_routes(start, end, transport)
+    if 'error' in route_data:
+        return _upstream_error(route_data)
+    return _layer_response(map_visualizer.route_layer(start, end, route_data, zoom))
+
+def _parse_isochrone_minutes(text):
+    # "5,10,15" -> [5, 10, 15]; None/kosong -> None (kontur default)
+    if not text:
+        return None, None
+    try:
+        minutes = sorted({int(value) for value in text.split(',')})
+    except ValueError:
+        return None, "Parameter minutes tidak valid"
+    if len(minutes) > Config.ISOCHRONE_MAX_CONTOURS:
+        return None, f"Maksimal {Config.ISOCHRONE_MAX_CONTOURS} nilai minutes"
+    if not 1 <= minutes[0] <= minutes[-1] <= Config.ISOCHRONE_MAX_MINUTES:
+        return None, f"Parameter minutes harus antara 1 dan {Config.ISOCHRONE_MAX_MINUTES}"
+    return minutes, None
+
+@bp.route('/api/isochrone', methods=['GET'])
+def api_isochrone():
+    origin = request.args.get('origin', type=int)
+    transport = request.args.get('transport', 'mobil')
+    if origin not in Config.NODES:
+        return jsonify({"error": "Lokasi asal tidak valid"}), 400
+    if transport not in Config.TRANSPORT_PROFILES:
+        return jsonify({"error": f"Moda transportasi '{transport}' tidak valid"}), 400
+    minutes, error = _parse_isochrone_minutes(request.args.get('minutes'))
+    if error:
+        return jsonify({"error": error}), 400
+    
+    isochrone = navigator.isochrone(origin, transport, minutes)
+    if 'error' in isochrone:
+        return _upstream_error(isochrone)
+    return _layer_response(map_visualizer.isochrone_layer(isochrone))
+
+@bp.route('/map/shell.js', methods=['GET'])
+def map_shell():
+    # URL shell memuat ?v=<hash isi>, jadi boleh di-cache lama tanpa revalidasi
+    response = Response(MAP_SHELL_JS, mimetype='application/javascript')
+    response.set_etag(MAP_SHELL_ETAG)
+    response.cache_control.public = True
+    response.cache_control.max_age = Config.MAP_SHELL_MAX_AGE
+    return response.make_conditional(request)
+
+@bp.route('/api/trip', methods=['POST'])
+def api_trip():
+    data = request.get_json() or {}
+    transport = data.get('transport', 'mobil')
+    node_ids = data.get('nodes')
+    
+    if transport not in Config.TRANSPORT_PROFILES:
+        return jsonify({"error": f"Moda transportasi '{transport}' tidak valid"}), 400
+    if not isinstance(node_ids, list) or len(node_ids) < 2:
+        return jsonify({"error": "Parameter nodes berisi minimal dua lokasi"}), 400
+    try:
+        node_ids = [int(node_id) for node_id in node_ids]
+    except (ValueError, TypeError):
+        return jsonify({"error": "ID lokasi tidak valid"}), 400
+    if any(node_id not in Config.NODES for node_id in node_ids):
+        return jsonify({"error": "Lokasi tidak valid"}), 400
+    if len(set(node_ids)) < 2:
+        return jsonify({"error": "Parameter nodes berisi minimal dua lokasi"}), 400
+    
+    geometry, error = _parse_geometry_options()
+    if error:
+        return error
+    
+    result = navigator.plan_trip(node_ids, transport, bool(data.get('round_trip', False)))
+    if result.get('infeasible'):
+        # Lokasi yang tidak saling terjangkau adalah masalah permintaan, bukan kegagalan layanan peta
+        return jsonify({"error": result['error']}), 422
+    if 'error' in result:
+        return _upstream_error(result)
+    return jsonify(GeometryCodec.apply(result, *geometry))
+
+@bp.route('/api/cache', methods=['GET'])
+def api_cache():
+    return jsonify(dict(navigator.route_cache.info(), map=map_visualizer.info(),
+                        results=dict(navigator.result_cache.info(), **navigator.result_stats)))
+
+@bp.route('/api/osrm', methods=['GET'])
+def api_osrm():
+    return jsonify(dict(navigator.osrm.info(), budget=navigator.upstream.info(), fallback=navigator.fallback_stats))
+
+@bp.route('/api/traffic/probes', methods=['POST'])
+def api_traffic_probes():
+    # Sampel probe: JSON {"samples": [[lat, lng, kecepatan_kmh, timestamp], ...]} atau teks CSV per baris
+    live = navigator.traffic_predictor.live
+    if live is None:
+        return jsonify({"error": "Data lalu lintas live tidak aktif"}), 404
+    if request.is_json:
+        samples = (request.get_json(silent=True) or {}).get('samples')
+        if not isinstance(samples, list):
+            return jsonify({"error": "Parameter samples harus berupa list"}), 400
+        try:
+            samples = np.array(samples, dtype=np.float64).reshape(-1, 4)
+        except (ValueError, TypeError):
+            return jsonify({"error": "Setiap sampel harus berisi [lat, lng, kecepatan_kmh, timestamp]"}), 400
+    else:
+        samples = parse_probe_lines(request.get_data(as_text=True).splitlines())
+    if len(samples) > Config.LIVE_BATCH_SIZE:
+        return jsonify({"error": f"Maksimal {Config.LIVE_BATCH_SIZE} sampel per request"}), 400
+    return jsonify({'received': len(samples), 'matched': live.ingest(samples)})
+
+@bp.route('/api/traffic/live', methods=['GET'])
+def api_traffic_live():
+    live = navigator.traffic_predictor.live
+    if live is None:
+        return jsonify({"error": "Data lalu lintas live tidak aktif"}), 404
+    nodes = {
+        str(node_id): {'name': Config.NODES[node_id]['name'], 'speed_kmh': round(speed, 1), 'samples': count}
+        for node_id, (speed, count) in sorted(live.observations().items())
+    }
+    return jsonify(dict(live.info(), active=live.applies(navigator.traffic_predictor.now()), nodes=nodes))
+
+@bp.route('/healthz', methods=['GET'])
+def healthz():
+    # Liveness: proses hidup dan bisa melayani request
+    return jsonify({'status': 'ok', 'pid': os.getpid()})
+
+@bp.route('/readyz', methods=['GET'])
+def readyz():
+    # Readiness: layanan sudah dipanaskan dan mesin rute bisa dipakai (circuit breaker OSRM tidak terbuka)
+    services = current_app.extensions['smartcity']
+    routing = navigator.osrm.info()
+    checks = {
+        'warmed': services.get('warmed', False),
+        'routing': routing.get('state', 'closed') != 'open',
+        'route_matrix': len(navigator.route_matrix) if navigator.route_matrix is not None else 0,
+    }
+    ready = checks['routing'] and (checks['warmed'] or not services.get('preload', False))
+    return jsonify({'ready': ready, 'pid': os.getpid(), 'checks': checks}), 200 if ready else 503
+
+@bp.route('/metrics', methods=['GET'])
+def api_metrics():
+    gauges = {}
+    sources = [('route_cache', navigator.route_cache.info()), ('result_cache', dict(navigator.result_cache.info(), **navigator.result_stats)),
+               ('map_cache', map_visualizer.info()), ('osrm', navigator.osrm.info()), ('osrm_budget', navigator.upstream.info())]
+    if navigator.traffic_predictor.live is not None:
+        sources.append(('live', navigator.traffic_predictor.live.info()))
+    for prefix, info in sources:
+        for key, value in info.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                gauges[f"smartcity_{prefix}_{key}"] = value
+    return Response(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+
+HTML_TEMPLATE = """
+<!DOCTYPE html>
+<html lang="id">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Smart Traffic Bengkulu</title>
+    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css">
+    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css" rel="stylesheet">
+    {% if map_layers %}
+    <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/leaflet@1.9.3/dist/leaflet.css">
+    {% endif %}
+    <style>
+        .route-option {
+            border: 1px solid #ddd;
+            border-radius: 8px;
+            padding: 15px;
+            margin-bottom: 15px;
+            cursor: pointer;
+            transition: all 0.3s;
+        }
+        .route-option:hover {
+            background-color: #f8f9fa;
+            border-color: #007bff;
+        }
+        .badge-padat { background-color: #dc3545; }
+        .badge-sedang { background-color: #ffc107; }
+        .badge-lancar { background-color: #28a745; }
+        .transport-icon { font-size: 1.5em; margin-right: 10px; }
+        .step-item { margin-left: 20px; }
+        .step-details { font-size: 0.9em; color: #666; }
+        .map-frame { position: relative; width: 100%; height: 0; padding-bottom: 60%; }
+        .map-frame > div { position: absolute; width: 100%; height: 100%; left: 0; top: 0; }
+        .map-pin {
+            display: flex; align-items: center; justify-content: center;
+            width: 28px; height: 28px; border-radius: 50%; color: white; font-size: 12px;
+        }
+    </style>
+</head>
+<body>
+    <div class="container-fluid">
+        <div class="row bg-primary text-white p-4">
+            <div class="col">
+                <h1><i class="fas fa-traffic-light"></i> Smart Traffic Bengkulu</h1>
+                <p class="mb-0">Sistem navigasi cerdas berbasis peta digital</p>
+            </div>
+        </div>
+        
+        <div class="row mt-4">
+            <div class="col-md-4">
+                <div class="card">
+                    <div class="card-header bg-primary text-white">
+                        <h5 class="mb-0"><i class="fas fa-search-location"></i> Cari Rute</h5>
+                    </div>
+                    <div class="card-body">
+                        <form method="POST">
+                            <div class="mb-3">
+                                <label for="start" class="form-label">Lokasi Awal</label>
+                                <select class="form-select" id="start" name="start" required>
+                                    <option value="">Pilih lokasi awal</option>
+                                    {% for id, node in nodes.items() %}
+                                    <option value="{{ id }}" {% if selected_start == id %}selected{% endif %}>{{ node.name }}</option>
+                                    {% endfor %}
+                                </select>
+                            </div>
+                            <div class="mb-3">
+                                <label for="end" class="form-label">Lokasi Tujuan</label>
+                                <select class="form-select" id="end" name="end" required>
+                                    <option value="">Pilih lokasi tujuan</option>
+                                    {% for id, node in nodes.items() %}
+                                    <option value="{{ id }}" {% if selected_end == id %}selected{% endif %}>{{ node.name }}</option>
+                                    {% endfor %}
+                                </select>
+                            </div>
+                            <div class="mb-3">
+                                <label for="transport" class="form-label">Moda Transportasi</label>
+                                <select class="form-select" id="transport" name="transport">
+                                    <option value="motor" {% if selected_transport == 'motor' %}selected{% endif %}>Motor</option>
+                                    <option value="mobil" {% if selected_transport == 'mobil' %}selected{% endif %}>Mobil</option>
+                                    <option value="jalan_kaki" {% if selected_transport == 'jalan_kaki' %}selected{% endif %}>Jalan Kaki</option>
+                                </select>
+                            </div>
+                            <button type="submit" class="btn btn-primary w-100">
+                                <i class="fas fa-route"></i> Cari Rute
+                            </button>
+                        </form>
+                    </div>
+                </div>
+                
+                <div class="card mt-3">
+                    <div class="card-header bg-primary text-white">
+                        <h5 class="mb-0"><i class="fas fa-info-circle"></i> Legenda</h5>
+                    </div>
+                    <div class="card-body">
+                        <div class="d-flex align-items-center mb-2">
+                            <div style="width: 20px; height: 20px; background-color: red; margin-right: 10px;"></div>
+                            <span>Padat</span>
+                        </div>
+                        <div class="d-flex align-items-center mb-2">
+                            <div style="width: 20px; height: 20px; background-color: orange; margin-right: 10px;"></div>
+                            <span>Sedang</span>
+                        </div>
+                        <div class="d-flex align-items-center">
+                            <div style="width: 20px; height: 20px; background-color: green; margin-right: 10px;"></div>
+                            <span>Lancar</span>
+                        </div>
+                    </div>
+                </div>
+            </div>
+            
+            <div class="col-md-8">
+                <div class="card h-100">
+                    <div class="card-header bg-primary text-white">
+                        <h5 class="mb-0"><i class="fas fa-map-marked-alt"></i> Peta</h5>
+                    </div>
+                    <div class="card-body p-0">
+                        {% if map_layers %}
+                        <div class="map-frame">
+                            <div id="smartcity-map" data-congestion-url="{{ map_layers.congestion }}"{% if map_layers.route %} data-route-url="{{ map_layers.route }}"{% endif %}{% if map_layers.isochrone %} data-isochrone-url="{{ map_layers.isochrone }}"{% endif %}></div>
+                        </div>
+                        {% else %}
+                        {{ map_html|safe }}
+                        {% endif %}
+                    </div>
+                </div>
+            </div>
+        </div>
+
+        {% if error_message %}
+        <div class="container mt-4">
+            <div class="alert alert-danger">
+                <i class="fas fa-exclamation-circle"></i> {{ error_message }}
+            </div>
+        </div>
+        {% endif %}
+
+        {% if route_data %}
+        <div class="container mt-4">
+            {% if route_data.degraded %}
+            <div class="alert alert-info">
+                <i class="fas fa-info-circle"></i>
+                Layanan peta sedang sibuk: rute alternatif dan kondisi terbaru mungkin belum ditampilkan.
+            </div>
+            {% endif %}
+            {% if route_data.has_congestion %}
+            <div class="alert alert-warning">
+                <i class="fas fa-exclamation-triangle"></i> 
+                Terdeteksi kemacetan pada rute utama. Berikut alternatifnya:
+            </div>
+            {% endif %}
+            
+            <div class="row">
+                <div class="col-md-6">
+                    <div class="route-option">
+                        <h5><i class="fas fa-route"></i> Rute Utama <i class="fas fa-{{ route_data.primary.transport_icon }} transport-icon"></i></h5>
+                        <div class="d-flex justify-content-between">
+                            <span>{{ route_data.primary.distance }}</span>
+                            <span>{{ route_data.primary.time }}</span>
+                        </div>
+                        {% for step in route_data.primary.steps %}
+                        <div class="step-item mb-2">
+                            <strong>{{ step.instruction }}</strong>
+                            <div class="step-details">
+                                <p>Jarak: {{ step.distance }}</p>
+                                <p>Waktu: {{ step.time }}</p>
+                                <p>{{ step.condition }}</p>
+                            </div>
+                        </div>
+                        {% endfor %}
+                    </div>
+                </div>
+                
+                {% if route_data.has_congestion and route_data.alternative %}
+                <div class="col-md-6">
+                    <div class="route-option">
+                        <h5><i class="fas fa-random"></i> Rute Alternatif <i class="fas fa-{{ route_data.alternative.transport_icon }} transport-icon"></i></h5>
+                        <div class="d-flex justify-content-between">
+                            <span>{{ route_data.alternative.distance }}</span>
+                            <span>{{ route_data.alternative.time }}</span>
+                        </div>
+                        {% if route_data.alternative.avoided_congestion %}
+                        <div class="text-muted mb-1">
+                            <small><i class="fas fa-check-circle"></i> Menghindari {{ route_data.alternative.avoided_congestion|length }} titik macet</small>
+                        </div>
+                        {% endif %}
+                        {% for step in route_data.alternative.steps %}
+                        <div class="step-item mb-2">
+                            <strong>{{ step.instruction }}</strong>
+                            <div class="step-details">
+                                <p>Jarak: {{ step.distance }}</p>
+                                <p>Waktu: {{ step.time }}</p>
+                                <p>{{ step.condition }}</p>
+                            </div>
+                        </div>
+                        {% endfor %}
+                    </div>
+                </div>
+                {% endif %}
+            </div>
+        </div>
+        {% endif %}
+    </div>
+    
+    <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.bundle.min.js"></script>
+    {% if map_layers %}
+    <script src="https://cdn.jsdelivr.net/npm/leaflet@1.9.3/dist/leaflet.js"></script>
+    <script src="https://cdn.jsdelivr.net/gh/python-visualization/folium@main/folium/templates/leaflet_heat.min.js"></script>
+    <script src="{{ map_layers.shell }}"></script>
+    {% endif %}
+</body>
+</html>
+"""
+
+# Shell peta mode MAP_RENDERING=json: sama untuk semua request, layer diambil dari /api/map/congestion dan /api/map/route
+MAP_SHELL_JS = """
+(function () {
+    var element = document.getElementById('smartcity-map');
+    if (!element) {
+        return;
+    }
+    var map = L.map(element).setView([-3.7956, 102.2597], 14);
+    L.tileLayer('https://{s}.basemaps.cartocdn.com/light_all/{z}/{x}/{y}{r}.png', {
+        attribution: '&copy; OpenStreetMap contributors &copy; CARTO', subdomains: 'abcd', maxZoom: 20
+    }).addTo(map);
+
+    function escape(text) {
+        var span = document.createElement('span');
+        span.textContent = text;
+        return span.innerHTML;
+    }
+
+    function decodePolyline(encoded) {
+        var points = [], index = 0, lat = 0, lng = 0;
+        while (index < encoded.length) {
+            var values = [0, 0];
+            for (var i = 0; i < 2; i++) {
+                var shift = 0, result = 0, byte;
+                do {
+                    byte = encoded.charCodeAt(index++) - 63;
+                    result |= (byte & 0x1f) << shift;
+                    shift += 5;
+                } while (byte >= 0x20);
+                values[i] = result & 1 ? ~(result >> 1) : result >> 1;
+            }
+            lat += values[0];
+            lng += values[1];
+            points.push([lat / 1e5, lng / 1e5]);
+        }
+        return points;
+    }
+
+    function load(url, draw) {
+        // Browser mengirim If-None-Match sendiri; 304 dilayani dari cache HTTP
+        fetch(url, {credentials: 'same-origin'}).then(function (response) {
+            if (!response.ok) {
+                throw new Error(url + ': HTTP ' + response.status);
+            }
+            return response.json();
+        }).then(draw).catch(function (error) {
+            console.error(error);
+        });
+    }
+
+    load(element.dataset.congestionUrl, function (layer) {
+        L.heatLayer(layer.heatmap, {radius: 15, blur: 15, minOpacity: 0.5, maxZoom: 18}).addTo(map);
+        layer.markers.forEach(function (marker) {
+            L.circleMarker([marker.lat, marker.lng], {radius: 6, color: marker.color, fill: true})
+                .bindPopup(escape(marker.name + ' - ' + marker.level + ' (' + marker.reason + ')'))
+                .addTo(map);
+        });
+    });
+
+    if (element.dataset.isochroneUrl) {
+        load(element.dataset.isochroneUrl, function (layer) {
+            var shapes = L.geoJSON(layer, {
+                style: function (feature) {
+                    return {color: feature.properties.color, weight: 1, fillOpacity: 0.25};
+                }
+            }).bindPopup(function (shape) {
+                return escape(shape.feature.properties.label);
+            }).addTo(map).bringToBack();
+            if (!element.dataset.routeUrl && shapes.getBounds().isValid()) {
+                map.fitBounds(shapes.getBounds(), {padding: [20, 20]});
+            }
+        });
+    }
+
+    if (element.dataset.routeUrl) {
+        load(element.dataset.routeUrl, function (layer) {
+            var bounds = [];
+            layer.routes.forEach(function (route) {
+                var path = decodePolyline(route.polyline);
+                bounds = bounds.concat(path);
+                L.polyline(path, {color: route.color, weight: 6}).bindPopup(escape(route.popup)).addTo(map);
+            });
+            layer.markers.forEach(function (marker) {
+                var icon = L.divIcon({
+                    className: '', iconSize: [28, 28], iconAnchor: [14, 14],
+                    html: '<span class="map-pin" style="background:' + marker.color + '"><i class="fas fa-' + marker.icon + '"></i></span>'
+                });
+                L.marker([marker.lat, marker.lng], {icon: icon})
+                    .bindPopup('<b>' + marker.label + ':</b> ' + escape(marker.name))
+                    .addTo(map);
+            });
+            if (bounds.length) {
+                map.fitBounds(bounds, {padding: [20, 20]});
+            }
+        });
+    }
+})();
+"""
+MAP_SHELL_ETAG = hashlib.blake2b(MAP_SHELL_JS.encode('utf-8'), digest_size=8).hexdigest()
+
+# ===================== APLIKASI =====================
+def create_navigator(backend=None):
+    backend = backend or Config.ROUTING_BACKEND
+    live = LiveTraffic() if Config.LIVE_TRAFFIC else None
+    if backend == 'local':
+        try:
+            graph = RoadGraph.load(Config.ROAD_GRAPH_PATH)
+            traffic_predictor = TrafficPredictor(live=live)
+            router = LocalRouter(graph, traffic_predictor)
+            logger.info("Local routing graph loaded: %d vertices, %d edges", graph.n_vertices, graph.n_edges)
+            # Matriks precompute berisi rute OSRM, tidak dipakai bersama mesin lokal
+            return SmartNavigator(route_matrix=None, osrm_client=router, traffic_predictor=traffic_predictor)
+        except Exception as e:
+            logger.error("Failed to load road graph %s, falling back to OSRM: %s", Config.ROAD_GRAPH_PATH, e)
+    elif backend != 'osrm':
+        logger.warning("Unknown routing backend '%s', falling back to OSRM", backend)
+    return SmartNavigator(route_matrix=RouteMatrix.load_if_exists(Config.ROUTE_MATRIX_PATH), traffic_predictor=TrafficPredictor(live=live))
+
+def create_app(navigator=None, map_visualizer=None, background=True, preload=False):
+    # background=False: thread latar (ingest data live) baru dijalankan lewat start_background, mis. setelah fork.
+    # preload=True: /readyz menunggu warm_up selesai.
+    app = Flask(__name__)
+    # Template dilayani dari memori: tidak ada file yang ditulis saat startup
+    app.jinja_loader = DictLoader({'index.html': HTML_TEMPLATE})
+
+    if navigator is None:
+        navigator = create_navigator()
+    if map_visualizer is None:
+        map_visualizer = TrafficMap(navigator.traffic_predictor)
+    app.extensions['smartcity'] = {'navigator': navigator, 'map_visualizer': map_visualizer, 'preload': preload}
+
+    live = navigator.traffic_predictor.live
+    if live is not None and Config.LIVE_TRAFFIC_SOURCE:
+        try:
+            app.extensions['smartcity']['probe_ingestor'] = ProbeIngestor(live, open_probe_source(Config.LIVE_TRAFFIC_SOURCE))
+        except ValueError as e:
+            logger.error("Live traffic ingestion disabled: %s", e)
+    if background:
+        start_background(app)
+
+    app.register_blueprint(bp)
+    return app
+
+def start_background(app):
+    ingestor = app.extensions['smartcity'].get('probe_ingestor')
+    if ingestor is not None:
+        ingestor.start()
+        logger.info("Live traffic ingestion started from %s", Config.LIVE_TRAFFIC_SOURCE)
+
+def warm_up(app):
+    # Dijalankan sekali di proses master sebelum fork (gunicorn preload_app): modul berat, cache rute dari disk,
+    # snapshot kemacetan, peta dasar, dan struktur mesin rute lokal dibagi ke semua worker lewat copy-on-write.
+    # Tidak ada request ke OSRM di sini agar tidak ada koneksi yang diwarisi worker.
+    started = time.perf_counter()
+    services = app.extensions['smartcity']
+    navigator = services['navigator']
+    warmed_routes = navigator.route_cache.warm()
+    navigator.traffic_predictor.snapshot()
+    navigator.osrm.warm()
+    if Config.MAP_RENDERING == 'folium':
+        services['map_visualizer'].create_map()
+    else:
+        services['map_visualizer'].congestion_layer()
+    services['warmed'] = True
+    logger.info("Warm-up finished in %.2f s (%d cached routes, %d precomputed)", time.perf_counter() - started,
+                warmed_routes, len(navigator.route_matrix) if navigator.route_matrix is not None else 0)
+
+def after_fork(app):
+    # Dipanggil di tiap worker setelah fork (lihat gunicorn.conf.py)
+    app.extensions['smartcity']['navigator'].after_fork()
+    app.extensions['smartcity']['map_visualizer'].after_fork()
+    start_background(app)
+
+if __name__ == "__main__":
+    # Server development Werkzeug; untuk produksi: gunicorn -c gunicorn.conf.py wsgi:app
+    logging.basicConfig(level=logging.DEBUG)
+    app = create_app()
+    app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 8080)), debug=os.environ.get('FLASK_DEBUG', '0') == '1')
\ No newline at end of file
@@ -0,0 +1,17 @@
+# -- coding: utf-8 --
+# Entry point WSGI untuk produksi:
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Dengan preload_app (gunicorn.conf.py) modul ini diimpor sekali di proses master: aplikasi dibuat dan
+# dipanaskan sebelum fork sehingga matriks rute, graf jalan, dan peta dasar dibagi ke semua worker.
+import logging
+import os
+
+import ujianakhir
+
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO').upper(),
+                    format='%(asctime)s [%(process)d] %(levelname)s %(name)s: %(message)s')
+
+app = ujianakhir.create_app(background=False, preload=True)
+ujianakhir.warm_up(app)